@@ -0,0 +1,247 @@
+"""
+Admission Control for Generation Endpoints
+
+Keeps one user from monopolising threadpool workers, DB connections and paid
+API calls. Each generation request (POST /personas, avatar regeneration,
+POST /conversations/challenge, POST /conversations/{id}/continue) must be
+admitted before any work starts:
+
+1. In flight: at most GENERATION_MAX_IN_FLIGHT_PER_USER generations per user
+   and GENERATION_MAX_IN_FLIGHT across the instance.
+2. Budget: optional daily (UTC) token / image budgets per user, checked
+   against usage_events plus not-yet-flushed usage (app/services/usage.py).
+3. Rate: a per-user token bucket refilling at GENERATION_RATE_PER_MINUTE,
+   holding up to GENERATION_BURST requests.
+
+A rejected request gets 429 with Retry-After before touching any service.
+Limits set to 0 are disabled. State is per process, like the other in-memory
+counters; with several instances the global limit applies to each.
+
+The slot covers the request only. Endpoints that enqueue a job
+(/continue?background=true, /auto-run, challenge builds, experiments)
+release it once the job is queued; the job queue then runs at most
+JOB_MAX_RUNNING_PER_USER of a user's jobs at once (see claim_job), within
+the worker pool (JOB_WORKER_CONCURRENCY). The rate limit and budgets still
+apply per request.
+
+Usage:
+    @router.post("/conversations/{unique_id}/continue")
+    def continue_conversation(..., slot: GenerationSlot = Depends(generation_slot)):
+        ...
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import get_db
+from app.dependencies import get_current_user
+from app.models.user import User
+
+# Suggested wait when rejected for concurrency (a turn takes seconds to tens of seconds)
+IN_FLIGHT_RETRY_AFTER = 5.0
+
+
+class AdmissionRejected(Exception):
+    """A generation request was over a limit; retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled at `rate` per second."""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class GenerationSlot:
+    """An admitted generation; release() (idempotent) frees its in-flight place."""
+
+    def __init__(self, controller: "AdmissionController", user_id: int):
+        self.controller = controller
+        self.user_id = user_id
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.controller._release(self.user_id)
+
+
+class AdmissionController:
+    """
+    Per-user token buckets and in-flight counters, plus budget checks.
+
+    Limits are read from settings on every call so they can be tuned (and
+    patched in tests) without rebuilding the controller.
+
+    Args:
+        clock: Monotonic time source (seconds)
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._in_flight: Dict[int, int] = {}
+        self._total_in_flight = 0
+        self.rejected: Dict[str, int] = {"in_flight": 0, "global_in_flight": 0, "budget": 0, "rate": 0}
+
+    def admit(self, user_id: int, db: Optional[Session] = None) -> GenerationSlot:
+        """
+        Admit one generation for user_id or raise AdmissionRejected.
+
+        Args:
+            user_id: Requesting user
+            db: Session for the budget check (skipped when None or no budget is set)
+        """
+        if db is not None:
+            self.check_budget(user_id, db)
+
+        per_user = settings.GENERATION_MAX_IN_FLIGHT_PER_USER
+        total = settings.GENERATION_MAX_IN_FLIGHT
+        rate = settings.GENERATION_RATE_PER_MINUTE / 60
+        now = self.clock()
+        with self._lock:
+            if per_user and self._in_flight.get(user_id, 0) >= per_user:
+                self._reject("in_flight", f"Too many generations in progress (max {per_user})", IN_FLIGHT_RETRY_AFTER)
+            if total and self._total_in_flight >= total:
+                self._reject("global_in_flight", "Server is busy generating; try again shortly", IN_FLIGHT_RETRY_AFTER)
+            bucket = None
+            if rate > 0:
+                bucket = self._buckets.get(user_id)
+                if bucket is None:
+                    bucket = self._buckets[user_id] = TokenBucket(rate, max(1, settings.GENERATION_BURST), now)
+                wait = bucket.wait_time(now)
+                if wait > 0:
+                    self._reject("rate", "Generation rate limit exceeded", wait)
+                bucket.take()
+            self._in_flight[user_id] = self._in_flight.get(user_id, 0) + 1
+            self._total_in_flight += 1
+        return GenerationSlot(self, user_id)
+
+    def _reject(self, kind: str, reason: str, retry_after: float) -> None:
+        self.rejected[kind] += 1
+        raise AdmissionRejected(reason, retry_after)
+
+    def _release(self, user_id: int) -> None:
+        with self._lock:
+            remaining = self._in_flight.get(user_id, 0) - 1
+            if remaining > 0:
+                self._in_flight[user_id] = remaining
+            else:
+                self._in_flight.pop(user_id, None)
+            self._total_in_flight = max(0, self._total_in_flight - 1)
+
+    def check_budget(self, user_id: int, db: Session) -> None:
+        """Raise AdmissionRejected if the user has spent today's budget."""
+        token_budget = settings.USER_DAILY_TOKEN_BUDGET
+        image_budget = settings.USER_DAILY_IMAGE_BUDGET
+        if not token_budget and not image_budget:
+            return
+        tokens, images = daily_usage(db, user_id)
+        if (token_budget and tokens >= token_budget) or (image_budget and images >= image_budget):
+            now = datetime.now(timezone.utc)
+            midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            with self._lock:
+                self._reject("budget", "Daily generation budget exhausted", (midnight - now).total_seconds())
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self._total_in_flight,
+                "in_flight_by_user": dict(self._in_flight),
+                "rejected": dict(self.rejected),
+                "limits": {
+                    "rate_per_minute": settings.GENERATION_RATE_PER_MINUTE,
+                    "burst": settings.GENERATION_BURST,
+                    "max_in_flight_per_user": settings.GENERATION_MAX_IN_FLIGHT_PER_USER,
+                    "max_in_flight": settings.GENERATION_MAX_IN_FLIGHT,
+                    "daily_token_budget": settings.USER_DAILY_TOKEN_BUDGET,
+                    "daily_image_budget": settings.USER_DAILY_IMAGE_BUDGET,
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._in_flight.clear()
+            self._total_in_flight = 0
+            self.rejected = dict.fromkeys(self.rejected, 0)
+
+
+def daily_usage(db: Session, user_id: int) -> Tuple[int, int]:
+    """(tokens, images) used by user_id since UTC midnight, including unflushed events."""
+    from app.models.usage import UsageEvent
+    from app.services.usage import usage_recorder
+
+    midnight = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    tokens, images = db.query(
+        func.coalesce(func.sum(UsageEvent.input_tokens + UsageEvent.output_tokens), 0),
+        func.coalesce(func.sum(UsageEvent.images), 0),
+    ).filter(UsageEvent.user_id == user_id, UsageEvent.created_at >= midnight).one()
+    pending_tokens, pending_images = usage_recorder.pending(user_id)
+    return int(tokens) + pending_tokens, int(images) + pending_images
+
+
+admission = AdmissionController()
+
+
+@contextmanager
+def admitted(user_id: int, db: Optional[Session] = None) -> Iterator[GenerationSlot]:
+    """
+    Admit one generation for user_id for the duration of the block.
+
+    Raises:
+        HTTPException: 429 with Retry-After when over a limit
+    """
+    try:
+        slot = admission.admit(user_id, db)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.reason,
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+    try:
+        yield slot
+    finally:
+        slot.release()
+
+
+def generation_slot(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> Iterator[GenerationSlot]:
+    """
+    Dependency admitting one generation for the current user (429 otherwise).
+
+    The slot is released when the request finishes, including for
+    endpoints that hand the generation to the job queue.
+    """
+    with admitted(current_user.id, db) as slot:
+        yield slot
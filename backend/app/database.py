@@ -9,11 +9,16 @@ Features:
 - Session factory for database operations
 - Dependency injection for FastAPI endpoints
 - Environment-based configuration (dev, test, prod)
+- Async engine/session (asyncpg, aiosqlite) for `async def` endpoints, so
+  I/O-bound requests wait on the connection pool instead of holding a
+  Starlette threadpool slot
 """
 
 import os
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
@@ -24,6 +29,7 @@ from sqlalchemy.pool import StaticPool
 
 # Import settings from config (loads .env file)
 from app.config import settings
+from app.db_pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
 # Get database URL from settings
 DATABASE_URL = settings.DATABASE_URL
@@ -31,6 +37,17 @@ DATABASE_URL = settings.DATABASE_URL
 # Testing mode uses SQLite in-memory for speed
 TESTING = settings.is_testing
 
+
+def pool_options() -> dict:
+    """QueuePool sizing shared by the sync and async PostgreSQL engines."""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,  # Persistent connections
+        "max_overflow": settings.DB_MAX_OVERFLOW,  # Additional connections if pool exhausted
+        "pool_timeout": settings.DB_POOL_TIMEOUT,  # Seconds to wait before TimeoutError
+        "pool_recycle": settings.DB_POOL_RECYCLE,  # Replace connections older than this
+        "echo": settings.DB_ECHO,  # Log SQL queries
+    }
+
 if TESTING:
     # Use SQLite in-memory for tests (fast, isolated)
     DATABASE_URL = "sqlite:///:memory:"
@@ -44,18 +61,77 @@ elif DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},
-        echo=settings.DEBUG,  # Log SQL queries in debug mode
+        echo=settings.DB_ECHO,
     )
 else:
-    # Production/development PostgreSQL
+    # Production/development PostgreSQL (pool sizing via DB_* settings)
     engine = create_engine(
         DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
         pool_pre_ping=True,  # Verify connections before using
-        pool_size=5,  # Connection pool size
-        max_overflow=10,  # Additional connections if pool exhausted
-        echo=settings.DEBUG,  # Log SQL queries in debug mode
+        connect_args=(
+            {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+            if settings.DB_STATEMENT_TIMEOUT_MS else {}
+        ),
+        **pool_options(),
     )
 
+# ============================================================================
+# Async Engine
+# ============================================================================
+
+# Async drivers for each sync dialect used by DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """
+    Translate a sync database URL to its async-driver equivalent.
+
+    postgresql:// and postgresql+psycopg2:// become postgresql+asyncpg://,
+    sqlite:// becomes sqlite+aiosqlite://. URLs that already name an async
+    driver are returned unchanged.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.get_driver_name() in ("asyncpg", "aiosqlite") or backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str):
+    """
+    Build an async engine for a (sync or async) database URL.
+
+    Used for the primary async engine and for read replicas, so both get
+    the same pool sizing, pre-ping and statement timeout.
+    """
+    url = async_database_url(url)
+    if url.startswith("sqlite"):
+        return create_async_engine(url, echo=settings.DB_ECHO)
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_pre_ping=True,
+        connect_args=(
+            {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+            if settings.DB_STATEMENT_TIMEOUT_MS else {}
+        ),
+        **pool_options(),
+    )
+
+
+if TESTING:
+    async_engine = create_async_engine(
+        async_database_url(DATABASE_URL),
+        poolclass=StaticPool,
+    )
+else:
+    async_engine = create_async_db_engine(DATABASE_URL)
+
 # ============================================================================
 # Session Factory
 # ============================================================================
@@ -66,6 +142,14 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# expire_on_commit=False: attributes can't lazy-refresh outside a greenlet,
+# so objects stay readable after commit (same values the sync path returns)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # ============================================================================
 # Base Model Class
 # ============================================================================
@@ -100,6 +184,25 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async database session dependency for `async def` endpoints.
+
+    Usage in FastAPI endpoint:
+        @app.get("/things")
+        async def list_things(db: AsyncSession = Depends(get_async_db)):
+            result = await db.execute(select(Thing))
+
+    Model helpers that lazy-load relationships (e.g. Conversation.to_dict)
+    must run through `await db.run_sync(...)`.
+
+    Yields:
+        AsyncSession: SQLAlchemy async database session
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 # ============================================================================
 # Database Initialization
 # ============================================================================
@@ -121,6 +224,11 @@ def init_db() -> None:
     from app.models import moderation  # noqa: F401
     from app.models import conversation  # noqa: F401
     from app.models import social  # noqa: F401
+    from app.models import ocean_cache  # noqa: F401
+    from app.models import usage  # noqa: F401
+    from app.models import idempotency  # noqa: F401
+    from app.models import job  # noqa: F401
+    from app.models import experiment  # noqa: F401
 
     Base.metadata.create_all(bind=engine)
 
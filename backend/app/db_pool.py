@@ -0,0 +1,116 @@
+"""
+Connection Pool Instrumentation
+
+QueuePool subclasses that record how long each connection checkout takes
+and how often a request had to wait because the pool was exhausted, so
+pool sizing can be tuned per instance size and pool starvation is visible.
+
+Exposed via GET /admin/db-pool.
+
+Usage:
+    engine = create_engine(url, poolclass=InstrumentedQueuePool, pool_size=5)
+    pool_status(engine)
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """Thread-safe checkout counters for one pool."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.waits = 0
+            self.timeouts = 0
+            self.total_checkout_ms = 0.0
+            self.max_checkout_ms = 0.0
+            self.total_wait_ms = 0.0
+
+    def record(self, elapsed_ms: float, waited: bool, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_checkout_ms += elapsed_ms
+                self.max_checkout_ms = max(self.max_checkout_ms, elapsed_ms)
+            if waited:
+                self.waits += 1
+                self.total_wait_ms += elapsed_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "avg_checkout_ms": round(self.total_checkout_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_checkout_ms": round(self.max_checkout_ms, 3),
+                "avg_wait_ms": round(self.total_wait_ms / self.waits, 3) if self.waits else 0.0,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Times QueuePool._do_get(); a checkout 'waited' if no connection was free."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # Pool.recreate() (engine.dispose()) builds a fresh pool; keep the counters
+        new_pool = super().recreate()
+        new_pool.stats = self.stats
+        return new_pool
+
+    def _do_get(self):
+        exhausted = self.checkedin() == 0 and self._max_overflow > -1 and self.overflow() >= self._max_overflow
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record((time.perf_counter() - start) * 1000, waited=True, timed_out=True)
+            raise
+        self.stats.record((time.perf_counter() - start) * 1000, waited=exhausted)
+        return conn
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool with checkout latency / wait metrics (sync engine)."""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout latency / wait metrics (async engine)."""
+
+
+def pool_status(engine) -> Dict[str, Any]:
+    """
+    Current pool occupancy plus cumulative checkout metrics for an engine.
+
+    Works for sync and async engines; pools without instrumentation (e.g. the
+    SQLite StaticPool used in tests) report occupancy only where available.
+    """
+    pool = getattr(engine, "sync_engine", engine).pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
@@ -0,0 +1,174 @@
+"""
+Read-Replica Routing
+
+Optional read replicas (DATABASE_REPLICA_URLS) for the public read
+endpoints (/discover, /p/{id}, /c/{id}, ...), so anonymous traffic stops
+competing with conversation writes on the primary.
+
+- ReplicaSet: round-robin over replica engines; a replica that raises a
+  connection error is skipped for DB_REPLICA_RETRY_SECONDS, and reads fall
+  back to the primary when no replica is healthy.
+- ReadYourWrites: after a user makes a successful write request, their reads
+  go to the primary for DB_REPLICA_STICKY_SECONDS (replication lag window).
+  Tracked per process, keyed by user ID.
+- RoutingSession: sync Session (wrapped by AsyncSession) whose get_bind()
+  sends SELECTs to the chosen replica and flushes / DML to the primary.
+  Once a session has written, all its later reads use the primary too.
+
+Usage:
+    @router.get("/discover")
+    async def discover(db: AsyncSession = Depends(get_read_db)):
+        ...
+
+    # Force a read to the primary (e.g. a dedup check before an insert)
+    await db.scalar(select(PageView).execution_options(use_primary=True))
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.auth import verify_token
+from app.config import settings
+from app.database import async_engine, create_async_db_engine
+from app.db_pool import pool_status
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """Round-robin replica selection with passive health checking."""
+
+    def __init__(self, engines: List[AsyncEngine], retry_seconds: float = 30.0) -> None:
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self._down_until: Dict[int, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for engine in engines:
+            self._watch(engine)
+
+    def _watch(self, engine: AsyncEngine) -> None:
+        @event.listens_for(engine.sync_engine, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(engine)
+
+    def mark_down(self, engine: AsyncEngine) -> None:
+        logger.warning(f"Read replica {engine.url.render_as_string()} failed; skipping for {self.retry_seconds}s")
+        with self._lock:
+            self._down_until[id(engine)] = time.monotonic() + self.retry_seconds
+
+    def is_healthy(self, engine: AsyncEngine) -> bool:
+        return self._down_until.get(id(engine), 0.0) <= time.monotonic()
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """Next healthy replica in round-robin order, or None (use the primary)."""
+        if not self.engines:
+            return None
+        start = next(self._counter)
+        for offset in range(len(self.engines)):
+            engine = self.engines[(start + offset) % len(self.engines)]
+            if self.is_healthy(engine):
+                return engine
+        return None
+
+    def status(self) -> List[dict]:
+        return [
+            {
+                "url": engine.url.render_as_string(),  # password masked
+                "healthy": self.is_healthy(engine),
+                **pool_status(engine),
+            }
+            for engine in self.engines
+        ]
+
+
+class ReadYourWrites:
+    """Per-user window during which reads must see the primary."""
+
+    def __init__(self, window_seconds: float = 5.0) -> None:
+        self.window_seconds = window_seconds
+        self._until: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: Optional[int]) -> None:
+        if user_id is None or self.window_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._until[user_id] = now + self.window_seconds
+            if len(self._until) > 10_000:
+                self._until = {uid: t for uid, t in self._until.items() if t > now}
+
+    def is_sticky(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        return self._until.get(user_id, 0.0) > time.monotonic()
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica (when given one) and writes to the primary."""
+
+    def __init__(self, *args, replica=None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.replica = replica
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self.replica is None or self.wrote:
+            return primary
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.wrote = True
+            return primary
+        if clause is not None and clause.get_execution_options().get("use_primary"):
+            return primary
+        return self.replica
+
+
+replicas = ReplicaSet(
+    [create_async_db_engine(url) for url in settings.database_replica_urls],
+    retry_seconds=settings.DB_REPLICA_RETRY_SECONDS,
+)
+read_your_writes = ReadYourWrites(settings.DB_REPLICA_STICKY_SECONDS)
+
+ReadSessionLocal = async_sessionmaker(
+    async_engine,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def request_user_id(request: Request) -> Optional[int]:
+    """User ID from the Bearer token, or None (no DB lookup, never raises)."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return verify_token(token.strip())
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async session for read-mostly public endpoints.
+
+    Reads go to a healthy replica unless none is configured/healthy or the
+    caller wrote within the read-your-writes window; writes always go to
+    the primary.
+    """
+    replica = None
+    if not read_your_writes.is_sticky(request_user_id(request)):
+        engine = replicas.choose()
+        replica = engine.sync_engine if engine is not None else None
+    async with ReadSessionLocal(replica=replica) as db:
+        yield db
@@ -10,14 +10,17 @@ This module was implemented following TDD:
 
 Dependencies:
 - get_current_user: Extracts JWT from header, validates, returns User
+- get_current_user_async / get_optional_user_async: Same, over the async
+  session, for `async def` endpoints
 """
 
 from typing import Optional
 from fastapi import Depends, HTTPException, status, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.auth import verify_token
 from app.models.user import User
 
@@ -47,6 +50,22 @@ def get_current_user(
     Raises:
         HTTPException: 401 if authentication fails
     """
+    user_id = _user_id_from_request(request)
+
+    # Fetch user from database
+    result = db.execute(
+        select(User).where(User.id == user_id)
+    )
+    user = result.scalar_one_or_none()
+
+    if user is None:
+        raise _user_not_found()
+
+    return user
+
+
+def _user_id_from_request(request: Request) -> int:
+    """Parse and verify the Bearer token, returning its user ID (401 on failure)."""
     # Extract Authorization header
     authorization: Optional[str] = request.headers.get("authorization")
 
@@ -78,20 +97,15 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Fetch user from database
-    result = db.execute(
-        select(User).where(User.id == user_id)
-    )
-    user = result.scalar_one_or_none()
+    return user_id
 
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
 
-    return user
+def _user_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="User not found",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
 
 def get_current_admin(
@@ -146,6 +160,36 @@ def get_current_user_optional(
 get_optional_user = get_current_user_optional
 
 
+async def get_current_user_async(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Authentication dependency for `async def` endpoints.
+
+    Same contract as get_current_user, but the user lookup goes through the
+    async session so the request never occupies a threadpool slot.
+    """
+    user_id = _user_id_from_request(request)
+
+    user = await db.scalar(select(User).where(User.id == user_id))
+    if user is None:
+        raise _user_not_found()
+
+    return user
+
+
+async def get_optional_user_async(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[User]:
+    """Async counterpart of get_current_user_optional."""
+    try:
+        return await get_current_user_async(request, db)
+    except HTTPException:
+        return None
+
+
 def get_current_superuser(
     current_user: User = Depends(get_current_user),
 ) -> User:
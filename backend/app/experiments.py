@@ -0,0 +1,162 @@
+"""
+Batch Experiment CLI
+
+Create, run, resume and export batch experiments (see
+app/services/experiments.py) without the API.
+
+Usage:
+    python -m app.experiments run spec.json --email me@example.com --concurrency 8 --out results.jsonl
+    python -m app.experiments status abc123
+    python -m app.experiments resume abc123 --concurrency 8 --out results.parquet
+    python -m app.experiments export abc123 --out results.jsonl
+    python -m app.experiments export abc123 --out results.data --format parquet
+
+spec.json: {"name": "...", "topics": [...], "persona_sets": [["persona_uid", ...], ...], "turns": [5]}
+
+run and resume start --concurrency job worker threads in this process (they
+also pick up any other queued jobs) and wait until every cell has finished;
+with --no-workers they only queue the cells for the deployed workers.
+Ctrl-C stops waiting; cells in progress finish their current turn, and
+`resume` carries on from there. The export format is --format, or else
+the --out suffix (.parquet, otherwise JSONL); parquet needs pyarrow.
+"""
+
+import argparse
+import json
+import logging
+import signal
+import sys
+import threading
+from typing import List, Optional
+
+from app.admission import AdmissionRejected
+from app.config import settings
+from app.database import SessionLocal
+from app.models.experiment import Experiment
+from app.models.user import User
+from app.services.experiments import (
+    create_experiment,
+    experiment_progress,
+    export_rows,
+    resume_experiment,
+    write_jsonl,
+    write_parquet,
+)
+from app.services.job_queue import start_workers
+from app.services.usage import usage_recorder
+
+logger = logging.getLogger("app.experiments")
+
+
+def _load(db, unique_id: str) -> Experiment:
+    experiment = db.query(Experiment).filter(Experiment.unique_id == unique_id).first()
+    if experiment is None:
+        sys.exit(f"Experiment {unique_id} not found")
+    return experiment
+
+
+def _wait(unique_id: str, concurrency: int) -> None:
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    logger.info(f"Starting {concurrency} job worker thread(s)")
+    threads = start_workers(concurrency, stop)
+    while not stop.wait(settings.JOB_POLL_INTERVAL_SECONDS * 5):
+        with SessionLocal() as db:
+            progress = experiment_progress(db, _load(db, unique_id))
+        logger.info(
+            f"{unique_id}: {progress['completed']}/{progress['cells']} cells, "
+            f"{progress['turns_completed']}/{progress['turns_total']} turns"
+        )
+        if progress["is_finished"]:
+            break
+    stop.set()
+    for thread in threads:
+        thread.join()
+    usage_recorder.flush()
+
+
+EXPORT_FORMATS = ("jsonl", "parquet")
+
+
+def _export(unique_id: str, out: str, fmt: Optional[str] = None) -> None:
+    fmt = fmt or ("parquet" if out.endswith(".parquet") else "jsonl")
+    with SessionLocal() as db:
+        rows = export_rows(db, _load(db, unique_id))
+        if fmt == "parquet":
+            count = write_parquet(rows, out)
+        else:
+            with open(out, "w", encoding="utf-8") as fp:
+                count = write_jsonl(rows, fp)
+    logger.info(f"Wrote {count} message(s) to {out}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run batch focus-group experiments")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="create an experiment from a spec file and run it")
+    run.add_argument("spec", help="JSON file with name, topics, persona_sets, turns")
+    run.add_argument("--email", required=True, help="owner of the experiment and its conversations")
+    resume = commands.add_parser("resume", help="re-queue unfinished cells and run them")
+    resume.add_argument("experiment", help="experiment unique_id")
+    for command in (run, resume):
+        command.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY)
+        command.add_argument("--no-workers", action="store_true", help="only queue; deployed workers run the cells")
+        command.add_argument("--out", help="afterwards, export to this .jsonl or .parquet file")
+        command.add_argument("--format", choices=EXPORT_FORMATS, help="export format (default: from --out)")
+    status = commands.add_parser("status", help="print progress")
+    status.add_argument("experiment", help="experiment unique_id")
+    export = commands.add_parser("export", help="write every cell's messages to a file")
+    export.add_argument("experiment", help="experiment unique_id")
+    export.add_argument("--out", required=True, help=".jsonl or .parquet file")
+    export.add_argument("--format", choices=EXPORT_FORMATS, help="export format (default: from --out)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    with SessionLocal() as db:
+        if args.command == "run":
+            with open(args.spec, encoding="utf-8") as fp:
+                spec = json.load(fp)
+            user = db.query(User).filter(User.email == args.email).first()
+            if user is None:
+                sys.exit(f"No user with email {args.email}")
+            try:
+                experiment = create_experiment(
+                    db, user.id, spec["name"],
+                    topics=spec["topics"],
+                    persona_sets=spec["persona_sets"],
+                    turns=spec.get("turns", [5]),
+                    is_public=spec.get("is_public", False),
+                )
+            except (LookupError, ValueError) as e:
+                sys.exit(str(e))
+            db.commit()
+            unique_id = experiment.unique_id
+            logger.info(f"Created experiment {unique_id} with {len(experiment.runs)} cell(s)")
+        elif args.command == "resume":
+            experiment = _load(db, args.experiment)
+            unique_id = experiment.unique_id
+            try:
+                resumed = resume_experiment(db, experiment)
+            except AdmissionRejected as e:
+                sys.exit(f"Not resuming {unique_id}: {e.reason}")
+            logger.info(f"Re-queued {resumed} cell(s) of {unique_id}")
+            db.commit()
+        elif args.command == "status":
+            print(json.dumps(experiment_progress(db, _load(db, args.experiment)), indent=2))
+            return
+        else:
+            _export(args.experiment, args.out, args.format)
+            return
+
+    if not args.no_workers:
+        _wait(unique_id, args.concurrency)
+    if args.out:
+        _export(unique_id, args.out, args.format)
+
+
+if __name__ == "__main__":
+    main()
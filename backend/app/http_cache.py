@@ -0,0 +1,143 @@
+"""
+HTTP Caching Helpers
+
+Weak ETag support for the GET endpoints the frontend polls (conversation
+state while a challenge is pending, after /continue, persona profiles).
+
+ETags are derived from row-level columns only (updated_at, turn_count,
+counters, the stored avatar key), so an unchanged poll can be answered
+with 304 Not Modified before any messages or participants are loaded or
+serialized.
+
+Bodies carry avatar URLs presigned for PRESIGNED_URL_EXPIRY_SECONDS, which
+the row columns cannot see. When avatars are served from S3 the ETag also
+includes the current half-lifetime window (presigned_url_window), so a
+client stops getting 304s while its cached URLs still have at least half
+their lifetime left.
+
+Usage:
+    etag = conversation_etag(conversation)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+"""
+
+import hashlib
+import time
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from app.config import settings
+from app.services.image_generation_service import PRESIGNED_URL_EXPIRY_SECONDS
+
+
+def weak_etag(*parts: Any) -> str:
+    """
+    Build a weak ETag from an ordered sequence of values.
+
+    Args:
+        *parts: Values that together identify a representation
+
+    Returns:
+        str: Weak ETag header value, e.g. 'W/"3f2a9c1d0b7e4a55"'
+    """
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    digest = hashlib.sha1(raw.encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def presigned_url_window() -> Optional[int]:
+    """Index of the current half-lifetime window of presigned avatar URLs; None if not presigning."""
+    if settings.LOCAL_AVATAR_DIR or not settings.S3_AVATAR_BUCKET:
+        return None
+    return int(time.time()) // (PRESIGNED_URL_EXPIRY_SECONDS // 2)
+
+
+def conversation_etag(conversation, *extra: Any) -> str:
+    """
+    Weak ETag for a conversation representation.
+
+    Uses only columns on the conversations row. Anything that adds messages
+    or changes participant state also bumps turn_count or updated_at.
+
+    Args:
+        conversation: Conversation model instance
+        *extra: Per-response variants (e.g. is_owner, since_id)
+    """
+    return weak_etag(
+        "conversation",
+        conversation.id,
+        conversation.updated_at.isoformat() if conversation.updated_at else None,
+        conversation.turn_count,
+        conversation.status,
+        conversation.is_public,
+        conversation.view_count,
+        conversation.upvote_count,
+        presigned_url_window(),  # Participant avatar URLs
+        *extra,
+    )
+
+
+def persona_etag(persona, *extra: Any) -> str:
+    """
+    Weak ETag for a persona representation.
+
+    Args:
+        persona: Persona model instance
+        *extra: Per-response variants (e.g. is_owner)
+    """
+    return weak_etag(
+        "persona",
+        persona.id,
+        persona.updated_at.isoformat() if persona.updated_at else None,
+        persona.is_public,
+        persona.view_count,
+        persona.upvote_count,
+        persona.avatar_url,  # Stored key, not the presigned URL in the body
+        presigned_url_window(),
+        *extra,
+    )
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Check the request's If-None-Match header against an ETag.
+
+    Uses weak comparison (RFC 9110 §13.1.2): the W/ prefix is ignored.
+
+    Args:
+        request: Incoming request
+        etag: Current ETag of the resource
+
+    Returns:
+        bool: True if the client's cached copy is still current
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    def _opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    current = _opaque(etag)
+    return any(_opaque(candidate) == current for candidate in header.split(","))
+
+
+# Browsers keep the response but revalidate it on every poll; "private"
+# because representations vary with the Authorization header (is_owner).
+CACHE_CONTROL = "private, no-cache"
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Attach the ETag and revalidation Cache-Control to a 200 response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    """Return an empty 304 response carrying the current ETag."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
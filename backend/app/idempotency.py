@@ -0,0 +1,174 @@
+"""
+Idempotent, Coalesced Generation
+
+A double-click or client retry on POST /conversations/{id}/continue used to
+run generate_turn twice: duplicate Claude calls, and two writers racing on
+conversation.turn_count. Two mechanisms stop that:
+
+1. Single-flight: concurrent requests for the same key (the conversation)
+   in this process share one in-flight generation. The first request does
+   the work; the others wait for it and return its result (or its error).
+2. Idempotency-Key: a request carrying the header stores its response in
+   idempotency_records. Retries with the same key within
+   IDEMPOTENCY_TTL_SECONDS replay it (with an Idempotent-Replayed header)
+   without generating again, on any instance.
+
+Requests on different instances can still overlap; the orchestrator's turn
+claim makes the later one fail with 409 instead of corrupting the turn.
+
+Usage:
+    replay = idempotency_store.get(db, user.id, key, request="continue:abc123")
+    if replay is not None:
+        return replay
+
+    result = turn_flight.do(conversation.id, generate)
+    idempotency_store.put(db, user.id, key, "continue:abc123", result)
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.idempotency import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one execution."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Run fn unless a call for key is already in flight, then share its outcome.
+
+        Raises:
+            Exception: Whatever fn raised, in the caller and every waiter
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._flights), "executed": self.executed, "coalesced": self.coalesced}
+
+
+class IdempotencyStore:
+    """Completed responses by (user, Idempotency-Key), in idempotency_records."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.replayed = 0
+
+    @staticmethod
+    def _cutoff() -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+
+    def get(self, db: Session, user_id: int, key: str, request: str) -> Optional[Dict[str, Any]]:
+        """
+        The stored response for key, or None if the key is new or expired.
+
+        Raises:
+            HTTPException: 422 if the key was used for a different request
+        """
+        record = db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.user_id == user_id,
+            IdempotencyRecord.key == key,
+        ).first()
+        if record is None:
+            return None
+        created_at = record.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        if created_at < self._cutoff():
+            db.delete(record)
+            db.commit()
+            return None
+        if record.request != request:
+            raise HTTPException(
+                status_code=422,
+                detail=f"{IDEMPOTENCY_HEADER} was already used for a different request",
+            )
+        with self._lock:
+            self.replayed += 1
+        return record.response
+
+    def put(self, db: Session, user_id: int, key: str, request: str, response: Dict[str, Any]) -> None:
+        """Store response for key and purge expired records. Never raises."""
+        try:
+            db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.created_at < self._cutoff()
+            ).delete(synchronize_session=False)
+            db.add(IdempotencyRecord(user_id=user_id, key=key, request=request, response=response))
+            db.commit()
+        except IntegrityError:
+            # A concurrent request with the same key stored it first
+            db.rollback()
+        except Exception as e:
+            logger.warning(f"Could not store idempotency record: {e}")
+            db.rollback()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"replayed": self.replayed}
+
+
+def validate_key(key: Optional[str]) -> Optional[str]:
+    """Check an Idempotency-Key header value (None when absent)."""
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters",
+        )
+    return key
+
+
+turn_flight = SingleFlight()
+idempotency_store = IdempotencyStore()
@@ -22,6 +22,7 @@ from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 import os
 import logging
+import threading
 
 # Import version from package
 from app import __version__
@@ -83,6 +84,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Retry-After", "Idempotent-Replayed"],  # polling; pagination; 429s; replays
 )
 
 # Session middleware required for OAuth (stores state)
@@ -91,6 +93,29 @@ app.add_middleware(
     secret_key=settings.JWT_SECRET
 )
 
+
+# Read-your-writes: after a successful write, route the user's reads to the
+# primary for DB_REPLICA_STICKY_SECONDS (no-op without DATABASE_REPLICA_URLS)
+from app.db_replicas import read_your_writes, replicas, request_user_id  # noqa: E402
+
+
+from app.services.usage import usage_context, usage_recorder  # noqa: E402
+
+
+@app.middleware("http")
+async def attribute_usage(request, call_next):
+    """Attribute AI calls made while serving this request to its user and route."""
+    with usage_context(user_id=request_user_id(request), scope=request.scope):
+        return await call_next(request)
+
+
+@app.middleware("http")
+async def mark_primary_after_write(request, call_next):
+    response = await call_next(request)
+    if replicas.engines and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        read_your_writes.mark(request_user_id(request))
+    return response
+
 # ============================================================================
 # OpenAPI Customization for Swagger UI
 # ============================================================================
@@ -131,6 +156,10 @@ app.openapi = custom_openapi
 # Startup/Shutdown Events
 # ============================================================================
 
+# Stops the in-process job workers (JOB_INLINE_WORKER) at shutdown
+_job_workers_stop = threading.Event()
+
+
 @app.on_event("startup")
 async def startup_event():
     """
@@ -140,11 +169,17 @@ async def startup_event():
     logger.info(f"Starting AI Focus Groups API v{__version__}")
     logger.info(f"Environment: {settings.ENV}")
 
+    if settings.JOB_INLINE_WORKER and not settings.is_testing:
+        from app.services.job_queue import start_workers
+        start_workers(settings.JOB_WORKER_CONCURRENCY, _job_workers_stop)
+        logger.info(f"Started {settings.JOB_WORKER_CONCURRENCY} inline job worker(s)")
+
     # Preview mode: override auth to return a dummy user without DB lookup.
     # This allows smoke tests to exercise all endpoints without seeding users.
     if settings.ENV == "preview":
         from app.dependencies import (
             get_current_user, get_current_user_optional,
+            get_current_user_async, get_optional_user_async,
             get_current_admin, get_current_superuser,
         )
         from app.models.user import User
@@ -163,6 +198,8 @@ async def startup_event():
 
         app.dependency_overrides[get_current_user] = _dummy_user
         app.dependency_overrides[get_current_user_optional] = _dummy_user
+        app.dependency_overrides[get_current_user_async] = _dummy_user
+        app.dependency_overrides[get_optional_user_async] = _dummy_user
         app.dependency_overrides[get_current_admin] = _dummy_user
         app.dependency_overrides[get_current_superuser] = _dummy_user
         logger.info("Preview mode: auth dependencies overridden with dummy user")
@@ -175,6 +212,8 @@ async def shutdown_event():
     Future: Close database connections, cleanup resources, etc.
     """
     logger.info("Shutting down AI Focus Groups API")
+    _job_workers_stop.set()
+    usage_recorder.close()
 
 
 # ============================================================================
@@ -243,13 +282,15 @@ if settings.LOCAL_AVATAR_DIR:
     logger.info(f"Serving local avatars from {settings.LOCAL_AVATAR_DIR} at /avatars")
 
 # Authentication routes (OAuth 2.0)
-from app.routers import auth, users, personas, admin, conversations, discovery
+from app.routers import auth, users, personas, admin, conversations, discovery, jobs, experiments
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(personas.router)
 app.include_router(admin.router)
 app.include_router(conversations.router)
 app.include_router(discovery.router)
+app.include_router(jobs.router)
+app.include_router(experiments.router)
 
 
 # ============================================================================
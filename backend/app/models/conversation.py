@@ -16,10 +16,10 @@ TDD Status:
 import secrets
 import string
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean, func, event
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean, Index, and_, or_, func, event, text
+from sqlalchemy.orm import Session, object_session, relationship
 
 from app.database import Base
 
@@ -72,6 +72,28 @@ class Conversation(Base):
         doc="unique_id of the conversation this was forked from"
     )
 
+    parent_id = Column(
+        Integer, ForeignKey("conversations.id", ondelete="RESTRICT"),
+        nullable=True, index=True,
+        doc="Internal ID of the conversation whose transcript this fork shares (copy-on-write). "
+            "RESTRICT: a parent must materialize its forks before it can be deleted"
+    )
+
+    fork_point_turn = Column(
+        Integer, nullable=True,
+        doc="Turn count of the source at the moment it was forked"
+    )
+
+    fork_point_message_id = Column(
+        Integer, nullable=True,
+        doc="Last parent message visible to this fork; parent rows above it are not shared"
+    )
+
+    fork_depth = Column(
+        Integer, nullable=False, default=0, server_default="0",
+        doc="Number of shared ancestors in the fork chain (0 = owns its full transcript)"
+    )
+
     view_count = Column(
         Integer, nullable=False, default=0, server_default="0",
         doc="Deduplicated page view count"
@@ -99,7 +121,7 @@ class Conversation(Base):
 
     status = Column(
         String(20), nullable=False, default="active", server_default="'active'",
-        doc="'active' (ready) | 'pending' (challenge personas still being generated)"
+        doc="'active' (ready) | 'pending' (challenge personas still being generated) | 'failed' (generation gave up)"
     )
 
     created_at = Column(
@@ -112,6 +134,22 @@ class Conversation(Base):
         onupdate=func.now(), nullable=False, doc="Last update timestamp"
     )
 
+    # Indexes shaped to the router queries (see tests/unit/test_query_plans.py)
+    __table_args__ = (
+        # GET /conversations: WHERE created_by = ? ORDER BY created_at DESC
+        Index("ix_conversations_creator_created", "created_by", "created_at"),
+        # /discover?sort=new, /p/{id}/conversations?sort=new
+        Index(
+            "ix_conversations_public_created", "created_at",
+            postgresql_where=text("is_public"), sqlite_where=text("is_public = 1"),
+        ),
+        # /discover?sort=top
+        Index(
+            "ix_conversations_public_upvotes", "upvote_count", "view_count",
+            postgresql_where=text("is_public"), sqlite_where=text("is_public = 1"),
+        ),
+    )
+
     # Relationships
     messages = relationship(
         "ConversationMessage",
@@ -131,8 +169,65 @@ class Conversation(Base):
         """True when the conversation has reached its maximum turn count."""
         return self.turn_count >= self.max_turns
 
+    # ------------------------------------------------------------------
+    # Copy-on-write transcript
+    # ------------------------------------------------------------------
+
+    def transcript_segments(self, session=None) -> List[Tuple[int, Optional[int]]]:
+        """
+        Resolve the fork chain into message segments.
+
+        Returns a list of (conversation_id, max_message_id) pairs: this
+        conversation's own rows (unbounded) followed by one bounded segment
+        per shared ancestor. Message ids only grow, so the bound is the
+        tightest fork point seen so far along the chain. The walk is capped
+        by fork_depth, which fork creation keeps at or below
+        settings.FORK_MAX_DEPTH.
+        """
+        segments = [(self.id, None)]
+        if self.parent_id is None or self.fork_point_message_id is None:
+            return segments
+
+        session = session or object_session(self)
+        max_id = self.fork_point_message_id
+        node = self
+        for _ in range(max(self.fork_depth, 1)):
+            parent = session.get(Conversation, node.parent_id)
+            if parent is None:
+                break
+            segments.append((parent.id, max_id))
+            if parent.parent_id is None or parent.fork_point_message_id is None:
+                break
+            max_id = min(max_id, parent.fork_point_message_id)
+            node = parent
+        return segments
+
+    def transcript_query(self, session=None):
+        """Query for every message visible in this conversation, in display order."""
+        session = session or object_session(self)
+        return (
+            session.query(ConversationMessage)
+            .filter(transcript_clause(self.transcript_segments(session)))
+            .order_by(ConversationMessage.turn_number, ConversationMessage.id)
+        )
+
+    def get_transcript(self) -> List["ConversationMessage"]:
+        """Own messages for standalone conversations; spliced chain for shared forks."""
+        if self.parent_id is None:
+            return list(self.messages)
+        return self.transcript_query().all()
+
+    def last_visible_message_id(self, session=None) -> Optional[int]:
+        """Highest message id in this conversation's transcript (own rows first, then inherited bound)."""
+        session = session or object_session(self)
+        own_max = session.query(func.max(ConversationMessage.id)).filter(
+            ConversationMessage.conversation_id == self.id
+        ).scalar()
+        if own_max is not None:
+            return own_max
+        return self.fork_point_message_id if self.parent_id is not None else None
+
     def to_dict(self, include_messages: bool = False) -> Dict[str, Any]:
-        from app.services.image_generation_service import generate_presigned_url
         d = {
             "id": self.id,
             "unique_id": self.unique_id,
@@ -147,29 +242,35 @@ class Conversation(Base):
             "challenge_type": self.challenge_type,
             "status": self.status,
             "forked_from_id": self.forked_from_id,
+            "fork_point_turn": self.fork_point_turn,
             "view_count": self.view_count,
             "upvote_count": self.upvote_count,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "participants": [
-                {
-                    "persona_id": p.persona_id,
-                    "persona_name": p.persona.name if p.persona else None,
-                    "persona_unique_id": p.persona.unique_id if p.persona else None,
-                    "avatar_url": (
-                        generate_presigned_url(p.persona.avatar_url)
-                        if p.persona and p.persona.avatar_url and p.persona.avatar_url.startswith("avatars/")
-                        else (p.persona.avatar_url if p.persona else None)
-                    ),
-                    "persuaded_score": p.persuaded_score,
-                }
-                for p in self.participants
-            ],
+            "participants": self.participants_to_dict(),
         }
         if include_messages:
-            d["messages"] = [m.to_dict() for m in self.messages]
+            d["messages"] = [m.to_dict() for m in self.get_transcript()]
         return d
 
+    def participants_to_dict(self) -> List[Dict[str, Any]]:
+        """Serialize participants with display fields and current persuasion scores."""
+        from app.services.image_generation_service import generate_presigned_url
+        return [
+            {
+                "persona_id": p.persona_id,
+                "persona_name": p.persona.name if p.persona else None,
+                "persona_unique_id": p.persona.unique_id if p.persona else None,
+                "avatar_url": (
+                    generate_presigned_url(p.persona.avatar_url)
+                    if p.persona and p.persona.avatar_url and p.persona.avatar_url.startswith("avatars/")
+                    else (p.persona.avatar_url if p.persona else None)
+                ),
+                "persuaded_score": p.persuaded_score,
+            }
+            for p in self.participants
+        ]
+
     def __repr__(self) -> str:
         return f"<Conversation(unique_id='{self.unique_id}', topic='{self.topic[:30]}')>"
 
@@ -260,6 +361,11 @@ class ConversationMessage(Base):
         doc="ID of the message this is a reply to"
     )
 
+    # Transcript reads: WHERE conversation_id = ? [AND id <= ?] ORDER BY turn_number, id
+    __table_args__ = (
+        Index("ix_conversation_messages_transcript", "conversation_id", "turn_number", "id"),
+    )
+
     conversation = relationship("Conversation", back_populates="messages")
     reply_to = relationship("ConversationMessage", remote_side=[id])
 
@@ -283,6 +389,25 @@ class ConversationMessage(Base):
         return f"<ConversationMessage(persona='{self.persona_name}', turn={self.turn_number})>"
 
 
+def transcript_clause(segments, columns=None):
+    """
+    Build the WHERE clause selecting the messages of a transcript.
+
+    Args:
+        segments: Output of Conversation.transcript_segments()
+        columns: Column collection to filter on (defaults to the
+                 conversation_messages table; pass an alias's .c for Core)
+    """
+    c = columns if columns is not None else ConversationMessage.__table__.c
+    clauses = []
+    for conversation_id, max_id in segments:
+        if max_id is None:
+            clauses.append(c.conversation_id == conversation_id)
+        else:
+            clauses.append(and_(c.conversation_id == conversation_id, c.id <= max_id))
+    return or_(*clauses)
+
+
 # ============================================================================
 # SQLAlchemy Event Listeners
 # ============================================================================
@@ -297,3 +422,19 @@ def generate_conversation_unique_id(mapper, connection, target):
 @event.listens_for(Conversation, "before_update")
 def update_conversation_timestamp(mapper, connection, target):
     target.updated_at = datetime.utcnow()
+
+
+@event.listens_for(Session, "before_flush")
+def materialize_forks_of_deleted(session, flush_context, instances):
+    """
+    Copy shared rows into the forks of conversations being deleted.
+
+    Runs for every session delete (owner delete, superuser force delete,
+    admin scripts), so a fork never loses the transcript it shares.
+    """
+    deleted = [obj for obj in session.deleted if isinstance(obj, Conversation)]
+    if not deleted:
+        return
+    from app.services.fork_service import materialize_forks
+    for conversation in deleted:
+        materialize_forks(session, conversation)
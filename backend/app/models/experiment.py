@@ -0,0 +1,87 @@
+"""
+Batch Experiment Models
+
+An experiment runs every combination of topics x persona sets x turn counts
+as its own conversation (see app/services/experiments.py).
+
+Models:
+- Experiment: The matrix a user submitted
+- ExperimentRun: One cell of the matrix and the conversation that runs it
+
+Progress is checkpointed by the conversations themselves (each turn is
+committed as it is generated), so a run is complete once its conversation
+has `turns` turns, and resuming only re-queues the unfinished cells.
+"""
+
+from typing import Any, Dict
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, UniqueConstraint, event, func
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import JSON
+
+from app.database import Base
+from app.models.conversation import _generate_unique_id
+
+
+class Experiment(Base):
+    """A topic x persona set x turns matrix of conversations."""
+
+    __tablename__ = "experiments"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    unique_id = Column(String(6), unique=True, nullable=False, index=True, doc="Public 6-char alphanumeric ID")
+
+    name = Column(String(200), nullable=False)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    spec = Column(JSON, nullable=False, doc="Submitted matrix: topics, persona_sets (persona unique_ids), turns")
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    runs = relationship(
+        "ExperimentRun", back_populates="experiment", order_by="ExperimentRun.cell_index",
+        cascade="all, delete-orphan",
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "unique_id": self.unique_id,
+            "name": self.name,
+            "spec": self.spec,
+            "cells": len(self.runs),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self) -> str:
+        return f"<Experiment(id={self.id}, unique_id='{self.unique_id}', name='{self.name}')>"
+
+
+class ExperimentRun(Base):
+    """One (topic, persona set, turns) cell and its conversation."""
+
+    __tablename__ = "experiment_runs"
+    __table_args__ = (
+        UniqueConstraint("experiment_id", "cell_index", name="uq_experiment_runs_cell"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    experiment_id = Column(Integer, ForeignKey("experiments.id", ondelete="CASCADE"), nullable=False)
+    cell_index = Column(Integer, nullable=False, doc="Position in the expanded matrix")
+
+    topic = Column(String(1000), nullable=False)
+    persona_set = Column(Integer, nullable=False, doc="Index into spec['persona_sets']")
+    turns = Column(Integer, nullable=False)
+
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="SET NULL"), nullable=True, index=True)
+
+    experiment = relationship("Experiment", back_populates="runs")
+    conversation = relationship("Conversation")
+
+    def __repr__(self) -> str:
+        return f"<ExperimentRun(experiment_id={self.experiment_id}, cell_index={self.cell_index})>"
+
+
+@event.listens_for(Experiment, "before_insert")
+def generate_experiment_unique_id(mapper, connection, target):
+    """Auto-generate unique_id before insert if not set."""
+    if target.unique_id is None:
+        target.unique_id = _generate_unique_id()
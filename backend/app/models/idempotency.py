@@ -0,0 +1,32 @@
+"""
+Idempotency Record Model
+
+Completed responses of requests sent with an Idempotency-Key header, kept for
+IDEMPOTENCY_TTL_SECONDS so retries replay the original result instead of
+repeating the work (see app/idempotency.py).
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint, func
+from sqlalchemy.types import JSON
+
+from app.database import Base
+
+
+class IdempotencyRecord(Base):
+    """The response a user's Idempotency-Key resolved to."""
+
+    __tablename__ = "idempotency_records"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_records_user_key"),
+        Index("ix_idempotency_records_created", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key = Column(String(255), nullable=False, doc="Client-supplied Idempotency-Key header")
+
+    request = Column(String(255), nullable=False, doc="What the key was used for, e.g. 'continue:abc123'")
+    response = Column(JSON, nullable=False, doc="Response body returned to the original request")
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,80 @@
+"""
+Background Job Model
+
+Durable queue of work that used to run inside HTTP requests or FastAPI
+BackgroundTasks (challenge builds, conversation turns). Rows are claimed by
+workers with SELECT ... FOR UPDATE SKIP LOCKED; see app/services/job_queue.py.
+
+Lifecycle: queued -> running -> succeeded | failed | cancelled. A running
+job whose locked_until has passed (the worker died or hung) is claimable
+again; a failed attempt is re-queued with backoff until max_attempts is
+reached. Cancelling a queued job ends it at once; a running job is asked to
+stop via cancel_requested, which long handlers check between steps.
+"""
+
+from typing import Any, Dict
+
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text, func, text
+from sqlalchemy.types import JSON
+
+from app.database import Base
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class Job(Base):
+    """One unit of background work and its outcome."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_claim", "status", "run_after"),
+        # At most one active job per dedupe key (e.g. one turn per conversation at a time)
+        Index(
+            "uq_jobs_active_dedupe_key", "dedupe_key", unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    kind = Column(String(50), nullable=False, doc="Handler name, e.g. 'generate_turn', 'build_challenge'")
+    payload = Column(JSON, nullable=False, default=dict)
+    dedupe_key = Column(String(100), nullable=True, doc="Enqueueing the same key while active returns the existing job")
+
+    status = Column(String(20), nullable=False, default="queued", doc="queued | running | succeeded | failed | cancelled")
+    cancel_requested = Column(Boolean, nullable=False, default=False, server_default="false")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), doc="Not claimable before this (retry backoff)")
+
+    locked_by = Column(String(100), nullable=True, doc="Worker holding the job")
+    locked_until = Column(DateTime(timezone=True), nullable=True, doc="Visibility timeout; extended by worker heartbeats")
+
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True, doc="Last failure")
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "cancel_requested": self.cancel_requested,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self) -> str:
+        return f"<Job(id={self.id}, kind='{self.kind}', status='{self.status}')>"
@@ -0,0 +1,37 @@
+"""
+OCEAN Inference Cache Model
+
+Persistent back of the OCEAN inference cache (app/services/ocean_cache.py):
+one row per (model, prompt version, normalised description) hash.
+"""
+
+from typing import Dict
+
+from sqlalchemy import Column, DateTime, Integer, String, func
+from sqlalchemy.types import JSON
+
+from app.database import Base
+
+
+class OceanInferenceCacheEntry(Base):
+    """Cached OCEAN scores for one inference input."""
+
+    __tablename__ = "ocean_inference_cache"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    cache_key = Column(
+        String(64), nullable=False, unique=True, index=True,
+        doc="sha256 of model + prompt version + normalised description"
+    )
+
+    model = Column(String(100), nullable=False, doc="Claude model that produced the scores")
+
+    prompt_version = Column(Integer, nullable=False, doc="ocean_inference.PROMPT_VERSION at inference time")
+
+    scores = Column(JSON, nullable=False, doc="{openness, conscientiousness, extraversion, agreeableness, neuroticism}")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def get_scores(self) -> Dict[str, float]:
+        return {key: float(value) for key, value in self.scores.items()}
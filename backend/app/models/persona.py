@@ -25,6 +25,7 @@ Fields:
 - ocean_agreeableness: OCEAN A score [0.0, 1.0]
 - ocean_neuroticism: OCEAN N score [0.0, 1.0]
 - archetype_affinities: JSON dict of archetype affinity scores
+- prompt_block / prompt_block_version: pre-rendered conversation prompt opening
 - motto: AI-generated personal motto
 - avatar_url: Generated avatar image URL
 - created_at / updated_at: Timestamps
@@ -35,12 +36,30 @@ import string
 from datetime import datetime
 from typing import Optional, Dict, Any
 
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean, func, event
+from sqlalchemy import DDL, Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean, Index, func, event, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import JSON
 
 from app.database import Base
 from app.services.image_generation_service import generate_presigned_url
+from app.services.prompt_templates import PERSONA_BLOCK_VERSION, render_persona_block
+
+
+# Weighted full-text document for public persona search (PostgreSQL). Used
+# verbatim by both the GIN expression index and the search query so the
+# planner can match them: name (A) > motto (B) > description (C).
+SEARCH_DOCUMENT_SQL = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(motto, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C')"
+)
+
+# PostgreSQL-only search indexes (docker-entrypoint.sh creates them on existing DBs)
+SEARCH_INDEX_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_personas_search ON personas USING GIN (({SEARCH_DOCUMENT_SQL})) WHERE is_public",
+    "CREATE INDEX IF NOT EXISTS ix_personas_name_trgm ON personas USING GIN (name gin_trgm_ops) WHERE is_public",
+]
 
 
 def _generate_unique_id(length: int = 6) -> str:
@@ -212,6 +231,18 @@ class Persona(Base):
         doc="URL of generated avatar image"
     )
 
+    prompt_block = Column(
+        Text,
+        nullable=True,
+        doc="Pre-rendered persona section of conversation prompts (render_persona_block)"
+    )
+
+    prompt_block_version = Column(
+        Integer,
+        nullable=True,
+        doc="PERSONA_BLOCK_VERSION prompt_block was rendered with"
+    )
+
     # =========================================================================
     # Social / Discovery
     # =========================================================================
@@ -259,6 +290,25 @@ class Persona(Base):
         doc="Last modification timestamp"
     )
 
+    # =========================================================================
+    # Indexes (shaped to the router queries; see tests/unit/test_query_plans.py)
+    # =========================================================================
+
+    __table_args__ = (
+        # GET /personas: WHERE user_id = ? ORDER BY created_at DESC
+        Index("ix_personas_user_created", "user_id", "created_at"),
+        # GET /personas/public, /discover?sort=top: public only, ranked by upvotes
+        Index(
+            "ix_personas_public_upvotes", "upvote_count", "created_at",
+            postgresql_where=text("is_public"), sqlite_where=text("is_public = 1"),
+        ),
+        # /discover?sort=new
+        Index(
+            "ix_personas_public_created", "created_at",
+            postgresql_where=text("is_public"), sqlite_where=text("is_public = 1"),
+        ),
+    )
+
     # =========================================================================
     # Relationships
     # =========================================================================
@@ -291,6 +341,27 @@ class Persona(Base):
             "N": float(self.ocean_neuroticism),
         }
 
+    def render_prompt_block(self) -> str:
+        """Render the persona's conversation prompt block from its current fields."""
+        return render_persona_block(
+            self.name,
+            {
+                "openness": self.ocean_openness,
+                "conscientiousness": self.ocean_conscientiousness,
+                "extraversion": self.ocean_extraversion,
+                "agreeableness": self.ocean_agreeableness,
+                "neuroticism": self.ocean_neuroticism,
+            },
+            self.attitude,
+            self.description or "",
+        )
+
+    def current_prompt_block(self) -> str:
+        """The stored prompt block, or a fresh render if it predates PERSONA_BLOCK_VERSION."""
+        if self.prompt_block is not None and self.prompt_block_version == PERSONA_BLOCK_VERSION:
+            return self.prompt_block
+        return self.render_prompt_block()
+
     def to_dict(self) -> Dict[str, Any]:
         """
         Serialize persona to a dictionary for API responses.
@@ -338,6 +409,38 @@ def generate_unique_id(mapper, connection, target):
         target.unique_id = _generate_unique_id()
 
 
+@event.listens_for(Persona, "before_insert")
+@event.listens_for(Persona, "before_update")
+def store_prompt_block(mapper, connection, target):
+    """Keep prompt_block in step with the fields it is rendered from."""
+    block = target.render_prompt_block()
+    if block != target.prompt_block or target.prompt_block_version != PERSONA_BLOCK_VERSION:
+        target.prompt_block = block
+        target.prompt_block_version = PERSONA_BLOCK_VERSION
+
+
+def backfill_prompt_blocks(db, batch_size: int = 500) -> int:
+    """
+    Render prompt_block for personas stored without one, or with an older
+    PERSONA_BLOCK_VERSION. Run by docker-entrypoint.sh; returns the count.
+    """
+    stale = (Persona.prompt_block_version.is_(None)) | (Persona.prompt_block_version != PERSONA_BLOCK_VERSION)
+    updated = 0
+    while True:
+        batch = db.query(Persona).filter(stale).order_by(Persona.id).limit(batch_size).all()
+        if not batch:
+            return updated
+        for persona in batch:
+            persona.prompt_block = persona.render_prompt_block()
+            persona.prompt_block_version = PERSONA_BLOCK_VERSION
+        db.commit()
+        updated += len(batch)
+
+
+for _statement in SEARCH_INDEX_DDL:
+    event.listen(Persona.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+
 @event.listens_for(Persona, "before_update")
 def update_timestamp(mapper, connection, target):
     """Ensure updated_at is refreshed on update."""
@@ -0,0 +1,40 @@
+"""
+Usage Event Model
+
+One row per external AI call (Claude, image generation, moderation), written
+in batches by app/services/usage.py and rolled up per user / conversation by
+the admin router.
+"""
+
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, func
+
+from app.database import Base
+
+
+class UsageEvent(Base):
+    """Model, tokens, latency and estimated cost of one AI call."""
+
+    __tablename__ = "usage_events"
+    __table_args__ = (
+        Index("ix_usage_events_user_created", "user_id", "created_at"),
+        Index("ix_usage_events_conversation", "conversation_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    service = Column(String(50), nullable=False, doc="llm, ocean_inference, challenge, moderation, image")
+    operation = Column(String(50), nullable=False, doc="e.g. motto, conversation_turn, persuasion_evaluation")
+    model = Column(String(100), nullable=False)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="SET NULL"), nullable=True)
+    endpoint = Column(String(200), nullable=True, doc="Route that triggered the call, e.g. 'POST /conversations/{id}/continue'")
+
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    images = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(Float, nullable=False, default=0.0)
+    cache_hit = Column(Boolean, nullable=False, default=False, doc="Answered from a cache; no API call made")
+    cost_usd = Column(Float, nullable=False, default=0.0, doc="Estimated from usage.MODEL_PRICES / IMAGE_PRICES")
@@ -7,29 +7,53 @@ Admin endpoints (is_admin=True):
 - GET  /admin/flagged-content  - List moderation audit log entries
 - POST /admin/approve/{log_id} - Approve flagged content
 - POST /admin/block/{log_id}   - Block flagged content
+- GET  /admin/db-pool          - Connection pool occupancy and checkout metrics
+- GET  /admin/ocean-cache      - OCEAN inference cache hit/miss counters
+- GET  /admin/conversation-state - Conversation state cache hit/miss/invalidation counters
+- GET  /admin/structured-output - Structured (tool-use) LLM output repair/failure counters
+- GET  /admin/usage            - AI call tokens/latency/cost totals per service and model
+- GET  /admin/admission        - Generation in-flight counts, rejections and limits
+- GET  /admin/jobs             - Background job counts by kind and status
+- GET  /admin/provider-limits  - AI provider request rate limits and time spent throttled
+- GET  /admin/flag-rates       - Personas generating speculatively and how often it paid off
 
 Superuser endpoints (is_superuser=True):
 - GET   /admin/users               - List all users with counts
 - PATCH /admin/users/{id}/superuser - Set/unset superuser flag
 - GET   /admin/personas            - All personas with owner info (paginated)
 - GET   /admin/conversations       - All conversations with owner info (paginated)
+- GET   /admin/usage/users         - AI usage and estimated cost rolled up per user
+- GET   /admin/usage/conversations - AI usage and estimated cost rolled up per conversation
 - POST  /admin/repair-avatars      - Regenerate missing avatar images via DALL-E + S3
+- POST  /admin/ocean-cache/warm    - Seed the OCEAN inference cache from existing personas
 """
 
 import logging
+from datetime import datetime
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
-from sqlalchemy import func
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session, joinedload
 
-from app.database import get_db
+from app.admission import admission
+from app.database import async_engine, engine, get_db
+from app.db_pool import pool_status
+from app.db_replicas import replicas
 from app.dependencies import get_current_admin, get_current_superuser
 from app.models.conversation import Conversation
 from app.models.moderation import ModerationAuditLog
 from app.models.persona import Persona
+from app.models.usage import UsageEvent
 from app.models.user import User
+from app.services.job_queue import queue_stats
+from app.services.conversation_state import conversation_state
+from app.services.flag_rates import flag_rates
+from app.services.ocean_cache import ocean_cache
+from app.services.provider_limits import provider_limits
+from app.services.structured_output import structured_output_metrics
+from app.services.usage import usage_recorder
 
 logger = logging.getLogger(__name__)
 
@@ -88,6 +112,107 @@ def block_content(
     return log.to_dict()
 
 
+# ============================================================================
+# Admin (is_admin) endpoints — operations
+# ============================================================================
+
+@router.get("/db-pool")
+def db_pool_metrics(
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Pool occupancy and cumulative checkout metrics for both engines and
+    any read replicas (with their health).
+
+    A rising `waits`/`avg_wait_ms` (or any `timeouts`) means requests are
+    queuing for connections: raise DB_POOL_SIZE / DB_MAX_OVERFLOW or shed load.
+    """
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine),
+        "replicas": replicas.status(),
+    }
+
+
+@router.get("/ocean-cache")
+def ocean_cache_metrics(
+    admin: User = Depends(get_current_admin),
+):
+    """In-process OCEAN inference cache counters (this instance only)."""
+    return ocean_cache.stats()
+
+
+@router.get("/conversation-state")
+def conversation_state_metrics(
+    admin: User = Depends(get_current_admin),
+):
+    """In-process conversation state cache counters (this instance only)."""
+    return conversation_state.stats()
+
+
+@router.get("/structured-output")
+def structured_output_stats(
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Per-call-site counters for JSON-returning Claude calls (this instance only).
+
+    `repaired` calls needed the one repair request; `failed` calls fell back
+    to defaults. `wasted_*_tokens` are spent on responses that were unusable.
+    """
+    return structured_output_metrics.stats()
+
+
+@router.get("/usage")
+def usage_totals(
+    admin: User = Depends(get_current_admin),
+):
+    """
+    AI call totals per service/model since this instance started, plus the
+    state of the usage_events write buffer.
+    """
+    return usage_recorder.stats()
+
+
+@router.get("/admission")
+def admission_status(
+    admin: User = Depends(get_current_admin),
+):
+    """Generation admission control state for this instance (in flight, rejections by reason, limits)."""
+    return admission.status()
+
+
+@router.get("/jobs")
+def job_queue_status(
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """Background job counts by kind and status (shared by all instances and workers)."""
+    return queue_stats(db)
+
+
+@router.get("/provider-limits")
+def provider_limit_status(
+    admin: User = Depends(get_current_admin),
+):
+    """Per-provider requests, throttled requests and wait seconds for this instance, with the configured limits."""
+    return provider_limits.stats()
+
+
+@router.get("/flag-rates")
+def flag_rate_status(
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Speculative generation counters for this instance.
+
+    `speculative_rescues` rounds had a toxic first candidate but a safe
+    second one (a serial regeneration avoided); `speculative_unused` rounds
+    paid for a second candidate that was not needed.
+    """
+    return flag_rates.stats()
+
+
 # ============================================================================
 # Superuser endpoints — user management + bulk content
 # ============================================================================
@@ -218,6 +343,87 @@ def list_all_conversations(
     return {"total": total, "page": page, "page_size": page_size, "items": items}
 
 
+# ============================================================================
+# GET /admin/usage/* — AI spend rollups from usage_events
+# ============================================================================
+
+def _usage_rollup(db: Session, key, since: Optional[datetime], limit: int):
+    """Aggregate usage_events grouped by `key`, most expensive first."""
+    usage_recorder.flush()  # Include this instance's buffered events
+    cost = func.sum(UsageEvent.cost_usd)
+    query = db.query(
+        key.label("key"),
+        func.count(UsageEvent.id).label("calls"),
+        func.sum(case((UsageEvent.cache_hit == True, 1), else_=0)).label("cache_hits"),
+        func.sum(UsageEvent.input_tokens).label("input_tokens"),
+        func.sum(UsageEvent.output_tokens).label("output_tokens"),
+        func.sum(UsageEvent.images).label("images"),
+        func.avg(UsageEvent.latency_ms).label("avg_latency_ms"),
+        cost.label("cost_usd"),
+    ).filter(key != None)
+    if since is not None:
+        query = query.filter(UsageEvent.created_at >= since)
+    rows = query.group_by(key).order_by(cost.desc()).limit(limit).all()
+    return [
+        {
+            "calls": row.calls,
+            "cache_hits": int(row.cache_hits or 0),
+            "input_tokens": int(row.input_tokens or 0),
+            "output_tokens": int(row.output_tokens or 0),
+            "images": int(row.images or 0),
+            "avg_latency_ms": round(row.avg_latency_ms or 0.0, 1),
+            "cost_usd": round(row.cost_usd or 0.0, 6),
+            "key": row.key,
+        }
+        for row in rows
+    ]
+
+
+@router.get("/usage/users")
+def usage_by_user(
+    superuser: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db),
+    since: Optional[datetime] = Query(None, description="Only count events at or after this time"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Per-user AI calls, tokens, images, latency and estimated cost."""
+    rollup = _usage_rollup(db, UsageEvent.user_id, since, limit)
+    users = {u.id: u for u in db.query(User).filter(User.id.in_([r["key"] for r in rollup]))}
+    items = []
+    for r in rollup:
+        user = users.get(r.pop("key"))
+        if user is None:
+            continue
+        items.append({"user_id": user.id, "email": user.email, "name": user.name, **r})
+    return {"items": items}
+
+
+@router.get("/usage/conversations")
+def usage_by_conversation(
+    superuser: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db),
+    since: Optional[datetime] = Query(None, description="Only count events at or after this time"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Per-conversation AI calls, tokens, images, latency and estimated cost."""
+    rollup = _usage_rollup(db, UsageEvent.conversation_id, since, limit)
+    conversations = {
+        c.id: c for c in db.query(Conversation).filter(Conversation.id.in_([r["key"] for r in rollup]))
+    }
+    items = []
+    for r in rollup:
+        conversation = conversations.get(r.pop("key"))
+        if conversation is None:
+            continue
+        items.append({
+            "conversation_id": conversation.unique_id,
+            "topic": conversation.topic,
+            "created_by": conversation.created_by,
+            **r,
+        })
+    return {"items": items}
+
+
 # ============================================================================
 # POST /admin/repair-avatars — regenerate missing avatars
 # ============================================================================
@@ -287,3 +493,17 @@ def repair_avatars(
         message = "No personas need avatar repair. All avatars are valid S3 keys."
 
     return {"repaired": repaired, "failed": failed, "remaining": remaining, "message": message}
+
+
+@router.post("/ocean-cache/warm")
+def warm_ocean_cache(
+    superuser: User = Depends(get_current_superuser),
+    db: Session = Depends(get_db),
+):
+    """
+    Add OCEAN cache rows for existing personas' descriptions, so repeat
+    descriptions skip inference from the first request. Idempotent.
+    """
+    added = ocean_cache.warm_from_personas(db)
+    logger.info(f"OCEAN cache warmed with {added} entries")
+    return {"added": added}
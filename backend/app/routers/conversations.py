@@ -7,22 +7,38 @@ Endpoints:
 - POST /conversations - Create a new conversation
 - GET /conversations - List user's conversations
 - GET /conversations/{unique_id} - Get conversation with messages
-- POST /conversations/{unique_id}/continue - Generate the next turn
+- GET /conversations/{unique_id}/messages - Poll for messages newer than since_id
+- POST /conversations/{unique_id}/continue - Generate the next turn (background=true queues a job)
+- POST /conversations/{unique_id}/auto-run - Generate several turns in one background job
 """
 
 import logging
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
 from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db, SessionLocal
-from app.dependencies import get_current_user
+from app.admission import GenerationSlot, admitted, generation_slot
+from app.database import get_async_db, get_db
+from app.dependencies import get_current_user, get_current_user_async
+from app.http_cache import conversation_etag, is_not_modified, not_modified, set_etag
+from app.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, idempotency_store, turn_flight, validate_key
 from app.models.user import User
 from app.models.persona import Persona
 from app.models.conversation import Conversation, ConversationParticipant, ConversationMessage
-from app.services.conversation_orchestrator import ConversationOrchestrator
+from app.models.job import Job
+from app.services.conversation_orchestrator import (
+    ConversationOrchestrator,
+    TurnConflictError,
+    turn_result,
+)
+from app.services.conversation_state import conversation_state
+from app.services.job_handlers import AUTO_RUN, BUILD_CHALLENGE, GENERATE_TURN
+from app.services.job_queue import active_job, enqueue
 
 logger = logging.getLogger(__name__)
 
@@ -51,54 +67,17 @@ class ConversationUpdateRequest(BaseModel):
 # POST /conversations - Create Conversation
 # ============================================================================
 
-def _build_challenge_background(
-    conversation_unique_id: str,
-    user_id: int,
-    proposal: str,
-    challenge_type: str,
-    n_personas: int,
-) -> None:
-    """Background task: generate personas and attach them to the pending challenge conversation."""
-    from app.services.challenge_service import ChallengeService
-    db = SessionLocal()
-    try:
-        challenge_svc = ChallengeService()
-        personas = challenge_svc.generate_challenge_personas(
-            db=db,
-            user_id=user_id,
-            proposal=proposal,
-            challenge_type=challenge_type,
-            n=n_personas,
-        )
-        conversation = db.query(Conversation).filter(
-            Conversation.unique_id == conversation_unique_id
-        ).first()
-        if conversation:
-            for persona in personas:
-                db.add(ConversationParticipant(
-                    conversation_id=conversation.id,
-                    persona_id=persona.id,
-                    persuaded_score=0.1,
-                ))
-            conversation.status = "active"
-            db.commit()
-    except Exception as e:
-        logger.error(f"Background challenge build failed for {conversation_unique_id}: {e}")
-        db.rollback()
-    finally:
-        db.close()
-
-
 @router.post(
     "/conversations/challenge",
     status_code=status.HTTP_201_CREATED,
     summary="Create a new challenge mode conversation",
+    responses={429: {"description": "Generation limit reached (see Retry-After)"}},
 )
 def create_challenge(
     request: ChallengeCreateRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    slot: GenerationSlot = Depends(generation_slot),
 ):
     # Create the conversation immediately so we can redirect the user right away
     conversation = Conversation(
@@ -111,20 +90,26 @@ def create_challenge(
         is_public=False,
     )
     db.add(conversation)
+    db.flush()
+
+    # A worker generates the personas; the conversation page polls until status="active".
+    # Committed together, so a pending conversation always has its build job.
+    job = enqueue(
+        db,
+        BUILD_CHALLENGE,
+        {
+            "proposal": request.proposal,
+            "challenge_type": request.challenge_type,
+            "n_personas": request.n_personas,
+        },
+        user_id=current_user.id,
+        conversation_id=conversation.id,
+        dedupe_key=f"challenge:{conversation.id}",
+    )
     db.commit()
     db.refresh(conversation)
 
-    # Generate personas in the background; the conversation page polls until status="active"
-    background_tasks.add_task(
-        _build_challenge_background,
-        conversation.unique_id,
-        current_user.id,
-        request.proposal,
-        request.challenge_type,
-        request.n_personas,
-    )
-
-    return conversation.to_dict()
+    return {**conversation.to_dict(), "job_id": job.id}
 
 
 @router.post(
@@ -194,17 +179,16 @@ def create_conversation(
         401: {"description": "Not authenticated"},
     },
 )
-def list_conversations(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def list_conversations(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    conversations = (
-        db.query(Conversation)
-        .filter(Conversation.created_by == current_user.id)
+    conversations = (await db.scalars(
+        select(Conversation)
+        .where(Conversation.created_by == current_user.id)
         .order_by(Conversation.created_at.desc())
-        .all()
-    )
-    return [c.to_dict() for c in conversations]
+    )).all()
+    return await db.run_sync(lambda _: [c.to_dict() for c in conversations])
 
 
 # ============================================================================
@@ -216,27 +200,98 @@ def list_conversations(
     summary="Get a conversation with all messages",
     responses={
         200: {"description": "Conversation details with messages"},
+        304: {"description": "Not modified since the ETag in If-None-Match"},
         401: {"description": "Not authenticated"},
         404: {"description": "Conversation not found"},
     },
 )
-def get_conversation(
+async def get_conversation(
     unique_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    conversation = (
-        db.query(Conversation)
-        .filter(
+    conversation = await _get_owned_conversation(db, unique_id, current_user)
+
+    etag = conversation_etag(conversation)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return await db.run_sync(lambda _: conversation.to_dict(include_messages=True))
+
+
+# ============================================================================
+# GET /conversations/{unique_id}/messages - Incremental Polling
+# ============================================================================
+
+@router.get(
+    "/conversations/{unique_id}/messages",
+    summary="Get messages newer than since_id plus current conversation status",
+    responses={
+        200: {"description": "New messages and status"},
+        304: {"description": "Nothing changed since the ETag in If-None-Match"},
+        401: {"description": "Not authenticated"},
+        404: {"description": "Conversation not found"},
+    },
+)
+async def get_conversation_messages(
+    unique_id: str,
+    request: Request,
+    response: Response,
+    since_id: int = 0,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Polling endpoint: returns only messages with id > since_id.
+
+    Status fields (status, turn_count, is_complete, participants with their
+    persuaded_score) are always included so a pending challenge can detect
+    when it becomes active. The ETag covers the conversation row and since_id,
+    so repeated polls with nothing new return 304 without querying messages.
+    """
+    conversation = await _get_owned_conversation(db, unique_id, current_user)
+
+    etag = conversation_etag(conversation, "since", since_id)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    set_etag(response, etag)
+    return await db.run_sync(lambda session: _messages_since(session, conversation, since_id))
+
+
+async def _get_owned_conversation(db: AsyncSession, unique_id: str, current_user: User) -> Conversation:
+    """Load one of the current user's conversations or raise 404."""
+    conversation = await db.scalar(
+        select(Conversation).where(
             Conversation.unique_id == unique_id,
             Conversation.created_by == current_user.id,
         )
-        .first()
     )
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
+    return conversation
 
-    return conversation.to_dict(include_messages=True)
+
+def _messages_since(db: Session, conversation: Conversation, since_id: int) -> dict:
+    """Body of the polling response; runs inside AsyncSession.run_sync."""
+    new_messages = (
+        conversation.transcript_query(db)
+        .filter(ConversationMessage.id > since_id)
+        .all()
+    )
+    return {
+        "conversation_unique_id": conversation.unique_id,
+        "status": conversation.status,
+        "turn_count": conversation.turn_count,
+        "max_turns": conversation.max_turns,
+        "is_complete": conversation.is_complete,
+        "updated_at": conversation.updated_at.isoformat() if conversation.updated_at else None,
+        "participants": conversation.participants_to_dict(),
+        "messages": [m.to_dict() for m in new_messages],
+        "last_message_id": max((m.id for m in new_messages), default=since_id),
+    }
 
 
 # ============================================================================
@@ -247,17 +302,38 @@ def get_conversation(
     "/conversations/{unique_id}/continue",
     summary="Generate the next turn of the conversation",
     responses={
-        200: {"description": "New messages generated"},
+        200: {"description": "New messages generated (or replayed for a repeated Idempotency-Key)"},
+        202: {"description": "background=true: turn queued; poll GET /jobs/{id}"},
         400: {"description": "Conversation is complete"},
         401: {"description": "Not authenticated"},
         404: {"description": "Conversation not found"},
+        409: {"description": "The turn was generated concurrently by another request"},
+        422: {"description": "Idempotency-Key reused for a different conversation"},
+        429: {"description": "Generation limit reached (see Retry-After)"},
     },
 )
 def continue_conversation(
     unique_id: str,
+    response: Response,
+    background: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
 ):
+    """
+    Generate the next turn.
+
+    Concurrent continues on the same conversation share one generation, and
+    a retry with the same Idempotency-Key replays the original response
+    instead of generating another turn. Only the request that actually
+    generates counts against admission limits.
+
+    With background=true the turn is queued as a job instead and the job is
+    returned (202); while it is queued or running, further background
+    continues return the same job. New messages show up in
+    GET /conversations/{id}/messages, and in the job's result.
+    """
+    idempotency_key = validate_key(idempotency_key)
     conversation = (
         db.query(Conversation)
         .filter(
@@ -269,50 +345,143 @@ def continue_conversation(
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
+    request_id = f"{'continue-job' if background else 'continue'}:{unique_id}"
+    if idempotency_key:
+        replay = idempotency_store.get(db, current_user.id, idempotency_key, request_id)
+        if replay is not None:
+            response.headers[REPLAYED_HEADER] = "true"
+            if background:
+                response.status_code = status.HTTP_202_ACCEPTED
+                job = db.get(Job, replay["id"])
+                return job.to_dict() if job else replay
+            return replay
+
+    if background:
+        result = _enqueue_next_turn(conversation, current_user, db)
+        response.status_code = status.HTTP_202_ACCEPTED
+    else:
+        result = turn_flight.do(
+            conversation.id, lambda: _generate_next_turn(conversation, current_user, db),
+        )
+    if idempotency_key:
+        idempotency_store.put(db, current_user.id, idempotency_key, request_id, result)
+    return result
+
+
+def _check_not_complete(conversation: Conversation) -> None:
     if conversation.is_complete:
         raise HTTPException(
             status_code=400,
             detail=f"Conversation has reached its maximum of {conversation.max_turns} turns.",
         )
 
-    # Load participants and their personas
-    participants = (
-        db.query(ConversationParticipant)
-        .filter(ConversationParticipant.conversation_id == conversation.id)
-        .all()
-    )
-    personas = [p.persona for p in participants]
 
-    # Build conversation history from existing messages
-    existing_messages = (
-        db.query(ConversationMessage)
-        .filter(ConversationMessage.conversation_id == conversation.id)
-        .order_by(ConversationMessage.turn_number, ConversationMessage.id)
-        .all()
-    )
-    history = [
-        {"speaker": m.persona_name, "message": m.message_text}
-        for m in existing_messages
-        if m.moderation_status in ("approved", "user")
-    ]
-
-    try:
-        orchestrator = ConversationOrchestrator()
-        new_messages = orchestrator.generate_turn(
-            conversation=conversation,
-            personas=personas,
-            history=history,
-            db=db,
+def _generate_next_turn(conversation: Conversation, current_user: User, db: Session) -> dict:
+    """Admit and generate one turn; the result is shared by coalesced requests."""
+    _check_not_complete(conversation)
+    with admitted(current_user.id, db):
+        state = conversation_state.get(conversation, db)
+        try:
+            orchestrator = ConversationOrchestrator()
+            new_messages = orchestrator.generate_turn(
+                conversation=conversation,
+                personas=state.personas,
+                history=state.history,
+                db=db,
+                history_ids=state.history_ids,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except TurnConflictError as e:
+            conversation_state.invalidate(conversation.id)
+            raise HTTPException(status_code=409, detail=str(e))
+    conversation_state.advance(conversation, state, new_messages)
+    return turn_result(conversation, new_messages)
+
+
+def _enqueue_next_turn(conversation: Conversation, current_user: User, db: Session) -> dict:
+    """Queue a generate_turn job, or return the one already queued for this conversation."""
+    dedupe_key = f"turn:{conversation.id}"
+    job = active_job(db, dedupe_key)
+    if job is None:
+        _check_not_complete(conversation)
+        # Admission applies to starting work; claim_job caps how many of the user's jobs run at once
+        with admitted(current_user.id, db):
+            job = enqueue(
+                db, GENERATE_TURN, {"turn_count": conversation.turn_count},
+                user_id=current_user.id,
+                conversation_id=conversation.id,
+                dedupe_key=dedupe_key,
+            )
+            db.commit()
+    return job.to_dict()
+
+
+# ============================================================================
+# POST /conversations/{unique_id}/auto-run - Generate Remaining Turns as a Job
+# ============================================================================
+
+class AutoRunRequest(BaseModel):
+    turns: Optional[int] = Field(None, ge=1, description="Turns to generate (default: all remaining)")
+
+
+@router.post(
+    "/conversations/{unique_id}/auto-run",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Generate several turns in one background job",
+    responses={
+        202: {"description": "Auto-run job queued (or the one already running); poll GET /jobs/{id}"},
+        400: {"description": "Conversation is complete"},
+        401: {"description": "Not authenticated"},
+        404: {"description": "Conversation not found"},
+        409: {"description": "Another turn job is active for this conversation"},
+        429: {"description": "Generation limit reached (see Retry-After)"},
+    },
+)
+def auto_run_conversation(
+    unique_id: str,
+    request: Optional[AutoRunRequest] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Queue an auto_run job that generates `turns` turns (capped at max_turns).
+
+    Each turn is saved as it completes, so GET /conversations/{id}/messages
+    shows progress; the job's result carries turns_completed. Cancel with
+    POST /jobs/{id}/cancel; the turn in progress is finished first.
+    """
+    conversation = (
+        db.query(Conversation)
+        .filter(
+            Conversation.unique_id == unique_id,
+            Conversation.created_by == current_user.id,
         )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        .first()
+    )
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
 
-    return {
-        "conversation_unique_id": unique_id,
-        "turn_number": conversation.turn_count,
-        "new_messages": [m.to_dict() for m in new_messages],
-        "is_complete": conversation.is_complete,
-    }
+    dedupe_key = f"turn:{conversation.id}"
+    job = active_job(db, dedupe_key)
+    if job is not None:
+        if job.kind != AUTO_RUN:
+            raise HTTPException(status_code=409, detail=f"A turn is already being generated (job {job.id})")
+        return job.to_dict()
+
+    _check_not_complete(conversation)
+    remaining = conversation.max_turns - conversation.turn_count
+    turns = min(request.turns, remaining) if request and request.turns else remaining
+    with admitted(current_user.id, db):
+        job = enqueue(
+            db, AUTO_RUN,
+            {"start_turn": conversation.turn_count, "until_turn": conversation.turn_count + turns},
+            user_id=current_user.id,
+            conversation_id=conversation.id,
+            dedupe_key=dedupe_key,
+        )
+        db.commit()
+    return job.to_dict()
 
 
 # ============================================================================
@@ -356,7 +525,10 @@ def inject_user_message(
         moderation_status="user",
     )
     db.add(msg)
+    # Touch the conversation so cached ETags for it are invalidated
+    conversation.updated_at = datetime.utcnow()
     db.commit()
+    conversation_state.invalidate(conversation.id)
     db.refresh(msg)
     return msg.to_dict()
 
@@ -395,6 +567,7 @@ def update_conversation(
         conversation.is_public = request.is_public
 
     db.commit()
+    conversation_state.invalidate(conversation.id)
     db.refresh(conversation)
     return conversation.to_dict(include_messages=True)
 
@@ -428,5 +601,7 @@ def delete_conversation(
     )
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
+    conversation_id = conversation.id
     db.delete(conversation)
     db.commit()
+    conversation_state.invalidate(conversation_id)
@@ -22,17 +22,22 @@ import math
 from datetime import datetime, date
 from typing import Optional, List
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from pydantic import BaseModel
-from sqlalchemy import text
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.dependencies import get_current_user, get_optional_user
+from app.database import get_async_db, get_db
+from app.db_replicas import get_read_db
+from app.dependencies import get_current_user, get_current_user_async, get_optional_user_async
+from app.http_cache import conversation_etag, persona_etag, is_not_modified, not_modified, set_etag
 from app.models.user import User
 from app.models.persona import Persona
 from app.models.conversation import Conversation, ConversationParticipant, ConversationMessage
 from app.models.social import Upvote, PageView
+from app.services.conversation_state import conversation_state
+from app.services.fork_service import add_participants, attach_transcript, copy_participants
 
 logger = logging.getLogger(__name__)
 
@@ -53,18 +58,22 @@ def _ip_hash(request: Request) -> str:
     return hashlib.sha256(ip.encode()).hexdigest()[:32]
 
 
-def _record_view(db: Session, target_type: str, target_id: str, user_id: Optional[int], ip: str) -> bool:
+async def _record_view(db: AsyncSession, target_type: str, target_id: str, user_id: Optional[int], ip: str) -> bool:
     """Insert a page view. Returns True if it was a new (deduplicated) view."""
     today = date.today()
     uid = user_id if user_id else None
     ih = ip if not user_id else None  # prefer user_id dedup over ip
 
-    existing = db.query(PageView).filter(
+    # Dedup against the primary: a lagging replica could miss today's view.
+    # All five uq_pageview_daily columns are constrained (the unused identity
+    # IS NULL), so the lookup is a single unique-index probe.
+    existing = await db.scalar(select(PageView).where(
         PageView.target_type == target_type,
         PageView.target_id == target_id,
+        PageView.user_id == uid if uid else PageView.user_id.is_(None),
+        PageView.ip_hash == ih if ih else PageView.ip_hash.is_(None),
         PageView.viewed_date == today,
-        PageView.user_id == uid if uid else PageView.ip_hash == ih,
-    ).first()
+    ).execution_options(use_primary=True))
 
     if existing:
         return False
@@ -77,17 +86,14 @@ def _record_view(db: Session, target_type: str, target_id: str, user_id: Optiona
         viewed_date=today,
     ))
     # Increment counter on the target
-    if target_type == "persona":
-        db.execute(
-            text("UPDATE personas SET view_count = view_count + 1 WHERE unique_id = :uid"),
-            {"uid": target_id}
-        )
-    else:
-        db.execute(
-            text("UPDATE conversations SET view_count = view_count + 1 WHERE unique_id = :uid"),
-            {"uid": target_id}
-        )
-    db.commit()
+    model = Persona if target_type == "persona" else Conversation
+    await db.execute(
+        update(model)
+        .where(model.unique_id == target_id)
+        .values(view_count=model.view_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
     return True
 
 
@@ -102,35 +108,32 @@ class DiscoverRequest(BaseModel):
 
 
 @router.get("/discover", summary="Public discovery feed")
-def discover(
+async def discover(
     sort: str = "hot",
     cursor: Optional[int] = None,
     limit: int = 20,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     limit = min(limit, 50)
 
-    def base_persona_q():
-        return db.query(Persona).filter(Persona.is_public == True)
-
-    def base_conv_q():
-        return db.query(Conversation).filter(Conversation.is_public == True)
+    base_persona_q = select(Persona).where(Persona.is_public == True)
+    base_conv_q = select(Conversation).where(Conversation.is_public == True)
 
     if sort == "new":
-        personas = base_persona_q().order_by(Persona.created_at.desc()).limit(limit).all()
-        convos = base_conv_q().order_by(Conversation.created_at.desc()).limit(limit).all()
+        personas = (await db.scalars(base_persona_q.order_by(Persona.created_at.desc()).limit(limit))).all()
+        convos = (await db.scalars(base_conv_q.order_by(Conversation.created_at.desc()).limit(limit))).all()
     elif sort == "top":
-        personas = base_persona_q().order_by(Persona.upvote_count.desc(), Persona.view_count.desc()).limit(limit).all()
-        convos = base_conv_q().order_by(Conversation.upvote_count.desc(), Conversation.view_count.desc()).limit(limit).all()
+        personas = (await db.scalars(base_persona_q.order_by(Persona.upvote_count.desc(), Persona.view_count.desc()).limit(limit))).all()
+        convos = (await db.scalars(base_conv_q.order_by(Conversation.upvote_count.desc(), Conversation.view_count.desc()).limit(limit))).all()
     else:  # hot
-        personas = base_persona_q().all()
-        convos = base_conv_q().all()
+        personas = (await db.scalars(base_persona_q)).all()
+        convos = (await db.scalars(base_conv_q)).all()
         personas = sorted(personas, key=lambda p: _hot_score(p.upvote_count, p.view_count, p.created_at), reverse=True)[:limit]
         convos = sorted(convos, key=lambda c: _hot_score(c.upvote_count, c.view_count, c.created_at), reverse=True)[:limit]
 
     return {
         "personas": [p.to_dict() for p in personas],
-        "conversations": [c.to_dict() for c in convos],
+        "conversations": await db.run_sync(lambda _: [c.to_dict() for c in convos]),
     }
 
 
@@ -139,22 +142,30 @@ def discover(
 # ============================================================================
 
 @router.get("/p/{unique_id}", summary="Public persona profile")
-def public_persona(
+async def public_persona(
     unique_id: str,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Optional[User] = Depends(get_optional_user_async),
 ):
-    persona = db.query(Persona).filter(Persona.unique_id == unique_id).first()
+    persona = await db.scalar(select(Persona).where(Persona.unique_id == unique_id))
     if not persona:
         raise HTTPException(status_code=404, detail="Persona not found")
     if not persona.is_public and (not current_user or current_user.id != persona.user_id):
         raise HTTPException(status_code=404, detail="Persona not found")
 
-    _record_view(db, "persona", unique_id, current_user.id if current_user else None, _ip_hash(request))
+    if await _record_view(db, "persona", unique_id, current_user.id if current_user else None, _ip_hash(request)):
+        await db.refresh(persona)
+
+    is_owner = bool(current_user and current_user.id == persona.user_id)
+    etag = persona_etag(persona, is_owner)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
 
     result = persona.to_dict()
-    result["is_owner"] = bool(current_user and current_user.id == persona.user_id)
+    result["is_owner"] = is_owner
     return result
 
 
@@ -163,22 +174,22 @@ def public_persona(
 # ============================================================================
 
 @router.get("/p/{unique_id}/conversations", summary="Public conversations featuring this persona")
-def persona_conversations(
+async def persona_conversations(
     unique_id: str,
     sort: str = "hot",
     limit: int = 20,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Optional[User] = Depends(get_optional_user_async),
 ):
-    persona = db.query(Persona).filter(Persona.unique_id == unique_id).first()
+    persona = await db.scalar(select(Persona).where(Persona.unique_id == unique_id))
     if not persona:
         raise HTTPException(status_code=404, detail="Persona not found")
 
     # Conversations that have this persona as a participant
     convos_q = (
-        db.query(Conversation)
+        select(Conversation)
         .join(ConversationParticipant, ConversationParticipant.conversation_id == Conversation.id)
-        .filter(
+        .where(
             ConversationParticipant.persona_id == persona.id,
             Conversation.is_public == True,
         )
@@ -186,14 +197,14 @@ def persona_conversations(
 
     limit = min(limit, 50)
     if sort == "new":
-        convos = convos_q.order_by(Conversation.created_at.desc()).limit(limit).all()
+        convos = (await db.scalars(convos_q.order_by(Conversation.created_at.desc()).limit(limit))).all()
     elif sort == "top":
-        convos = convos_q.order_by(Conversation.upvote_count.desc(), Conversation.view_count.desc()).limit(limit).all()
+        convos = (await db.scalars(convos_q.order_by(Conversation.upvote_count.desc(), Conversation.view_count.desc()).limit(limit))).all()
     else:  # hot
-        convos = convos_q.all()
+        convos = (await db.scalars(convos_q)).all()
         convos = sorted(convos, key=lambda c: _hot_score(c.upvote_count, c.view_count, c.created_at), reverse=True)[:limit]
 
-    return [c.to_dict() for c in convos]
+    return await db.run_sync(lambda _: [c.to_dict() for c in convos])
 
 
 # ============================================================================
@@ -201,22 +212,30 @@ def persona_conversations(
 # ============================================================================
 
 @router.get("/c/{unique_id}", summary="Public conversation")
-def public_conversation(
+async def public_conversation(
     unique_id: str,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Optional[User] = Depends(get_optional_user_async),
 ):
-    conv = db.query(Conversation).filter(Conversation.unique_id == unique_id).first()
+    conv = await db.scalar(select(Conversation).where(Conversation.unique_id == unique_id))
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
     if not conv.is_public and (not current_user or current_user.id != conv.created_by):
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    _record_view(db, "conversation", unique_id, current_user.id if current_user else None, _ip_hash(request))
+    if await _record_view(db, "conversation", unique_id, current_user.id if current_user else None, _ip_hash(request)):
+        await db.refresh(conv)
 
-    result = conv.to_dict(include_messages=True)
-    result["is_owner"] = bool(current_user and current_user.id == conv.created_by)
+    is_owner = bool(current_user and current_user.id == conv.created_by)
+    etag = conversation_etag(conv, is_owner)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    result = await db.run_sync(lambda _: conv.to_dict(include_messages=True))
+    result["is_owner"] = is_owner
     return result
 
 
@@ -225,32 +244,32 @@ def public_conversation(
 # ============================================================================
 
 @router.post("/p/{unique_id}/upvote", summary="Toggle upvote on a persona")
-def upvote_persona(
+async def upvote_persona(
     unique_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    persona = db.query(Persona).filter(Persona.unique_id == unique_id).first()
+    persona = await db.scalar(select(Persona).where(Persona.unique_id == unique_id))
     if not persona or not persona.is_public:
         raise HTTPException(status_code=404, detail="Persona not found")
 
-    existing = db.query(Upvote).filter(
+    existing = await db.scalar(select(Upvote).where(
         Upvote.user_id == current_user.id,
         Upvote.target_type == "persona",
         Upvote.target_id == unique_id,
-    ).first()
+    ))
 
     if existing:
-        db.delete(existing)
-        db.execute(text("UPDATE personas SET upvote_count = CASE WHEN upvote_count > 0 THEN upvote_count - 1 ELSE 0 END WHERE unique_id = :uid"), {"uid": unique_id})
-        db.commit()
-        db.refresh(persona)
+        await db.delete(existing)
+        await db.execute(text("UPDATE personas SET upvote_count = CASE WHEN upvote_count > 0 THEN upvote_count - 1 ELSE 0 END WHERE unique_id = :uid"), {"uid": unique_id})
+        await db.commit()
+        await db.refresh(persona)
         return {"upvoted": False, "upvote_count": persona.upvote_count}
     else:
         db.add(Upvote(user_id=current_user.id, target_type="persona", target_id=unique_id))
-        db.execute(text("UPDATE personas SET upvote_count = upvote_count + 1 WHERE unique_id = :uid"), {"uid": unique_id})
-        db.commit()
-        db.refresh(persona)
+        await db.execute(text("UPDATE personas SET upvote_count = upvote_count + 1 WHERE unique_id = :uid"), {"uid": unique_id})
+        await db.commit()
+        await db.refresh(persona)
         return {"upvoted": True, "upvote_count": persona.upvote_count}
 
 
@@ -259,32 +278,32 @@ def upvote_persona(
 # ============================================================================
 
 @router.post("/c/{unique_id}/upvote", summary="Toggle upvote on a conversation")
-def upvote_conversation(
+async def upvote_conversation(
     unique_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    conv = db.query(Conversation).filter(Conversation.unique_id == unique_id).first()
+    conv = await db.scalar(select(Conversation).where(Conversation.unique_id == unique_id))
     if not conv or not conv.is_public:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    existing = db.query(Upvote).filter(
+    existing = await db.scalar(select(Upvote).where(
         Upvote.user_id == current_user.id,
         Upvote.target_type == "conversation",
         Upvote.target_id == unique_id,
-    ).first()
+    ))
 
     if existing:
-        db.delete(existing)
-        db.execute(text("UPDATE conversations SET upvote_count = CASE WHEN upvote_count > 0 THEN upvote_count - 1 ELSE 0 END WHERE unique_id = :uid"), {"uid": unique_id})
-        db.commit()
-        db.refresh(conv)
+        await db.delete(existing)
+        await db.execute(text("UPDATE conversations SET upvote_count = CASE WHEN upvote_count > 0 THEN upvote_count - 1 ELSE 0 END WHERE unique_id = :uid"), {"uid": unique_id})
+        await db.commit()
+        await db.refresh(conv)
         return {"upvoted": False, "upvote_count": conv.upvote_count}
     else:
         db.add(Upvote(user_id=current_user.id, target_type="conversation", target_id=unique_id))
-        db.execute(text("UPDATE conversations SET upvote_count = upvote_count + 1 WHERE unique_id = :uid"), {"uid": unique_id})
-        db.commit()
-        db.refresh(conv)
+        await db.execute(text("UPDATE conversations SET upvote_count = upvote_count + 1 WHERE unique_id = :uid"), {"uid": unique_id})
+        await db.commit()
+        await db.refresh(conv)
         return {"upvoted": True, "upvote_count": conv.upvote_count}
 
 
@@ -329,6 +348,7 @@ def set_conversation_visibility(
         raise HTTPException(status_code=404, detail="Conversation not found")
     conv.is_public = body.is_public
     db.commit()
+    conversation_state.invalidate(conv.id)
     return {"unique_id": unique_id, "is_public": conv.is_public}
 
 
@@ -355,6 +375,7 @@ def fork_conversation(
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     # Determine participants for the fork
+    personas = None
     if body.persona_ids:
         # Caller provided new personas — must own them
         personas = (
@@ -364,45 +385,25 @@ def fork_conversation(
         )
         if len(personas) != len(body.persona_ids):
             raise HTTPException(status_code=404, detail="One or more personas not found")
-    else:
-        # Inherit the original participants
-        participants = db.query(ConversationParticipant).filter(
-            ConversationParticipant.conversation_id == source.id
-        ).all()
-        personas = [p.persona for p in participants if p.persona]
 
     # Create the forked conversation
     fork = Conversation(
         topic=body.topic or source.topic,
         created_by=current_user.id,
         forked_from_id=source.unique_id,
+        turn_count=source.turn_count,
     )
     db.add(fork)
     db.flush()
 
-    # Copy participants
-    for persona in personas:
-        db.add(ConversationParticipant(conversation_id=fork.id, persona_id=persona.id))
+    # Participants are copied set-based; the transcript is shared with the
+    # source (copy-on-write) rather than duplicated
+    if personas is not None:
+        add_participants(db, fork.id, [p.id for p in personas])
+    else:
+        copy_participants(db, source.id, fork.id)
+    attach_transcript(db, source, fork)
 
-    # Copy full message history from source
-    source_messages = (
-        db.query(ConversationMessage)
-        .filter(ConversationMessage.conversation_id == source.id)
-        .order_by(ConversationMessage.turn_number, ConversationMessage.id)
-        .all()
-    )
-    for msg in source_messages:
-        db.add(ConversationMessage(
-            conversation_id=fork.id,
-            persona_id=msg.persona_id,
-            persona_name=msg.persona_name,
-            message_text=msg.message_text,
-            turn_number=msg.turn_number,
-            toxicity_score=msg.toxicity_score,
-            moderation_status=msg.moderation_status,
-        ))
-
-    fork.turn_count = source.turn_count
     db.commit()
     db.refresh(fork)
     return fork.to_dict(include_messages=True)
@@ -438,5 +439,7 @@ def force_delete_conversation(
     conv = db.query(Conversation).filter(Conversation.unique_id == unique_id).first()
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
+    conversation_id = conv.id
     db.delete(conv)
     db.commit()
+    conversation_state.invalidate(conversation_id)
@@ -0,0 +1,215 @@
+"""
+Experiment Routes
+
+Batch focus-group experiments: one request runs a matrix of topics x
+persona sets x turn counts as background conversations (see
+app/services/experiments.py). The CLI equivalent is python -m app.experiments.
+
+Endpoints:
+- POST /experiments                      - Create an experiment and queue every cell
+- GET  /experiments                      - List your experiments
+- GET  /experiments/{unique_id}          - Progress and the conversation of each cell
+- POST /experiments/{unique_id}/resume   - Re-queue unfinished cells that stopped
+- POST /experiments/{unique_id}/cancel   - Cancel queued cells, stop running ones
+- GET  /experiments/{unique_id}/export   - Messages of every cell as JSONL or Parquet
+"""
+
+import io
+from typing import Annotated, List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from app.admission import admitted
+from app.database import get_db
+from app.dependencies import get_current_user
+from app.models.experiment import Experiment
+from app.models.user import User
+from app.services.experiments import (
+    cancel_experiment,
+    create_experiment,
+    experiment_progress,
+    export_rows,
+    resume_experiment,
+    write_jsonl,
+    write_parquet,
+)
+
+router = APIRouter(prefix="/experiments", tags=["experiments"])
+
+
+class ExperimentCreateRequest(BaseModel):
+    name: str = Field(..., min_length=1, max_length=200)
+    topics: List[Annotated[str, Field(min_length=1, max_length=1000)]] = Field(..., min_length=1)
+    persona_sets: List[Annotated[List[str], Field(min_length=1)]] = Field(
+        ..., min_length=1, description="Lists of persona unique_ids",
+    )
+    turns: List[Annotated[int, Field(ge=1)]] = Field(
+        [5], min_length=1, description="Turn counts to run each topic/persona set for",
+    )
+    is_public: bool = False
+
+
+def _detail(db: Session, experiment: Experiment) -> dict:
+    return {
+        **experiment.to_dict(),
+        "progress": experiment_progress(db, experiment),
+        "runs": [
+            {
+                "cell_index": run.cell_index,
+                "topic": run.topic,
+                "persona_set": run.persona_set,
+                "turns": run.turns,
+                "conversation_unique_id": run.conversation.unique_id if run.conversation else None,
+                "turn_count": run.conversation.turn_count if run.conversation else None,
+            }
+            for run in experiment.runs
+        ],
+    }
+
+
+def _owned_experiment(db: Session, unique_id: str, user: User) -> Experiment:
+    experiment = (
+        db.query(Experiment)
+        .filter(Experiment.unique_id == unique_id, Experiment.created_by == user.id)
+        .first()
+    )
+    if experiment is None:
+        raise HTTPException(status_code=404, detail="Experiment not found")
+    return experiment
+
+
+@router.post(
+    "",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Create a batch experiment",
+    responses={
+        202: {"description": "Experiment created; every cell is queued as an auto-run job"},
+        400: {"description": "Invalid matrix (e.g. more than EXPERIMENT_MAX_CELLS cells)"},
+        401: {"description": "Not authenticated"},
+        404: {"description": "Personas not found"},
+        422: {"description": "Validation error"},
+        429: {"description": "Generation limit reached (see Retry-After)"},
+    },
+)
+def create(
+    request: ExperimentCreateRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Expand topics x persona_sets x turns into cells and queue each one as a
+    private conversation (is_public=false by default) with an auto-run job.
+    """
+    with admitted(current_user.id, db):
+        try:
+            experiment = create_experiment(
+                db, current_user.id, request.name,
+                topics=request.topics,
+                persona_sets=request.persona_sets,
+                turns=request.turns,
+                is_public=request.is_public,
+            )
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        db.commit()
+    return _detail(db, experiment)
+
+
+@router.get("", summary="List your experiments")
+def list_experiments(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    experiments = (
+        db.query(Experiment)
+        .filter(Experiment.created_by == current_user.id)
+        .order_by(Experiment.created_at.desc())
+        .all()
+    )
+    return [e.to_dict() for e in experiments]
+
+
+@router.get(
+    "/{unique_id}",
+    summary="Get experiment progress",
+    responses={404: {"description": "Experiment not found"}},
+)
+def get_experiment(
+    unique_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return _detail(db, _owned_experiment(db, unique_id, current_user))
+
+
+@router.post(
+    "/{unique_id}/resume",
+    summary="Re-queue stopped cells",
+    responses={
+        404: {"description": "Experiment not found"},
+        429: {"description": "Generation limit or daily budget reached (see Retry-After)"},
+    },
+)
+def resume(
+    unique_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Cells that failed, were cancelled or ran out of budget continue from their last saved turn."""
+    experiment = _owned_experiment(db, unique_id, current_user)
+    with admitted(current_user.id, db):
+        resumed = resume_experiment(db, experiment)
+        db.commit()
+    return {"resumed": resumed, "progress": experiment_progress(db, experiment)}
+
+
+@router.post(
+    "/{unique_id}/cancel",
+    summary="Cancel an experiment's cells",
+    responses={404: {"description": "Experiment not found"}},
+)
+def cancel(
+    unique_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Queued cells are cancelled at once; running ones stop after their current turn."""
+    experiment = _owned_experiment(db, unique_id, current_user)
+    cancelled = cancel_experiment(db, experiment)
+    db.commit()
+    return {"cancelled": cancelled, "progress": experiment_progress(db, experiment)}
+
+
+@router.get(
+    "/{unique_id}/export",
+    summary="Export experiment messages",
+    responses={
+        200: {"description": "One row per message: cell, topic, persona set, turn, persona, text, moderation"},
+        404: {"description": "Experiment not found"},
+        501: {"description": "Parquet requested but pyarrow is not installed"},
+    },
+)
+def export(
+    unique_id: str,
+    format: Literal["jsonl", "parquet"] = Query("jsonl"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    experiment = _owned_experiment(db, unique_id, current_user)
+    filename = f"experiment-{experiment.unique_id}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    rows = export_rows(db, experiment)
+    if format == "parquet":
+        buffer = io.BytesIO()
+        try:
+            write_parquet(rows, buffer)
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        return Response(buffer.getvalue(), media_type="application/vnd.apache.parquet", headers=headers)
+    buffer = io.StringIO()
+    write_jsonl(rows, buffer)
+    return Response(buffer.getvalue(), media_type="application/x-ndjson", headers=headers)
@@ -0,0 +1,69 @@
+"""
+Job Routes
+
+Status of background jobs (see app/services/job_queue.py) for the clients
+that started them, e.g. POST /conversations/{id}/continue?background=true.
+
+Endpoints:
+- GET /jobs/{job_id} - Job status, attempts, and result (progress for auto_run)
+- POST /jobs/{job_id}/cancel - Cancel a queued job or stop a running one
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.dependencies import get_current_user
+from app.models.job import Job
+from app.models.user import User
+from app.services.job_queue import cancel_job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get(
+    "/{job_id}",
+    summary="Get background job status",
+    responses={
+        200: {"description": "Job status (result is set once status is 'succeeded')"},
+        401: {"description": "Not authenticated"},
+        404: {"description": "Job not found"},
+    },
+)
+def get_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return _owned_job(db, job_id, current_user).to_dict()
+
+
+@router.post(
+    "/{job_id}/cancel",
+    summary="Cancel a background job",
+    responses={
+        200: {"description": "Job after cancelling (a running job stops after its current step)"},
+        401: {"description": "Not authenticated"},
+        404: {"description": "Job not found"},
+    },
+)
+def cancel(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Queued jobs are cancelled at once. Running jobs get cancel_requested and
+    finish as 'cancelled' once the handler reaches a stopping point (for
+    auto_run, after the turn in progress). Finished jobs are returned as-is.
+    """
+    job = cancel_job(db, _owned_job(db, job_id, current_user))
+    db.commit()
+    return job.to_dict()
+
+
+def _owned_job(db: Session, job_id: int, user: User) -> Job:
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user.id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
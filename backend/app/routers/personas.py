@@ -7,6 +7,7 @@ motto generation (Claude), and avatar generation (DALL-E).
 Endpoints:
 - POST /personas - Create persona (OCEAN inference → motto → avatar)
 - GET /personas - List current user's personas
+- GET /personas/public - List / search public personas from other users
 - GET /personas/{unique_id} - Get single persona
 - DELETE /personas/{unique_id} - Delete persona
 - POST /personas/compatibility - Compatibility analysis between personas
@@ -16,12 +17,17 @@ Endpoints:
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel, Field, field_validator
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.dependencies import get_current_user
+from app.admission import GenerationSlot, generation_slot
+from app.database import get_async_db, get_db
+from app.db_replicas import get_read_db
+from app.dependencies import get_current_user, get_current_user_async
+from app.http_cache import persona_etag, is_not_modified, not_modified, set_etag
 from app.models.user import User
 from app.models.persona import Persona
 from app.models.moderation import ModerationAuditLog
@@ -29,9 +35,11 @@ from app.models.traits import PersonalityVector
 from app.models.affinity import AffinityCalculator
 from app.models.archetypes import get_all_archetypes
 from app.services.ocean_inference import OceanInferenceService
+from app.services.ocean_cache import get_ocean_cache
 from app.services.llm_service import LLMService
 from app.services.image_generation_service import ImageGenerationService
 from app.services.content_moderation_service import ContentModerationService
+from app.services.persona_search import search_public_personas
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +85,7 @@ class CompatibilityRequest(BaseModel):
     responses={
         201: {"description": "Persona created successfully"},
         401: {"description": "Not authenticated"},
+        429: {"description": "Generation limit reached (see Retry-After)"},
         502: {"description": "OCEAN inference service failed"},
     },
 )
@@ -84,6 +93,7 @@ def create_persona(
     request: PersonaCreateRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    slot: GenerationSlot = Depends(generation_slot),
 ):
     # Step 1: Moderate content (check description for harmful content)
     description = request.description or f"A person named {request.name}"
@@ -112,7 +122,7 @@ def create_persona(
 
     # Step 2: Infer OCEAN traits from description
     try:
-        service = OceanInferenceService()
+        service = OceanInferenceService(cache=get_ocean_cache())
         ocean_scores = service.infer_ocean_traits(description)
     except Exception as e:
         logger.error(f"OCEAN inference failed: {e}")
@@ -198,15 +208,14 @@ def create_persona(
         401: {"description": "Not authenticated"},
     },
 )
-def list_personas(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def list_personas(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    personas = (
-        db.query(Persona)
-        .filter(Persona.user_id == current_user.id)
+    personas = await db.scalars(
+        select(Persona)
+        .where(Persona.user_id == current_user.id)
         .order_by(Persona.created_at.desc())
-        .all()
     )
     return [p.to_dict() for p in personas]
 
@@ -223,20 +232,38 @@ def list_personas(
         401: {"description": "Not authenticated"},
     },
 )
-def list_public_personas(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def list_public_personas(
+    response: Response,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_read_db),
     q: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
 ):
-    """Return all public personas, excluding the current user's own personas."""
+    """
+    Return public personas, excluding the current user's own personas.
+
+    Without q: ranked by upvotes. With q: ranked full-text / fuzzy name search
+    (see app/services/persona_search.py); when more results exist the
+    X-Next-Cursor response header carries the cursor for the next page.
+    """
+    if q and q.strip():
+        try:
+            personas, next_cursor = await search_public_personas(
+                db, q, exclude_user_id=current_user.id, limit=limit, cursor=cursor,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return [p.to_dict() for p in personas]
+
     query = (
-        db.query(Persona)
-        .filter(Persona.is_public == True, Persona.user_id != current_user.id)
+        select(Persona)
+        .where(Persona.is_public == True, Persona.user_id != current_user.id)
         .order_by(Persona.upvote_count.desc(), Persona.created_at.desc())
     )
-    if q:
-        query = query.filter(Persona.name.ilike(f"%{q}%"))
-    personas = query.limit(100).all()
+    personas = await db.scalars(query.limit(limit))
     return [p.to_dict() for p in personas]
 
 
@@ -249,22 +276,28 @@ def list_public_personas(
     summary="Get a persona by unique ID",
     responses={
         200: {"description": "Persona details"},
+        304: {"description": "Not modified since the ETag in If-None-Match"},
         401: {"description": "Not authenticated"},
         404: {"description": "Persona not found"},
     },
 )
-def get_persona(
+async def get_persona(
     unique_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    persona = (
-        db.query(Persona)
-        .filter(Persona.unique_id == unique_id, Persona.user_id == current_user.id)
-        .first()
+    persona = await db.scalar(
+        select(Persona).where(Persona.unique_id == unique_id, Persona.user_id == current_user.id)
     )
     if not persona:
         raise HTTPException(status_code=404, detail="Persona not found")
+
+    etag = persona_etag(persona)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return persona.to_dict()
 
 
@@ -310,12 +343,14 @@ def delete_persona(
         401: {"description": "Not authenticated"},
         403: {"description": "Not the owner"},
         404: {"description": "Persona not found"},
+        429: {"description": "Generation limit reached (see Retry-After)"},
     },
 )
 def regenerate_persona_avatar(
     unique_id: str,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    slot: GenerationSlot = Depends(generation_slot),
 ):
     persona = (
         db.query(Persona)
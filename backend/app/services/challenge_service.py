@@ -4,20 +4,26 @@ Challenge Service - Phase 10
 Handles the logic for Challenge Mode:
 1. Generating representative disagreeable personas for a proposal.
 2. Evaluating persuasion score changes based on conversational turns.
+
+Both return JSON through forced tool calls (app/services/structured_output.py)
+with schema validation and one repair request on invalid output.
 """
 
-import json
 import logging
-import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.services.llm_service import LLMService, DEFAULT_MODEL
 from app.services.prompt_templates import (
     ChallengePersonaGenerationTemplate,
     PersuasionEvaluationTemplate
 )
-from app.services.ocean_inference import OceanInferenceService
+from app.services.ocean_inference import OCEAN_SCORES_SCHEMA, OceanInferenceService, validate_ocean_scores
+from app.services.structured_output import StructuredOutputError, call_with_tool
+from app.services.usage import in_context
+from app.services.ocean_cache import get_ocean_cache
 from app.services.image_generation_service import ImageGenerationService
 from app.models.traits import PersonalityVector
 from app.models.affinity import AffinityCalculator
@@ -26,6 +32,95 @@ from app.models.persona import Persona
 
 logger = logging.getLogger(__name__)
 
+_PERSONA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "age": {"type": "integer"},
+        "gender": {"type": "string"},
+        "description": {"type": "string"},
+        "attitude": {
+            "type": "string",
+            "enum": ["Neutral", "Sarcastic", "Comical", "Somber", "Confrontational", "Blunt", "Cynical"],
+        },
+    },
+    "required": ["name", "age", "gender", "description", "attitude"],
+}
+
+_FUSED_PERSONA_SCHEMA = {
+    **_PERSONA_SCHEMA,
+    "properties": {**_PERSONA_SCHEMA["properties"], "ocean": OCEAN_SCORES_SCHEMA, "motto": {"type": "string"}},
+    "required": _PERSONA_SCHEMA["required"] + ["ocean", "motto"],
+}
+
+
+def personas_tool(fused: bool) -> Dict[str, Any]:
+    """Tool for the brainstormed challenge personas (with OCEAN + motto when fused)."""
+    return {
+        "name": "record_challenge_personas",
+        "description": "Record the brainstormed personas who would disagree with the proposal.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "personas": {"type": "array", "items": _FUSED_PERSONA_SCHEMA if fused else _PERSONA_SCHEMA},
+            },
+            "required": ["personas"],
+        },
+    }
+
+
+PERSUASION_TOOL = {
+    "name": "record_persuasion",
+    "description": "Record the persona's updated persuasion score after the message.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "new_score": {"type": "number", "minimum": 0.0, "maximum": 1.0},
+            "reasoning": {"type": "string"},
+        },
+        "required": ["new_score", "reasoning"],
+    },
+}
+
+
+def validate_personas(data: Any) -> List[Dict[str, Any]]:
+    """
+    Validate brainstormed personas ({"personas": [...]} tool input, or a bare array).
+
+    Per-field gaps (e.g. fused OCEAN scores) are left to the caller's fallbacks.
+
+    Raises:
+        ValueError: If there is no non-empty array of named persona objects
+    """
+    if isinstance(data, dict):
+        data = data.get("personas")
+    if not isinstance(data, list) or not data:
+        raise ValueError("Expected a non-empty array of persona objects")
+    for i, item in enumerate(data, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"Persona {i} is not an object")
+        if not isinstance(item.get("name"), str) or not item["name"].strip():
+            raise ValueError(f"Persona {i} has no name")
+    return data
+
+
+def validate_persuasion(data: Any) -> Dict[str, Any]:
+    """
+    Validate a persuasion evaluation; new_score is clamped to [0.0, 1.0].
+
+    Raises:
+        ValueError: If data is not an object or new_score is not numeric
+        KeyError: If new_score is missing
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"Evaluation must be a JSON object, got {type(data).__name__}")
+    try:
+        new_score = float(data["new_score"])
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid new_score: {data['new_score']!r}") from e
+    return {"new_score": max(0.0, min(1.0, new_score)), "reasoning": str(data.get("reasoning", ""))}
+
+
 class ChallengeService:
     def __init__(self, llm_service: Optional[LLMService] = None):
         self.llm_service = llm_service or LLMService()
@@ -38,52 +133,66 @@ class ChallengeService:
         user_id: int,
         proposal: str,
         challenge_type: str,
-        n: int = 3
+        n: int = 3,
+        fused: Optional[bool] = None,
     ) -> List[Persona]:
         """
         Brainstorm N personas who would disagree with the proposal and create them.
-        """
-        prompt = self.persona_gen_template.render(proposal, challenge_type, n)
 
-        response = self.llm_service.client.messages.create(
-            model=DEFAULT_MODEL,
-            max_tokens=2000,
-            system="You are an expert in stakeholder analysis and social psychology.",
-            messages=[{"role": "user", "content": prompt}],
-        )
-
-        raw_text = response.content[0].text.strip()
-        # Find JSON list
-        json_match = re.search(r"\[.*\]", raw_text, re.DOTALL)
-        if not json_match:
-            logger.error(f"Failed to find JSON in LLM response: {raw_text}")
-            return []
+        In fused mode (settings.CHALLENGE_FUSED_GENERATION) the brainstorm
+        response also carries each persona's OCEAN scores and motto; only
+        personas whose scores are missing/invalid fall back to one batched
+        inference call, and only missing mottos are generated separately.
+        Mottos and avatars run concurrently (CHALLENGE_MAX_CONCURRENCY).
+        """
+        if fused is None:
+            fused = settings.CHALLENGE_FUSED_GENERATION
+        prompt = self.persona_gen_template.render(proposal, challenge_type, n, fused=fused)
 
         try:
-            persona_data_list = json.loads(json_match.group(0))
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse JSON from LLM response: {json_match.group(0)}")
+            persona_data_list = call_with_tool(
+                self.llm_service.client, "challenge_personas", personas_tool(fused), validate_personas,
+                service="challenge",
+                model=DEFAULT_MODEL,
+                max_tokens=2000 + (150 * n if fused else 0),
+                system="You are an expert in stakeholder analysis and social psychology.",
+                messages=[{"role": "user", "content": prompt}],
+            )
+        except StructuredOutputError as e:
+            logger.error(f"Failed to get challenge personas: {e}")
             return []
 
-        created_personas = []
-        ocean_service = OceanInferenceService()
+        ocean_service = OceanInferenceService(cache=get_ocean_cache())
         img_service = ImageGenerationService()
         archetypes = get_all_archetypes()
         calculator = AffinityCalculator(archetypes)
 
-        for data in persona_data_list[:n]:
-            name = data.get("name", "Unknown")
-            description = data.get("description", "")
-            age = data.get("age")
-            gender = data.get("gender")
-            attitude = data.get("attitude", "Neutral")
+        persona_data_list = persona_data_list[:n]
 
-            # 1. OCEAN Inference
+        # 1. OCEAN scores - from the fused response, else all missing ones in one inference call
+        ocean_scores_list = [
+            self._fused_ocean_scores(data) if fused else None
+            for data in persona_data_list
+        ]
+        missing = [i for i, scores in enumerate(ocean_scores_list) if scores is None]
+        if missing:
             try:
-                ocean_scores = ocean_service.infer_ocean_traits(description)
+                inferred = ocean_service.infer_ocean_traits_batch(
+                    [persona_data_list[i].get("description", "") for i in missing]
+                )
             except Exception as e:
-                logger.warning(f"OCEAN inference failed for {name}: {e}")
-                ocean_scores = {"openness": 0.5, "conscientiousness": 0.5, "extraversion": 0.5, "agreeableness": 0.5, "neuroticism": 0.5}
+                logger.warning(f"OCEAN inference failed for challenge personas: {e}")
+                inferred = [None] * len(missing)
+            for i, scores in zip(missing, inferred):
+                ocean_scores_list[i] = scores
+
+        neutral_scores = {"openness": 0.5, "conscientiousness": 0.5, "extraversion": 0.5, "agreeableness": 0.5, "neuroticism": 0.5}
+        details = []
+        for data, ocean_scores in zip(persona_data_list, ocean_scores_list):
+            name = data.get("name", "Unknown")
+            if ocean_scores is None:
+                logger.warning(f"OCEAN inference failed for {name}; using neutral scores")
+                ocean_scores = dict(neutral_scores)
 
             # 2. Archetype Affinities
             vector = PersonalityVector({
@@ -93,47 +202,69 @@ class ChallengeService:
                 "A": ocean_scores["agreeableness"],
                 "N": ocean_scores["neuroticism"],
             })
-            affinities = calculator.calculate(vector)
+            details.append({
+                "name": name,
+                "age": data.get("age"),
+                "gender": data.get("gender"),
+                "description": data.get("description", ""),
+                "attitude": data.get("attitude", "Neutral"),
+                "ocean_scores": ocean_scores,
+                "archetype_affinities": calculator.calculate(vector),
+                "motto": self._fused_motto(data) if fused else None,
+            })
 
-            # 3. Motto
-            motto = None
-            try:
-                motto = self.llm_service.generate_motto({
-                    "name": name,
-                    "ocean_scores": ocean_scores,
-                    "archetype_affinities": affinities,
-                    "attitude": attitude
+        # 3. Mottos (where not fused) and 4. avatars, concurrently
+        with ThreadPoolExecutor(max_workers=max(1, settings.CHALLENGE_MAX_CONCURRENCY)) as pool:
+            motto_futures = {
+                i: pool.submit(in_context(self.llm_service.generate_motto), {
+                    "name": d["name"],
+                    "ocean_scores": d["ocean_scores"],
+                    "archetype_affinities": d["archetype_affinities"],
+                    "attitude": d["attitude"],
                 })
-            except Exception as e:
-                logger.warning(f"Motto generation failed for {name}: {e}")
+                for i, d in enumerate(details) if not d["motto"]
+            }
+            avatar_futures = [
+                pool.submit(in_context(img_service.generate_avatar_for_persona), {
+                    "name": d["name"],
+                    "age": d["age"],
+                    "gender": d["gender"],
+                    "description": d["description"],
+                    "attitude": d["attitude"],
+                })
+                for d in details
+            ]
+
+        created_personas = []
+        for i, d in enumerate(details):
+            motto = d["motto"]
+            if i in motto_futures:
+                try:
+                    motto = motto_futures[i].result()
+                except Exception as e:
+                    logger.warning(f"Motto generation failed for {d['name']}: {e}")
 
-            # 4. Avatar
             avatar_url = None
             try:
-                avatar_url = img_service.generate_avatar_for_persona({
-                    "name": name,
-                    "age": age,
-                    "gender": gender,
-                    "description": description,
-                    "attitude": attitude
-                })
+                avatar_url = avatar_futures[i].result()
             except Exception as e:
-                logger.warning(f"Avatar generation failed for {name}: {e}")
+                logger.warning(f"Avatar generation failed for {d['name']}: {e}")
 
             # 5. Create Persona
+            ocean_scores = d["ocean_scores"]
             persona = Persona(
                 user_id=user_id,
-                name=name,
-                age=age,
-                gender=gender,
-                description=description,
-                attitude=attitude,
+                name=d["name"],
+                age=d["age"],
+                gender=d["gender"],
+                description=d["description"],
+                attitude=d["attitude"],
                 ocean_openness=ocean_scores["openness"],
                 ocean_conscientiousness=ocean_scores["conscientiousness"],
                 ocean_extraversion=ocean_scores["extraversion"],
                 ocean_agreeableness=ocean_scores["agreeableness"],
                 ocean_neuroticism=ocean_scores["neuroticism"],
-                archetype_affinities=affinities,
+                archetype_affinities=d["archetype_affinities"],
                 motto=motto,
                 avatar_url=avatar_url,
                 is_public=True
@@ -144,6 +275,23 @@ class ChallengeService:
         db.flush() # Ensure IDs are populated
         return created_personas
 
+    @staticmethod
+    def _fused_ocean_scores(data: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """Validated OCEAN scores from a fused persona object, or None if absent/invalid."""
+        try:
+            return validate_ocean_scores(data.get("ocean"))
+        except (KeyError, ValueError) as e:
+            logger.warning(f"Invalid fused OCEAN scores for {data.get('name')}: {e}")
+            return None
+
+    @staticmethod
+    def _fused_motto(data: Dict[str, Any]) -> Optional[str]:
+        motto = data.get("motto")
+        if not isinstance(motto, str):
+            return None
+        motto = motto.strip().strip('"').strip("'").strip()
+        return motto[:512] or None
+
     def evaluate_persuasion(
         self,
         persona_name: str,
@@ -165,21 +313,15 @@ class ChallengeService:
             message_text=message_text
         )
 
-        response = self.llm_service.client.messages.create(
-            model=DEFAULT_MODEL,
-            max_tokens=512,
-            system="You are a social psychologist and debate judge.",
-            messages=[{"role": "user", "content": prompt}],
-        )
-
-        raw_text = response.content[0].text.strip()
-        json_match = re.search(r"\{.*\}", raw_text, re.DOTALL)
-        if not json_match:
-            logger.error(f"Failed to find JSON in persuasion evaluation: {raw_text}")
-            return {"new_score": current_score, "reasoning": "Failed to evaluate."}
-
         try:
-            return json.loads(json_match.group(0))
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse JSON in persuasion evaluation: {json_match.group(0)}")
-            return {"new_score": current_score, "reasoning": "Failed to parse evaluation."}
+            return call_with_tool(
+                self.llm_service.client, "persuasion_evaluation", PERSUASION_TOOL, validate_persuasion,
+                service="challenge",
+                model=DEFAULT_MODEL,
+                max_tokens=512,
+                system="You are a social psychologist and debate judge.",
+                messages=[{"role": "user", "content": prompt}],
+            )
+        except StructuredOutputError as e:
+            logger.error(f"Failed to evaluate persuasion: {e}")
+            return {"new_score": current_score, "reasoning": "Failed to evaluate."}
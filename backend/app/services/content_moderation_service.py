@@ -15,18 +15,24 @@ Usage:
     score = service.analyze_toxicity("Some text to check")
     if not service.is_safe(score):
         raise HTTPException(400, "Content failed moderation")
+
+    scores = service.analyze_toxicity_batch(["First candidate", "Second candidate"])
 """
 
 import logging
-from typing import Optional
+import time
+from typing import List, Optional
 
 import httpx
 
 from app.config import settings
+from app.services.provider_limits import provider_limits
+from app.services.usage import usage_recorder
 
 logger = logging.getLogger(__name__)
 
 OPENAI_MODERATION_URL = "https://api.openai.com/v1/moderations"
+MODERATION_MODEL = "omni-moderation-latest"  # OpenAI's default when none is given
 DEFAULT_THRESHOLD = 0.7
 FAIL_SAFE_SCORE = 1.0  # Returned when moderation API is unavailable
 
@@ -71,11 +77,17 @@ class ContentModerationService:
                    Returns 1.0 (fail safe) on API error.
         """
         try:
+            provider_limits.acquire("openai")
+            started = time.perf_counter()
             response = self.http_client.post(
                 OPENAI_MODERATION_URL,
                 json={"input": text},
             )
             response.raise_for_status()
+            usage_recorder.record(
+                "moderation", "analyze_toxicity", MODERATION_MODEL,
+                latency_ms=(time.perf_counter() - started) * 1000,
+            )
             data = response.json()
             category_scores = data["results"][0]["category_scores"]
             return float(max(category_scores.values()))
@@ -84,6 +96,38 @@ class ContentModerationService:
             logger.error(f"Content moderation API failed, failing safe: {e}")
             return FAIL_SAFE_SCORE
 
+    def analyze_toxicity_batch(self, texts: List[str]) -> List[float]:
+        """
+        Score several texts with one Moderation API request.
+
+        Args:
+            texts: The text contents to moderate
+
+        Returns:
+            List[float]: One toxicity score per text, in order.
+                         All 1.0 (fail safe) on API error.
+        """
+        try:
+            provider_limits.acquire("openai")
+            started = time.perf_counter()
+            response = self.http_client.post(
+                OPENAI_MODERATION_URL,
+                json={"input": list(texts)},
+            )
+            response.raise_for_status()
+            usage_recorder.record(
+                "moderation", "analyze_toxicity_batch", MODERATION_MODEL,
+                latency_ms=(time.perf_counter() - started) * 1000,
+            )
+            results = response.json()["results"]
+            if len(results) != len(texts):
+                raise ValueError(f"Expected {len(texts)} moderation results, got {len(results)}")
+            return [float(max(r["category_scores"].values())) for r in results]
+
+        except Exception as e:
+            logger.error(f"Content moderation API failed, failing safe: {e}")
+            return [FAIL_SAFE_SCORE] * len(texts)
+
     def is_safe(self, toxicity_score: float) -> bool:
         """
         Determine if a toxicity score is below the safety threshold.
@@ -3,9 +3,23 @@ Conversation Orchestrator - Phase 7
 
 Drives a single turn of a focus group conversation:
 1. Validates the conversation isn't complete
-2. For each persona, generates a response via LLM
-3. Checks moderation; regenerates if toxic (up to max_regeneration_attempts)
-4. Saves all messages and increments the turn counter
+2. Challenge mode: scores every participant's reaction to the last message
+   (concurrently, up to CHALLENGE_MAX_CONCURRENCY persuasion calls at once)
+3. For each persona, generates a response via LLM
+4. Checks moderation; regenerates if toxic (up to max_regeneration_attempts).
+   Personas that are often flagged get two candidates at once, moderated in
+   one batch (see app/services/flag_rates.py)
+5. Saves all messages and claims the turn (TurnConflictError if a concurrent
+   request already generated it)
+
+Challenge evaluation modes (CHALLENGE_EVALUATION_MODE):
+- "sync": every evaluation finishes before the first persona speaks.
+- "pipelined": evaluations start together and each persona waits only for
+  its own, so later evaluations overlap earlier personas' generation. The
+  scores each persona sees are identical to "sync".
+- "deferred": evaluations run alongside the whole turn and are applied once
+  it ends; personas speak with their previous score, so the last message's
+  effect shows up one turn later.
 
 TDD Status:
 - Tests written first in: tests/unit/test_conversation_orchestrator.py
@@ -23,13 +37,28 @@ Usage:
 
 import logging
 import re
-from typing import List, Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 
+from app.config import settings
+from app.models.conversation import Conversation
 from app.services.llm_service import LLMService
-from app.services.content_moderation_service import ContentModerationService
+from app.services.content_moderation_service import FAIL_SAFE_SCORE, ContentModerationService
+from app.services.conversation_state import HISTORY_STATUSES, PersonaSnapshot, persona_details
+from app.services.flag_rates import flag_rates
+from app.services.prompt_engine import history_token_budget
+from app.services.provider_limits import provider_limits
+from app.services.usage import in_context, usage_context, usage_recorder
 
 logger = logging.getLogger(__name__)
 
+EVALUATION_MODES = ("sync", "pipelined", "deferred")
+
+
+class TurnConflictError(Exception):
+    """The turn being generated was committed by a concurrent request first."""
+
 
 class ConversationOrchestrator:
     """
@@ -42,6 +71,8 @@ class ConversationOrchestrator:
         llm_service: LLMService instance. If None, creates one from env vars.
         moderation_service: ContentModerationService instance.
         max_regeneration_attempts: Max retries when content is toxic.
+        evaluation_mode: One of EVALUATION_MODES. Defaults to
+            settings.CHALLENGE_EVALUATION_MODE.
     """
 
     def __init__(
@@ -49,10 +80,16 @@ class ConversationOrchestrator:
         llm_service=None,
         moderation_service=None,
         max_regeneration_attempts: int = 2,
+        evaluation_mode: Optional[str] = None,
     ):
         self.llm_service = llm_service or LLMService()
         self.moderation_service = moderation_service or ContentModerationService()
         self.max_regeneration_attempts = max_regeneration_attempts
+        self.evaluation_mode = evaluation_mode or settings.CHALLENGE_EVALUATION_MODE
+        if self.evaluation_mode not in EVALUATION_MODES:
+            raise ValueError(
+                f"Unknown evaluation mode {self.evaluation_mode!r}; expected one of {EVALUATION_MODES}"
+            )
 
     def generate_turn(
         self,
@@ -60,66 +97,104 @@ class ConversationOrchestrator:
         personas: list,
         history: List[Dict[str, str]],
         db,
+        history_ids: Optional[List[int]] = None,
     ) -> list:
-        topic = conversation.topic
         """
         Generate one full turn — one message from each persona.
 
         Args:
             conversation: Conversation model instance
-            personas: List of Persona model instances
+            personas: Persona model instances or cached PersonaSnapshots
             history: Prior messages as [{"speaker": name, "message": text}]
             db: SQLAlchemy session
+            history_ids: Message IDs parallel to history, for REPLY_TO links.
+                Loaded from the transcript when None; callers normally pass
+                the cached ones (see app/services/conversation_state.py).
 
         Returns:
             List[ConversationMessage]: The newly created messages
 
         Raises:
             ValueError: If conversation.is_complete is True
+            TurnConflictError: If a concurrent request committed this turn first
         """
-        from app.models.conversation import ConversationMessage
-
         if conversation.is_complete:
             raise ValueError(
                 f"Conversation has reached its maximum of {conversation.max_turns} turns."
             )
 
+        with usage_context(conversation_id=conversation.id):
+            return self._generate_turn(conversation, personas, history, db, history_ids)
+
+    def _generate_turn(
+        self, conversation, personas: list, history: List[Dict[str, str]], db, history_ids: Optional[List[int]],
+    ) -> list:
+        topic = conversation.topic
         next_turn = conversation.turn_count + 1
-        new_messages = []
 
-        # Work on a copy of history to avoid side effects for the caller
+        # Work on copies to avoid side effects for the caller
         history = list(history)
 
         # Map current history to original message IDs for REPLY_TO linking
-        existing_msgs = db.query(ConversationMessage).filter_by(
-            conversation_id=conversation.id
-        ).order_by(ConversationMessage.turn_number, ConversationMessage.id).all()
-
-        history_ids = [m.id for m in existing_msgs if m.moderation_status in ("approved", "user")]
+        if history_ids is None:
+            existing_msgs = conversation.transcript_query(db).all()
+            history_ids = [m.id for m in existing_msgs if m.moderation_status in HISTORY_STATUSES]
+        else:
+            history_ids = list(history_ids)
 
         # For challenge mode, evaluate persuasion from previous turn's messages
+        pool = None
+        evaluations: Dict[int, tuple] = {}
         if conversation.is_challenge and history:
-            from app.services.challenge_service import ChallengeService
-            challenge_svc = ChallengeService(llm_service=self.llm_service)
-
-            last_msg = history[-1]
-
-            for participant in conversation.participants:
-                eval_res = challenge_svc.evaluate_persuasion(
-                    persona_name=participant.persona.name,
-                    persona_description=participant.persona.description,
-                    proposal=conversation.proposal,
-                    current_score=participant.persuaded_score,
-                    message_speaker=last_msg["speaker"],
-                    message_text=last_msg["message"]
-                )
-                participant.persuaded_score = eval_res.get("new_score", participant.persuaded_score)
+            workers = max(1, min(len(conversation.participants), settings.CHALLENGE_MAX_CONCURRENCY))
+            pool = ThreadPoolExecutor(max_workers=workers)
+            evaluations = self._start_persuasion_evaluation(conversation, history[-1], pool)
+            if self.evaluation_mode == "sync":
+                self._apply_evaluations(evaluations)
+
+        try:
+            new_messages = self._generate_messages(
+                conversation, personas, history, history_ids, next_turn, topic, db, evaluations,
+            )
+            # "deferred" applies everything here; the others pick up
+            # participants that did not speak this turn
+            self._apply_evaluations(evaluations)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+        # Claim the turn: if another request finished it first, drop ours
+        # rather than writing a second set of messages for the same turn
+        claimed = db.query(Conversation).filter(
+            Conversation.id == conversation.id,
+            Conversation.turn_count == next_turn - 1,
+        ).update({Conversation.turn_count: next_turn}, synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            raise TurnConflictError(f"Turn {next_turn} was already generated by another request")
+        conversation.turn_count = next_turn
+        db.commit()
+
+        for msg in new_messages:
+            db.refresh(msg)
+
+        return new_messages
 
+    def _generate_messages(
+        self, conversation, personas: list, history: List[Dict[str, str]], history_ids: List[int],
+        next_turn: int, topic: str, db, evaluations: Dict[int, tuple],
+    ) -> list:
+        """Generate, moderate and flush one message per persona."""
+        from app.models.conversation import ConversationMessage
+
+        new_messages = []
         for persona in personas:
             # Get current persuaded score for this persona in this conversation
             persuaded_score = 0.0
             participant = next((p for p in conversation.participants if p.persona_id == persona.id), None)
             if participant:
+                if self.evaluation_mode == "pipelined":
+                    self._apply_evaluations(evaluations, only=participant)
                 persuaded_score = participant.persuaded_score
 
             persona_details = self._build_persona_details(persona)
@@ -131,6 +206,7 @@ class ConversationOrchestrator:
                 proposal=conversation.proposal,
                 challenge_type=conversation.challenge_type,
                 persuaded_score=persuaded_score,
+                persona_id=persona.id,
             )
 
             # Parse REPLY_TO: [index]
@@ -172,13 +248,47 @@ class ConversationOrchestrator:
                     action_taken="flagged",
                 ))
 
-        conversation.turn_count = next_turn
-        db.commit()
+        return new_messages
 
-        for msg in new_messages:
-            db.refresh(msg)
+    def _start_persuasion_evaluation(
+        self, conversation, last_msg: Dict[str, str], pool: ThreadPoolExecutor,
+    ) -> Dict[int, tuple]:
+        """
+        Submit one evaluate_persuasion call per participant for last_msg.
 
-        return new_messages
+        The evaluations are independent Claude calls, so they run on the
+        bounded pool; ORM objects are only read here and written in
+        _apply_evaluations, both on the calling thread.
+
+        Returns:
+            {persona id: (participant, Future)}
+        """
+        from app.services.challenge_service import ChallengeService
+        challenge_svc = ChallengeService(llm_service=self.llm_service)
+
+        evaluations = {}
+        for participant in conversation.participants:
+            future = pool.submit(
+                in_context(challenge_svc.evaluate_persuasion),
+                persona_name=participant.persona.name,
+                persona_description=participant.persona.description,
+                proposal=conversation.proposal,
+                current_score=participant.persuaded_score,
+                message_speaker=last_msg["speaker"],
+                message_text=last_msg["message"],
+            )
+            evaluations[participant.persona_id] = (participant, future)
+        return evaluations
+
+    def _apply_evaluations(self, evaluations: Dict[int, tuple], only=None) -> None:
+        """Wait for pending evaluations (or just `only`'s) and store their scores."""
+        persona_ids = [only.persona_id] if only is not None else list(evaluations)
+        for persona_id in persona_ids:
+            if persona_id not in evaluations:
+                continue
+            participant, future = evaluations.pop(persona_id)
+            eval_res: Dict[str, Any] = future.result()
+            participant.persuaded_score = eval_res.get("new_score", participant.persuaded_score)
 
     def _generate_safe_message(
         self,
@@ -189,53 +299,60 @@ class ConversationOrchestrator:
         proposal: str = None,
         challenge_type: str = None,
         persuaded_score: float = 0.0,
+        persona_id: Optional[int] = None,
     ):
         """
         Generate a message, regenerating up to max_regeneration_attempts if toxic.
 
+        Personas that are often flagged (see app/services/flag_rates.py) get
+        two candidates per round, generated concurrently and moderated in
+        one batch; the first safe one wins. Each candidate counts as an
+        attempt, so the worst case makes the same number of calls.
+
         Returns:
             tuple: (message_text, toxicity_score, moderation_status)
         """
-        from app.services.prompt_templates import ChallengeConversationTemplate
+        def candidate():
+            return self._generate_candidate(
+                persona_details, history, topic, is_challenge, proposal, challenge_type, persuaded_score,
+            )
+
         last_text = ""
         last_score = 0.0
-
-        for attempt in range(self.max_regeneration_attempts):
-            if is_challenge:
-                template = ChallengeConversationTemplate()
-                user_message = template.render(
-                    persona_name=persona_details.get("name", "Participant"),
-                    ocean_scores=persona_details.get("ocean_scores", {}),
-                    attitude=persona_details.get("attitude", "Neutral"),
-                    proposal=proposal,
-                    challenge_type=challenge_type,
-                    history=history,
-                    description=persona_details.get("description", ""),
-                    persuaded_score=persuaded_score,
-                )
-                text = self.llm_service.client.messages.create(
-                    model=self.llm_service.model,
-                    max_tokens=512,
-                    system="You are roleplaying as a specific person in a challenge conversation.",
-                    messages=[{"role": "user", "content": user_message}],
-                ).content[0].text.strip()
+        attempt = 0
+
+        while attempt < self.max_regeneration_attempts:
+            width = 2 if flag_rates.should_speculate(persona_id) else 1
+            width = min(width, self.max_regeneration_attempts - attempt)
+            if width == 1:
+                texts = [candidate()]
+                scores = [self.moderation_service.analyze_toxicity(texts[0])]
             else:
-                text = self.llm_service.generate_response(
-                    persona_details=persona_details,
-                    conversation_history=history,
-                    topic=topic,
+                with ThreadPoolExecutor(max_workers=width) as pool:
+                    futures = [pool.submit(in_context(candidate)) for _ in range(width)]
+                    texts = [f.result() for f in futures]
+                scores = self.moderation_service.analyze_toxicity_batch(texts)
+
+            safe = [self.moderation_service.is_safe(score) for score in scores]
+            for score, is_safe in zip(scores, safe):
+                # A moderation outage blocks every candidate; that says nothing
+                # about the persona, so it must not push it into speculating
+                if score != FAIL_SAFE_SCORE:
+                    flag_rates.record(persona_id, flagged=not is_safe)
+            if width > 1:
+                flag_rates.record_speculation(first_safe=safe[0], any_safe=any(safe))
+
+            for text, score, is_safe in zip(texts, scores, safe):
+                attempt += 1
+                last_text = text
+                last_score = score
+                if is_safe:
+                    return text, score, "approved"
+
+                logger.warning(
+                    f"Toxic content (score={score:.2f}) for '{persona_details.get('name')}', "
+                    f"attempt {attempt}/{self.max_regeneration_attempts}"
                 )
-            score = self.moderation_service.analyze_toxicity(text)
-            last_text = text
-            last_score = score
-
-            if self.moderation_service.is_safe(score):
-                return text, score, "approved"
-
-            logger.warning(
-                f"Toxic content (score={score:.2f}) for '{persona_details.get('name')}', "
-                f"attempt {attempt + 1}/{self.max_regeneration_attempts}"
-            )
 
         # Exhausted attempts — save as flagged
         logger.error(
@@ -244,18 +361,60 @@ class ConversationOrchestrator:
         )
         return last_text, last_score, "flagged"
 
+    def _generate_candidate(
+        self,
+        persona_details: Dict[str, Any],
+        history: List[Dict[str, str]],
+        topic: str,
+        is_challenge: bool,
+        proposal: Optional[str],
+        challenge_type: Optional[str],
+        persuaded_score: float,
+    ) -> str:
+        """One unmoderated response from the persona."""
+        if not is_challenge:
+            return self.llm_service.generate_response(
+                persona_details=persona_details,
+                conversation_history=history,
+                topic=topic,
+            )
+
+        from app.services.prompt_templates import ChallengeConversationTemplate
+        user_message = ChallengeConversationTemplate().render(
+            persona_name=persona_details.get("name", "Participant"),
+            ocean_scores=persona_details.get("ocean_scores", {}),
+            attitude=persona_details.get("attitude", "Neutral"),
+            proposal=proposal,
+            challenge_type=challenge_type,
+            history=history,
+            description=persona_details.get("description", ""),
+            persuaded_score=persuaded_score,
+            persona_block=persona_details.get("prompt_block"),
+            token_budget=history_token_budget(self.llm_service.model),
+        )
+        provider_limits.acquire("anthropic")
+        started = time.perf_counter()
+        response = self.llm_service.client.messages.create(
+            model=self.llm_service.model,
+            max_tokens=512,
+            system="You are roleplaying as a specific person in a challenge conversation.",
+            messages=[{"role": "user", "content": user_message}],
+        )
+        usage_recorder.record_response("llm", "challenge_turn", self.llm_service.model, response, started)
+        return response.content[0].text.strip()
+
     def _build_persona_details(self, persona) -> Dict[str, Any]:
-        """Convert a Persona model instance to a details dict for the LLM."""
-        return {
-            "name": persona.name,
-            "description": persona.description or "",
-            "attitude": persona.attitude or "Neutral",
-            "ocean_scores": {
-                "openness": persona.ocean_openness,
-                "conscientiousness": persona.ocean_conscientiousness,
-                "extraversion": persona.ocean_extraversion,
-                "agreeableness": persona.ocean_agreeableness,
-                "neuroticism": persona.ocean_neuroticism,
-            },
-            "archetype_affinities": persona.archetype_affinities or {},
-        }
+        """Details dict for the LLM; cached snapshots already carry theirs."""
+        if isinstance(persona, PersonaSnapshot):
+            return persona.details
+        return persona_details(persona)
+
+
+def turn_result(conversation, new_messages: list) -> Dict[str, Any]:
+    """The API representation of a generated turn."""
+    return {
+        "conversation_unique_id": conversation.unique_id,
+        "turn_number": conversation.turn_count,
+        "new_messages": [m.to_dict() for m in new_messages],
+        "is_complete": conversation.is_complete,
+    }
@@ -0,0 +1,178 @@
+"""
+Conversation State Cache
+
+Generating a turn needs the participants' persona details and the ordered
+transcript (with message ids, for REPLY_TO links). Loading them means one
+query per participant persona plus the full transcript, which grows with
+every turn and spans the fork chain. This per-process LRU keeps that state
+between consecutive turns of a conversation: a turn appends its approved
+messages to the cached history instead of reloading it.
+
+An entry is only used while it matches the conversation row it was built
+for (turn_count, updated_at and the participant persona ids), so turns
+generated, messages injected or forks detached by another instance or
+worker simply miss and rebuild. Writers in this process also invalidate
+explicitly: message injection, visibility changes, deletion and
+detach_forks (which changes the fork chain of a deleted conversation's forks).
+
+Usage:
+    state = conversation_state.get(conversation, db)
+    new_messages = orchestrator.generate_turn(
+        conversation=conversation, personas=state.personas,
+        history=state.history, db=db, history_ids=state.history_ids,
+    )
+    conversation_state.advance(conversation, state, new_messages)
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+# Messages that are part of the history personas see
+HISTORY_STATUSES = ("approved", "user")
+
+
+def persona_details(persona) -> Dict[str, Any]:
+    """Convert a Persona model instance to a details dict for the LLM."""
+    return {
+        "name": persona.name,
+        "description": persona.description or "",
+        "attitude": persona.attitude or "Neutral",
+        "ocean_scores": {
+            "openness": persona.ocean_openness,
+            "conscientiousness": persona.ocean_conscientiousness,
+            "extraversion": persona.ocean_extraversion,
+            "agreeableness": persona.ocean_agreeableness,
+            "neuroticism": persona.ocean_neuroticism,
+        },
+        "archetype_affinities": persona.archetype_affinities or {},
+        "prompt_block": persona.current_prompt_block(),
+    }
+
+
+@dataclass(frozen=True)
+class PersonaSnapshot:
+    """The parts of a participant persona a turn needs, detached from any session."""
+
+    id: int
+    name: str
+    details: Dict[str, Any]
+
+
+@dataclass
+class ConversationState:
+    """Inputs for a conversation's next turn, valid for `version`."""
+
+    version: Tuple[Any, ...]
+    personas: List[PersonaSnapshot]
+    history: List[Dict[str, str]]
+    history_ids: List[int]
+
+
+def _version(conversation) -> Tuple[Any, ...]:
+    return (
+        conversation.turn_count,
+        conversation.updated_at,
+        tuple(p.persona_id for p in conversation.participants),
+    )
+
+
+def load_state(conversation, db) -> ConversationState:
+    """Build the state from the database."""
+    personas = [
+        PersonaSnapshot(p.persona.id, p.persona.name, persona_details(p.persona))
+        for p in conversation.participants
+    ]
+    messages = [m for m in conversation.transcript_query(db) if m.moderation_status in HISTORY_STATUSES]
+    return ConversationState(
+        version=_version(conversation),
+        personas=personas,
+        history=[{"speaker": m.persona_name, "message": m.message_text} for m in messages],
+        history_ids=[m.id for m in messages],
+    )
+
+
+class ConversationStateCache:
+    """
+    LRU of ConversationState by conversation id.
+
+    Args:
+        max_entries: LRU capacity; 0 disables caching
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, ConversationState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, conversation, db) -> ConversationState:
+        """The cached state if it is still current, else a freshly loaded one."""
+        version = _version(conversation)
+        with self._lock:
+            state = self._entries.get(conversation.id)
+            if state is not None and state.version == version:
+                self._entries.move_to_end(conversation.id)
+                self.hits += 1
+                return state
+            self.misses += 1
+
+        state = load_state(conversation, db)
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[conversation.id] = state
+                self._entries.move_to_end(conversation.id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return state
+
+    def advance(self, conversation, state: ConversationState, new_messages: list) -> None:
+        """
+        Append a committed turn's history messages to `state`.
+
+        Only applies if `state` is still the cached entry; afterwards it is
+        valid for the conversation's new turn_count / updated_at.
+        """
+        with self._lock:
+            if self._entries.get(conversation.id) is not state:
+                return
+            for msg in new_messages:
+                if msg.moderation_status in HISTORY_STATUSES:
+                    state.history.append({"speaker": msg.persona_name, "message": msg.message_text})
+                    state.history_ids.append(msg.id)
+        # Reading the committed row may refresh it, so do it outside the lock
+        version = _version(conversation)
+        with self._lock:
+            if self._entries.get(conversation.id) is state:
+                state.version = version
+
+    def invalidate(self, conversation_id: Optional[int]) -> None:
+        with self._lock:
+            if self._entries.pop(conversation_id, None) is not None:
+                self.invalidations += 1
+
+    def reset(self) -> None:
+        """Drop every entry and zero the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+conversation_state = ConversationStateCache(max_entries=settings.CONVERSATION_STATE_CACHE_SIZE)
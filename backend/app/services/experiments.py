@@ -0,0 +1,258 @@
+"""
+Batch Experiments
+
+Runs the same persona panel across many topics, or many panels on one topic,
+without a create + continue round trip per conversation. An experiment's
+matrix (topics x persona sets x turn counts) is expanded into cells; each
+cell gets its own private conversation and one auto_run job (see
+app/services/job_handlers.py), all created in one transaction.
+
+Throughput is bounded by the job workers: JOB_WORKER_CONCURRENCY threads per
+API process or `python -m app.worker --concurrency N` processes, each
+turn pacing its provider calls through app/services/provider_limits.py.
+
+Each turn is committed as it is generated, so the conversations are the
+checkpoint. resume_experiment re-queues only the cells whose conversation
+is short of its turns and has no active job (failed, cancelled or lost), and
+each continues from its last committed turn. It queues nothing while the
+owner's daily budget is spent, since every cell would stop at once.
+
+Results export one row per message (export_rows) as JSONL, or Parquet when
+pyarrow is installed.
+
+Usage:
+    experiment = create_experiment(
+        db, user.id, "Pricing",
+        topics=["Raise prices?", "Add a free tier?"],
+        persona_sets=[["abc123", "def456"], ["ghi789", "jkl012"]],
+        turns=[5],
+    )
+    db.commit()
+    ...
+    write_jsonl(export_rows(db, experiment), sys.stdout)
+"""
+
+import json
+from itertools import product
+from typing import IO, Any, Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.admission import admission
+from app.config import settings
+from app.models.conversation import Conversation, ConversationParticipant
+from app.models.experiment import Experiment, ExperimentRun
+from app.models.job import ACTIVE_STATUSES, Job
+from app.models.persona import Persona
+from app.services.job_handlers import AUTO_RUN
+from app.services.job_queue import cancel_job, enqueue
+
+EXPORT_FIELDS = (
+    "experiment", "cell_index", "topic", "persona_set", "turns", "conversation",
+    "message_id", "turn_number", "persona_unique_id", "persona_name", "message_text",
+    "moderation_status", "toxicity_score", "reply_to_id", "created_at",
+)
+
+
+def expand_matrix(topics: Sequence[str], n_persona_sets: int, turns: Sequence[int]) -> List[Tuple[str, int, int]]:
+    """(topic, persona set index, turns) for every cell, in a stable order."""
+    return list(product(topics, range(n_persona_sets), turns))
+
+
+def _dedupe_key(conversation_id: int) -> str:
+    # Shared with /continue?background=true and /auto-run: one turn writer per conversation
+    return f"turn:{conversation_id}"
+
+
+def _enqueue_run(db: Session, run: ExperimentRun, user_id: int, start_turn: int) -> Job:
+    return enqueue(
+        db, AUTO_RUN,
+        {"start_turn": start_turn, "until_turn": run.turns, "experiment_id": run.experiment_id},
+        user_id=user_id,
+        conversation_id=run.conversation_id,
+        dedupe_key=_dedupe_key(run.conversation_id),
+    )
+
+
+def create_experiment(
+    db: Session,
+    user_id: int,
+    name: str,
+    topics: Sequence[str],
+    persona_sets: Sequence[Sequence[str]],
+    turns: Sequence[int],
+    is_public: bool = False,
+) -> Experiment:
+    """
+    Create the experiment, one conversation per cell, and queue every cell.
+
+    Persona sets are lists of persona unique_ids (own or public personas).
+    The caller commits.
+
+    Raises:
+        ValueError: The matrix exceeds EXPERIMENT_MAX_CELLS
+        LookupError: Some persona unique_ids were not found
+    """
+    cells = expand_matrix(topics, len(persona_sets), turns)
+    if len(cells) > settings.EXPERIMENT_MAX_CELLS:
+        raise ValueError(f"Experiment has {len(cells)} cells; the limit is {settings.EXPERIMENT_MAX_CELLS}")
+
+    wanted = {pid for persona_set in persona_sets for pid in persona_set}
+    personas = {
+        p.unique_id: p
+        for p in db.query(Persona).filter(
+            Persona.unique_id.in_(wanted),
+            or_(Persona.user_id == user_id, Persona.is_public == True),  # noqa: E712
+        )
+    }
+    missing = sorted(wanted - personas.keys())
+    if missing:
+        raise LookupError(f"Personas not found: {missing}")
+
+    experiment = Experiment(
+        name=name,
+        created_by=user_id,
+        spec={"topics": list(topics), "persona_sets": [list(s) for s in persona_sets], "turns": list(turns)},
+    )
+    db.add(experiment)
+    db.flush()
+
+    for cell_index, (topic, persona_set, n_turns) in enumerate(cells):
+        conversation = Conversation(topic=topic, created_by=user_id, is_public=is_public, max_turns=n_turns)
+        db.add(conversation)
+        db.flush()
+        for pid in persona_sets[persona_set]:
+            db.add(ConversationParticipant(conversation_id=conversation.id, persona_id=personas[pid].id))
+        run = ExperimentRun(
+            experiment_id=experiment.id, cell_index=cell_index, topic=topic,
+            persona_set=persona_set, turns=n_turns, conversation_id=conversation.id,
+        )
+        db.add(run)
+        db.flush()
+        _enqueue_run(db, run, user_id, start_turn=0)
+    return experiment
+
+
+def _active_jobs(db: Session, experiment: Experiment) -> Dict[str, Job]:
+    keys = [_dedupe_key(run.conversation_id) for run in experiment.runs if run.conversation_id]
+    if not keys:
+        return {}
+    return {
+        job.dedupe_key: job
+        for job in db.query(Job).filter(Job.dedupe_key.in_(keys), Job.status.in_(ACTIVE_STATUSES))
+    }
+
+
+def _is_done(run: ExperimentRun) -> bool:
+    return run.conversation is None or run.conversation.turn_count >= run.turns
+
+
+def resume_experiment(db: Session, experiment: Experiment) -> int:
+    """
+    Re-queue unfinished cells that have no active job. Returns how many; the caller commits.
+
+    Raises:
+        AdmissionRejected: The owner's daily budget is spent
+    """
+    if experiment.created_by is not None:
+        admission.check_budget(experiment.created_by, db)
+    active = _active_jobs(db, experiment)
+    resumed = 0
+    for run in experiment.runs:
+        if _is_done(run) or _dedupe_key(run.conversation_id) in active:
+            continue
+        _enqueue_run(db, run, experiment.created_by, start_turn=run.conversation.turn_count)
+        resumed += 1
+    return resumed
+
+
+def cancel_experiment(db: Session, experiment: Experiment) -> int:
+    """Cancel the cells' queued jobs and stop running ones. Returns how many; the caller commits."""
+    jobs = _active_jobs(db, experiment).values()
+    for job in jobs:
+        cancel_job(db, job)
+    return len(jobs)
+
+
+def experiment_progress(db: Session, experiment: Experiment) -> Dict[str, Any]:
+    """
+    Cell counts by state and turn totals.
+
+    States: completed (all turns generated), running / queued (its job's
+    status), stopped (incomplete with no active job; resume to continue).
+    """
+    active = _active_jobs(db, experiment)
+    counts = {"completed": 0, "running": 0, "queued": 0, "stopped": 0}
+    turns_completed = turns_total = 0
+    for run in experiment.runs:
+        turns_total += run.turns
+        turns_completed += min(run.turns, run.conversation.turn_count) if run.conversation else 0
+        if _is_done(run):
+            counts["completed"] += 1
+        elif _dedupe_key(run.conversation_id) in active:
+            counts[active[_dedupe_key(run.conversation_id)].status] += 1
+        else:
+            counts["stopped"] += 1
+    return {
+        "cells": len(experiment.runs),
+        **counts,
+        "turns_completed": turns_completed,
+        "turns_total": turns_total,
+        "is_finished": counts["running"] == counts["queued"] == 0,
+    }
+
+
+def export_rows(db: Session, experiment: Experiment) -> Iterator[Dict[str, Any]]:
+    """One row per message of every cell (EXPORT_FIELDS), in cell then transcript order."""
+    for run in experiment.runs:
+        conversation = run.conversation
+        if conversation is None:
+            continue
+        persona_ids = {p.persona_id: p.persona.unique_id for p in conversation.participants if p.persona}
+        for msg in conversation.transcript_query(db):
+            yield {
+                "experiment": experiment.unique_id,
+                "cell_index": run.cell_index,
+                "topic": run.topic,
+                "persona_set": run.persona_set,
+                "turns": run.turns,
+                "conversation": conversation.unique_id,
+                "message_id": msg.id,
+                "turn_number": msg.turn_number,
+                "persona_unique_id": persona_ids.get(msg.persona_id),
+                "persona_name": msg.persona_name,
+                "message_text": msg.message_text,
+                "moderation_status": msg.moderation_status,
+                "toxicity_score": msg.toxicity_score,
+                "reply_to_id": msg.reply_to_id,
+                "created_at": msg.created_at.isoformat() if msg.created_at else None,
+            }
+
+
+def write_jsonl(rows: Iterator[Dict[str, Any]], fp: IO[str]) -> int:
+    """Write rows as JSON lines. Returns the row count."""
+    count = 0
+    for row in rows:
+        fp.write(json.dumps(row, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def write_parquet(rows: Iterator[Dict[str, Any]], where: Any) -> int:
+    """
+    Write rows as a Parquet table to a path or binary file. Returns the row count.
+
+    Raises:
+        RuntimeError: pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow); use JSONL instead") from e
+
+    rows = list(rows)
+    table = pa.Table.from_pylist(rows) if rows else pa.table({field: [] for field in EXPORT_FIELDS})
+    pq.write_table(table, where)
+    return len(rows)
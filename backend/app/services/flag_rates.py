@@ -0,0 +1,100 @@
+"""
+Persona Flag Rates
+
+Per-persona moderation outcomes for recent generated candidates, kept per
+process. ConversationOrchestrator uses them to decide when to generate
+speculatively: a persona whose recent candidates were often flagged
+(typically an edgy attitude such as Confrontational or Cynical) gets two
+candidates generated concurrently and moderated in one batch, instead of
+a toxic first attempt followed by a serial regeneration.
+
+Usage:
+    if flag_rates.should_speculate(persona.id):
+        ...generate 2 candidates...
+    flag_rates.record(persona.id, flagged=not moderation_service.is_safe(score))
+"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+
+from app.config import settings
+
+
+class FlagRateTracker:
+    """
+    Sliding window of moderation outcomes per persona.
+
+    Args:
+        window: Outcomes kept per persona
+        max_personas: Personas tracked (LRU)
+    """
+
+    def __init__(self, window: int = 20, max_personas: int = 10000) -> None:
+        self.window = window
+        self.max_personas = max_personas
+        self._outcomes: "OrderedDict[int, Deque[bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.speculative_rounds = 0
+        self.speculative_rescues = 0  # A later candidate was safe when the first was not
+        self.speculative_unused = 0  # The first candidate was safe; the others were extra cost
+
+    def record(self, persona_id: Optional[int], flagged: bool) -> None:
+        if persona_id is None:
+            return
+        with self._lock:
+            outcomes = self._outcomes.get(persona_id)
+            if outcomes is None:
+                outcomes = self._outcomes[persona_id] = deque(maxlen=self.window)
+            outcomes.append(flagged)
+            self._outcomes.move_to_end(persona_id)
+            while len(self._outcomes) > self.max_personas:
+                self._outcomes.popitem(last=False)
+
+    def flag_rate(self, persona_id: Optional[int]) -> Optional[float]:
+        """Share of the persona's recent candidates that were flagged; None if unseen."""
+        with self._lock:
+            outcomes = self._outcomes.get(persona_id)
+            if not outcomes:
+                return None
+            return sum(outcomes) / len(outcomes)
+
+    def should_speculate(self, persona_id: Optional[int]) -> bool:
+        threshold = settings.SPECULATIVE_FLAG_RATE_THRESHOLD
+        if threshold <= 0:
+            return False
+        with self._lock:
+            outcomes = self._outcomes.get(persona_id)
+            if not outcomes or len(outcomes) < settings.SPECULATIVE_MIN_SAMPLES:
+                return False
+            return sum(outcomes) / len(outcomes) >= threshold
+
+    def record_speculation(self, first_safe: bool, any_safe: bool) -> None:
+        with self._lock:
+            self.speculative_rounds += 1
+            if first_safe:
+                self.speculative_unused += 1
+            elif any_safe:
+                self.speculative_rescues += 1
+
+    def reset(self) -> None:
+        """Forget every persona and zero the counters."""
+        with self._lock:
+            self._outcomes.clear()
+            self.speculative_rounds = self.speculative_rescues = self.speculative_unused = 0
+
+    def stats(self) -> Dict[str, Any]:
+        threshold = settings.SPECULATIVE_FLAG_RATE_THRESHOLD
+        with self._lock:
+            rates = [sum(o) / len(o) for o in self._outcomes.values() if len(o) >= settings.SPECULATIVE_MIN_SAMPLES]
+            return {
+                "personas": len(self._outcomes),
+                "speculating": sum(1 for r in rates if threshold > 0 and r >= threshold),
+                "threshold": threshold,
+                "speculative_rounds": self.speculative_rounds,
+                "speculative_rescues": self.speculative_rescues,
+                "speculative_unused": self.speculative_unused,
+            }
+
+
+flag_rates = FlagRateTracker(window=settings.SPECULATIVE_FLAG_RATE_WINDOW)
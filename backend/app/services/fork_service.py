@@ -0,0 +1,282 @@
+"""
+Fork Service
+
+Copy-on-write forks for POST /conversations/{id}/fork.
+
+A fork references its source (parent_id, fork_point_turn,
+fork_point_message_id) instead of duplicating the transcript; reads splice
+the parent's rows up to the fork point with the fork's own rows (see
+Conversation.transcript_segments). Fork creation is constant-time and
+storage grows only with new content.
+
+Rows are physically copied only when the chain would exceed
+settings.FORK_MAX_DEPTH (the new fork is materialized, set-based: one
+INSERT ... SELECT plus one UPDATE to remap reply_to_id).
+
+Deleting a conversation with live forks copies nothing: its rows move to
+the fork that shares the most of them and the other forks re-point to that
+one (see detach_forks). Message ids are kept, so every fork's transcript
+stays in id order and since_id polling is unaffected.
+
+Usage:
+    from app.services.fork_service import attach_transcript, copy_participants
+
+    copy_participants(db, source.id, fork.id)
+    attach_transcript(db, source, fork)
+"""
+
+from typing import Iterable
+
+from sqlalchemy import func, insert, inspect, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.conversation import (
+    Conversation,
+    ConversationMessage,
+    ConversationParticipant,
+    transcript_clause,
+)
+from app.services.conversation_state import conversation_state
+
+conversations_table = Conversation.__table__
+messages_table = ConversationMessage.__table__
+participants_table = ConversationParticipant.__table__
+
+# Columns carried over verbatim from the source rows. reply_to_id is copied
+# as-is (still pointing at source rows) and rewritten by _remap_reply_to().
+COPIED_MESSAGE_COLUMNS = (
+    "persona_id",
+    "persona_name",
+    "message_text",
+    "turn_number",
+    "toxicity_score",
+    "moderation_status",
+    "created_at",
+    "reply_to_id",
+)
+
+
+def copy_participants(db: Session, source_conversation_id: int, target_conversation_id: int) -> None:
+    """
+    Copy the participant list of one conversation to another in one statement.
+
+    Persuasion scores are not inherited; the fork starts from the column default.
+    """
+    rows = select(
+        literal(target_conversation_id).label("conversation_id"),
+        participants_table.c.persona_id,
+    ).where(participants_table.c.conversation_id == source_conversation_id)
+
+    db.execute(insert(participants_table).from_select(["conversation_id", "persona_id"], rows))
+
+
+def add_participants(db: Session, conversation_id: int, persona_ids: Iterable[int]) -> None:
+    """Insert participants for the given persona IDs as one executemany batch."""
+    rows = [{"conversation_id": conversation_id, "persona_id": pid} for pid in persona_ids]
+    if rows:
+        db.execute(insert(participants_table), rows)
+
+
+def attach_transcript(db: Session, source: Conversation, fork: Conversation) -> None:
+    """
+    Give a new fork the source's transcript, copy-on-write where possible.
+
+    The fork normally references the source (parent_id + fork point) and
+    copies nothing. Once the chain would exceed settings.FORK_MAX_DEPTH the
+    source's visible transcript is materialized into the fork instead, so
+    read-time chain resolution stays bounded.
+
+    Args:
+        db: SQLAlchemy session (the caller commits)
+        source: Conversation being forked
+        fork: The new, already-flushed fork
+    """
+    fork_point_message_id = source.last_visible_message_id(db)
+    fork.fork_point_turn = source.turn_count
+    if fork_point_message_id is None:
+        return  # Nothing to share
+
+    depth = (source.fork_depth + 1) if source.parent_id is not None else 1
+    if depth > settings.FORK_MAX_DEPTH:
+        copy_transcript(db, source, fork.id)
+        return
+
+    fork.parent_id = source.id
+    fork.fork_point_message_id = fork_point_message_id
+    fork.fork_depth = depth
+
+
+def detach_forks(db: Session, conversation: Conversation) -> None:
+    """
+    Hand a conversation's shared rows to its forks before it is deleted.
+
+    Must run before the conversation is deleted, since its message rows
+    cascade with it. Session deletes do this automatically (see the
+    before_flush listener in app/models/conversation.py); the
+    conversations.parent_id foreign key refuses deletes that bypass the
+    session.
+    """
+    materialize_forks(db, conversation)
+    db.flush()
+
+
+def materialize_forks(db: Session, conversation: Conversation) -> None:
+    """
+    detach_forks without the flush, for use while the session is flushing.
+
+    The fork with the highest fork point (the heir) takes ownership of the
+    conversation's rows up to that point, keeping their ids, and its place
+    in the chain (parent and fork point). The other forks become forks of
+    the heir at their unchanged fork points: the heir's own rows all come
+    after them, so each sees exactly the rows it saw before.
+    """
+    forks = db.scalars(
+        select(Conversation)
+        .where(Conversation.parent_id == conversation.id)
+        .order_by(Conversation.fork_point_message_id.desc(), Conversation.id)
+    ).all()
+    if not forks:
+        return
+    heir, siblings = forks[0], forks[1:]
+
+    db.execute(
+        update(messages_table)
+        .where(
+            messages_table.c.conversation_id == conversation.id,
+            messages_table.c.id <= heir.fork_point_message_id,
+        )
+        .values(conversation_id=heir.id)
+    )
+    _forget_moved_messages(db, conversation, heir)
+
+    # The heir's descendants are one shared ancestor closer to their root
+    frontier = [heir.id]
+    for _ in range(settings.FORK_MAX_DEPTH):
+        descendants = db.scalars(select(Conversation).where(Conversation.parent_id.in_(frontier))).all()
+        if not descendants:
+            break
+        for descendant in descendants:
+            descendant.fork_depth = max(descendant.fork_depth - 1, 1)
+        frontier = [d.id for d in descendants]
+
+    if conversation.parent_id is not None and conversation.fork_point_message_id is not None:
+        heir.parent_id = conversation.parent_id
+        heir.fork_point_message_id = min(heir.fork_point_message_id, conversation.fork_point_message_id)
+        heir.fork_depth = conversation.fork_depth
+    else:
+        heir.parent_id = None
+        heir.fork_point_message_id = None
+        heir.fork_depth = 0
+    for sibling in siblings:
+        sibling.parent_id = heir.id
+
+    # Their chains changed, though every message keeps its id
+    for fork in forks:
+        conversation_state.invalidate(fork.id)
+
+
+def _forget_moved_messages(db: Session, conversation: Conversation, heir: Conversation) -> None:
+    """
+    Keep the session from deleting or misplacing rows moved to the heir.
+
+    A session delete has already cascaded to the conversation's loaded
+    messages, so the moved ones are taken out of the session; the rest are
+    expired along with both messages collections.
+    """
+    for obj in list(db.identity_map.values()):
+        if not isinstance(obj, ConversationMessage):
+            continue
+        loaded = inspect(obj).dict
+        if loaded.get("conversation_id") != conversation.id or loaded.get("id", 0) > heir.fork_point_message_id:
+            continue
+        if obj in db.deleted:
+            db.expunge(obj)
+        else:
+            db.expire(obj)
+    db.expire(conversation, ["messages"])
+    db.expire(heir, ["messages"])
+
+
+def copy_transcript(db: Session, source: Conversation, target_conversation_id: int) -> None:
+    """
+    Copy the messages visible in a conversation's transcript into another conversation.
+
+    Rows are inserted in id order with INSERT ... SELECT, then reply_to_id
+    is remapped from the original ids to the new ids.
+
+    Args:
+        db: SQLAlchemy session (the caller commits)
+        source: Conversation whose transcript (own + shared rows) is copied
+        target_conversation_id: Internal ID of the conversation to copy into
+    """
+    segments = source.transcript_segments(db)
+
+    watermark = db.scalar(
+        select(func.coalesce(func.max(messages_table.c.id), 0))
+        .where(messages_table.c.conversation_id == target_conversation_id)
+    )
+
+    source_rows = (
+        select(
+            literal(target_conversation_id).label("conversation_id"),
+            *[messages_table.c[name] for name in COPIED_MESSAGE_COLUMNS],
+        )
+        .where(transcript_clause(segments))
+        .order_by(messages_table.c.id)
+    )
+    db.execute(
+        insert(messages_table).from_select(
+            ["conversation_id", *COPIED_MESSAGE_COLUMNS], source_rows
+        )
+    )
+
+    _remap_reply_to(db, segments, target_conversation_id, watermark)
+
+
+def _remap_reply_to(
+    db: Session,
+    segments,
+    target_conversation_id: int,
+    watermark: int,
+) -> None:
+    """
+    Point reply_to_id values at the copies instead of the originals.
+
+    Copies were inserted in source id order, so the n-th source row (by id)
+    maps to the n-th new target row above the watermark. The mapping is
+    built with ROW_NUMBER() on both sides and applied in one UPDATE.
+    """
+    src = messages_table.alias("src")
+    dst = messages_table.alias("dst")
+
+    src_ranked = (
+        select(src.c.id.label("old_id"), func.row_number().over(order_by=src.c.id).label("rn"))
+        .where(transcript_clause(segments, src.c))
+        .subquery("src_ranked")
+    )
+    dst_ranked = (
+        select(dst.c.id.label("new_id"), func.row_number().over(order_by=dst.c.id).label("rn"))
+        .where(dst.c.conversation_id == target_conversation_id, dst.c.id > watermark)
+        .subquery("dst_ranked")
+    )
+    id_map = (
+        select(src_ranked.c.old_id, dst_ranked.c.new_id)
+        .join_from(src_ranked, dst_ranked, src_ranked.c.rn == dst_ranked.c.rn)
+        .cte("id_map")
+    )
+
+    new_reply_to = (
+        select(id_map.c.new_id)
+        .where(id_map.c.old_id == messages_table.c.reply_to_id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(messages_table)
+        .where(
+            messages_table.c.conversation_id == target_conversation_id,
+            messages_table.c.reply_to_id.in_(select(id_map.c.old_id)),
+        )
+        .values(reply_to_id=new_reply_to)
+        .add_cte(id_map)
+    )
@@ -11,6 +11,7 @@ not a URL. Call generate_presigned_url() to get a displayable URL.
 import base64
 import logging
 import os
+import time
 import uuid
 from typing import Dict, Any, Optional
 
@@ -18,6 +19,8 @@ import boto3
 from botocore.exceptions import ClientError
 
 from app.config import settings
+from app.services.provider_limits import provider_limits
+from app.services.usage import usage_recorder
 
 logger = logging.getLogger(__name__)
 
@@ -219,6 +222,8 @@ class ImageGenerationService:
         try:
             image_bytes = None
             content_type = "image/jpeg"
+            provider_limits.acquire("openai" if model == "dalle" else "gemini")
+            started = time.perf_counter()
             if model == "dalle":
                 response = self.client.images.generate(
                     model=DALLE_MODEL,
@@ -230,10 +235,18 @@ class ImageGenerationService:
                 )
                 b64_data = response.data[0].b64_json
                 image_bytes = base64.b64decode(b64_data)
+                usage_recorder.record(
+                    "image", "avatar", DALLE_MODEL, images=1,
+                    latency_ms=(time.perf_counter() - started) * 1000,
+                )
             elif model == "nano-banana":
                 result = self._generate_with_banana(prompt)
                 if result:
                     image_bytes, content_type = result
+                    usage_recorder.record(
+                        "image", "avatar", settings.GEMINI_MODEL_ID, images=1,
+                        latency_ms=(time.perf_counter() - started) * 1000,
+                    )
 
             if not image_bytes:
                 logger.warning(f"Image generation failed for model {model}")
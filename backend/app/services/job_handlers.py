@@ -0,0 +1,173 @@
+"""
+Background Job Handlers
+
+The job kinds run by app/services/job_queue.py workers. Importing this
+module registers them; the API process imports it to enqueue (and, with
+JOB_INLINE_WORKER, to run) jobs, and python -m app.worker to run them.
+
+Kinds:
+- build_challenge: generate the personas for a pending challenge
+  conversation and mark it active (failed once retries run out).
+- generate_turn: generate the next turn of a conversation; the result is
+  the same body POST /conversations/{id}/continue returns. payload
+  ["turn_count"] is the turn count at enqueue time, so a retry after the
+  turn was committed returns that turn instead of adding another.
+- auto_run: generate turns until payload["until_turn"] (or max_turns) in one
+  job, reusing the LLM clients and the cached personas and transcript
+  between turns. Each turn is committed as it completes together with progress in
+  job.result, so a retry resumes where the last attempt stopped and a
+  cancel takes effect after the turn in progress.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.admission import AdmissionRejected, admission
+from app.models.conversation import Conversation, ConversationMessage, ConversationParticipant
+from app.models.job import Job
+from app.services.conversation_orchestrator import (
+    ConversationOrchestrator,
+    TurnConflictError,
+    turn_result,
+)
+from app.services.conversation_state import conversation_state
+from app.services.job_queue import PermanentJobError, job_handler
+
+logger = logging.getLogger(__name__)
+
+BUILD_CHALLENGE = "build_challenge"
+GENERATE_TURN = "generate_turn"
+AUTO_RUN = "auto_run"
+
+
+def _conversation(db: Session, job: Job) -> Conversation:
+    conversation = db.get(Conversation, job.conversation_id) if job.conversation_id else None
+    if conversation is None:
+        raise PermanentJobError("Conversation no longer exists")
+    return conversation
+
+
+def _mark_challenge_failed(db: Session, job: Job) -> None:
+    conversation = db.get(Conversation, job.conversation_id) if job.conversation_id else None
+    if conversation is not None and conversation.status == "pending":
+        conversation.status = "failed"
+
+
+@job_handler(BUILD_CHALLENGE, on_failure=_mark_challenge_failed)
+def build_challenge(db: Session, job: Job) -> Optional[Dict[str, Any]]:
+    """Generate personas and attach them to the pending challenge conversation."""
+    from app.services.challenge_service import ChallengeService
+
+    conversation = _conversation(db, job)
+    if conversation.status != "pending":
+        # Built by an earlier attempt whose completion was not recorded
+        return {"participants": len(conversation.participants)}
+
+    personas = ChallengeService().generate_challenge_personas(
+        db=db,
+        user_id=job.user_id,
+        proposal=job.payload["proposal"],
+        challenge_type=job.payload["challenge_type"],
+        n=job.payload["n_personas"],
+    )
+    if not personas:
+        raise RuntimeError("Challenge persona generation returned no personas")
+    for persona in personas:
+        db.add(ConversationParticipant(
+            conversation_id=conversation.id,
+            persona_id=persona.id,
+            persuaded_score=0.1,
+        ))
+    conversation.status = "active"
+    db.commit()
+    return {"participants": len(personas)}
+
+
+@job_handler(GENERATE_TURN)
+def generate_turn(db: Session, job: Job) -> Dict[str, Any]:
+    """Generate the next turn of the job's conversation."""
+    conversation = _conversation(db, job)
+    enqueued_at_turn = job.payload.get("turn_count")
+    if enqueued_at_turn is not None and conversation.turn_count > enqueued_at_turn:
+        # Generated by an earlier attempt whose completion was not recorded
+        last_turn = (
+            conversation.transcript_query(db)
+            .filter(ConversationMessage.turn_number == conversation.turn_count)
+            .all()
+        )
+        return turn_result(conversation, last_turn)
+    state = conversation_state.get(conversation, db)
+    try:
+        new_messages = ConversationOrchestrator().generate_turn(
+            conversation=conversation,
+            personas=state.personas,
+            history=state.history,
+            db=db,
+            history_ids=state.history_ids,
+        )
+    except (ValueError, TurnConflictError) as e:
+        raise PermanentJobError(str(e)) from e
+    conversation_state.advance(conversation, state, new_messages)
+    return turn_result(conversation, new_messages)
+
+
+def _stop_requested(db: Session, job: Job, owner: Optional[str]) -> bool:
+    db.refresh(job, ["cancel_requested", "locked_by"])
+    return job.cancel_requested or job.locked_by != owner
+
+
+@job_handler(AUTO_RUN)
+def auto_run(db: Session, job: Job) -> Dict[str, Any]:
+    """Generate turns until until_turn, stopping early on cancel or budget."""
+    conversation = _conversation(db, job)
+    until_turn = min(job.payload["until_turn"], conversation.max_turns)
+    owner = job.locked_by
+    progress = {
+        "turns_requested": until_turn - job.payload["start_turn"],
+        "turns_completed": conversation.turn_count - job.payload["start_turn"],
+        "turn_number": conversation.turn_count,
+        "is_complete": conversation.is_complete,
+        "stopped": None,
+    }
+    orchestrator = ConversationOrchestrator()
+
+    # Each turn reloads only the conversation row; personas and history come
+    # from the state cache, which the previous turn appended to
+    while conversation.turn_count < until_turn and not conversation.is_complete:
+        if _stop_requested(db, job, owner):
+            progress["stopped"] = "cancelled" if job.cancel_requested else "lease_lost"
+            break
+        if job.user_id is not None:
+            try:
+                admission.check_budget(job.user_id, db)
+            except AdmissionRejected:
+                progress["stopped"] = "budget"
+                break
+        state = conversation_state.get(conversation, db)
+        try:
+            new_messages = orchestrator.generate_turn(
+                conversation=conversation,
+                personas=state.personas,
+                history=state.history,
+                db=db,
+                history_ids=state.history_ids,
+            )
+        except TurnConflictError:
+            # Someone else generated this turn; the next get() reloads their transcript
+            conversation_state.invalidate(conversation.id)
+            continue
+        except ValueError as e:
+            raise PermanentJobError(str(e)) from e
+
+        conversation_state.advance(conversation, state, new_messages)
+        progress.update(
+            turns_completed=conversation.turn_count - job.payload["start_turn"],
+            turn_number=conversation.turn_count,
+            is_complete=conversation.is_complete,
+        )
+        job.result = dict(progress)
+        db.commit()
+        logger.info(f"Auto-run job {job.id}: turn {conversation.turn_count}/{until_turn}")
+    return progress
@@ -0,0 +1,372 @@
+"""
+Background Job Queue
+
+A durable, DB-backed queue (the jobs table) for work that should not run in
+a web request: challenge persona builds and, on request, conversation turns.
+Jobs are enqueued in the caller's transaction, so a job exists if and only
+if the row that needs it (e.g. the pending conversation) was committed.
+
+Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+worker processes can share the table without handing out a job twice. A
+claim holds a lease (JOB_VISIBILITY_TIMEOUT_SECONDS) that a heartbeat thread
+extends while the handler runs; if the worker dies, the lease expires and
+another worker picks the job up. A user's queued jobs are skipped while
+JOB_MAX_RUNNING_PER_USER of their jobs hold live leases, so one user's
+batch (e.g. an experiment's cells) cannot take over the worker pool; two
+workers claiming at the same instant may each let one more through.
+Failures are retried with exponential
+backoff (JOB_RETRY_BACKOFF_SECONDS * 2^(attempt-1)) up to max_attempts;
+PermanentJobError fails a job immediately.
+
+cancel_job ends a queued job at once and asks a running one to stop: the
+handler checks job.cancel_requested between steps and returns what it has
+done, and the job finishes as cancelled instead of succeeded (or retried).
+
+Workers run either as a separate process (python -m app.worker) or, when
+JOB_INLINE_WORKER is set, as threads inside the API process.
+
+Usage:
+    @job_handler("generate_turn")
+    def generate_turn(db, job):
+        ...
+        return {"turn_number": 3}
+
+    job = enqueue(db, "generate_turn", {}, conversation_id=conv.id, dedupe_key=f"turn:{conv.id}")
+    db.commit()
+"""
+
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import ACTIVE_STATUSES, Job
+from app.services.usage import usage_context
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Session, Job], Optional[Dict[str, Any]]]
+FailureHook = Callable[[Session, Job], None]
+
+_handlers: Dict[str, Tuple[Handler, Optional[FailureHook]]] = {}
+
+
+class PermanentJobError(Exception):
+    """A job failure that retrying cannot fix (e.g. the conversation is complete)."""
+
+
+def job_handler(kind: str, on_failure: Optional[FailureHook] = None) -> Callable[[Handler], Handler]:
+    """
+    Register the handler for a job kind.
+
+    The handler gets the worker's session and the claimed job and returns a
+    JSON-serialisable result (or None). on_failure runs once the job has
+    failed for good, e.g. to mark a pending conversation as failed.
+    """
+    def register(fn: Handler) -> Handler:
+        _handlers[kind] = (fn, on_failure)
+        return fn
+    return register
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ============================================================================
+# Producer side
+# ============================================================================
+
+def active_job(db: Session, dedupe_key: str) -> Optional[Job]:
+    return db.query(Job).filter(Job.dedupe_key == dedupe_key, Job.status.in_(ACTIVE_STATUSES)).first()
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    user_id: Optional[int] = None,
+    conversation_id: Optional[int] = None,
+    dedupe_key: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+) -> Job:
+    """
+    Add a job to the caller's transaction; it becomes visible on commit.
+
+    If dedupe_key is given and a job with that key is still queued or
+    running, that job is returned instead of adding another.
+    """
+    if dedupe_key:
+        existing = active_job(db, dedupe_key)
+        if existing is not None:
+            return existing
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=_utcnow(),
+        user_id=user_id,
+        conversation_id=conversation_id,
+    )
+    if not dedupe_key:
+        db.add(job)
+        db.flush()
+        return job
+    try:
+        with db.begin_nested():
+            db.add(job)
+            db.flush()
+    except IntegrityError:
+        # Another request enqueued the same key between our check and insert
+        return active_job(db, dedupe_key)
+    return job
+
+
+def cancel_job(db: Session, job: Job) -> Job:
+    """Cancel a queued job or request that a running one stops (caller commits)."""
+    if job.status == "queued":
+        _finish(job, "cancelled", result=job.result)
+    elif job.status == "running":
+        job.cancel_requested = True
+    return job
+
+
+def queue_stats(db: Session) -> Dict[str, Dict[str, int]]:
+    """Job counts by kind and status."""
+    stats: Dict[str, Dict[str, int]] = {}
+    for kind, job_status, count in db.query(Job.kind, Job.status, func.count(Job.id)).group_by(Job.kind, Job.status):
+        stats.setdefault(kind, {})[job_status] = count
+    return stats
+
+
+# ============================================================================
+# Worker side
+# ============================================================================
+
+def claim_job(db: Session, worker_id: str, visibility_timeout: float) -> Optional[Job]:
+    """
+    Lease the next runnable job to worker_id, or return None.
+
+    Runnable: queued and past run_after, or running with an expired lease,
+    and not owned by a user already at JOB_MAX_RUNNING_PER_USER live leases.
+    Expired jobs that have used all their attempts are failed instead.
+    """
+    while True:
+        now = _utcnow()
+        runnable = or_(
+            and_(Job.status == "queued", Job.run_after <= now),
+            and_(Job.status == "running", Job.locked_until < now),
+        )
+        if settings.JOB_MAX_RUNNING_PER_USER > 0:
+            busy_users = (
+                select(Job.user_id)
+                .where(Job.status == "running", Job.locked_until >= now, Job.user_id.is_not(None))
+                .group_by(Job.user_id)
+                .having(func.count(Job.id) >= settings.JOB_MAX_RUNNING_PER_USER)
+            )
+            runnable = and_(runnable, or_(Job.user_id.is_(None), Job.user_id.not_in(busy_users)))
+        job = db.execute(
+            select(Job)
+            .where(runnable)
+            .order_by(Job.run_after, Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalars().first()
+        if job is None:
+            db.commit()
+            return None
+
+        if job.status == "running":
+            logger.warning(f"Job {job.id} ({job.kind}) lease held by {job.locked_by} expired")
+            if job.cancel_requested:
+                _finish(job, "cancelled", result=job.result)
+                db.commit()
+                continue
+            if job.attempts >= job.max_attempts:
+                _finish(job, "failed", error=f"Worker lease expired on attempt {job.attempts}")
+                db.commit()
+                _run_failure_hook(db, job)
+                continue
+
+        job.status = "running"
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_until = now + timedelta(seconds=visibility_timeout)
+        job.started_at = now
+        db.commit()
+        return job
+
+
+def extend_lease(db: Session, job_id: int, worker_id: str, visibility_timeout: float) -> bool:
+    """Push the lease out again; False if another worker has taken the job over."""
+    updated = db.query(Job).filter(Job.id == job_id, Job.locked_by == worker_id).update(
+        {Job.locked_until: _utcnow() + timedelta(seconds=visibility_timeout)}, synchronize_session=False,
+    )
+    db.commit()
+    return bool(updated)
+
+
+def _finish(job: Job, job_status: str, result: Any = None, error: Optional[str] = None) -> None:
+    job.status = job_status
+    job.result = result
+    job.error = error
+    job.locked_by = None
+    job.locked_until = None
+    job.finished_at = _utcnow()
+
+
+def _run_failure_hook(db: Session, job: Job) -> None:
+    _, on_failure = _handlers.get(job.kind, (None, None))
+    if on_failure is None:
+        return
+    try:
+        on_failure(db, job)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Failure hook for job {job.id} ({job.kind}) raised: {e}")
+        db.rollback()
+
+
+class _Heartbeat:
+    """Extends a job's lease every third of the visibility timeout until stopped."""
+
+    def __init__(self, session_factory: Callable[[], Session], job_id: int, worker_id: str, visibility_timeout: float):
+        self._stop = threading.Event()
+        self._args = (job_id, worker_id, visibility_timeout)
+        self._session_factory = session_factory
+        self._interval = visibility_timeout / 3
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_id}", daemon=True)
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                with self._session_factory() as db:
+                    if not extend_lease(db, *self._args):
+                        return
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {self._args[0]} failed: {e}")
+
+
+class JobWorker:
+    """
+    Claims and runs jobs until stopped.
+
+    Args:
+        session_factory: Creates the session each job runs in
+        worker_id: Lease owner name (defaults to host:pid:thread)
+        poll_interval: Seconds to sleep when the queue is empty
+        visibility_timeout: Lease length in seconds
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        worker_id: Optional[str] = None,
+        poll_interval: Optional[float] = None,
+        visibility_timeout: Optional[float] = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.poll_interval = settings.JOB_POLL_INTERVAL_SECONDS if poll_interval is None else poll_interval
+        self.visibility_timeout = visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT_SECONDS
+
+    def run_once(self) -> bool:
+        """Run one job if any is runnable. Returns whether a job was run."""
+        with self.session_factory() as db:
+            job = claim_job(db, self.worker_id, self.visibility_timeout)
+            if job is None:
+                return False
+            handler, _ = _handlers.get(job.kind, (None, None))
+            logger.info(f"Running job {job.id} ({job.kind}), attempt {job.attempts}/{job.max_attempts}")
+            with _Heartbeat(self.session_factory, job.id, self.worker_id, self.visibility_timeout):
+                try:
+                    if handler is None:
+                        raise PermanentJobError(f"No handler registered for job kind '{job.kind}'")
+                    with usage_context(user_id=job.user_id, conversation_id=job.conversation_id):
+                        result = handler(db, job)
+                except Exception as e:
+                    db.rollback()
+                    self._fail(db, job, e)
+                else:
+                    self._complete(db, job, result)
+            return True
+
+    def run(self, stop: threading.Event) -> None:
+        """Work until stop is set; the job in progress is finished first."""
+        while not stop.is_set():
+            try:
+                worked = self.run_once()
+            except Exception as e:
+                logger.error(f"Job worker {self.worker_id} error: {e}")
+                worked = False
+            if not worked:
+                stop.wait(self.poll_interval)
+
+    def _owns(self, db: Session, job: Job) -> bool:
+        db.refresh(job)
+        if job.locked_by != self.worker_id:
+            logger.warning(f"Job {job.id} lease was lost to {job.locked_by}; discarding outcome")
+            db.rollback()
+            return False
+        return True
+
+    def _complete(self, db: Session, job: Job, result: Optional[Dict[str, Any]]) -> None:
+        if self._owns(db, job):
+            _finish(job, "cancelled" if job.cancel_requested else "succeeded", result=result)
+            db.commit()
+            logger.info(f"Job {job.id} ({job.kind}) {job.status}")
+
+    def _fail(self, db: Session, job: Job, error: Exception) -> None:
+        if not self._owns(db, job):
+            return
+        message = f"{type(error).__name__}: {error}"
+        if job.cancel_requested:
+            _finish(job, "cancelled", result=job.result, error=message)
+            db.commit()
+            return
+        if isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts:
+            _finish(job, "failed", error=message)
+            db.commit()
+            logger.error(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempt(s): {message}")
+            _run_failure_hook(db, job)
+            return
+        delay = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        job.status = "queued"
+        job.error = message
+        job.locked_by = None
+        job.locked_until = None
+        job.run_after = _utcnow() + timedelta(seconds=delay)
+        db.commit()
+        logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, retrying in {delay:.0f}s: {message}")
+
+
+def start_workers(concurrency: int, stop: threading.Event, **worker_kwargs: Any) -> List[threading.Thread]:
+    """Start `concurrency` daemon worker threads that run until stop is set."""
+    threads = []
+    for i in range(concurrency):
+        thread = threading.Thread(
+            target=lambda: JobWorker(**worker_kwargs).run(stop), name=f"job-worker-{i}", daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    return threads
@@ -18,10 +18,14 @@ Usage:
     response = service.generate_response(persona_details, history, topic)
 """
 
+import time
 from typing import Dict, List, Any, Optional
 
 from app.config import settings
+from app.services.prompt_engine import history_token_budget
 from app.services.prompt_templates import MottoPromptTemplate, ConversationPromptTemplate
+from app.services.provider_limits import provider_limits
+from app.services.usage import usage_recorder
 
 # Use a capable but cost-effective model for generation tasks
 DEFAULT_MODEL = "claude-haiku-4-5-20251001"
@@ -89,12 +93,15 @@ class LLMService:
             attitude=persona_details.get("attitude", "Neutral"),
         )
 
+        provider_limits.acquire("anthropic")
+        started = time.perf_counter()
         message = self.client.messages.create(
             model=self.model,
             max_tokens=128,
             system=MOTTO_SYSTEM_PROMPT,
             messages=[{"role": "user", "content": user_message}],
         )
+        usage_recorder.record_response("llm", "motto", self.model, message, started)
 
         raw = message.content[0].text.strip()
         # Strip surrounding quotation marks if Claude added them
@@ -127,13 +134,18 @@ class LLMService:
             topic=topic,
             history=conversation_history,
             description=persona_details.get("description", ""),
+            persona_block=persona_details.get("prompt_block"),
+            token_budget=history_token_budget(self.model),
         )
 
+        provider_limits.acquire("anthropic")
+        started = time.perf_counter()
         message = self.client.messages.create(
             model=self.model,
             max_tokens=512,
             system=CONVERSATION_SYSTEM_PROMPT,
             messages=[{"role": "user", "content": user_message}],
         )
+        usage_recorder.record_response("llm", "conversation_turn", self.model, message, started)
 
         return message.content[0].text.strip()
@@ -0,0 +1,190 @@
+"""
+OCEAN Inference Cache
+
+Skips the Claude round trip in OceanInferenceService.infer_ocean_traits for
+descriptions that have been scored before. This is common: persona creation
+without a description falls back to "A person named {name}".
+
+Entries are keyed by sha256(model, PROMPT_VERSION, normalised description), so
+changing the model or bumping PROMPT_VERSION naturally misses. Lookups hit an
+in-process LRU first and then the ocean_inference_cache table, which is shared
+by all instances and survives restarts. Cache failures are logged and treated
+as misses; they never fail an inference.
+
+The table can be warmed from existing personas (POST /admin/ocean-cache/warm).
+Persona scores are assumed to come from the current model and prompt;
+challenge personas and neutral fallback rows, which did not, are skipped.
+
+Usage:
+    from app.services.ocean_cache import get_ocean_cache
+
+    service = OceanInferenceService(cache=get_ocean_cache())
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import and_, not_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.conversation import Conversation, ConversationParticipant
+from app.models.ocean_cache import OceanInferenceCacheEntry
+from app.models.persona import Persona
+from app.services.ocean_inference import DEFAULT_MODEL, OCEAN_KEYS, PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_description(description: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of a description."""
+    return " ".join((description or "").split()).casefold()
+
+
+def cache_key(model: str, description: Optional[str], prompt_version: int = PROMPT_VERSION) -> str:
+    raw = f"{model}\x00{prompt_version}\x00{normalize_description(description)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class OceanCache:
+    """
+    Two-level OCEAN score cache: in-memory LRU in front of the DB table.
+
+    Args:
+        session_factory: Creates the (short-lived) sessions used for the DB level
+        max_entries: LRU capacity
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, max_entries: int = 1024) -> None:
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, scores: Dict[str, float]) -> None:
+        with self._lock:
+            self._entries[key] = scores
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, model: str, description: Optional[str]) -> Optional[Dict[str, float]]:
+        """Cached scores, or None on a miss."""
+        key = cache_key(model, description)
+        with self._lock:
+            scores = self._entries.get(key)
+            if scores is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(scores)
+
+        try:
+            with self.session_factory() as db:
+                entry = db.scalar(select(OceanInferenceCacheEntry).where(OceanInferenceCacheEntry.cache_key == key))
+                scores = entry.get_scores() if entry else None
+        except Exception as e:
+            logger.warning(f"OCEAN cache lookup failed: {e}")
+            scores = None
+
+        with self._lock:
+            if scores is None:
+                self.misses += 1
+                return None
+            self.db_hits += 1
+        self._remember(key, scores)
+        return dict(scores)
+
+    def put(self, model: str, description: Optional[str], scores: Dict[str, float]) -> None:
+        key = cache_key(model, description)
+        scores = {k: float(scores[k]) for k in OCEAN_KEYS}
+        self._remember(key, scores)
+        try:
+            with self.session_factory() as db:
+                db.add(OceanInferenceCacheEntry(
+                    cache_key=key, model=model, prompt_version=PROMPT_VERSION, scores=scores,
+                ))
+                db.commit()
+        except IntegrityError:
+            pass  # Another request cached the same input first
+        except Exception as e:
+            logger.warning(f"OCEAN cache write failed: {e}")
+
+    def warm_from_personas(self, db: Session, model: str = DEFAULT_MODEL, batch_size: int = 500) -> int:
+        """
+        Insert cache rows for existing personas' descriptions (DB level only).
+
+        Only personas scored by infer_ocean_traits are used: challenge
+        personas (scored by the brainstorm call) and rows holding the
+        neutral all-0.5 fallback are skipped. Personas without a description
+        are keyed by the router's default "A person named {name}". Pages
+        through the table newest first, so the newest scores win for a
+        repeated description. Returns the number of rows added.
+        """
+        challenge_personas = (
+            select(ConversationParticipant.persona_id)
+            .join(Conversation, Conversation.id == ConversationParticipant.conversation_id)
+            .where(Conversation.is_challenge.is_(True))
+        )
+        traits = sorted(OCEAN_KEYS)
+        neutral_fallback = and_(*(getattr(Persona, f"ocean_{k}") == 0.5 for k in traits))
+        query = (
+            select(Persona.id, Persona.name, Persona.description, *(getattr(Persona, f"ocean_{k}") for k in traits))
+            .where(Persona.id.not_in(challenge_personas), not_(neutral_fallback))
+            .order_by(Persona.id.desc())
+            .limit(batch_size)
+        )
+
+        added = 0
+        last_id = None
+        while True:
+            page = db.execute(query if last_id is None else query.where(Persona.id < last_id)).all()
+            if not page:
+                return added
+            last_id = page[-1].id
+
+            entries = {}
+            for _, name, description, *scores in page:
+                key = cache_key(model, description or f"A person named {name}")
+                entries.setdefault(key, dict(zip(traits, scores)))
+            existing = set(db.scalars(
+                select(OceanInferenceCacheEntry.cache_key).where(OceanInferenceCacheEntry.cache_key.in_(entries))
+            ))
+            for key, scores in entries.items():
+                if key not in existing:
+                    db.add(OceanInferenceCacheEntry(
+                        cache_key=key, model=model, prompt_version=PROMPT_VERSION, scores=scores,
+                    ))
+                    added += 1
+            db.commit()
+
+    def clear(self) -> None:
+        """Drop the in-memory level (the table is left alone)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.db_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.db_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+ocean_cache = OceanCache(max_entries=settings.OCEAN_CACHE_SIZE)
+
+
+def get_ocean_cache() -> Optional[OceanCache]:
+    """The process-wide cache, or None when OCEAN_CACHE_ENABLED is off."""
+    return ocean_cache if settings.OCEAN_CACHE_ENABLED else None
@@ -4,7 +4,9 @@ OCEAN Inference Service - Phase 3B
 Uses Claude API to infer OCEAN personality trait scores from a persona description.
 
 The service sends the description to Claude with a structured prompt that asks
-for all five OCEAN dimensions scored between 0.0 and 1.0, returned as JSON.
+for all five OCEAN dimensions scored between 0.0 and 1.0. The scores come back
+as the input of a forced tool call (app/services/structured_output.py), are
+validated, and an invalid answer gets one repair request.
 
 TDD Status:
 - Tests written first in: tests/unit/test_ocean_inference_service.py
@@ -16,34 +18,146 @@ Usage:
     service = OceanInferenceService()  # Uses ANTHROPIC_API_KEY from env
     scores = service.infer_ocean_traits("A meticulous planner who loves data")
     # Returns: {"openness": 0.6, "conscientiousness": 0.9, ...}
+
+    # Reuse scores for previously seen descriptions (app/services/ocean_cache.py)
+    service = OceanInferenceService(cache=get_ocean_cache())
+
+    # Several descriptions in one Claude call (aligned with the input order)
+    scores_list = service.infer_ocean_traits_batch(["A stoic farmer", "An anxious poet"])
 """
 
-import json
-import re
-from typing import Optional, Dict
+import logging
+from typing import Any, Dict, List, Optional
 
 from app.config import settings
+from app.services.structured_output import call_with_tool, extract_json
+from app.services.usage import usage_recorder
 
 # Default model for OCEAN inference - Haiku is fast and cheap for structured extraction
 DEFAULT_MODEL = "claude-haiku-4-5-20251001"
 
 OCEAN_KEYS = {"openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism"}
 
-INFERENCE_SYSTEM_PROMPT = """You are a psychologist specializing in the Big Five (OCEAN) personality model.
-Given a description of a person, infer their personality trait scores on all five OCEAN dimensions.
+# Bump when INFERENCE_SYSTEM_PROMPT or build_inference_prompt changes meaning;
+# part of the OCEAN cache key, so old cached scores stop matching
+PROMPT_VERSION = 1
+
+logger = logging.getLogger(__name__)
 
-Score each dimension from 0.0 (extremely low) to 1.0 (extremely high):
+_TRAIT_GUIDE = """Score each dimension from 0.0 (extremely low) to 1.0 (extremely high):
 - openness: Curiosity, creativity, preference for novelty and variety
 - conscientiousness: Organization, dependability, self-discipline, goal-directed behavior
 - extraversion: Sociability, assertiveness, positive emotionality, energy from social interaction
 - agreeableness: Cooperation, trust, empathy, concern for others' well-being
-- neuroticism: Emotional instability, anxiety, moodiness, tendency toward negative emotions
+- neuroticism: Emotional instability, anxiety, moodiness, tendency toward negative emotions"""
+
+INFERENCE_SYSTEM_PROMPT = f"""You are a psychologist specializing in the Big Five (OCEAN) personality model.
+Given a description of a person, infer their personality trait scores on all five OCEAN dimensions.
+
+{_TRAIT_GUIDE}
 
 Respond ONLY with a JSON object containing exactly these five keys with float values between 0.0 and 1.0.
 Do not include any explanation or commentary - only the JSON object.
 
 Example response format:
-{"openness": 0.7, "conscientiousness": 0.8, "extraversion": 0.4, "agreeableness": 0.6, "neuroticism": 0.3}"""
+{{"openness": 0.7, "conscientiousness": 0.8, "extraversion": 0.4, "agreeableness": 0.6, "neuroticism": 0.3}}"""
+
+BATCH_INFERENCE_SYSTEM_PROMPT = f"""You are a psychologist specializing in the Big Five (OCEAN) personality model.
+Given a numbered list of person descriptions, infer each person's personality trait scores on all five OCEAN dimensions.
+
+{_TRAIT_GUIDE}
+
+Respond ONLY with a JSON array containing one object per description, in the same order as the list.
+Each object must contain exactly these five keys with float values between 0.0 and 1.0.
+Do not include any explanation or commentary - only the JSON array.
+
+Example response format for two descriptions:
+[{{"openness": 0.7, "conscientiousness": 0.8, "extraversion": 0.4, "agreeableness": 0.6, "neuroticism": 0.3}},
+ {{"openness": 0.3, "conscientiousness": 0.5, "extraversion": 0.9, "agreeableness": 0.4, "neuroticism": 0.6}}]"""
+
+EMPTY_DESCRIPTION = "No description provided. Use neutral/average scores."
+
+OCEAN_SCORES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        key: {"type": "number", "minimum": 0.0, "maximum": 1.0}
+        for key in ("openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism")
+    },
+    "required": ["openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism"],
+    "additionalProperties": False,
+}
+
+OCEAN_TOOL = {
+    "name": "record_ocean_scores",
+    "description": "Record the inferred Big Five (OCEAN) scores for the described person.",
+    "input_schema": OCEAN_SCORES_SCHEMA,
+}
+
+OCEAN_BATCH_TOOL = {
+    "name": "record_ocean_scores_batch",
+    "description": "Record the inferred Big Five (OCEAN) scores for each description, in list order.",
+    "input_schema": {
+        "type": "object",
+        "properties": {"scores": {"type": "array", "items": OCEAN_SCORES_SCHEMA}},
+        "required": ["scores"],
+    },
+}
+
+
+def validate_ocean_scores(data: Any) -> Dict[str, float]:
+    """
+    Validate one parsed OCEAN score object.
+
+    Shared by single and batch response parsing, and by callers that get
+    scores from another prompt (e.g. fused challenge persona generation).
+
+    Raises:
+        ValueError: If data is not an object or a value is not numeric
+        KeyError: If a required key is missing
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"OCEAN scores must be a JSON object, got {type(data).__name__}")
+
+    # Validate all required keys are present
+    missing = OCEAN_KEYS - set(data.keys())
+    if missing:
+        raise KeyError(f"OCEAN response missing required keys: {missing}")
+
+    # Convert to floats and clamp to [0.0, 1.0]
+    result = {}
+    for key in OCEAN_KEYS:
+        try:
+            val = float(data[key])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid value for {key}: {data[key]!r}") from e
+        result[key] = max(0.0, min(1.0, val))
+
+    return result
+
+
+def validate_ocean_batch(data: Any, expected: int) -> List[Optional[Dict[str, float]]]:
+    """
+    Validate a batch answer ({"scores": [...]} tool input, or a bare array).
+
+    An invalid item becomes None so the caller can retry just that one.
+
+    Raises:
+        ValueError: If there is no array of `expected` items (items could not
+            be matched to descriptions)
+    """
+    if isinstance(data, dict):
+        data = data.get("scores")
+    if not isinstance(data, list) or len(data) != expected:
+        raise ValueError(f"Expected an array of {expected} OCEAN objects")
+
+    results: List[Optional[Dict[str, float]]] = []
+    for i, item in enumerate(data):
+        try:
+            results.append(validate_ocean_scores(item))
+        except (KeyError, ValueError) as e:
+            logger.warning(f"Invalid OCEAN scores for batch item {i + 1}: {e}")
+            results.append(None)
+    return results
 
 
 class OceanInferenceService:
@@ -59,9 +173,10 @@ class OceanInferenceService:
     Args:
         client: Anthropic client instance. If None, creates one from env vars.
         model: Claude model ID to use for inference.
+        cache: Optional OceanCache consulted before calling Claude.
     """
 
-    def __init__(self, client=None, model: str = DEFAULT_MODEL):
+    def __init__(self, client=None, model: str = DEFAULT_MODEL, cache=None):
         if client is not None:
             self.client = client
         else:
@@ -70,6 +185,7 @@ class OceanInferenceService:
             self.client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
 
         self.model = model
+        self.cache = cache
 
     def build_inference_prompt(self, description: str) -> str:
         """
@@ -85,7 +201,7 @@ class OceanInferenceService:
             str: Formatted user message for Claude
         """
         if not description:
-            description = "No description provided. Use neutral/average scores."
+            description = EMPTY_DESCRIPTION
 
         return (
             f"Please analyze the following persona description and provide OCEAN personality scores "
@@ -114,45 +230,20 @@ class OceanInferenceService:
         Raises:
             ValueError: If response cannot be parsed or is missing required keys
         """
-        # Strip markdown code blocks if present
-        cleaned = response_text.strip()
-        # Match ```json ... ``` or ``` ... ```
-        code_block_match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", cleaned, re.DOTALL)
-        if code_block_match:
-            cleaned = code_block_match.group(1)
-        else:
-            # Find first JSON object in the response
-            json_match = re.search(r"\{.*\}", cleaned, re.DOTALL)
-            if json_match:
-                cleaned = json_match.group(0)
-
         try:
-            data = json.loads(cleaned)
-        except json.JSONDecodeError as e:
+            data = extract_json(response_text)
+        except ValueError as e:
             raise ValueError(f"Could not parse OCEAN response as JSON: {e}\nResponse: {response_text!r}")
 
-        # Validate all required keys are present
-        missing = OCEAN_KEYS - set(data.keys())
-        if missing:
-            raise KeyError(f"OCEAN response missing required keys: {missing}")
-
-        # Convert to floats and clamp to [0.0, 1.0]
-        result = {}
-        for key in OCEAN_KEYS:
-            try:
-                val = float(data[key])
-            except (TypeError, ValueError) as e:
-                raise ValueError(f"Invalid value for {key}: {data[key]!r}") from e
-            result[key] = max(0.0, min(1.0, val))
-
-        return result
+        return validate_ocean_scores(data)
 
     def infer_ocean_traits(self, description: str) -> Dict[str, float]:
         """
         Infer OCEAN personality scores from a persona description.
 
-        Makes a synchronous call to the Claude API. For production use in
-        async FastAPI endpoints, run in a thread pool executor.
+        Makes a synchronous call to the Claude API (skipped on a cache hit
+        when the service has a cache). For production use in async FastAPI
+        endpoints, run in a thread pool executor.
 
         Args:
             description: Persona backstory or description text
@@ -164,12 +255,20 @@ class OceanInferenceService:
 
         Raises:
             Exception: Re-raises any API errors from Anthropic client
-            ValueError: If response cannot be parsed into valid OCEAN scores
+            ValueError: If neither the response nor its repair holds valid
+                OCEAN scores (StructuredOutputError)
         """
+        if self.cache is not None:
+            cached = self.cache.get(self.model, description)
+            if cached is not None:
+                usage_recorder.record("ocean_inference", "ocean_inference", self.model, cache_hit=True)
+                return cached
+
         user_message = self.build_inference_prompt(description)
 
-        # Call the Anthropic Messages API
-        message = self.client.messages.create(
+        # Call the Anthropic Messages API, forcing the record_ocean_scores tool
+        scores = call_with_tool(
+            self.client, "ocean_inference", OCEAN_TOOL, validate_ocean_scores, service="ocean_inference",
             model=self.model,
             max_tokens=256,
             system=INFERENCE_SYSTEM_PROMPT,
@@ -177,8 +276,98 @@ class OceanInferenceService:
                 {"role": "user", "content": user_message}
             ],
         )
+        if self.cache is not None:
+            self.cache.put(self.model, description, scores)
+        return scores
+
+    def build_batch_inference_prompt(self, descriptions: List[str]) -> str:
+        """
+        Build the user message for batched OCEAN inference.
+
+        Args:
+            descriptions: Persona descriptions, numbered in the prompt from 1
+
+        Returns:
+            str: Formatted user message for Claude
+        """
+        numbered = "\n\n".join(
+            f'{i}. "{description or EMPTY_DESCRIPTION}"'
+            for i, description in enumerate(descriptions, 1)
+        )
+        return (
+            f"Please analyze the following {len(descriptions)} persona descriptions and provide OCEAN "
+            f"personality scores for each, from 0.0 to 1.0:\n\n"
+            f"{numbered}\n\n"
+            f"Respond with only a JSON array of {len(descriptions)} objects, in the same order, each containing: "
+            f"openness, conscientiousness, extraversion, agreeableness, neuroticism"
+        )
 
-        # Extract text from response
-        response_text = message.content[0].text
+    def parse_ocean_batch_response(self, response_text: str, expected: int) -> List[Optional[Dict[str, float]]]:
+        """
+        Parse a batched text response into one scores dict (or None) per description.
 
-        return self.parse_ocean_response(response_text)
+        Each item is validated with the same rules as parse_ocean_response; an
+        invalid item becomes None so the caller can retry just that one.
+
+        Raises:
+            ValueError: If no JSON array can be parsed, or it has the wrong
+                length (items could not be matched to descriptions)
+        """
+        try:
+            return validate_ocean_batch(extract_json(response_text), expected)
+        except ValueError as e:
+            raise ValueError(f"Could not parse batch OCEAN response: {e}\nResponse: {response_text!r}")
+
+    def infer_ocean_traits_batch(self, descriptions: List[str]) -> List[Optional[Dict[str, float]]]:
+        """
+        Infer OCEAN scores for several descriptions with a single Claude call.
+
+        Cached descriptions are answered from the cache and duplicates are sent
+        once. If the batched call fails or an item is invalid, the affected
+        descriptions fall back to individual infer_ocean_traits calls.
+
+        Args:
+            descriptions: Persona descriptions
+
+        Returns:
+            list: Scores dicts aligned with descriptions; None where even the
+                individual fallback call failed
+        """
+        results: List[Optional[Dict[str, float]]] = [None] * len(descriptions)
+        pending: Dict[str, List[int]] = {}
+        for i, description in enumerate(descriptions):
+            cached = self.cache.get(self.model, description) if self.cache is not None else None
+            if cached is not None:
+                usage_recorder.record("ocean_inference", "ocean_inference_batch", self.model, cache_hit=True)
+                results[i] = cached
+            else:
+                pending.setdefault(description, []).append(i)
+
+        unique = list(pending)
+        parsed: List[Optional[Dict[str, float]]] = [None] * len(unique)
+        if len(unique) > 1:
+            try:
+                parsed = call_with_tool(
+                    self.client, "ocean_inference_batch", OCEAN_BATCH_TOOL,
+                    lambda data: validate_ocean_batch(data, len(unique)), service="ocean_inference",
+                    model=self.model,
+                    max_tokens=256 * len(unique),
+                    system=BATCH_INFERENCE_SYSTEM_PROMPT,
+                    messages=[
+                        {"role": "user", "content": self.build_batch_inference_prompt(unique)}
+                    ],
+                )
+            except Exception as e:
+                logger.warning(f"Batched OCEAN inference failed, falling back to individual calls: {e}")
+
+        for description, scores in zip(unique, parsed):
+            if scores is None:
+                try:
+                    scores = self.infer_ocean_traits(description)
+                except Exception as e:
+                    logger.warning(f"OCEAN inference failed for batch item: {e}")
+            elif self.cache is not None:
+                self.cache.put(self.model, description, scores)
+            for i in pending[description]:
+                results[i] = dict(scores) if scores is not None else None
+        return results
@@ -0,0 +1,258 @@
+"""
+Persona Search
+
+Ranked search over public personas for GET /personas/public?q=...
+
+PostgreSQL: a weighted tsvector over name (A), motto (B) and description (C)
+backed by a GIN expression index (ix_personas_search), plus pg_trgm fuzzy
+matching on name (ix_personas_name_trgm). A persona matches if every query
+term is in its document (the last term as a prefix, so search-as-you-type
+works) or its name is trigram-similar to the query. Results are ordered by
+ts_rank_cd + similarity, then id, so latency follows the number of matches
+rather than the size of the personas table.
+
+SQLite (tests / local dev): SearchIndex, a pure-Python inverted index with
+the same matching and scoring shape (no stemming or stop words). It is built
+once per engine and rebuilt only when the public persona set changes.
+
+Pagination is keyset-based: the cursor encodes the (score, id) of the last
+row returned, so later pages cost the same as the first.
+
+Usage:
+    from app.services.persona_search import search_public_personas
+
+    personas, next_cursor = await search_public_personas(db, "stoic", exclude_user_id=user.id)
+"""
+
+import base64
+import binascii
+import bisect
+import json
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Float, cast, func, literal, literal_column, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.persona import SEARCH_DOCUMENT_SQL, Persona
+
+# pg_trgm's default similarity_threshold (the `%` operator)
+TRIGRAM_THRESHOLD = 0.3
+
+# ts_rank_cd default weights for the A/B/C document sections
+FIELD_WEIGHTS = {"name": 1.0, "motto": 0.4, "description": 0.2}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens."""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def trigrams(text: Optional[str]) -> Set[str]:
+    """pg_trgm-style trigrams: each word padded with two leading and one trailing space."""
+    grams: Set[str] = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def encode_cursor(score: float, persona_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([score, persona_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """Inverse of encode_cursor. Raises ValueError for a malformed cursor."""
+    try:
+        score, persona_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(persona_id)
+    except (binascii.Error, TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class SearchIndex:
+    """In-memory inverted index approximating the PostgreSQL search."""
+
+    def __init__(self) -> None:
+        self._owners: Dict[int, int] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._trigram_postings: Dict[str, Set[int]] = {}
+        self._name_trigram_counts: Dict[int, int] = {}
+        self._vocabulary: Optional[List[str]] = None
+
+    def add(self, persona_id: int, user_id: int, name: str,
+            motto: Optional[str] = None, description: Optional[str] = None) -> None:
+        self._owners[persona_id] = user_id
+        for field, text in (("name", name), ("motto", motto), ("description", description)):
+            for token in set(tokenize(text)):
+                postings = self._postings.setdefault(token, {})
+                postings[persona_id] = max(postings.get(persona_id, 0.0), FIELD_WEIGHTS[field])
+        grams = trigrams(name)
+        self._name_trigram_counts[persona_id] = len(grams)
+        for gram in grams:
+            self._trigram_postings.setdefault(gram, set()).add(persona_id)
+        self._vocabulary = None
+
+    def _term_weights(self, token: str, prefix: bool) -> Dict[int, float]:
+        if not prefix:
+            return self._postings.get(token, {})
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        weights: Dict[int, float] = {}
+        for term in self._vocabulary[bisect.bisect_left(self._vocabulary, token):]:
+            if not term.startswith(token):
+                break
+            for persona_id, weight in self._postings[term].items():
+                weights[persona_id] = max(weights.get(persona_id, 0.0), weight)
+        return weights
+
+    def search(self, query: str, exclude_user_id: Optional[int] = None) -> List[Tuple[float, int]]:
+        """(score, persona_id) for every match, best first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        # Full text: every term must match, the last one as a prefix
+        text_scores: Optional[Dict[int, float]] = None
+        for i, token in enumerate(tokens):
+            weights = self._term_weights(token, prefix=i == len(tokens) - 1)
+            if text_scores is None:
+                text_scores = dict(weights)
+            else:
+                text_scores = {pid: score + weights[pid] for pid, score in text_scores.items() if pid in weights}
+
+        # Fuzzy name: Jaccard similarity over trigrams
+        query_grams = trigrams(query)
+        overlap = Counter()
+        for gram in query_grams:
+            overlap.update(self._trigram_postings.get(gram, ()))
+        similarity = {
+            pid: shared / (len(query_grams) + self._name_trigram_counts[pid] - shared)
+            for pid, shared in overlap.items()
+        }
+
+        results = []
+        for pid in set(text_scores) | set(similarity):
+            if exclude_user_id is not None and self._owners[pid] == exclude_user_id:
+                continue
+            if pid not in text_scores and similarity[pid] < TRIGRAM_THRESHOLD:
+                continue
+            results.append((text_scores.get(pid, 0.0) + similarity.get(pid, 0.0), pid))
+        results.sort(reverse=True)
+        return results
+
+
+# engine -> (public persona stamp, index); rebuilt when the stamp changes
+_fallback_indexes: "WeakKeyDictionary" = WeakKeyDictionary()
+
+
+async def _fallback_index(db: AsyncSession) -> SearchIndex:
+    public = Persona.is_public == True
+    # Inserts move max(id), deletes / visibility changes move count, edits move max(updated_at)
+    stamp = tuple((await db.execute(
+        select(func.count(Persona.id), func.max(Persona.id), func.max(Persona.updated_at)).where(public)
+    )).one())
+    engine = db.bind.sync_engine
+    cached = _fallback_indexes.get(engine)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    index = SearchIndex()
+    rows = await db.execute(
+        select(Persona.id, Persona.user_id, Persona.name, Persona.motto, Persona.description).where(public)
+    )
+    for row in rows:
+        index.add(*row)
+    _fallback_indexes[engine] = (stamp, index)
+    return index
+
+
+async def _search_fallback(
+    db: AsyncSession, query: str, exclude_user_id: Optional[int],
+    limit: int, after: Optional[Tuple[float, int]],
+) -> List[Tuple[Persona, float]]:
+    index = await _fallback_index(db)
+    ranked = index.search(query, exclude_user_id)
+    if after is not None:
+        ranked = [hit for hit in ranked if hit < after]
+    ranked = ranked[:limit]
+    if not ranked:
+        return []
+    personas = {
+        p.id: p for p in await db.scalars(select(Persona).where(Persona.id.in_([pid for _, pid in ranked])))
+    }
+    return [(personas[pid], score) for score, pid in ranked if pid in personas]
+
+
+def postgres_search_statement(
+    query: str, exclude_user_id: Optional[int] = None,
+    limit: int = 20, after: Optional[Tuple[float, int]] = None,
+):
+    """SELECT (Persona, score) for a non-empty query (PostgreSQL only)."""
+    tokens = tokenize(query)
+    # Built from \w+ tokens only, so no tsquery syntax reaches to_tsquery
+    ts_query = func.to_tsquery(
+        literal_column("'english'::regconfig"), " & ".join(tokens[:-1] + [f"{tokens[-1]}:*"])
+    )
+    document = literal_column(SEARCH_DOCUMENT_SQL)
+    score = cast(func.ts_rank_cd(document, ts_query) + func.similarity(Persona.name, query), Float)
+
+    statement = select(Persona, score.label("score")).where(
+        Persona.is_public == True,
+        or_(document.op("@@")(ts_query), Persona.name.op("%")(query)),
+    )
+    if exclude_user_id is not None:
+        statement = statement.where(Persona.user_id != exclude_user_id)
+    if after is not None:
+        statement = statement.where(tuple_(score, Persona.id) < tuple_(literal(after[0], Float), literal(after[1])))
+    return statement.order_by(score.desc(), Persona.id.desc()).limit(limit)
+
+
+async def _search_postgres(
+    db: AsyncSession, query: str, exclude_user_id: Optional[int],
+    limit: int, after: Optional[Tuple[float, int]],
+) -> List[Tuple[Persona, float]]:
+    if not tokenize(query):
+        return []
+    rows = await db.execute(postgres_search_statement(query, exclude_user_id, limit, after))
+    return [(persona, score) for persona, score in rows]
+
+
+async def search_public_personas(
+    db: AsyncSession,
+    query: str,
+    exclude_user_id: Optional[int] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Persona], Optional[str]]:
+    """
+    Ranked search over public personas.
+
+    Args:
+        db: Async session (may be a read-replica session)
+        query: Free-text query
+        exclude_user_id: Omit this user's personas (the caller's own)
+        limit: Page size
+        cursor: next_cursor from the previous page, if any
+
+    Returns:
+        (personas, next_cursor) - next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    after = decode_cursor(cursor) if cursor else None
+    search = _search_postgres if db.bind.dialect.name == "postgresql" else _search_fallback
+    # Fetch one extra row to learn whether another page exists
+    hits = await search(db, query, exclude_user_id, limit + 1, after)
+
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last, last_score = hits[-1]
+        next_cursor = encode_cursor(last_score, last.id)
+    return [persona for persona, _ in hits], next_cursor
@@ -0,0 +1,195 @@
+"""
+Prompt Engine
+
+Compiled prompt templates and incremental history rendering for the
+per-turn prompts in app/services/prompt_templates.py.
+
+CompiledTemplate parses a str.format-style source once. Fields bound at
+compile time (e.g. the banned-phrase list) are folded into the surrounding
+static text, which is interned, so rendering is one "".join over a tuple
+of static strings and the handful of per-call values.
+
+HistoryRenderer keeps the rendered text of each conversation history it
+has seen. Turn histories only ever grow by appending (the orchestrator
+copies the list and appends each new message; the conversation state
+cache appends committed turns), so the next render reuses the cached
+prefix and only formats the new lines. An entry is reused only if the
+message dicts it was built from are the very same objects, in order, at
+the start of the new history; anything else renders from scratch.
+
+render_window bounds the history to a token budget (estimate_tokens, a
+local ~4 chars/token estimate, per PROMPT_HISTORY_TOKEN_BUDGET(S)) by
+leaving out the oldest lines. Lines are rendered with their position in
+the full history, so the kept lines keep their [index] labels and
+REPLY_TO still maps to the right message.
+
+Usage:
+    template = CompiledTemplate("Topic: {topic}\\nRules: {rules}", rules=RULES)
+    template.render(topic="Mars")
+
+    renderer = HistoryRenderer(lambda i, m: f"[{i + 1}] {m['speaker']}: {m['message']}")
+    renderer.render(history)
+    text, omitted = renderer.render_window(history, history_token_budget(model))
+"""
+
+import operator
+import sys
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from string import Formatter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+# Rough characters per token for English text with Claude / GPT tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate; no tokenizer round-trip."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens, marking the cut. max_tokens <= 0 means no limit."""
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max_tokens * CHARS_PER_TOKEN].rstrip() + " […]"
+
+
+def history_token_budget(model: Optional[str] = None) -> Optional[int]:
+    """The history token budget for a model; None if unlimited."""
+    budget = settings.prompt_history_token_budgets.get(model, settings.PROMPT_HISTORY_TOKEN_BUDGET)
+    return budget if budget > 0 else None
+
+
+class CompiledTemplate:
+    """
+    A str.format-style template split into static and dynamic parts.
+
+    Args:
+        source: Template text with {name} fields (no format specs or conversions)
+        **static: Field values fixed at compile time
+    """
+
+    def __init__(self, source: str, **static: Any) -> None:
+        parts: List[str] = []
+        slots: List[Tuple[int, str]] = []
+        pending = ""
+        for literal, field, spec, conversion in Formatter().parse(source):
+            pending += literal
+            if field is None:
+                continue
+            if spec or conversion:
+                raise ValueError(f"Field {{{field}}} uses a format spec; format the value before rendering")
+            if field in static:
+                pending += str(static[field])
+                continue
+            if pending:
+                parts.append(sys.intern(pending))
+                pending = ""
+            slots.append((len(parts), field))
+            parts.append("")
+        if pending:
+            parts.append(sys.intern(pending))
+
+        self._parts = tuple(parts)
+        self._slots = tuple(slots)
+        self.fields = tuple(name for _, name in slots)
+
+    def render(self, **values: Any) -> str:
+        parts = list(self._parts)
+        for index, name in self._slots:
+            value = values[name]
+            parts[index] = value if isinstance(value, str) else str(value)
+        return "".join(parts)
+
+
+class _Rendered:
+    """A rendered history: its message dicts, text, and per-line running totals."""
+
+    __slots__ = ("messages", "text", "ends", "tokens")
+
+    def __init__(self, messages: List[Dict[str, str]], text: str, ends: List[int], tokens: List[int]) -> None:
+        self.messages = messages
+        self.text = text
+        self.ends = ends  # Offset in text just past each line
+        self.tokens = tokens  # Estimated tokens of lines [0..i]
+
+
+_EMPTY = _Rendered([], "", [], [])
+
+
+class HistoryRenderer:
+    """
+    Renders history lines joined by newlines, extending cached prefixes.
+
+    Args:
+        line: Formats one message given its 0-based position and dict
+        max_entries: Number of histories kept (LRU)
+    """
+
+    def __init__(self, line: Callable[[int, Dict[str, str]], str], max_entries: int = 512) -> None:
+        self._line = line
+        self.max_entries = max_entries
+        # id(first message dict) -> _Rendered. Holding the dicts keeps their
+        # ids from being reused while the entry exists.
+        self._entries: "OrderedDict[int, _Rendered]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.lines_rendered = 0
+
+    def render(self, history: Sequence[Dict[str, str]]) -> str:
+        return self._render(history).text
+
+    def render_window(self, history: Sequence[Dict[str, str]], token_budget: Optional[int]) -> Tuple[str, int]:
+        """
+        The most recent lines that fit token_budget (at least the last one).
+
+        Returns:
+            (text, number of oldest messages left out)
+        """
+        rendered = self._render(history)
+        if not token_budget or not rendered.tokens or rendered.tokens[-1] <= token_budget:
+            return rendered.text, 0
+        # Drop the fewest oldest lines whose tokens cover the excess
+        dropped = bisect_left(rendered.tokens, rendered.tokens[-1] - token_budget) + 1
+        dropped = min(dropped, len(rendered.tokens) - 1)
+        return rendered.text[rendered.ends[dropped - 1] + 1:], dropped
+
+    def _render(self, history: Sequence[Dict[str, str]]) -> _Rendered:
+        if not history:
+            return _EMPTY
+        key = id(history[0])
+        with self._lock:
+            cached = self._entries.get(key) or _EMPTY
+
+        if len(cached.messages) > len(history) or not all(map(operator.is_, cached.messages, history)):
+            cached = _EMPTY
+        start = len(cached.messages)
+        if start == len(history):
+            return cached
+
+        text, ends, tokens = cached.text, list(cached.ends), list(cached.tokens)
+        lines = [self._line(i, msg) for i, msg in enumerate(history[start:], start)]
+        offset = len(text) + 1 if text else 0
+        total = tokens[-1] if tokens else 0
+        for line in lines:
+            ends.append(offset + len(line))
+            offset = ends[-1] + 1
+            total += estimate_tokens(line)
+            tokens.append(total)
+        new_text = "\n".join(lines)
+        rendered = _Rendered(list(history), f"{text}\n{new_text}" if text else new_text, ends, tokens)
+
+        with self._lock:
+            self.lines_rendered += len(lines)
+            self._entries[key] = rendered
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -2,11 +2,15 @@
 Prompt Templates - Phase 4
 
 String templates for LLM prompts used in persona motto generation
-and focus group conversation responses.
+and focus group conversation responses. The per-turn conversation and
+challenge prompts are compiled once at import (see prompt_engine.py).
 """
 
 from typing import Dict, List, Any, Optional
 
+from app.config import settings
+from app.services.prompt_engine import CompiledTemplate, HistoryRenderer, truncate_to_tokens
+
 ARCHETYPE_NAMES = {
     "ANALYST": "The Analyst",
     "SOCIALITE": "The Socialite",
@@ -28,6 +32,10 @@ ATTITUDE_DESCRIPTIONS = {
     "Cynical":         "assumes bad faith, skewers idealism, trusts no institution",
 }
 
+# Bump when render_persona_block's output changes; stored blocks of an older
+# version are re-rendered on read and rewritten by the startup backfill
+PERSONA_BLOCK_VERSION = 1
+
 # Phrases that make responses sound like an AI performing politeness or using formulaic starters
 BANNED_PHRASES = [
     "Absolutely", "Great point", "That's a great", "That's an interesting",
@@ -51,6 +59,78 @@ NATURAL_STARTERS = [
 ]
 
 
+def describe_personality(ocean_scores: Dict[str, float]) -> str:
+    traits = []
+
+    o = ocean_scores.get("openness", 0.5)
+    c = ocean_scores.get("conscientiousness", 0.5)
+    e = ocean_scores.get("extraversion", 0.5)
+    a = ocean_scores.get("agreeableness", 0.5)
+    n = ocean_scores.get("neuroticism", 0.5)
+
+    if o > 0.7:
+        traits.append("intellectually curious, enjoys abstract ideas and provocation")
+    elif o > 0.5:
+        traits.append("open to new ideas but grounded")
+    elif o < 0.3:
+        traits.append("suspicious of novelty, prefers what's been proven to work")
+    else:
+        traits.append("practical, not interested in theory for its own sake")
+
+    if c > 0.7:
+        traits.append("disciplined and precise, irritated by sloppiness")
+    elif c < 0.3:
+        traits.append("impulsive, easily bored, ignores rules that seem pointless")
+
+    if e > 0.7:
+        traits.append("dominant in conversation, fills silence, thinks out loud")
+    elif e < 0.3:
+        traits.append("speaks only when they have something worth saying")
+
+    if a > 0.7:
+        traits.append("values harmony but not a pushover")
+    elif a < 0.3:
+        traits.append("competitive, self-interested, finds deference irritating")
+    elif a < 0.45:
+        traits.append("sceptical of others' motives, won't soften an opinion to spare feelings")
+
+    if n > 0.7:
+        traits.append("prone to catastrophising, emotions close to the surface")
+    elif n > 0.55:
+        traits.append("occasionally irritable, takes things personally")
+    elif n < 0.3:
+        traits.append("emotionally flat, rarely rattled")
+
+    if not traits:
+        traits.append("unremarkably average across all dimensions")
+
+    return "\n".join(f"- {t}" for t in traits)
+
+
+def render_persona_block(
+    name: str,
+    ocean_scores: Dict[str, float],
+    attitude: Optional[str] = "Neutral",
+    description: str = "",
+) -> str:
+    """
+    The persona-specific opening of every conversation prompt.
+
+    It only depends on the persona, so it is rendered once when the persona is
+    saved (Persona.prompt_block) and spliced in as-is; the identical prefix
+    also keeps provider-side prompt caches warm.
+    """
+    attitude = attitude or "Neutral"
+    attitude_desc = ATTITUDE_DESCRIPTIONS.get(attitude, "speaks plainly")
+    background = f"Your background: {description}\n" if description else ""
+    return (
+        f"You are {name}.\n"
+        f"{background}"
+        f"Your personality:\n{describe_personality(ocean_scores)}\n"
+        f"Your communication style: {attitude} — {attitude_desc}\n"
+    )
+
+
 class MottoPromptTemplate:
 
     def render(
@@ -88,6 +168,49 @@ class MottoPromptTemplate:
         )
 
 
+_BANNED = ", ".join(f'"{p}"' for p in BANNED_PHRASES)
+_STARTERS = ", ".join(f'"{s}"' for s in NATURAL_STARTERS)
+
+_STAGNATION_WARNING = (
+    "\nWARNING: The conversation is going in circles. "
+    "You MUST introduce a new angle, contradict something, or say something provocative. "
+    "Do NOT continue the current thread.\n"
+)
+
+_CONVERSATION_PROMPT = CompiledTemplate(
+    "{persona_block}\n"
+    "Topic: {topic}\n\n"
+    "{history_intro}{history_text}{history_outro}"
+    "{stagnation_warning}"
+    "RULES — read carefully:\n"
+    "1. State YOUR OWN position first. Do not open by asking what others think.\n"
+    "2. You are NOT required to be nice. Low agreeableness means you push back hard.\n"
+    "3. NEVER open with any of these: {banned}\n"
+    "4. Aim for a direct, authentic opening. Examples: {starters}\n"
+    "5. Do not repeat points already made. If you agree, say so in one clause then move on.\n"
+    "6. If someone said something wrong or naive, call it out directly.\n"
+    "7. Keep it to 2-3 sentences. Be dense, not verbose.\n"
+    "8. Sound like a real human, not a panel discussion moderator. No filler phrases.\n"
+    "9. Be aware of the developing tone of the conversation and respond accordingly.\n"
+    "10. Track who you have spoken to. Use direct quotes when appropriate.\n"
+    "11. If you are responding to a specific message, start your response with 'REPLY_TO: [index]'. Example: 'REPLY_TO: [1] I disagree because...'\n\n"
+    "Respond now as {persona_name}:",
+    banned=_BANNED,
+    starters=_STARTERS,
+)
+
+def _message(msg: Dict[str, str]) -> str:
+    return truncate_to_tokens(msg["message"], settings.PROMPT_HISTORY_MESSAGE_MAX_TOKENS)
+
+
+def _omitted(count: int) -> str:
+    return f"({count} earlier message{'s' if count != 1 else ''} omitted)\n" if count else ""
+
+
+# Numbered by position in the full history so REPLY_TO: [index] survives windowing
+_indexed_history = HistoryRenderer(lambda i, msg: f"[{i + 1}] {msg['speaker']}: {_message(msg)}")
+
+
 class ConversationPromptTemplate:
 
     def render(
@@ -98,110 +221,64 @@ class ConversationPromptTemplate:
         topic: str,
         history: List[Dict[str, str]],
         description: str = "",
+        persona_block: Optional[str] = None,
+        token_budget: Optional[int] = None,
     ) -> str:
-        attitude_desc = ATTITUDE_DESCRIPTIONS.get(attitude, "speaks plainly")
-        personality_traits = self._describe_personality(ocean_scores)
-        banned = ", ".join(f'"{p}"' for p in BANNED_PHRASES)
+        if persona_block is None:
+            persona_block = render_persona_block(persona_name, ocean_scores, attitude, description)
+        history_text, omitted = _indexed_history.render_window(history, token_budget)
 
         # Detect if the last few messages are stagnating (same speakers saying similar things)
         stagnation_warning = ""
         if len(history) >= 4:
-            recent = history[-4:]
-            speakers = [m["speaker"] for m in recent]
             # If the last 4 are all from the same 2 people just agreeing, force disruption
-            if len(set(speakers)) <= 2:
-                stagnation_warning = (
-                    "\nWARNING: The conversation is going in circles. "
-                    "You MUST introduce a new angle, contradict something, or say something provocative. "
-                    "Do NOT continue the current thread.\n"
-                )
+            if len({m["speaker"] for m in history[-4:]}) <= 2:
+                stagnation_warning = _STAGNATION_WARNING
 
         if history:
-            lines = [f"[{i+1}] {msg['speaker']}: {msg['message']}" for i, msg in enumerate(history)]
-            history_text = "\n".join(lines)
-            history_section = f"Conversation so far (use [index] to reply):\n{history_text}\n\n"
+            history_intro = f"Conversation so far (use [index] to reply):\n{_omitted(omitted)}"
+            history_outro = "\n\n"
         else:
-            history_section = "You are opening the discussion.\n\n"
-
-        background = f"Your background: {description}\n" if description else ""
-
-        starters = ", ".join(f'"{s}"' for s in NATURAL_STARTERS)
-
-        return (
-            f"You are {persona_name}.\n"
-            f"{background}"
-            f"Your personality:\n{personality_traits}\n"
-            f"Your communication style: {attitude} — {attitude_desc}\n\n"
-            f"Topic: {topic}\n\n"
-            f"{history_section}"
-            f"{stagnation_warning}"
-            f"RULES — read carefully:\n"
-            f"1. State YOUR OWN position first. Do not open by asking what others think.\n"
-            f"2. You are NOT required to be nice. Low agreeableness means you push back hard.\n"
-            f"3. NEVER open with any of these: {banned}\n"
-            f"4. Aim for a direct, authentic opening. Examples: {starters}\n"
-            f"5. Do not repeat points already made. If you agree, say so in one clause then move on.\n"
-            f"6. If someone said something wrong or naive, call it out directly.\n"
-            f"7. Keep it to 2-3 sentences. Be dense, not verbose.\n"
-            f"8. Sound like a real human, not a panel discussion moderator. No filler phrases.\n"
-            f"9. Be aware of the developing tone of the conversation and respond accordingly.\n"
-            f"10. Track who you have spoken to. Use direct quotes when appropriate.\n"
-            f"11. If you are responding to a specific message, start your response with 'REPLY_TO: [index]'. Example: 'REPLY_TO: [1] I disagree because...'\n\n"
-            f"Respond now as {persona_name}:"
+            history_intro, history_outro = "You are opening the discussion.\n\n", ""
+
+        return _CONVERSATION_PROMPT.render(
+            persona_block=persona_block,
+            topic=topic,
+            history_intro=history_intro,
+            history_text=history_text,
+            history_outro=history_outro,
+            stagnation_warning=stagnation_warning,
+            persona_name=persona_name,
         )
 
     def _describe_personality(self, ocean_scores: Dict[str, float]) -> str:
-        traits = []
-
-        o = ocean_scores.get("openness", 0.5)
-        c = ocean_scores.get("conscientiousness", 0.5)
-        e = ocean_scores.get("extraversion", 0.5)
-        a = ocean_scores.get("agreeableness", 0.5)
-        n = ocean_scores.get("neuroticism", 0.5)
-
-        if o > 0.7:
-            traits.append("intellectually curious, enjoys abstract ideas and provocation")
-        elif o > 0.5:
-            traits.append("open to new ideas but grounded")
-        elif o < 0.3:
-            traits.append("suspicious of novelty, prefers what's been proven to work")
-        else:
-            traits.append("practical, not interested in theory for its own sake")
-
-        if c > 0.7:
-            traits.append("disciplined and precise, irritated by sloppiness")
-        elif c < 0.3:
-            traits.append("impulsive, easily bored, ignores rules that seem pointless")
-
-        if e > 0.7:
-            traits.append("dominant in conversation, fills silence, thinks out loud")
-        elif e < 0.3:
-            traits.append("speaks only when they have something worth saying")
-
-        if a > 0.7:
-            traits.append("values harmony but not a pushover")
-        elif a < 0.3:
-            traits.append("competitive, self-interested, finds deference irritating")
-        elif a < 0.45:
-            traits.append("sceptical of others' motives, won't soften an opinion to spare feelings")
-
-        if n > 0.7:
-            traits.append("prone to catastrophising, emotions close to the surface")
-        elif n > 0.55:
-            traits.append("occasionally irritable, takes things personally")
-        elif n < 0.3:
-            traits.append("emotionally flat, rarely rattled")
-
-        if not traits:
-            traits.append("unremarkably average across all dimensions")
-
-        return "\n".join(f"- {t}" for t in traits)
+        return describe_personality(ocean_scores)
 
 
 class ChallengePersonaGenerationTemplate:
-    """Template for brainstorming disagreeable personas for a proposal."""
-
-    def render(self, proposal: str, challenge_type: str, n: int) -> str:
+    """
+    Template for brainstorming disagreeable personas for a proposal.
+
+    With fused=True each persona also carries its OCEAN scores and a motto,
+    so challenge setup needs no per-persona inference or motto calls.
+    """
+
+    def render(self, proposal: str, challenge_type: str, n: int, fused: bool = False) -> str:
+        if fused:
+            extra_fields = (
+                f"6. Ocean: Big Five scores consistent with the description, each a float from 0.0 (extremely low) to 1.0 (extremely high): "
+                f"openness, conscientiousness, extraversion, agreeableness, neuroticism\n"
+                f"7. Motto: A short personal motto in their own voice that reflects their genuine character, including cynicism or "
+                f"aggression if that fits. No corporate motivational speak.\n\n"
+            )
+            example = (
+                f"  {{\"name\": \"John Smith\", \"age\": 45, \"gender\": \"Male\", \"description\": \"...\", \"attitude\": \"Cynical\", "
+                f"\"ocean\": {{\"openness\": 0.3, \"conscientiousness\": 0.7, \"extraversion\": 0.5, \"agreeableness\": 0.2, \"neuroticism\": 0.6}}, "
+                f"\"motto\": \"...\"}},\n"
+            )
+        else:
+            extra_fields = "\n"
+            example = f"  {{\"name\": \"John Smith\", \"age\": 45, \"gender\": \"Male\", \"description\": \"...\", \"attitude\": \"Cynical\"}},\n"
         return (
             f"I want to run a '{challenge_type}' to challenge the following proposal:\n"
             f"Proposal: \"{proposal}\"\n\n"
@@ -212,16 +289,36 @@ class ChallengePersonaGenerationTemplate:
             f"2. Age: A realistic age\n"
             f"3. Gender: Male, Female, or Non-binary\n"
             f"4. Description: A 2-3 sentence backstory explaining their background and exactly WHY they are skeptical or opposed to this proposal based on their personal/professional stakes.\n"
-            f"5. Attitude: Choose one from: Neutral, Sarcastic, Comical, Somber, Confrontational, Blunt, Cynical.\n\n"
+            f"5. Attitude: Choose one from: Neutral, Sarcastic, Comical, Somber, Confrontational, Blunt, Cynical.\n"
+            f"{extra_fields}"
             f"Respond ONLY with a JSON list of objects. No other text.\n"
             f"Example format:\n"
             f"[\n"
-            f"  {{\"name\": \"John Smith\", \"age\": 45, \"gender\": \"Male\", \"description\": \"...\", \"attitude\": \"Cynical\"}},\n"
+            f"{example}"
             f"  ...\n"
             f"]"
         )
 
 
+_CHALLENGE_PROMPT = CompiledTemplate(
+    "{persona_block}\n"
+    "Context: You are participating in a '{challenge_type}' regarding the following proposal.\n"
+    "PROPOSAL: \"{proposal}\"\n"
+    "Your current state: {persuasion_status} (Score: {score})\n\n"
+    "{history_intro}{history_text}{history_outro}"
+    "RULES:\n"
+    "1. Stay true to your character and your initial reasons for skepticism.\n"
+    "2. Rational discourse can move you, but do not pander. You are hard to convince.\n"
+    "3. Address the specific arguments made in the conversation.\n"
+    "4. Keep it to 2-3 sentences. Be direct and human.\n"
+    "5. NEVER open with: {banned}\n\n"
+    "Respond now as {persona_name}:",
+    banned=_BANNED,
+)
+
+_speaker_history = HistoryRenderer(lambda i, msg: f"{msg['speaker']}: {_message(msg)}")
+
+
 class ChallengeConversationTemplate:
     """Template for persona responses in challenge mode."""
 
@@ -235,40 +332,33 @@ class ChallengeConversationTemplate:
         history: List[Dict[str, str]],
         description: str = "",
         persuaded_score: float = 0.0,
+        persona_block: Optional[str] = None,
+        token_budget: Optional[int] = None,
     ) -> str:
-        attitude_desc = ATTITUDE_DESCRIPTIONS.get(attitude, "speaks plainly")
-        personality_traits = ConversationPromptTemplate()._describe_personality(ocean_scores)
-        banned = ", ".join(f'"{p}"' for p in BANNED_PHRASES)
+        if persona_block is None:
+            persona_block = render_persona_block(persona_name, ocean_scores, attitude, description)
+        history_text, omitted = _speaker_history.render_window(history, token_budget)
 
         if history:
-            lines = [f"{msg['speaker']}: {msg['message']}" for msg in history]
-            history_text = "\n".join(lines)
-            history_section = f"Conversation so far:\n{history_text}\n\n"
+            history_intro, history_outro = f"Conversation so far:\n{_omitted(omitted)}", "\n\n"
         else:
-            history_section = "You are opening the challenge.\n\n"
+            history_intro, history_outro = "You are opening the challenge.\n\n", ""
 
-        background = f"Your background: {description}\n" if description else ""
         persuasion_status = "You are strongly against." if persuaded_score < 0.3 else \
                             "You are not persuaded." if persuaded_score < 0.5 else \
                             "You are leaning towards being persuaded." if persuaded_score < 0.7 else \
                             "You are strongly persuaded."
 
-        return (
-            f"You are {persona_name}.\n"
-            f"{background}"
-            f"Your personality:\n{personality_traits}\n"
-            f"Your communication style: {attitude} — {attitude_desc}\n\n"
-            f"Context: You are participating in a '{challenge_type}' regarding the following proposal.\n"
-            f"PROPOSAL: \"{proposal}\"\n"
-            f"Your current state: {persuasion_status} (Score: {persuaded_score:.2f})\n\n"
-            f"{history_section}"
-            f"RULES:\n"
-            f"1. Stay true to your character and your initial reasons for skepticism.\n"
-            f"2. Rational discourse can move you, but do not pander. You are hard to convince.\n"
-            f"3. Address the specific arguments made in the conversation.\n"
-            f"4. Keep it to 2-3 sentences. Be direct and human.\n"
-            f"5. NEVER open with: {banned}\n\n"
-            f"Respond now as {persona_name}:"
+        return _CHALLENGE_PROMPT.render(
+            persona_block=persona_block,
+            challenge_type=challenge_type,
+            proposal=proposal,
+            persuasion_status=persuasion_status,
+            score=f"{persuaded_score:.2f}",
+            history_intro=history_intro,
+            history_text=history_text,
+            history_outro=history_outro,
+            persona_name=persona_name,
         )
 
 
@@ -0,0 +1,94 @@
+"""
+Per-Provider Rate Limits
+
+Client-side request rate limits for the external AI providers, so that many
+concurrent workers (e.g. a batch experiment) queue for the provider instead
+of tripping its 429s. Every call site acquires before calling:
+
+- anthropic: LLMService, challenge turns, structured output
+- openai: content moderation, DALL-E avatars
+- gemini: Nano Banana avatars
+
+acquire() blocks until the provider's token bucket (ANTHROPIC / OPENAI /
+GEMINI _REQUESTS_PER_MINUTE, one second of burst) has a token; callers queue
+in arrival order by reserving a token before they sleep. A limit of 0
+disables throttling for that provider. Limits are per process.
+
+Usage:
+    from app.services.provider_limits import provider_limits
+
+    provider_limits.acquire("anthropic")
+    message = client.messages.create(...)
+"""
+
+import threading
+import time
+from typing import Callable, Dict
+
+from app.admission import TokenBucket
+from app.config import settings
+
+PROVIDERS = ("anthropic", "openai", "gemini")
+
+
+def _requests_per_minute(provider: str) -> float:
+    return getattr(settings, f"{provider.upper()}_REQUESTS_PER_MINUTE", 0)
+
+
+class ProviderRateLimiter:
+    """
+    One token bucket per provider, rebuilt when its configured rate changes.
+
+    Args:
+        clock: Monotonic time source (seconds)
+        sleep: Called with the wait in seconds when a caller must queue
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def acquire(self, provider: str) -> float:
+        """Wait for the provider's next request slot. Returns seconds waited."""
+        per_minute = _requests_per_minute(provider)
+        if per_minute <= 0:
+            return 0.0
+        rate = per_minute / 60
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets.get(provider)
+            if bucket is None or bucket.rate != rate:
+                bucket = self._buckets[provider] = TokenBucket(rate, max(1.0, rate), now)
+            wait = bucket.wait_time(now)
+            # Reserve the token now so later callers queue behind this one
+            bucket.take()
+            stats = self._stats.setdefault(provider, {"requests": 0, "throttled": 0, "wait_seconds": 0.0})
+            stats["requests"] += 1
+            if wait > 0:
+                stats["throttled"] += 1
+                stats["wait_seconds"] += wait
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Requests, throttled requests and total wait per provider, plus configured limits."""
+        with self._lock:
+            return {
+                provider: {
+                    "requests_per_minute": _requests_per_minute(provider),
+                    **self._stats.get(provider, {"requests": 0, "throttled": 0, "wait_seconds": 0.0}),
+                }
+                for provider in PROVIDERS
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._stats.clear()
+
+
+provider_limits = ProviderRateLimiter()
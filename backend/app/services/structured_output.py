@@ -0,0 +1,188 @@
+"""
+Structured Output
+
+Tool-use wrapper for the Claude calls that must return JSON (OCEAN
+inference, challenge persona brainstorming, persuasion evaluation).
+
+Each call declares a single tool whose input_schema is the expected JSON
+shape and forces it with tool_choice, so Claude returns schema-shaped input
+instead of prose to regex-scrape. The tool input is then checked by a
+caller-supplied validator. If there is no usable tool call, or validation
+fails, one repair request is sent back with the validation error (as an
+error tool_result) before giving up with StructuredOutputError.
+
+A response that answers in plain text anyway (older models, test doubles)
+is parsed with extract_json and goes through the same validator.
+
+Per-call-site counters (first-try successes, repairs, failures and the
+tokens spent on unusable responses) are kept in structured_output_metrics
+and exposed at GET /admin/structured-output.
+
+Usage:
+    from app.services.structured_output import call_with_tool
+
+    scores = call_with_tool(
+        client, "ocean", OCEAN_TOOL, validate_ocean_scores,
+        model=model, max_tokens=256, system=SYSTEM, messages=[...],
+    )
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from app.services.provider_limits import provider_limits
+from app.services.usage import response_tokens, usage_recorder
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_CODE_BLOCK_RE = re.compile(r"```(?:json)?\s*([\[{].*?[\]}])\s*```", re.DOTALL)
+_JSON_RE = re.compile(r"[\[{].*[\]}]", re.DOTALL)
+
+
+class StructuredOutputError(ValueError):
+    """Claude did not produce valid structured output, even after a repair."""
+
+
+def extract_json(text: str) -> Any:
+    """
+    Parse the JSON object or array in a text response.
+
+    Accepts bare JSON, JSON in a markdown code block, or JSON surrounded by
+    prose.
+
+    Raises:
+        ValueError: If no JSON can be parsed
+    """
+    cleaned = text.strip()
+    match = _CODE_BLOCK_RE.search(cleaned) or _JSON_RE.search(cleaned)
+    if match:
+        cleaned = match.group(1) if match.re is _CODE_BLOCK_RE else match.group(0)
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not parse response as JSON: {e}") from e
+
+
+def _tool_call(response, tool_name: str):
+    """The forced tool_use block, or None if Claude answered without it."""
+    for block in getattr(response, "content", None) or []:
+        if getattr(block, "type", None) == "tool_use" and getattr(block, "name", None) == tool_name:
+            return block
+    return None
+
+
+def _text(response) -> str:
+    return "".join(
+        block.text for block in getattr(response, "content", None) or []
+        if isinstance(getattr(block, "text", None), str)
+    )
+
+
+class StructuredOutputMetrics:
+    """Thread-safe per-call-site counters for structured output calls."""
+
+    FIELDS = ("calls", "first_try", "repaired", "failed", "text_fallback", "wasted_input_tokens", "wasted_output_tokens")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, **increments: int) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(name, dict.fromkeys(self.FIELDS, 0))
+            for field, value in increments.items():
+                counters[field] += value
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for name, counters in self._counters.items():
+                calls = counters["calls"]
+                result[name] = {
+                    **counters,
+                    "parse_failure_rate": round((counters["repaired"] + counters["failed"]) / calls, 3) if calls else 0.0,
+                }
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+structured_output_metrics = StructuredOutputMetrics()
+
+
+def call_with_tool(
+    client,
+    name: str,
+    tool: Dict[str, Any],
+    validate: Callable[[Any], T],
+    *,
+    messages: List[Dict[str, Any]],
+    metrics: Optional[StructuredOutputMetrics] = None,
+    service: str = "llm",
+    **create_kwargs: Any,
+) -> T:
+    """
+    Call client.messages.create forcing `tool` and return validate(tool input).
+
+    Args:
+        client: Anthropic client
+        name: Call-site name for metrics (e.g. "ocean_inference")
+        tool: Tool definition ({"name", "description", "input_schema"})
+        validate: Turns the tool input into the result; raises ValueError,
+            KeyError or TypeError if it is unusable
+        messages: Conversation to send
+        metrics: Counter sink (defaults to structured_output_metrics)
+        service: Usage accounting service label (operation is `name`)
+        **create_kwargs: model, max_tokens, system, ...
+
+    Raises:
+        StructuredOutputError: If the response and its repair are both invalid
+        Exception: API errors from the Anthropic client propagate unchanged
+    """
+    metrics = metrics or structured_output_metrics
+    messages = list(messages)
+    tool_kwargs = {"tools": [tool], "tool_choice": {"type": "tool", "name": tool["name"]}}
+    error: Optional[Exception] = None
+
+    for attempt in range(2):
+        provider_limits.acquire("anthropic")
+        started = time.perf_counter()
+        response = client.messages.create(messages=messages, **tool_kwargs, **create_kwargs)
+        usage_recorder.record_response(service, name, create_kwargs.get("model", ""), response, started)
+        block = _tool_call(response, tool["name"])
+        try:
+            if block is not None:
+                data = block.input
+            else:
+                data = extract_json(_text(response))
+                metrics.record(name, text_fallback=1)
+            result = validate(data)
+        except (KeyError, TypeError, ValueError) as e:
+            error = e
+            input_tokens, output_tokens = response_tokens(response)
+            metrics.record(name, wasted_input_tokens=input_tokens, wasted_output_tokens=output_tokens)
+            logger.warning(f"Invalid structured output from {name} (attempt {attempt + 1}): {e}")
+            # Repair: show Claude its answer and what was wrong with it
+            messages.append({"role": "assistant", "content": response.content})
+            feedback = f"That output was invalid: {e}. Call {tool['name']} again with input matching its schema."
+            if block is not None:
+                messages.append({"role": "user", "content": [
+                    {"type": "tool_result", "tool_use_id": block.id, "content": feedback, "is_error": True},
+                ]})
+            else:
+                messages.append({"role": "user", "content": feedback})
+            continue
+
+        metrics.record(name, calls=1, **({"first_try": 1} if attempt == 0 else {"repaired": 1}))
+        return result
+
+    metrics.record(name, calls=1, failed=1)
+    raise StructuredOutputError(f"{name}: no valid structured output after repair: {error}") from error
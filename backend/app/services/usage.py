@@ -0,0 +1,308 @@
+"""
+Usage Accounting
+
+Records model, tokens, latency, cache hits and estimated cost for every
+external AI call (Claude via LLMService / OceanInferenceService /
+ChallengeService / structured output, OpenAI moderation, avatar images).
+
+Events are attributed to the current user, conversation and endpoint through
+usage_context (a ContextVar): an HTTP middleware in app.main sets the user and
+route for each request, and services add the conversation where they know it.
+Thread pool work keeps the attribution when submitted through in_context().
+
+Events are aggregated in memory (GET /admin/usage) and written to the
+usage_events table by a background flusher thread (started with the first
+event) in batches of USAGE_FLUSH_BATCH_SIZE, or once the oldest buffered
+event is USAGE_FLUSH_INTERVAL_SECONDS old, and at shutdown. record() only
+appends to the buffer, so requests never wait on the write. Write failures
+are logged and the batch dropped; accounting never fails a request.
+
+Costs are estimates from MODEL_PRICES / IMAGE_PRICES; unknown models cost 0.
+
+Usage:
+    from app.services.usage import usage_recorder
+
+    started = time.perf_counter()
+    message = client.messages.create(...)
+    usage_recorder.record_response("llm", "motto", model, message, started)
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# USD per million (input, output) tokens, matched by model-name prefix
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "claude-haiku-4-5": (1.00, 5.00),
+    "claude-sonnet-4": (3.00, 15.00),
+}
+
+# USD per generated image (DALL-E 3 at the HD 1024x1024 setting we request)
+IMAGE_PRICES: Dict[str, float] = {
+    "dall-e-3": 0.08,
+    "gemini-2.5-flash-image": 0.039,
+}
+
+ATTRIBUTION_KEYS = ("user_id", "conversation_id", "endpoint")
+
+_context: ContextVar[Dict[str, Any]] = ContextVar("usage_context", default={})
+
+
+@contextmanager
+def usage_context(**attributes: Any) -> Iterator[None]:
+    """Attribute AI calls made inside the block (None values are ignored)."""
+    token = _context.set({**_context.get(), **{k: v for k, v in attributes.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_attribution() -> Dict[str, Any]:
+    attributes = _context.get()
+    scope = attributes.get("scope")
+    if scope is not None and "endpoint" not in attributes:
+        # Resolved lazily: the route template is only known after routing
+        route = scope.get("route")
+        attributes = {**attributes, "endpoint": f"{scope.get('method')} {getattr(route, 'path', scope.get('path'))}"}
+    return {key: attributes.get(key) for key in ATTRIBUTION_KEYS}
+
+
+def in_context(fn: Callable) -> Callable:
+    """Wrap fn to run with the caller's usage attribution (for thread pools)."""
+    return partial(copy_context().run, fn)
+
+
+def estimate_cost(model: str, input_tokens: int = 0, output_tokens: int = 0, images: int = 0) -> float:
+    cost = images * IMAGE_PRICES.get(model, 0.0)
+    for prefix, (input_price, output_price) in MODEL_PRICES.items():
+        if model.startswith(prefix):
+            cost += (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+            break
+    return cost
+
+
+def response_tokens(response: Any) -> Tuple[int, int]:
+    """(input_tokens, output_tokens) from an Anthropic response; 0 where absent."""
+    usage = getattr(response, "usage", None)
+    tokens = (getattr(usage, "input_tokens", 0), getattr(usage, "output_tokens", 0))
+    return tuple(t if isinstance(t, int) else 0 for t in tokens)
+
+
+class UsageRecorder:
+    """
+    In-memory usage aggregation with batched writes to usage_events.
+
+    Args:
+        session_factory: Creates the short-lived sessions used to flush
+        batch_size: Flush once this many events are buffered
+        flush_interval: Flush once the oldest buffered event is this old (seconds)
+        max_buffer: Oldest events are dropped past this while writes fail
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = 50,
+        flush_interval: float = 10.0,
+        max_buffer: int = 10_000,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer: List[Dict[str, Any]] = []
+        self._oldest: Optional[float] = None
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._wake = threading.Event()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        self.flushed = 0
+        self.dropped = 0
+
+    def record(
+        self,
+        service: str,
+        operation: str,
+        model: str,
+        *,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        images: int = 0,
+        latency_ms: float = 0.0,
+        cache_hit: bool = False,
+    ) -> None:
+        if not settings.USAGE_ACCOUNTING_ENABLED:
+            return
+        cost = estimate_cost(model, input_tokens, output_tokens, images)
+        event = {
+            "created_at": datetime.now(timezone.utc),
+            "service": service,
+            "operation": operation,
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "images": images,
+            "latency_ms": round(latency_ms, 1),
+            "cache_hit": cache_hit,
+            "cost_usd": cost,
+            **current_attribution(),
+        }
+        now = time.monotonic()
+        with self._lock:
+            self._buffer.append(event)
+            if len(self._buffer) > self.max_buffer:
+                del self._buffer[0]
+                self.dropped += 1
+            if self._oldest is None:
+                self._oldest = now
+            totals = self._totals.setdefault(f"{service}/{model}", dict.fromkeys(
+                ("calls", "cache_hits", "input_tokens", "output_tokens", "images", "latency_ms", "cost_usd"), 0,
+            ))
+            totals["calls"] += 1
+            totals["cache_hits"] += int(cache_hit)
+            totals["input_tokens"] += input_tokens
+            totals["output_tokens"] += output_tokens
+            totals["images"] += images
+            totals["latency_ms"] += latency_ms
+            totals["cost_usd"] += cost
+            # The flusher sleeps while the buffer is empty; wake it to time the
+            # new batch, or to write a full one
+            wake = len(self._buffer) == 1 or len(self._buffer) >= self.batch_size
+            if self._thread is None or not self._thread.is_alive():
+                self._start()
+        if wake:
+            self._wake.set()
+
+    def _start(self) -> None:
+        """Start the flusher thread; called with _lock held."""
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="usage-flusher", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._oldest is None:
+                    timeout = None
+                elif len(self._buffer) >= self.batch_size:
+                    timeout = 0.0
+                else:
+                    timeout = max(0.0, self._oldest + self.flush_interval - time.monotonic())
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._closing:
+                return
+            with self._lock:
+                due = self._oldest is not None and (
+                    len(self._buffer) >= self.batch_size or time.monotonic() - self._oldest >= self.flush_interval
+                )
+            if due:
+                self.flush()
+
+    def close(self) -> None:
+        """Stop the flusher thread and write what is buffered (at shutdown)."""
+        with self._lock:
+            thread, self._closing = self._thread, True
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout=5)
+        self.flush()
+
+    def record_response(self, service: str, operation: str, model: str, response: Any, started: float) -> None:
+        """Record an Anthropic response; started is the time.perf_counter() before the call."""
+        input_tokens, output_tokens = response_tokens(response)
+        self.record(
+            service, operation, model,
+            input_tokens=input_tokens, output_tokens=output_tokens,
+            latency_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    def flush(self) -> int:
+        """Write buffered events in one batch. Returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                events, self._buffer, self._oldest = self._buffer, [], None
+            if not events:
+                return 0
+            try:
+                try:
+                    self._write(events)
+                except IntegrityError:
+                    # A user or conversation was deleted after its events were
+                    # recorded; keep the events, minus the dangling references
+                    self._write(self._without_deleted_refs(events))
+            except Exception as e:
+                logger.warning(f"Usage flush failed, dropping {len(events)} events: {e}")
+                with self._lock:
+                    self.dropped += len(events)
+                return 0
+            with self._lock:
+                self.flushed += len(events)
+            return len(events)
+
+    def _write(self, events: List[Dict[str, Any]]) -> None:
+        # Imported here: app.models imports services that record usage
+        from app.models.usage import UsageEvent
+        with self.session_factory() as db:
+            db.execute(insert(UsageEvent), events)
+            db.commit()
+
+    def _without_deleted_refs(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copies of events with user_id / conversation_id set to None where that row is gone."""
+        from app.models.conversation import Conversation
+        from app.models.user import User
+
+        events = [dict(e) for e in events]
+        with self.session_factory() as db:
+            for field, model in (("user_id", User), ("conversation_id", Conversation)):
+                ids = {e[field] for e in events if e.get(field) is not None}
+                if not ids:
+                    continue
+                existing = set(db.scalars(select(model.id).where(model.id.in_(ids))))
+                for event in events:
+                    if event.get(field) is not None and event[field] not in existing:
+                        event[field] = None
+        return events
+
+    def pending(self, user_id: int) -> Tuple[int, int]:
+        """(tokens, images) for user_id that are buffered but not yet in usage_events."""
+        with self._lock:
+            events = [e for e in self._buffer if e["user_id"] == user_id]
+        return sum(e["input_tokens"] + e["output_tokens"] for e in events), sum(e["images"] for e in events)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per service/model totals since process start, plus buffer state."""
+        with self._lock:
+            totals = {}
+            for key, counters in self._totals.items():
+                calls = counters["calls"]
+                totals[key] = {
+                    **counters,
+                    "latency_ms": round(counters["latency_ms"], 1),
+                    "avg_latency_ms": round(counters["latency_ms"] / calls, 1) if calls else 0.0,
+                    "cost_usd": round(counters["cost_usd"], 6),
+                }
+            return {"totals": totals, "buffered": len(self._buffer), "flushed": self.flushed, "dropped": self.dropped}
+
+
+usage_recorder = UsageRecorder(
+    batch_size=settings.USAGE_FLUSH_BATCH_SIZE,
+    flush_interval=settings.USAGE_FLUSH_INTERVAL_SECONDS,
+)
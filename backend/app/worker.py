@@ -0,0 +1,68 @@
+"""
+Background Job Worker
+
+Runs jobs from the jobs table (see app/services/job_queue.py) outside the
+API process. Run as many as needed; they coordinate through row locks.
+
+Usage:
+    python -m app.worker                    # JOB_WORKER_CONCURRENCY threads until SIGTERM
+    python -m app.worker --concurrency 4
+    python -m app.worker --drain            # Run until the queue is empty, then exit
+
+Set JOB_INLINE_WORKER=false on the API when running dedicated workers.
+SIGTERM / SIGINT stop claiming new jobs; jobs in progress are finished first.
+"""
+
+import argparse
+import logging
+import signal
+import threading
+from typing import Any, List, Optional
+
+from app.config import settings
+from app.services import job_handlers  # noqa: F401  (registers handlers)
+from app.services.job_queue import JobWorker, start_workers
+from app.services.usage import usage_recorder
+
+logger = logging.getLogger("app.worker")
+
+
+def main(argv: Optional[List[str]] = None, stop: Optional[threading.Event] = None, **worker_kwargs: Any) -> None:
+    """
+    Args:
+        argv: Command-line arguments (defaults to sys.argv[1:])
+        stop: Event that ends the run; SIGTERM / SIGINT set it when omitted
+        **worker_kwargs: Passed to each JobWorker (e.g. session_factory)
+    """
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY)
+    parser.add_argument("--drain", action="store_true", help="exit once no job is runnable")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.drain:
+        worker = JobWorker(**worker_kwargs)
+        count = 0
+        while worker.run_once():
+            count += 1
+        logger.info(f"Queue drained after {count} job(s)")
+        usage_recorder.close()
+        return
+
+    if stop is None:
+        stop = threading.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: stop.set())
+
+    logger.info(f"Starting {args.concurrency} job worker thread(s)")
+    threads = start_workers(args.concurrency, stop, **worker_kwargs)
+    stop.wait()
+    logger.info("Stopping: finishing jobs in progress")
+    for thread in threads:
+        thread.join()
+    usage_recorder.close()
+
+
+if __name__ == "__main__":
+    main()
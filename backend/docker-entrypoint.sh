@@ -78,6 +78,7 @@ import traceback
 
 try:
     from app.database import engine
+    from app.models.persona import SEARCH_INDEX_DDL
     with engine.connect() as conn:
         stmts = [
             # Persona social columns
@@ -135,6 +136,43 @@ try:
             """,
             # Reply-to threading for conversation messages
             "ALTER TABLE conversation_messages ADD COLUMN IF NOT EXISTS reply_to_id INTEGER REFERENCES conversation_messages(id)",
+            # Copy-on-write forks: a fork shares its parent's transcript up to the fork point
+            "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS parent_id INTEGER REFERENCES conversations(id) ON DELETE RESTRICT",
+            "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS fork_point_turn INTEGER",
+            "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS fork_point_message_id INTEGER",
+            "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS fork_depth INTEGER NOT NULL DEFAULT 0",
+            "CREATE INDEX IF NOT EXISTS ix_conversations_parent_id ON conversations(parent_id)",
+            # A parent must materialize its forks before it goes (was ON DELETE SET NULL).
+            # Swapped once, in one ALTER, only while the key is not RESTRICT yet
+            """
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM pg_constraint
+                    WHERE conname = 'conversations_parent_id_fkey' AND confdeltype <> 'r'
+                ) THEN
+                    ALTER TABLE conversations
+                        DROP CONSTRAINT conversations_parent_id_fkey,
+                        ADD CONSTRAINT conversations_parent_id_fkey
+                            FOREIGN KEY (parent_id) REFERENCES conversations(id) ON DELETE RESTRICT;
+                END IF;
+            END $$
+            """,
+            # Index pack shaped to the router queries (mirrors model __table_args__)
+            "CREATE INDEX IF NOT EXISTS ix_personas_user_created ON personas(user_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_personas_public_upvotes ON personas(upvote_count, created_at) WHERE is_public",
+            "CREATE INDEX IF NOT EXISTS ix_personas_public_created ON personas(created_at) WHERE is_public",
+            "CREATE INDEX IF NOT EXISTS ix_conversations_creator_created ON conversations(created_by, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_conversations_public_created ON conversations(created_at) WHERE is_public",
+            "CREATE INDEX IF NOT EXISTS ix_conversations_public_upvotes ON conversations(upvote_count, view_count) WHERE is_public",
+            "CREATE INDEX IF NOT EXISTS ix_conversation_messages_transcript ON conversation_messages(conversation_id, turn_number, id)",
+            # Background jobs: cooperative cancellation of running jobs
+            "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS cancel_requested BOOLEAN NOT NULL DEFAULT FALSE",
+            # Pre-rendered persona prompt blocks (filled in by backfill_prompt_blocks below)
+            "ALTER TABLE personas ADD COLUMN IF NOT EXISTS prompt_block TEXT",
+            "ALTER TABLE personas ADD COLUMN IF NOT EXISTS prompt_block_version INTEGER",
+            # Persona search: weighted tsvector + pg_trgm name indexes (shared with the model DDL)
+            *SEARCH_INDEX_DDL,
             # Clear expired DALL-E avatar URLs so they fall back to initials
             # (New avatars are stored as S3 keys starting with "avatars/")
             """
@@ -148,6 +186,11 @@ try:
         for stmt in stmts:
             conn.execute(__import__('sqlalchemy').text(stmt))
         conn.commit()
+
+    from app.database import SessionLocal
+    from app.models.persona import backfill_prompt_blocks
+    with SessionLocal() as db:
+        print(f"   Persona prompt blocks rendered: {backfill_prompt_blocks(db)}")
     print("✅ Schema migrations complete!")
 except Exception as e:
     print(f"❌ Migration error: {e}")
@@ -13,10 +13,13 @@ Following TDD principles:
 - Use in-memory database where possible for speed
 """
 
+import asyncio
 import os
+import aiosqlite
 import pytest
 from typing import Generator, Dict, Any
 from sqlalchemy import create_engine, event as sa_event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
@@ -29,7 +32,11 @@ os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 from app.main import app
 
 # Import database components (Phase 2)
-from app.database import Base, get_db
+from app.database import Base, get_async_db, get_db
+from app.db_replicas import get_read_db
+from app.admission import admission
+from app.services.conversation_state import conversation_state
+from app.services.flag_rates import flag_rates
 from app.models import User, Persona
 from app.auth import create_access_token
 
@@ -60,10 +67,16 @@ def test_db_engine():
 
     # Create all tables for testing (Phase 2: User model, Phase 3B: Persona model)
     Base.metadata.create_all(bind=engine)
+    # Fresh database, so ids are reused: drop state cached for the last one
+    conversation_state.reset()
+    flag_rates.reset()
 
     yield engine
 
-    # Cleanup
+    # Cleanup (DROP TABLE deletes rows first; self-referencing RESTRICT
+    # keys such as conversations.parent_id would refuse it)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
     Base.metadata.drop_all(bind=engine)
     engine.dispose()
 
@@ -89,17 +102,51 @@ def db_session(test_db_engine) -> Generator[Session, None, None]:
         session.close()
 
 
+class _BorrowedAioConnection(aiosqlite.Connection):
+    """aiosqlite connection over an existing sqlite3 connection; close() leaves it open."""
+
+    async def close(self) -> None:
+        self._running = False
+        self._connection = None
+
+
+@pytest.fixture(scope="function")
+def async_db_engine(test_db_engine):
+    """
+    Async engine sharing test_db_engine's in-memory SQLite connection.
+
+    Endpoints on get_async_db then see the same data (and transaction) as
+    db_session, exactly like the sync endpoints do.
+    """
+    dbapi_connection = test_db_engine.raw_connection().driver_connection
+
+    async def connect():
+        return await _BorrowedAioConnection(lambda: dbapi_connection, iter_chunk_size=64)
+
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        async_creator=connect,
+        poolclass=StaticPool,
+        pool_reset_on_return=None,  # don't roll back db_session's work on checkin
+    )
+
+    yield engine
+
+    asyncio.run(engine.dispose())
+
+
 # ============================================================================
 # FastAPI Client Fixtures
 # ============================================================================
 
 @pytest.fixture(scope="function")
-def client(db_session) -> Generator[TestClient, None, None]:
+def client(db_session, async_db_engine) -> Generator[TestClient, None, None]:
     """
     Create a FastAPI test client with test database dependency override.
 
     Phase 2: Now includes database dependency override for testing endpoints
-    that require database access.
+    that require database access. Async endpoints get a session on the same
+    connection as db_session.
     """
     # Override the get_db dependency to use our test database session
     def override_get_db():
@@ -108,7 +155,18 @@ def client(db_session) -> Generator[TestClient, None, None]:
         finally:
             pass
 
+    TestingAsyncSessionLocal = async_sessionmaker(async_db_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db
+
+    # Each test starts with empty rate-limit buckets and in-flight counters
+    admission.reset()
 
     with TestClient(app) as test_client:
         yield test_client
@@ -268,3 +268,22 @@ class TestPersonaModerationIntegration:
             headers=auth_headers,
         )
         assert response.status_code == 201
+
+
+# ============================================================================
+# GET /admin/db-pool
+# ============================================================================
+
+class TestDbPoolMetrics:
+
+    def test_admin_gets_both_engines(self, client, admin_auth_headers):
+        response = client.get("/admin/db-pool", headers=admin_auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) == {"sync", "async", "replicas"}
+        assert data["replicas"] == []
+        assert "pool_class" in data["sync"]
+
+    def test_regular_user_gets_403(self, client, auth_headers):
+        response = client.get("/admin/db-pool", headers=auth_headers)
+        assert response.status_code == 403
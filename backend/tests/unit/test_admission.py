@@ -0,0 +1,237 @@
+"""
+Admission Control Tests
+
+Token bucket refill, per-user and global in-flight limits, daily budgets
+from usage_events, and the 429 + Retry-After response on generation
+endpoints.
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected, TokenBucket, admission
+from app.models.conversation import Conversation, ConversationParticipant
+from app.models.usage import UsageEvent
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def limits():
+    """Settings used by the controller tests: 60/min, burst 2, 2 per user, 3 total."""
+    with patch.multiple(
+        "app.admission.settings",
+        GENERATION_RATE_PER_MINUTE=60.0,
+        GENERATION_BURST=2,
+        GENERATION_MAX_IN_FLIGHT_PER_USER=2,
+        GENERATION_MAX_IN_FLIGHT=3,
+        USER_DAILY_TOKEN_BUDGET=0,
+        USER_DAILY_IMAGE_BUDGET=0,
+    ):
+        yield
+
+
+class TestTokenBucket:
+
+    def test_starts_full_and_refills(self):
+        bucket = TokenBucket(rate=1.0, capacity=2, now=0.0)
+        for _ in range(2):
+            assert bucket.wait_time(0.0) == 0.0
+            bucket.take()
+        assert bucket.wait_time(0.0) == pytest.approx(1.0)
+        assert bucket.wait_time(0.25) == pytest.approx(0.75)
+        assert bucket.wait_time(1.0) == 0.0
+
+    def test_refill_is_capped_at_capacity(self):
+        bucket = TokenBucket(rate=1.0, capacity=2, now=0.0)
+        bucket.wait_time(3600.0)
+        assert bucket.tokens == 2
+
+
+class TestAdmissionController:
+
+    def test_rate_limit_after_burst(self, clock, limits):
+        controller = AdmissionController(clock=clock)
+        controller.admit(1).release()
+        controller.admit(1).release()
+        with pytest.raises(AdmissionRejected) as exc:
+            controller.admit(1)
+        assert exc.value.retry_after == pytest.approx(1.0)
+        assert controller.rejected["rate"] == 1
+
+        clock.now += 1.0
+        controller.admit(1).release()
+
+    def test_rate_limit_is_per_user(self, clock, limits):
+        controller = AdmissionController(clock=clock)
+        for _ in range(2):
+            controller.admit(1).release()
+        controller.admit(2).release()
+
+    def test_per_user_in_flight(self, clock, limits):
+        controller = AdmissionController(clock=clock)
+        first = controller.admit(1)
+        controller.admit(1)
+        clock.now += 60
+        with pytest.raises(AdmissionRejected):
+            controller.admit(1)
+        assert controller.rejected["in_flight"] == 1
+
+        first.release()
+        first.release()  # idempotent
+        controller.admit(1)
+        assert controller.status()["in_flight_by_user"] == {1: 2}
+
+    def test_global_in_flight(self, clock, limits):
+        controller = AdmissionController(clock=clock)
+        controller.admit(1)
+        controller.admit(1)
+        controller.admit(2)
+        with pytest.raises(AdmissionRejected):
+            controller.admit(3)
+        assert controller.rejected["global_in_flight"] == 1
+
+    def test_rejection_does_not_consume_rate(self, clock, limits):
+        controller = AdmissionController(clock=clock)
+        controller.admit(1)
+        controller.admit(1)
+        with pytest.raises(AdmissionRejected):
+            controller.admit(1)
+        # The in-flight rejection left the bucket empty but untouched
+        assert controller._buckets[1].tokens == 0
+
+    def test_zero_disables_limits(self, clock):
+        controller = AdmissionController(clock=clock)
+        with patch.multiple(
+            "app.admission.settings",
+            GENERATION_RATE_PER_MINUTE=0.0,
+            GENERATION_MAX_IN_FLIGHT_PER_USER=0,
+            GENERATION_MAX_IN_FLIGHT=0,
+        ):
+            for _ in range(50):
+                controller.admit(1)
+        assert controller.status()["in_flight"] == 50
+
+
+class TestBudget:
+
+    @pytest.fixture
+    def spent(self, db_session, test_user):
+        db_session.add(UsageEvent(
+            service="llm", operation="conversation_turn", model="m", user_id=test_user.id,
+            input_tokens=800, output_tokens=200, images=1, created_at=datetime.now(timezone.utc),
+        ))
+        db_session.commit()
+
+    def test_token_budget_exhausted(self, clock, limits, db_session, test_user, spent):
+        controller = AdmissionController(clock=clock)
+        with patch("app.admission.settings.USER_DAILY_TOKEN_BUDGET", 1000):
+            with pytest.raises(AdmissionRejected) as exc:
+                controller.admit(test_user.id, db_session)
+        assert 0 < exc.value.retry_after <= 86400
+        assert controller.rejected["budget"] == 1
+        assert controller.status()["in_flight"] == 0
+
+    def test_under_budget_admitted(self, clock, limits, db_session, test_user, spent):
+        controller = AdmissionController(clock=clock)
+        with patch.multiple("app.admission.settings", USER_DAILY_TOKEN_BUDGET=1001, USER_DAILY_IMAGE_BUDGET=2):
+            controller.admit(test_user.id, db_session)
+
+    def test_image_budget_exhausted(self, clock, limits, db_session, test_user, spent):
+        controller = AdmissionController(clock=clock)
+        with patch("app.admission.settings.USER_DAILY_IMAGE_BUDGET", 1):
+            with pytest.raises(AdmissionRejected):
+                controller.admit(test_user.id, db_session)
+
+    def test_unflushed_usage_counts(self, clock, limits, db_session, test_user):
+        controller = AdmissionController(clock=clock)
+        with patch("app.services.usage.usage_recorder.pending", return_value=(5000, 0)), \
+                patch("app.admission.settings.USER_DAILY_TOKEN_BUDGET", 1000):
+            with pytest.raises(AdmissionRejected):
+                controller.admit(test_user.id, db_session)
+
+
+# ============================================================================
+# Endpoints
+# ============================================================================
+
+@pytest.fixture
+def conversation(db_session, test_user, test_personas):
+    conv = Conversation(topic="Should we colonize Mars?", created_by=test_user.id)
+    db_session.add(conv)
+    db_session.commit()
+    for persona in test_personas[:2]:
+        db_session.add(ConversationParticipant(conversation_id=conv.id, persona_id=persona.id))
+    db_session.commit()
+    return conv
+
+
+class TestGenerationEndpoints:
+
+    @pytest.fixture(autouse=True)
+    def fresh_admission(self):
+        admission.reset()
+        yield
+        admission.reset()
+
+    @patch("app.routers.conversations.ConversationOrchestrator")
+    def test_continue_rejected_with_retry_after(self, mock_orch_cls, client, auth_headers, conversation, test_user):
+        mock_orch_cls.return_value.generate_turn.return_value = []
+        with patch("app.admission.settings.GENERATION_MAX_IN_FLIGHT_PER_USER", 1):
+            admission.admit(test_user.id)
+            response = client.post(f"/conversations/{conversation.unique_id}/continue", headers=auth_headers)
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "5"
+        mock_orch_cls.return_value.generate_turn.assert_not_called()
+
+    @patch("app.routers.conversations.ConversationOrchestrator")
+    def test_continue_releases_slot(self, mock_orch_cls, client, auth_headers, conversation):
+        mock_orch_cls.return_value.generate_turn.return_value = []
+        response = client.post(f"/conversations/{conversation.unique_id}/continue", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert admission.status()["in_flight"] == 0
+
+    def test_rate_limited_continue(self, client, auth_headers, conversation):
+        with patch("app.routers.conversations.ConversationOrchestrator") as mock_orch_cls, \
+                patch.multiple("app.admission.settings", GENERATION_BURST=1, GENERATION_RATE_PER_MINUTE=1.0):
+            mock_orch_cls.return_value.generate_turn.return_value = []
+            url = f"/conversations/{conversation.unique_id}/continue"
+            assert client.post(url, headers=auth_headers).status_code == 200
+            response = client.post(url, headers=auth_headers)
+
+        assert response.status_code == 429
+        assert 55 <= int(response.headers["Retry-After"]) <= 60
+
+    def test_challenge_slot_released_once_queued(self, client, auth_headers):
+        response = client.post(
+            "/conversations/challenge", json={"proposal": "Four-day week", "n_personas": 3}, headers=auth_headers,
+        )
+        assert response.status_code == 201
+        assert admission.status()["in_flight"] == 0
+
+    def test_admin_status(self, client, db_session, test_user):
+        from app.auth import create_access_token
+
+        test_user.is_admin = True
+        db_session.commit()
+        response = client.get(
+            "/admin/admission", headers={"Authorization": f"Bearer {create_access_token(user_id=test_user.id)}"},
+        )
+        assert response.status_code == 200
+        assert set(response.json()) == {"in_flight", "in_flight_by_user", "rejected", "limits"}
@@ -40,9 +40,9 @@ def test_generate_challenge_personas(mock_calc, mock_img, mock_ocean, db_session
     mock_llm.generate_motto.return_value = "Change is bad."
 
     mock_ocean_inst = mock_ocean.return_value
-    mock_ocean_inst.infer_ocean_traits.return_value = {
+    mock_ocean_inst.infer_ocean_traits_batch.return_value = [{
         "openness": 0.1, "conscientiousness": 0.8, "extraversion": 0.4, "agreeableness": 0.2, "neuroticism": 0.5
-    }
+    }]
 
     mock_img_inst = mock_img.return_value
     mock_img_inst.generate_avatar_for_persona.return_value = "http://avatar.url"
@@ -110,7 +110,7 @@ def test_generate_challenge_personas_services_fail(mock_calc, mock_img, mock_oce
 
     # Mock services instances to raise exceptions when methods are called
     mock_ocean_inst = mock_ocean.return_value
-    mock_ocean_inst.infer_ocean_traits.side_effect = Exception("OCEAN fail")
+    mock_ocean_inst.infer_ocean_traits_batch.side_effect = Exception("OCEAN fail")
 
     mock_img_inst = mock_img.return_value
     mock_img_inst.generate_avatar_for_persona.side_effect = Exception("Image fail")
@@ -132,3 +132,90 @@ def test_generate_challenge_personas_services_fail(mock_calc, mock_img, mock_oce
     assert personas[0].name == "Fail Guy"
     # Verify fallback OCEAN scores (0.5)
     assert personas[0].ocean_openness == 0.5
+
+@patch("app.services.challenge_service.OceanInferenceService")
+@patch("app.services.challenge_service.ImageGenerationService")
+@patch("app.services.challenge_service.AffinityCalculator")
+def test_generate_challenge_personas_batches_ocean_inference(mock_calc, mock_img, mock_ocean, db_session, test_user):
+    mock_llm = MagicMock()
+    mock_response = MagicMock()
+    mock_response.content = [MagicMock(text='''[
+        {"name": "A", "description": "First."},
+        {"name": "B", "description": "Second."},
+        {"name": "C", "description": "Third."}
+    ]''')]
+    mock_llm.client.messages.create.return_value = mock_response
+    mock_llm.generate_motto.return_value = "Motto"
+
+    scores = {"openness": 0.2, "conscientiousness": 0.2, "extraversion": 0.2, "agreeableness": 0.2, "neuroticism": 0.2}
+    mock_ocean_inst = mock_ocean.return_value
+    mock_ocean_inst.infer_ocean_traits_batch.return_value = [scores, None, scores]
+    mock_img.return_value.generate_avatar_for_persona.return_value = None
+    mock_calc.return_value.calculate.return_value = {}
+
+    svc = ChallengeService(llm_service=mock_llm)
+    personas = svc.generate_challenge_personas(
+        db=db_session, user_id=test_user.id, proposal="P", challenge_type="Interview", n=3
+    )
+
+    mock_ocean_inst.infer_ocean_traits_batch.assert_called_once_with(["First.", "Second.", "Third."])
+    mock_ocean_inst.infer_ocean_traits.assert_not_called()
+    assert [p.ocean_openness for p in personas] == [0.2, 0.5, 0.2]
+
+FUSED_RESPONSE = '''[
+    {"name": "A", "description": "First.", "attitude": "Blunt",
+     "ocean": {"openness": 0.1, "conscientiousness": 0.2, "extraversion": 0.3, "agreeableness": 0.4, "neuroticism": 0.5},
+     "motto": "\\"Trust nothing.\\""},
+    {"name": "B", "description": "Second.",
+     "ocean": {"openness": 0.9},
+     "motto": ""},
+    {"name": "C", "description": "Third.",
+     "ocean": {"openness": 1.7, "conscientiousness": 0.2, "extraversion": 0.3, "agreeableness": 0.4, "neuroticism": 0.5},
+     "motto": "Keep it simple."}
+]'''
+
+
+@patch("app.services.challenge_service.OceanInferenceService")
+@patch("app.services.challenge_service.ImageGenerationService")
+def test_fused_generation_uses_inline_scores_and_mottos(mock_img, mock_ocean, db_session, test_user):
+    import threading
+
+    mock_llm = MagicMock()
+    mock_llm.client.messages.create.return_value = MagicMock(content=[MagicMock(text=FUSED_RESPONSE)])
+    mock_llm.generate_motto.return_value = "Generated motto"
+    scores = {"openness": 0.6, "conscientiousness": 0.6, "extraversion": 0.6, "agreeableness": 0.6, "neuroticism": 0.6}
+    mock_ocean.return_value.infer_ocean_traits_batch.return_value = [scores]
+
+    # All three avatar calls must be in flight at once to pass the barrier
+    barrier = threading.Barrier(3, timeout=5)
+
+    def avatar(details):
+        barrier.wait()
+        return f"avatars/{details['name']}.jpg"
+
+    mock_img.return_value.generate_avatar_for_persona.side_effect = avatar
+
+    svc = ChallengeService(llm_service=mock_llm)
+    personas = svc.generate_challenge_personas(
+        db=db_session, user_id=test_user.id, proposal="P", challenge_type="Interview", n=3, fused=True
+    )
+
+    prompt = mock_llm.client.messages.create.call_args.kwargs["messages"][0]["content"]
+    assert '"ocean"' in prompt and '"motto"' in prompt
+
+    # Only the persona with invalid scores is inferred; out-of-range scores are clamped
+    mock_ocean.return_value.infer_ocean_traits_batch.assert_called_once_with(["Second."])
+    assert [p.ocean_openness for p in personas] == [0.1, 0.6, 1.0]
+
+    # Only the empty motto is generated
+    mock_llm.generate_motto.assert_called_once()
+    assert [p.motto for p in personas] == ["Trust nothing.", "Generated motto", "Keep it simple."]
+    assert [p.avatar_url for p in personas] == ["avatars/A.jpg", "avatars/B.jpg", "avatars/C.jpg"]
+
+
+def test_unfused_template_unchanged():
+    from app.services.prompt_templates import ChallengePersonaGenerationTemplate
+
+    template = ChallengePersonaGenerationTemplate()
+    assert '"ocean"' not in template.render("P", "Debate", 3)
+    assert "7. Motto" in template.render("P", "Debate", 3, fused=True)
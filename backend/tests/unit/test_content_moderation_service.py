@@ -82,6 +82,31 @@ class TestContentModerationServiceInit:
         assert service.threshold == 0.5
 
 
+# ============================================================================
+# analyze_toxicity_batch Tests
+# ============================================================================
+
+class TestAnalyzeToxicityBatch:
+
+    def test_one_request_one_score_per_text(self):
+        from app.services.content_moderation_service import ContentModerationService
+        mock_client = make_mock_http_client(SAFE_SCORES)
+        mock_client.post.return_value.json.return_value["results"].append(
+            {"flagged": True, "category_scores": TOXIC_SCORES}
+        )
+        service = ContentModerationService(http_client=mock_client)
+
+        scores = service.analyze_toxicity_batch(["calm", "angry"])
+        assert scores == [pytest.approx(max(SAFE_SCORES.values())), pytest.approx(max(TOXIC_SCORES.values()))]
+        mock_client.post.assert_called_once()
+        assert mock_client.post.call_args.kwargs["json"] == {"input": ["calm", "angry"]}
+
+    def test_failure_or_short_response_fails_safe(self):
+        from app.services.content_moderation_service import ContentModerationService, FAIL_SAFE_SCORE
+        service = ContentModerationService(http_client=make_mock_http_client(SAFE_SCORES))
+        assert service.analyze_toxicity_batch(["a", "b"]) == [FAIL_SAFE_SCORE, FAIL_SAFE_SCORE]
+
+
 # ============================================================================
 # analyze_toxicity Tests
 # ============================================================================
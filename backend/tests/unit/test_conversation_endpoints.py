@@ -244,6 +244,109 @@ class TestUpdateConversation:
         assert response.status_code == 401
 
 
+# ============================================================================
+# GET /conversations/{unique_id}/messages - Incremental Polling
+# ============================================================================
+
+class TestConversationPolling:
+
+    def test_messages_since_zero_returns_all(
+        self, client, auth_headers, test_conversation_with_messages
+    ):
+        response = client.get(
+            f"/conversations/{test_conversation_with_messages.unique_id}/messages",
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["messages"]) == 2
+        assert data["turn_count"] == 1
+        assert data["status"] == "active"
+        assert data["last_message_id"] == data["messages"][-1]["id"]
+        assert len(data["participants"]) == 2
+
+    def test_messages_since_returns_only_newer(
+        self, client, auth_headers, test_conversation_with_messages
+    ):
+        all_msgs = client.get(
+            f"/conversations/{test_conversation_with_messages.unique_id}/messages",
+            headers=auth_headers,
+        ).json()["messages"]
+        first_id = all_msgs[0]["id"]
+
+        response = client.get(
+            f"/conversations/{test_conversation_with_messages.unique_id}/messages?since_id={first_id}",
+            headers=auth_headers,
+        )
+        data = response.json()
+        assert [m["id"] for m in data["messages"]] == [all_msgs[1]["id"]]
+
+    def test_messages_since_latest_is_empty(
+        self, client, auth_headers, test_conversation_with_messages
+    ):
+        last_id = client.get(
+            f"/conversations/{test_conversation_with_messages.unique_id}/messages",
+            headers=auth_headers,
+        ).json()["last_message_id"]
+        response = client.get(
+            f"/conversations/{test_conversation_with_messages.unique_id}/messages?since_id={last_id}",
+            headers=auth_headers,
+        )
+        data = response.json()
+        assert data["messages"] == []
+        assert data["last_message_id"] == last_id
+
+    def test_unchanged_poll_returns_304(
+        self, client, auth_headers, test_conversation_with_messages
+    ):
+        url = f"/conversations/{test_conversation_with_messages.unique_id}/messages?since_id=0"
+        first = client.get(url, headers=auth_headers)
+        etag = first.headers["ETag"]
+        assert etag.startswith('W/"')
+
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_injected_message_invalidates_etag(
+        self, client, auth_headers, test_conversation_with_messages
+    ):
+        unique_id = test_conversation_with_messages.unique_id
+        first = client.get(f"/conversations/{unique_id}", headers=auth_headers)
+        etag = first.headers["ETag"]
+
+        client.post(
+            f"/conversations/{unique_id}/message",
+            json={"text": "New point"},
+            headers=auth_headers,
+        )
+
+        response = client.get(
+            f"/conversations/{unique_id}",
+            headers={**auth_headers, "If-None-Match": etag},
+        )
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert len(response.json()["messages"]) == 3
+
+    def test_get_conversation_if_none_match_returns_304(
+        self, client, auth_headers, test_conversation
+    ):
+        first = client.get(f"/conversations/{test_conversation.unique_id}", headers=auth_headers)
+        response = client.get(
+            f"/conversations/{test_conversation.unique_id}",
+            headers={**auth_headers, "If-None-Match": first.headers["ETag"]},
+        )
+        assert response.status_code == 304
+
+    def test_messages_not_found(self, client, auth_headers):
+        response = client.get("/conversations/xxxxxx/messages", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_messages_requires_auth(self, client, test_conversation):
+        response = client.get(f"/conversations/{test_conversation.unique_id}/messages")
+        assert response.status_code == 401
+
+
 # ============================================================================
 # POST /conversations/{unique_id}/continue - Continue Conversation
 # ============================================================================
@@ -257,7 +360,7 @@ class TestContinueConversation:
         from app.models.conversation import ConversationMessage
 
         # Mock orchestrator to create real messages
-        def fake_generate_turn(conversation, personas, history, db):
+        def fake_generate_turn(conversation, personas, history, db, history_ids=None):
             msgs = []
             for p in personas:
                 msg = ConversationMessage(
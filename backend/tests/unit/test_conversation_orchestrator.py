@@ -120,6 +120,28 @@ class TestGenerateTurn:
         db_session.refresh(conv)
         assert conv.turn_count == 1
 
+    def test_concurrently_committed_turn_is_discarded(self, db_session, test_user, test_personas):
+        from app.services.conversation_orchestrator import ConversationOrchestrator, TurnConflictError
+        from app.models.conversation import Conversation, ConversationMessage
+
+        conv = Conversation(topic="Test", created_by=test_user.id)
+        db_session.add(conv)
+        db_session.commit()
+
+        def other_request_finishes_first(text):
+            db_session.query(Conversation).filter(Conversation.id == conv.id).update(
+                {Conversation.turn_count: 1}, synchronize_session=False
+            )
+            return 0.01
+
+        moderator = make_mock_moderator()
+        moderator.analyze_toxicity.side_effect = other_request_finishes_first
+        orchestrator = ConversationOrchestrator(llm_service=make_mock_llm(), moderation_service=moderator)
+        with pytest.raises(TurnConflictError):
+            orchestrator.generate_turn(conversation=conv, personas=test_personas, history=[], db=db_session)
+
+        assert db_session.query(ConversationMessage).filter_by(conversation_id=conv.id).count() == 0
+
     def test_calls_llm_for_each_persona(self, db_session, test_user, test_personas):
         from app.services.conversation_orchestrator import ConversationOrchestrator
         from app.models.conversation import Conversation
@@ -321,3 +343,184 @@ class TestGenerateTurn:
             assert len(messages) == 1
             # Verify score updated
             assert conv.participants[0].persuaded_score == 0.3
+
+
+# ============================================================================
+# Challenge mode: persuasion evaluation
+# ============================================================================
+
+class TestPersuasionEvaluation:
+
+    @pytest.fixture
+    def challenge(self, db_session, test_user, test_personas):
+        from app.models.conversation import Conversation, ConversationParticipant
+
+        conv = Conversation(topic="Challenge", proposal="Ban cars", is_challenge=True, created_by=test_user.id)
+        db_session.add(conv)
+        db_session.flush()
+        for i, p in enumerate(test_personas):
+            db_session.add(ConversationParticipant(
+                conversation_id=conv.id, persona_id=p.id, persuaded_score=round(0.1 * (i + 1), 1),
+            ))
+        db_session.commit()
+        db_session.refresh(conv)
+        return conv
+
+    def _run(self, db_session, conv, personas, evaluate, mode=None, generate=None):
+        from app.services.conversation_orchestrator import ConversationOrchestrator
+
+        with patch("app.services.challenge_service.ChallengeService") as svc_cls:
+            svc_cls.return_value.evaluate_persuasion.side_effect = evaluate
+            mock_llm = MagicMock()
+            mock_llm.client.messages.create.return_value.content = [MagicMock(text="Response")]
+            orchestrator = ConversationOrchestrator(
+                llm_service=mock_llm, moderation_service=make_mock_moderator(), evaluation_mode=mode,
+            )
+            if generate is not None:
+                orchestrator._generate_safe_message = generate
+            orchestrator.generate_turn(
+                conversation=conv, personas=personas,
+                history=[{"speaker": "User", "message": "Cities are quieter."}], db=db_session,
+            )
+        return svc_cls.return_value.evaluate_persuasion
+
+    def test_evaluations_run_concurrently(self, db_session, challenge, test_personas):
+        import threading
+
+        barrier = threading.Barrier(len(test_personas), timeout=5)
+
+        def evaluate(**kwargs):
+            barrier.wait()  # Only passes if all evaluations are in flight together
+            return {"new_score": kwargs["current_score"]}
+
+        with patch("app.services.conversation_orchestrator.settings.CHALLENGE_MAX_CONCURRENCY", 4):
+            evaluator = self._run(db_session, challenge, test_personas, evaluate)
+        assert evaluator.call_count == 3
+
+    def test_concurrency_is_bounded(self, db_session, challenge, test_personas):
+        import threading
+        import time
+
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def evaluate(**kwargs):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.02)
+            with lock:
+                state["active"] -= 1
+            return {"new_score": kwargs["current_score"]}
+
+        with patch("app.services.conversation_orchestrator.settings.CHALLENGE_MAX_CONCURRENCY", 1):
+            self._run(db_session, challenge, test_personas, evaluate)
+        assert state["peak"] == 1
+
+    def test_scores_applied_to_matching_participant(self, db_session, challenge, test_personas):
+        import time
+
+        def evaluate(persona_name, current_score, **kwargs):
+            # Finish in reverse order so completion order differs from submission order
+            time.sleep({"Analyst": 0.05, "Socialite": 0.02}.get(persona_name, 0))
+            return {"new_score": round(current_score + 0.5, 2)}
+
+        evaluator = self._run(db_session, challenge, test_personas, evaluate)
+
+        scores = {p.persona.name: p.persuaded_score for p in challenge.participants}
+        assert scores == {"Analyst": 0.6, "Socialite": 0.7, "Innovator": 0.8}
+        for c in evaluator.call_args_list:
+            assert c.kwargs["proposal"] == "Ban cars"
+            assert c.kwargs["message_text"] == "Cities are quieter."
+
+
+class TestEvaluationModes:
+    """Which persuaded_score each persona speaks with, per CHALLENGE_EVALUATION_MODE."""
+
+    challenge = TestPersuasionEvaluation.challenge
+    _run = TestPersuasionEvaluation._run
+
+    @staticmethod
+    def _recorder(seen, hook=None):
+        def generate(persona_details, persuaded_score, **kwargs):
+            seen[persona_details["name"]] = persuaded_score
+            if hook:
+                hook(persona_details["name"])
+            return "Response", 0.01, "approved"
+        return generate
+
+    @staticmethod
+    def _bump(**kwargs):
+        return {"new_score": round(kwargs["current_score"] + 0.5, 2)}
+
+    @pytest.mark.parametrize("mode", ["sync", "pipelined"])
+    def test_sync_and_pipelined_speak_with_updated_scores(self, mode, db_session, challenge, test_personas):
+        seen = {}
+        self._run(db_session, challenge, test_personas, self._bump, mode=mode, generate=self._recorder(seen))
+
+        expected = {"Analyst": 0.6, "Socialite": 0.7, "Innovator": 0.8}
+        assert seen == expected
+        assert {p.persona.name: p.persuaded_score for p in challenge.participants} == expected
+
+    def test_deferred_speaks_with_previous_scores(self, db_session, challenge, test_personas):
+        seen = {}
+        self._run(db_session, challenge, test_personas, self._bump, mode="deferred", generate=self._recorder(seen))
+
+        assert seen == {"Analyst": 0.1, "Socialite": 0.2, "Innovator": 0.3}
+        # Applied once the turn ends, so the next turn sees them
+        scores = {p.persona.name: p.persuaded_score for p in challenge.participants}
+        assert scores == {"Analyst": 0.6, "Socialite": 0.7, "Innovator": 0.8}
+
+    def test_pipelined_overlaps_generation_with_later_evaluations(self, db_session, challenge, test_personas):
+        import threading
+
+        analyst_spoke = threading.Event()
+
+        def evaluate(persona_name, **kwargs):
+            if persona_name != "Analyst":
+                # Would time out if generation waited for every evaluation
+                assert analyst_spoke.wait(timeout=5)
+            return self._bump(**kwargs)
+
+        seen = {}
+        hook = lambda name: analyst_spoke.set() if name == "Analyst" else None
+        self._run(db_session, challenge, test_personas, evaluate, mode="pipelined", generate=self._recorder(seen, hook))
+        assert seen == {"Analyst": 0.6, "Socialite": 0.7, "Innovator": 0.8}
+
+    def test_deferred_overlaps_whole_turn(self, db_session, challenge, test_personas):
+        import threading
+
+        turn_done = threading.Event()
+
+        def evaluate(**kwargs):
+            assert turn_done.wait(timeout=5)
+            return self._bump(**kwargs)
+
+        seen = {}
+        hook = lambda name: turn_done.set() if name == "Innovator" else None
+        self._run(db_session, challenge, test_personas, evaluate, mode="deferred", generate=self._recorder(seen, hook))
+        assert seen == {"Analyst": 0.1, "Socialite": 0.2, "Innovator": 0.3}
+        assert challenge.participants[0].persuaded_score == 0.6
+
+    def test_non_speaking_participants_still_scored(self, db_session, challenge, test_personas):
+        seen = {}
+        self._run(db_session, challenge, test_personas[:1], self._bump, mode="pipelined", generate=self._recorder(seen))
+        assert seen == {"Analyst": 0.6}
+        assert sorted(p.persuaded_score for p in challenge.participants) == [0.6, 0.7, 0.8]
+
+    def test_unknown_mode_rejected(self):
+        from app.services.conversation_orchestrator import ConversationOrchestrator
+
+        with pytest.raises(ValueError):
+            ConversationOrchestrator(
+                llm_service=make_mock_llm(), moderation_service=make_mock_moderator(), evaluation_mode="eager",
+            )
+
+    def test_default_mode_from_settings(self):
+        from app.services.conversation_orchestrator import ConversationOrchestrator
+
+        with patch("app.services.conversation_orchestrator.settings.CHALLENGE_EVALUATION_MODE", "deferred"):
+            orchestrator = ConversationOrchestrator(
+                llm_service=make_mock_llm(), moderation_service=make_mock_moderator(),
+            )
+        assert orchestrator.evaluation_mode == "deferred"
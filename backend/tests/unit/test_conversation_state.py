@@ -0,0 +1,186 @@
+"""
+Conversation State Cache Tests
+
+Loading and reusing turn inputs, appending committed turns, staleness
+checks against the conversation row, explicit invalidation by the writing
+endpoints, and the /continue integration.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.models.conversation import Conversation, ConversationMessage, ConversationParticipant
+from app.services.conversation_orchestrator import ConversationOrchestrator
+from app.services.conversation_state import ConversationStateCache, PersonaSnapshot, conversation_state
+from app.services.fork_service import attach_transcript, copy_participants, detach_forks
+
+
+@pytest.fixture
+def conversation(db_session, test_user, test_personas):
+    conv = Conversation(topic="Should we colonize Mars?", created_by=test_user.id)
+    db_session.add(conv)
+    db_session.flush()
+    for persona in test_personas[:2]:
+        db_session.add(ConversationParticipant(conversation_id=conv.id, persona_id=persona.id))
+    db_session.add_all([
+        ConversationMessage(conversation_id=conv.id, persona_name="Analyst", message_text="Yes", turn_number=1),
+        ConversationMessage(
+            conversation_id=conv.id, persona_name="Socialite", message_text="(hidden)", turn_number=1,
+            moderation_status="flagged",
+        ),
+        ConversationMessage(
+            conversation_id=conv.id, persona_name="Me", message_text="Why?", turn_number=1,
+            moderation_status="user",
+        ),
+    ])
+    conv.turn_count = 1
+    db_session.commit()
+    return conv
+
+
+def _turn(db_session, conversation, texts):
+    """Commit a turn the way the orchestrator does and return its messages."""
+    msgs = [
+        ConversationMessage(
+            conversation_id=conversation.id, persona_name=name, message_text=text,
+            turn_number=conversation.turn_count + 1, moderation_status=status,
+        )
+        for name, text, status in texts
+    ]
+    db_session.add_all(msgs)
+    conversation.turn_count += 1
+    db_session.commit()
+    return msgs
+
+
+class TestConversationStateCache:
+
+    def test_load_and_reuse(self, db_session, conversation, test_personas):
+        cache = ConversationStateCache()
+        state = cache.get(conversation, db_session)
+
+        assert [p.name for p in state.personas] == ["Analyst", "Socialite"]
+        assert state.personas[0].details["ocean_scores"]["openness"] == test_personas[0].ocean_openness
+        assert state.history == [{"speaker": "Analyst", "message": "Yes"}, {"speaker": "Me", "message": "Why?"}]
+        assert len(state.history_ids) == 2
+
+        assert cache.get(conversation, db_session) is state
+        assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+    def test_advance_appends_without_reloading(self, db_session, conversation):
+        cache = ConversationStateCache()
+        state = cache.get(conversation, db_session)
+        msgs = _turn(db_session, conversation, [
+            ("Analyst", "Still yes", "approved"), ("Socialite", "(bad)", "flagged"),
+        ])
+        cache.advance(conversation, state, msgs)
+
+        with patch.object(Conversation, "transcript_query", side_effect=AssertionError("reloaded")):
+            again = cache.get(conversation, db_session)
+        assert again is state
+        assert state.history[-1] == {"speaker": "Analyst", "message": "Still yes"}
+        assert state.history_ids[-1] == msgs[0].id
+        assert len(state.history) == len(state.history_ids) == 3
+
+    def test_turn_from_elsewhere_is_a_miss(self, db_session, conversation):
+        cache = ConversationStateCache()
+        cache.get(conversation, db_session)
+        # Another instance generated a turn; this cache never saw it
+        _turn(db_session, conversation, [("Analyst", "Elsewhere", "approved")])
+
+        state = cache.get(conversation, db_session)
+        assert state.history[-1]["message"] == "Elsewhere"
+        assert cache.stats()["misses"] == 2
+
+    def test_participant_change_is_a_miss(self, db_session, conversation, test_personas):
+        cache = ConversationStateCache()
+        cache.get(conversation, db_session)
+        db_session.add(ConversationParticipant(conversation_id=conversation.id, persona_id=test_personas[2].id))
+        db_session.commit()
+        db_session.expire(conversation, ["participants"])
+
+        assert len(cache.get(conversation, db_session).personas) == 3
+
+    def test_advance_ignores_replaced_state(self, db_session, conversation):
+        cache = ConversationStateCache()
+        state = cache.get(conversation, db_session)
+        cache.invalidate(conversation.id)
+        cache.advance(conversation, state, _turn(db_session, conversation, [("Analyst", "x", "approved")]))
+        assert len(state.history) == 2
+
+    def test_lru_and_disabled(self, db_session, conversation):
+        disabled = ConversationStateCache(max_entries=0)
+        disabled.get(conversation, db_session)
+        assert disabled.stats()["entries"] == 0
+
+        cache = ConversationStateCache(max_entries=1)
+        cache.get(conversation, db_session)
+        assert cache.stats()["entries"] == 1
+
+    def test_orchestrator_uses_snapshot_details(self):
+        snapshot = PersonaSnapshot(1, "Analyst", {"name": "Analyst", "attitude": "Cached"})
+        orchestrator = ConversationOrchestrator(llm_service=object(), moderation_service=object())
+        assert orchestrator._build_persona_details(snapshot) == {"name": "Analyst", "attitude": "Cached"}
+
+
+class TestInvalidation:
+
+    def test_message_injection(self, client, auth_headers, conversation, db_session):
+        conversation_state.get(conversation, db_session)
+        client.post(
+            f"/conversations/{conversation.unique_id}/message", json={"text": "New point"}, headers=auth_headers,
+        )
+        assert conversation_state.stats()["invalidations"] == 1
+
+        db_session.expire_all()
+        assert conversation_state.get(conversation, db_session).history[-1]["message"] == "New point"
+
+    def test_visibility_and_delete(self, client, auth_headers, conversation, db_session):
+        url = f"/conversations/{conversation.unique_id}"
+        conversation_state.get(conversation, db_session)
+        client.patch(f"{url}/visibility", json={"is_public": False}, headers=auth_headers)
+        assert conversation_state.stats()["invalidations"] == 1
+
+        conversation_state.get(conversation, db_session)
+        client.delete(url, headers=auth_headers)
+        assert conversation_state.stats()["entries"] == 0
+
+    def test_detached_fork(self, db_session, conversation, test_user):
+        fork = Conversation(topic=conversation.topic, created_by=test_user.id, turn_count=conversation.turn_count)
+        db_session.add(fork)
+        db_session.flush()
+        copy_participants(db_session, conversation.id, fork.id)
+        attach_transcript(db_session, conversation, fork)
+        db_session.commit()
+        conversation_state.get(fork, db_session)
+
+        detach_forks(db_session, conversation)
+        assert conversation_state.stats()["invalidations"] == 1
+
+
+class TestContinueUsesCache:
+
+    def test_consecutive_turns_append(self, client, auth_headers, conversation):
+        seen = []
+
+        def generate_turn(conversation, personas, history, db, history_ids=None):
+            seen.append(list(history))
+            msg = ConversationMessage(
+                conversation_id=conversation.id, persona_id=personas[0].id, persona_name=personas[0].name,
+                message_text=f"Turn {conversation.turn_count + 1}", turn_number=conversation.turn_count + 1,
+            )
+            db.add(msg)
+            conversation.turn_count += 1
+            db.commit()
+            return [msg]
+
+        url = f"/conversations/{conversation.unique_id}/continue"
+        with patch("app.routers.conversations.ConversationOrchestrator") as orch_cls:
+            orch_cls.return_value.generate_turn.side_effect = generate_turn
+            client.post(url, headers=auth_headers)
+            with patch.object(Conversation, "transcript_query", side_effect=AssertionError("reloaded")):
+                assert client.post(url, headers=auth_headers).status_code == 200
+
+        assert [h["message"] for h in seen[1]] == ["Yes", "Why?", "Turn 2"]
+        assert conversation_state.stats()["hits"] == 1
@@ -0,0 +1,119 @@
+"""
+Database Module Tests
+
+Tests for the async engine/session support in app/database.py.
+"""
+
+import asyncio
+import importlib
+import inspect
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_database_url, pool_options
+from app.db_pool import InstrumentedQueuePool, pool_status
+from app.models.user import User
+
+
+class TestAsyncDatabaseUrl:
+
+    @pytest.mark.parametrize("url,expected", [
+        ("postgresql://u:p@db:5432/app", "postgresql+asyncpg://u:p@db:5432/app"),
+        ("postgresql+psycopg2://u:p@db/app", "postgresql+asyncpg://u:p@db/app"),
+        ("sqlite:///./dev.db", "sqlite+aiosqlite:///./dev.db"),
+        ("sqlite:///:memory:", "sqlite+aiosqlite:///:memory:"),
+    ])
+    def test_translates_sync_drivers(self, url, expected):
+        assert async_database_url(url) == expected
+
+    def test_async_url_unchanged(self):
+        url = "postgresql+asyncpg://u:p@db/app"
+        assert async_database_url(url) == url
+
+    def test_password_preserved(self):
+        assert "s3cret" in async_database_url("postgresql://u:s3cret@db/app")
+
+
+class TestPoolConfiguration:
+
+    def test_pool_options_follow_settings(self):
+        with patch("app.database.settings") as mock_settings:
+            mock_settings.DB_POOL_SIZE = 20
+            mock_settings.DB_MAX_OVERFLOW = 0
+            mock_settings.DB_POOL_TIMEOUT = 5
+            mock_settings.DB_POOL_RECYCLE = 300
+            mock_settings.DB_ECHO = False
+            options = pool_options()
+        assert options == {
+            "pool_size": 20, "max_overflow": 0, "pool_timeout": 5,
+            "pool_recycle": 300, "echo": False,
+        }
+
+    def test_echo_off_by_default(self):
+        from app.config import Settings
+        assert Settings(_env_file=None).DB_ECHO is False
+
+
+class TestInstrumentedPool:
+
+    @pytest.fixture
+    def engine(self):
+        engine = create_engine(
+            "sqlite://", poolclass=InstrumentedQueuePool,
+            pool_size=1, max_overflow=0, pool_timeout=0.05,
+        )
+        yield engine
+        engine.dispose()
+
+    def test_counts_checkouts(self, engine):
+        engine.connect().close()
+        engine.connect().close()
+        status = pool_status(engine)
+        assert status["checkouts"] == 2
+        assert status["waits"] == 0
+        assert status["size"] == 1
+
+    def test_exhausted_pool_records_wait_and_timeout(self, engine):
+        held = engine.connect()
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        held.close()
+
+        status = pool_status(engine)
+        assert status["timeouts"] == 1
+        assert status["waits"] == 1
+        assert status["avg_wait_ms"] >= 40
+
+    def test_stats_survive_dispose(self, engine):
+        engine.connect().close()
+        engine.dispose()
+        assert pool_status(engine)["checkouts"] == 1
+
+
+class TestAsyncSession:
+
+    def test_async_engine_sees_db_session_data(self, async_db_engine, db_session, test_user):
+        async def load():
+            async with AsyncSession(async_db_engine) as session:
+                return await session.scalar(select(User.email).where(User.id == test_user.id))
+
+        assert asyncio.run(load()) == test_user.email
+
+
+class TestAsyncEndpoints:
+
+    @pytest.mark.parametrize("module,name", [
+        ("app.routers.conversations", "get_conversation"),
+        ("app.routers.conversations", "get_conversation_messages"),
+        ("app.routers.conversations", "list_conversations"),
+        ("app.routers.personas", "get_persona"),
+        ("app.routers.discovery", "discover"),
+        ("app.routers.discovery", "public_conversation"),
+    ])
+    def test_hot_read_paths_are_async(self, module, name):
+        endpoint = getattr(importlib.import_module(module), name)
+        assert inspect.iscoroutinefunction(endpoint)
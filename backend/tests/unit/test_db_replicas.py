@@ -0,0 +1,174 @@
+"""
+Read-Replica Routing Tests
+
+Routing is exercised end-to-end with two SQLite files standing in for the
+primary and a replica.
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.auth import create_access_token
+from app.database import Base
+from app.db_replicas import ReadYourWrites, ReplicaSet, RoutingSession, request_user_id
+from app.models.user import User
+
+
+def _seed(path, email):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert().values(email=email, google_id=email, name=email))
+    engine.dispose()
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary_path, replica_path = tmp_path / "primary.db", tmp_path / "replica.db"
+    _seed(primary_path, "primary@example.com")
+    _seed(replica_path, "replica@example.com")
+    primary = create_async_engine(f"sqlite+aiosqlite:///{primary_path}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{replica_path}")
+    yield primary, replica
+
+    async def dispose():
+        await primary.dispose()
+        await replica.dispose()
+    asyncio.run(dispose())
+
+
+def _run_steps(session_factory, *steps):
+    async def run():
+        async with session_factory() as session:
+            return [await step(session) for step in steps]
+    return asyncio.run(run())
+
+
+async def _read_emails(session, **options):
+    return (await session.scalars(select(User.email).execution_options(**options))).all()
+
+
+class TestRoutingSession:
+
+    def _factory(self, primary, replica):
+        return lambda: AsyncSession(
+            primary, sync_session_class=RoutingSession,
+            replica=replica.sync_engine if replica else None,
+        )
+
+    def test_reads_go_to_replica(self, databases):
+        primary, replica = databases
+        [emails] = _run_steps(self._factory(primary, replica), _read_emails)
+        assert emails == ["replica@example.com"]
+
+    def test_without_replica_reads_primary(self, databases):
+        primary, _ = databases
+        [emails] = _run_steps(self._factory(primary, None), _read_emails)
+        assert emails == ["primary@example.com"]
+
+    def test_use_primary_option(self, databases):
+        primary, replica = databases
+        [emails] = _run_steps(self._factory(primary, replica), lambda s: _read_emails(s, use_primary=True))
+        assert emails == ["primary@example.com"]
+
+    def test_writes_go_to_primary_and_pin_session(self, databases):
+        primary, replica = databases
+
+        async def write(session):
+            session.add(User(email="new@example.com", google_id="new", name="New"))
+            await session.flush()
+
+        _, emails = _run_steps(self._factory(primary, replica), write, _read_emails)
+        assert sorted(emails) == ["new@example.com", "primary@example.com"]
+
+
+class TestReplicaSet:
+
+    def test_round_robin(self):
+        a, b = MagicMock(), MagicMock()
+        with patch("app.db_replicas.event"):
+            replica_set = ReplicaSet([a, b])
+        assert [replica_set.choose() for _ in range(4)] == [a, b, a, b]
+
+    def test_unhealthy_replica_skipped_until_retry(self):
+        a, b = MagicMock(), MagicMock()
+        with patch("app.db_replicas.event"):
+            replica_set = ReplicaSet([a, b], retry_seconds=30)
+        with patch("app.db_replicas.time.monotonic", return_value=100.0):
+            replica_set.mark_down(a)
+            assert {replica_set.choose() for _ in range(4)} == {b}
+        with patch("app.db_replicas.time.monotonic", return_value=131.0):
+            assert a in {replica_set.choose() for _ in range(2)}
+
+    def test_all_down_falls_back_to_primary(self):
+        a = MagicMock()
+        with patch("app.db_replicas.event"):
+            replica_set = ReplicaSet([a])
+        replica_set.mark_down(a)
+        assert replica_set.choose() is None
+
+    def test_no_replicas(self):
+        assert ReplicaSet([]).choose() is None
+
+    def test_connection_error_marks_replica_down(self, tmp_path):
+        broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/dir/replica.db")
+        replica_set = ReplicaSet([broken])
+
+        async def connect():
+            async with broken.connect():
+                pass
+
+        with pytest.raises(Exception):
+            asyncio.run(connect())
+        assert replica_set.is_healthy(broken) is False
+        assert replica_set.status()[0]["healthy"] is False
+
+
+class TestReadYourWrites:
+
+    def test_sticky_within_window(self):
+        ryw = ReadYourWrites(window_seconds=5)
+        with patch("app.db_replicas.time.monotonic", return_value=10.0):
+            ryw.mark(7)
+        with patch("app.db_replicas.time.monotonic", return_value=14.0):
+            assert ryw.is_sticky(7) is True
+            assert ryw.is_sticky(8) is False
+        with patch("app.db_replicas.time.monotonic", return_value=15.5):
+            assert ryw.is_sticky(7) is False
+
+    def test_anonymous_never_sticky(self):
+        ryw = ReadYourWrites(window_seconds=5)
+        ryw.mark(None)
+        assert ryw.is_sticky(None) is False
+
+    def test_request_user_id(self):
+        request = MagicMock()
+        request.headers = {"authorization": f"Bearer {create_access_token(user_id=42)}"}
+        assert request_user_id(request) == 42
+        request.headers = {"authorization": "Bearer not-a-jwt"}
+        assert request_user_id(request) is None
+        request.headers = {}
+        assert request_user_id(request) is None
+
+
+class TestStickinessMiddleware:
+
+    def test_successful_write_marks_user(self, client, auth_headers, test_user, test_persona):
+        with patch("app.main.replicas") as mock_replicas, patch("app.main.read_your_writes") as ryw:
+            mock_replicas.engines = [MagicMock()]
+            response = client.patch(
+                f"/personas/{test_persona.unique_id}/visibility",
+                json={"is_public": False}, headers=auth_headers,
+            )
+        assert response.status_code == 200
+        ryw.mark.assert_called_once_with(test_user.id)
+
+    def test_reads_do_not_mark(self, client, auth_headers):
+        with patch("app.main.replicas") as mock_replicas, patch("app.main.read_your_writes") as ryw:
+            mock_replicas.engines = [MagicMock()]
+            client.get("/discover", headers=auth_headers)
+        ryw.mark.assert_not_called()
@@ -156,6 +156,19 @@ class TestPublicConversation:
         data = response.json()
         assert data["is_owner"] is True
 
+    def test_repeat_view_with_etag_returns_304(self, client, public_conversation):
+        first = client.get(f"/c/{public_conversation.unique_id}")
+        response = client.get(
+            f"/c/{public_conversation.unique_id}",
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+        assert response.status_code == 304
+
+    def test_etag_differs_for_owner(self, client, auth_headers, public_conversation):
+        anon = client.get(f"/c/{public_conversation.unique_id}")
+        owner = client.get(f"/c/{public_conversation.unique_id}", headers=auth_headers)
+        assert anon.headers["ETag"] != owner.headers["ETag"]
+
 
 # ============================================================================
 # POST /p/{unique_id}/upvote
@@ -297,6 +310,56 @@ class TestForkConversation:
         data = response.json()
         assert data["topic"] == "My custom topic"
 
+    def test_fork_shares_transcript_with_reply_links(
+        self, client, auth_headers, public_conversation, public_persona, db_session
+    ):
+        from app.models.conversation import Conversation, ConversationMessage
+        first = ConversationMessage(
+            conversation_id=public_conversation.id, persona_id=public_persona.id,
+            persona_name=public_persona.name, message_text="First", turn_number=1,
+        )
+        db_session.add(first)
+        db_session.flush()
+        db_session.add(ConversationMessage(
+            conversation_id=public_conversation.id, persona_id=public_persona.id,
+            persona_name=public_persona.name, message_text="Second", turn_number=1,
+            reply_to_id=first.id,
+        ))
+        public_conversation.turn_count = 1
+        db_session.commit()
+
+        response = client.post(
+            f"/conversations/{public_conversation.unique_id}/fork",
+            json={},
+            headers=auth_headers,
+        )
+        assert response.status_code == 201
+        data = response.json()
+        assert data["turn_count"] == 1
+        assert [p["persona_unique_id"] for p in data["participants"]] == [public_persona.unique_id]
+        texts = [m["message_text"] for m in data["messages"]]
+        assert texts == ["First", "Second"]
+        assert data["messages"][1]["reply_to_id"] == data["messages"][0]["id"]
+        assert data["messages"][1]["reply_to_text"] == "First"
+        assert data["fork_point_turn"] == 1
+
+        # Copy-on-write: the fork owns no rows until it diverges
+        fork = db_session.query(Conversation).filter_by(unique_id=data["unique_id"]).first()
+        assert db_session.query(ConversationMessage).filter_by(conversation_id=fork.id).count() == 0
+
+        poll = client.get(f"/conversations/{data['unique_id']}/messages", headers=auth_headers)
+        assert [m["message_text"] for m in poll.json()["messages"]] == ["First", "Second"]
+
+    def test_fork_with_own_personas(self, client, auth_headers, public_conversation, private_persona):
+        response = client.post(
+            f"/conversations/{public_conversation.unique_id}/fork",
+            json={"persona_ids": [private_persona.unique_id]},
+            headers=auth_headers,
+        )
+        assert response.status_code == 201
+        data = response.json()
+        assert [p["persona_unique_id"] for p in data["participants"]] == [private_persona.unique_id]
+
     def test_fork_nonexistent_returns_404(self, client, auth_headers):
         response = client.post(
             "/conversations/xxxxxx/fork",
@@ -344,6 +407,28 @@ class TestForceDelete:
         )
         assert response.status_code == 204
 
+    def test_force_delete_conversation_keeps_fork_transcript(
+        self, client, superuser_headers, auth_headers, public_conversation, public_persona, db_session
+    ):
+        from app.models.conversation import ConversationMessage
+        db_session.add(ConversationMessage(
+            conversation_id=public_conversation.id, persona_id=public_persona.id,
+            persona_name=public_persona.name, message_text="Shared", turn_number=1,
+        ))
+        db_session.commit()
+        fork_id = client.post(
+            f"/conversations/{public_conversation.unique_id}/fork", json={}, headers=auth_headers,
+        ).json()["unique_id"]
+
+        response = client.delete(
+            f"/conversations/{public_conversation.unique_id}/force",
+            headers=superuser_headers,
+        )
+        assert response.status_code == 204
+
+        fork = client.get(f"/conversations/{fork_id}", headers=auth_headers).json()
+        assert [m["message_text"] for m in fork["messages"]] == ["Shared"]
+
     def test_force_delete_conversation_non_superuser(self, client, auth_headers, public_conversation):
         response = client.delete(
             f"/conversations/{public_conversation.unique_id}/force",
@@ -0,0 +1,311 @@
+"""
+Batch Experiment Tests
+
+Matrix expansion, cell creation and queueing, running cells through the job
+worker, resume / cancel, JSONL and Parquet export, and the endpoints.
+"""
+
+import io
+import json
+import sys
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import experiments as experiments_cli
+from app.admission import AdmissionRejected
+from app.auth import create_access_token
+from app.models.conversation import Conversation, ConversationMessage
+from app.models.experiment import ExperimentRun
+from app.models.job import Job
+from app.models.user import User
+from app.services.experiments import (
+    cancel_experiment,
+    create_experiment,
+    expand_matrix,
+    experiment_progress,
+    export_rows,
+    resume_experiment,
+    write_jsonl,
+    write_parquet,
+)
+from app.services.job_handlers import AUTO_RUN
+from app.services.job_queue import JobWorker
+
+
+@pytest.fixture
+def worker(test_db_engine):
+    return JobWorker(session_factory=sessionmaker(bind=test_db_engine), worker_id="w1", poll_interval=0)
+
+
+@pytest.fixture
+def experiment(db_session, test_user, test_personas):
+    a, b, c = (p.unique_id for p in test_personas)
+    experiment = create_experiment(
+        db_session, test_user.id, "Mars vs Moon",
+        topics=["Colonize Mars?", "Return to the Moon?"],
+        persona_sets=[[a, b], [b, c]],
+        turns=[2],
+    )
+    db_session.commit()
+    return experiment
+
+
+@pytest.fixture
+def orchestrator():
+    """Patched ConversationOrchestrator whose turns write one message per persona."""
+    def generate_turn(conversation, personas, history, db, history_ids=None):
+        turn = conversation.turn_count + 1
+        msgs = [
+            ConversationMessage(
+                conversation_id=conversation.id, persona_id=p.id, persona_name=p.name,
+                message_text=f"{conversation.topic} turn {turn} from {p.name}", turn_number=turn,
+            )
+            for p in personas
+        ]
+        db.add_all(msgs)
+        conversation.turn_count = turn
+        db.commit()
+        return msgs
+
+    with patch("app.services.job_handlers.ConversationOrchestrator") as cls:
+        cls.return_value.generate_turn.side_effect = generate_turn
+        yield cls.return_value
+
+
+def _drain(worker):
+    while worker.run_once():
+        pass
+
+
+class TestCreateExperiment:
+
+    def test_expand_matrix(self):
+        assert expand_matrix(["a", "b"], 2, [3, 5]) == [
+            ("a", 0, 3), ("a", 0, 5), ("a", 1, 3), ("a", 1, 5),
+            ("b", 0, 3), ("b", 0, 5), ("b", 1, 3), ("b", 1, 5),
+        ]
+
+    def test_one_private_conversation_and_job_per_cell(self, db_session, experiment, test_personas):
+        runs = experiment.runs
+        assert [(r.topic, r.persona_set) for r in runs] == [
+            ("Colonize Mars?", 0), ("Colonize Mars?", 1), ("Return to the Moon?", 0), ("Return to the Moon?", 1),
+        ]
+        conversation = runs[1].conversation
+        assert (conversation.max_turns, conversation.is_public) == (2, False)
+        assert {p.persona_id for p in conversation.participants} == {test_personas[1].id, test_personas[2].id}
+
+        jobs = db_session.query(Job).all()
+        assert len(jobs) == 4
+        assert {(j.kind, j.status) for j in jobs} == {(AUTO_RUN, "queued")}
+        assert {j.conversation_id for j in jobs} == {r.conversation_id for r in runs}
+
+    def test_missing_personas(self, db_session, test_user, test_personas):
+        with pytest.raises(LookupError, match="nope"):
+            create_experiment(db_session, test_user.id, "x", ["t"], [[test_personas[0].unique_id, "nope"]], [1])
+
+    def test_cell_limit(self, db_session, test_user, test_personas):
+        with patch("app.services.experiments.settings.EXPERIMENT_MAX_CELLS", 3):
+            with pytest.raises(ValueError, match="4 cells"):
+                create_experiment(
+                    db_session, test_user.id, "x", ["a", "b"], [[test_personas[0].unique_id]], [1, 2],
+                )
+
+
+class TestRunExperiment:
+
+    def test_workers_run_every_cell(self, db_session, worker, experiment, orchestrator):
+        assert experiment_progress(db_session, experiment)["queued"] == 4
+
+        _drain(worker)
+        db_session.expire_all()
+
+        progress = experiment_progress(db_session, experiment)
+        assert progress == {
+            "cells": 4, "completed": 4, "running": 0, "queued": 0, "stopped": 0,
+            "turns_completed": 8, "turns_total": 8, "is_finished": True,
+        }
+
+    def test_resume_continues_stopped_cells(self, db_session, worker, experiment, orchestrator):
+        calls = {"n": 0}
+        generate = orchestrator.generate_turn.side_effect
+
+        def fail_first_cell_turn_two(conversation, *args, **kwargs):
+            calls["n"] += 1
+            if conversation.id == experiment.runs[0].conversation_id and conversation.turn_count == 1:
+                raise ValueError("persona left")
+            return generate(conversation, *args, **kwargs)
+
+        orchestrator.generate_turn.side_effect = fail_first_cell_turn_two
+        _drain(worker)
+        db_session.expire_all()
+        progress = experiment_progress(db_session, experiment)
+        assert (progress["completed"], progress["stopped"], progress["turns_completed"]) == (3, 1, 7)
+
+        orchestrator.generate_turn.side_effect = generate
+        assert resume_experiment(db_session, experiment) == 1
+        db_session.commit()
+        job = db_session.query(Job).filter(Job.status == "queued").one()
+        assert job.payload["start_turn"] == 1
+
+        _drain(worker)
+        db_session.expire_all()
+        assert experiment_progress(db_session, experiment)["completed"] == 4
+        # Nothing left to resume
+        assert resume_experiment(db_session, experiment) == 0
+
+    def test_resume_over_budget_queues_nothing(self, db_session, experiment):
+        cancel_experiment(db_session, experiment)
+        db_session.commit()
+
+        with patch("app.admission.daily_usage", return_value=(100, 0)), \
+                patch("app.admission.settings.USER_DAILY_TOKEN_BUDGET", 100):
+            with pytest.raises(AdmissionRejected):
+                resume_experiment(db_session, experiment)
+        assert db_session.query(Job).filter(Job.status == "queued").count() == 0
+
+    def test_cancel(self, db_session, worker, experiment):
+        assert cancel_experiment(db_session, experiment) == 4
+        db_session.commit()
+
+        assert worker.run_once() is False
+        progress = experiment_progress(db_session, experiment)
+        assert (progress["stopped"], progress["is_finished"]) == (4, True)
+
+
+class TestExport:
+
+    def test_jsonl_rows(self, db_session, worker, experiment, orchestrator, test_personas):
+        _drain(worker)
+        db_session.expire_all()
+
+        buffer = io.StringIO()
+        assert write_jsonl(export_rows(db_session, experiment), buffer) == 16
+        rows = [json.loads(line) for line in buffer.getvalue().splitlines()]
+
+        first = rows[0]
+        assert first["experiment"] == experiment.unique_id
+        assert (first["cell_index"], first["topic"], first["persona_set"], first["turn_number"]) == (
+            0, "Colonize Mars?", 0, 1,
+        )
+        assert first["persona_unique_id"] == test_personas[0].unique_id
+        assert [r["cell_index"] for r in rows] == sorted(r["cell_index"] for r in rows)
+
+    def test_parquet_without_pyarrow(self, db_session, experiment):
+        with patch.dict(sys.modules, {"pyarrow": None, "pyarrow.parquet": None}):
+            with pytest.raises(RuntimeError, match="pyarrow"):
+                write_parquet(export_rows(db_session, experiment), io.BytesIO())
+
+    def test_parquet(self, db_session, worker, experiment, orchestrator):
+        pq = pytest.importorskip("pyarrow.parquet")
+        _drain(worker)
+        db_session.expire_all()
+
+        buffer = io.BytesIO()
+        assert write_parquet(export_rows(db_session, experiment), buffer) == 16
+        buffer.seek(0)
+        assert pq.read_table(buffer).num_rows == 16
+
+
+
+class TestCli:
+
+    @pytest.fixture(autouse=True)
+    def cli_sessions(self, test_db_engine):
+        with patch("app.experiments.SessionLocal", sessionmaker(bind=test_db_engine)):
+            yield
+
+    def test_export_jsonl(self, db_session, worker, experiment, orchestrator, tmp_path):
+        _drain(worker)
+        out = tmp_path / "results.data"
+
+        experiments_cli.main(["export", experiment.unique_id, "--out", str(out), "--format", "jsonl"])
+
+        rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+        assert len(rows) == 16
+        assert {r["experiment"] for r in rows} == {experiment.unique_id}
+        assert {(r["cell_index"], r["turn_number"]) for r in rows} == {(i, t) for i in range(4) for t in (1, 2)}
+
+    def test_status(self, db_session, experiment, capsys):
+        experiments_cli.main(["status", experiment.unique_id])
+        assert json.loads(capsys.readouterr().out)["cells"] == 4
+
+    def test_unknown_experiment_exits(self, db_session):
+        with pytest.raises(SystemExit, match="not found"):
+            experiments_cli.main(["export", "nope00", "--out", "unused.jsonl"])
+
+class TestExperimentEndpoints:
+
+    def _create(self, client, auth_headers, test_personas, **overrides):
+        body = {
+            "name": "Panel",
+            "topics": ["Four-day week?"],
+            "persona_sets": [[p.unique_id for p in test_personas[:2]]],
+            "turns": [3],
+            **overrides,
+        }
+        return client.post("/experiments", json=body, headers=auth_headers)
+
+    def test_create_and_get(self, client, auth_headers, test_personas):
+        response = self._create(client, auth_headers, test_personas, turns=[1, 3])
+        assert response.status_code == 202
+        body = response.json()
+        assert (body["cells"], body["progress"]["queued"]) == (2, 2)
+
+        detail = client.get(f"/experiments/{body['unique_id']}", headers=auth_headers).json()
+        assert [r["turns"] for r in detail["runs"]] == [1, 3]
+        assert all(r["conversation_unique_id"] for r in detail["runs"])
+        assert [e["unique_id"] for e in client.get("/experiments", headers=auth_headers).json()] == [body["unique_id"]]
+
+    def test_invalid_matrix(self, client, auth_headers, test_personas):
+        assert self._create(client, auth_headers, test_personas, persona_sets=[[]]).status_code == 422
+        assert self._create(client, auth_headers, test_personas, turns=[0]).status_code == 422
+        assert self._create(client, auth_headers, test_personas, persona_sets=[["missing"]]).status_code == 404
+        with patch("app.services.experiments.settings.EXPERIMENT_MAX_CELLS", 1):
+            assert self._create(client, auth_headers, test_personas, topics=["a", "b"]).status_code == 400
+
+    def test_cancel_and_resume(self, client, auth_headers, test_personas):
+        unique_id = self._create(client, auth_headers, test_personas).json()["unique_id"]
+
+        cancelled = client.post(f"/experiments/{unique_id}/cancel", headers=auth_headers).json()
+        assert (cancelled["cancelled"], cancelled["progress"]["stopped"]) == (1, 1)
+        resumed = client.post(f"/experiments/{unique_id}/resume", headers=auth_headers).json()
+        assert (resumed["resumed"], resumed["progress"]["queued"]) == (1, 1)
+
+    def test_resume_over_budget_is_429(self, client, auth_headers, test_personas, db_session):
+        unique_id = self._create(client, auth_headers, test_personas).json()["unique_id"]
+        client.post(f"/experiments/{unique_id}/cancel", headers=auth_headers)
+
+        with patch("app.admission.daily_usage", return_value=(100, 0)), \
+                patch("app.admission.settings.USER_DAILY_TOKEN_BUDGET", 100):
+            response = client.post(f"/experiments/{unique_id}/resume", headers=auth_headers)
+
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+        assert db_session.query(Job).filter(Job.status == "queued").count() == 0
+
+    def test_export_jsonl(self, client, auth_headers, test_personas, db_session):
+        unique_id = self._create(client, auth_headers, test_personas).json()["unique_id"]
+        run = db_session.query(ExperimentRun).one()
+        db_session.add(ConversationMessage(
+            conversation_id=run.conversation_id, persona_id=test_personas[0].id,
+            persona_name="Analyst", message_text="Hello", turn_number=1,
+            created_at=datetime.now(timezone.utc),
+        ))
+        db_session.commit()
+
+        response = client.get(f"/experiments/{unique_id}/export", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert f"experiment-{unique_id}.jsonl" in response.headers["content-disposition"]
+        assert [json.loads(line)["message_text"] for line in response.text.splitlines()] == ["Hello"]
+
+    def test_other_users_experiment_is_404(self, client, auth_headers, test_personas, db_session):
+        unique_id = self._create(client, auth_headers, test_personas).json()["unique_id"]
+        other = User(email="other@example.com", google_id="google_other", name="Other")
+        db_session.add(other)
+        db_session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(user_id=other.id)}"}
+        assert client.get(f"/experiments/{unique_id}", headers=headers).status_code == 404
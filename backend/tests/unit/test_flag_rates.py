@@ -0,0 +1,141 @@
+"""
+Flag Rate / Speculative Generation Tests
+
+Per-persona flag-rate windows, the speculation decision, and the
+orchestrator generating two candidates with one batched moderation call
+for personas that are often flagged.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.conversation_orchestrator import ConversationOrchestrator
+from app.services.flag_rates import FlagRateTracker, flag_rates
+
+
+@pytest.fixture(autouse=True)
+def clean_flag_rates():
+    flag_rates.reset()
+    yield
+    flag_rates.reset()
+
+
+def _moderator(scores):
+    """Moderator whose scores come from `scores` in order, single or batched."""
+    mod = MagicMock()
+    queue = list(scores)
+    mod.analyze_toxicity.side_effect = lambda text: queue.pop(0)
+    mod.analyze_toxicity_batch.side_effect = lambda texts: [queue.pop(0) for _ in texts]
+    mod.is_safe.side_effect = lambda score: score < 0.7
+    return mod
+
+
+def _orchestrator(mod, attempts=2):
+    llm = MagicMock()
+    llm.generate_response.side_effect = [f"candidate {i}" for i in range(1, 10)]
+    return ConversationOrchestrator(llm_service=llm, moderation_service=mod, max_regeneration_attempts=attempts)
+
+
+def _generate(orchestrator, persona_id=7):
+    return orchestrator._generate_safe_message(
+        persona_details={"name": "Rex", "attitude": "Confrontational"}, history=[], topic="Tax robots?",
+        persona_id=persona_id,
+    )
+
+
+class TestFlagRateTracker:
+
+    def test_window_and_threshold(self):
+        tracker = FlagRateTracker(window=4)
+        assert tracker.flag_rate(1) is None
+        for flagged in (True, True, False):
+            tracker.record(1, flagged)
+        assert tracker.flag_rate(1) == pytest.approx(2 / 3)
+        assert tracker.should_speculate(1)
+
+        for _ in range(4):
+            tracker.record(1, False)
+        assert tracker.flag_rate(1) == 0.0
+        assert not tracker.should_speculate(1)
+
+    def test_needs_min_samples_and_can_be_disabled(self):
+        tracker = FlagRateTracker()
+        tracker.record(1, True)
+        tracker.record(1, True)
+        assert not tracker.should_speculate(1)
+        tracker.record(1, True)
+        assert tracker.should_speculate(1)
+        with patch("app.services.flag_rates.settings.SPECULATIVE_FLAG_RATE_THRESHOLD", 0):
+            assert not tracker.should_speculate(1)
+        tracker.record(None, True)
+        assert tracker.stats()["personas"] == 1
+
+
+class TestSpeculativeGeneration:
+
+    def test_clean_persona_generates_serially(self):
+        mod = _moderator([0.1])
+        orchestrator = _orchestrator(mod)
+        assert _generate(orchestrator) == ("candidate 1", 0.1, "approved")
+        mod.analyze_toxicity_batch.assert_not_called()
+        assert flag_rates.flag_rate(7) == 0.0
+
+    def test_often_flagged_persona_gets_two_candidates(self):
+        for _ in range(3):
+            flag_rates.record(7, flagged=True)
+        mod = _moderator([0.9, 0.2])
+        orchestrator = _orchestrator(mod)
+
+        text, score, status = _generate(orchestrator)
+        assert (score, status) == (0.2, "approved")
+        assert orchestrator.llm_service.generate_response.call_count == 2
+        mod.analyze_toxicity_batch.assert_called_once()
+        mod.analyze_toxicity.assert_not_called()
+        assert flag_rates.stats()["speculative_rescues"] == 1
+
+    def test_first_safe_candidate_wins(self):
+        for _ in range(3):
+            flag_rates.record(7, flagged=True)
+        mod = _moderator([0.1, 0.1])
+        text, _, status = _generate(_orchestrator(mod))
+        assert status == "approved"
+        assert text in ("candidate 1", "candidate 2")
+        assert flag_rates.stats()["speculative_unused"] == 1
+
+    def test_candidates_count_as_attempts(self):
+        for _ in range(3):
+            flag_rates.record(7, flagged=True)
+        mod = _moderator([0.9, 0.9, 0.9])
+        orchestrator = _orchestrator(mod, attempts=3)
+
+        _, score, status = _generate(orchestrator)
+        assert (score, status) == (0.9, "flagged")
+        # One speculative pair, then a single last attempt
+        assert orchestrator.llm_service.generate_response.call_count == 3
+        assert mod.analyze_toxicity_batch.call_count == 1
+        assert mod.analyze_toxicity.call_count == 1
+
+    def test_stats_drive_the_switch(self):
+        mod = _moderator([0.9, 0.9, 0.9, 0.9, 0.1, 0.9])
+        orchestrator = _orchestrator(mod)
+        _generate(orchestrator)  # 2 serial flags
+        _generate(orchestrator)  # 2 more serial flags: now 4 samples, all flagged
+        orchestrator.llm_service.generate_response.side_effect = ["a", "b"]
+        assert _generate(orchestrator)[2] == "approved"
+        mod.analyze_toxicity_batch.assert_called_once()
+
+    def test_moderation_outage_is_not_counted_as_flags(self):
+        from app.services.content_moderation_service import ContentModerationService
+
+        http = MagicMock()
+        http.post.side_effect = Exception("OpenAI is down")
+        mod = ContentModerationService(http_client=http, threshold=0.7)
+        orchestrator = _orchestrator(mod)
+
+        for _ in range(4):
+            orchestrator.llm_service.generate_response.side_effect = ["a", "b"]
+            assert _generate(orchestrator)[2] == "flagged"
+        assert flag_rates.flag_rate(7) is None
+        assert not flag_rates.should_speculate(7)
+        assert http.post.call_count == 8  # All single-candidate requests
@@ -0,0 +1,291 @@
+"""
+Fork Service Tests
+
+Tests for copy-on-write forks and the set-based transcript copy used by
+POST /conversations/{id}/fork.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from app.models.conversation import Conversation, ConversationMessage, ConversationParticipant
+from app.services.fork_service import (
+    add_participants,
+    attach_transcript,
+    copy_participants,
+    copy_transcript,
+    detach_forks,
+)
+
+
+@pytest.fixture
+def source_conversation(db_session, test_user, test_personas):
+    conv = Conversation(topic="Source topic", created_by=test_user.id, turn_count=2)
+    db_session.add(conv)
+    db_session.flush()
+    for p in test_personas[:2]:
+        db_session.add(ConversationParticipant(conversation_id=conv.id, persona_id=p.id, persuaded_score=0.6))
+
+    first = ConversationMessage(
+        conversation_id=conv.id, persona_id=test_personas[0].id,
+        persona_name=test_personas[0].name, message_text="Opening", turn_number=1,
+    )
+    db_session.add(first)
+    db_session.flush()
+    db_session.add(ConversationMessage(
+        conversation_id=conv.id, persona_id=test_personas[1].id,
+        persona_name=test_personas[1].name, message_text="Rebuttal", turn_number=1,
+        reply_to_id=first.id,
+    ))
+    db_session.add(ConversationMessage(
+        conversation_id=conv.id, persona_id=None, persona_name="Test User",
+        message_text="Injected", turn_number=2, moderation_status="user",
+    ))
+    db_session.commit()
+    db_session.refresh(conv)
+    return conv
+
+
+@pytest.fixture
+def empty_target(db_session, test_user):
+    conv = Conversation(topic="Fork", created_by=test_user.id)
+    db_session.add(conv)
+    db_session.commit()
+    db_session.refresh(conv)
+    return conv
+
+
+def _messages(db_session, conversation_id):
+    return (
+        db_session.query(ConversationMessage)
+        .filter(ConversationMessage.conversation_id == conversation_id)
+        .order_by(ConversationMessage.id)
+        .all()
+    )
+
+
+class TestCopyTranscript:
+
+    def test_copies_all_rows_in_order(self, db_session, source_conversation, empty_target):
+        copy_transcript(db_session, source_conversation, empty_target.id)
+        db_session.commit()
+
+        copied = _messages(db_session, empty_target.id)
+        assert [m.message_text for m in copied] == ["Opening", "Rebuttal", "Injected"]
+        assert [m.turn_number for m in copied] == [1, 1, 2]
+        assert copied[2].moderation_status == "user"
+
+    def test_reply_to_remapped_to_copies(self, db_session, source_conversation, empty_target):
+        copy_transcript(db_session, source_conversation, empty_target.id)
+        db_session.commit()
+
+        copied = _messages(db_session, empty_target.id)
+        assert copied[1].reply_to_id == copied[0].id
+        assert copied[0].reply_to_id is None
+        assert copied[2].reply_to_id is None
+
+    def test_source_untouched(self, db_session, source_conversation, empty_target):
+        before = [(m.id, m.reply_to_id) for m in _messages(db_session, source_conversation.id)]
+        copy_transcript(db_session, source_conversation, empty_target.id)
+        db_session.commit()
+        db_session.expire_all()
+        after = [(m.id, m.reply_to_id) for m in _messages(db_session, source_conversation.id)]
+        assert before == after
+
+    def test_empty_source_copies_nothing(self, db_session, empty_target, test_user):
+        other = Conversation(topic="Empty", created_by=test_user.id)
+        db_session.add(other)
+        db_session.commit()
+        copy_transcript(db_session, other, empty_target.id)
+        db_session.commit()
+        assert _messages(db_session, empty_target.id) == []
+
+
+def _fork(db_session, source, test_user):
+    fork = Conversation(
+        topic="Fork", created_by=test_user.id,
+        forked_from_id=source.unique_id, turn_count=source.turn_count,
+    )
+    db_session.add(fork)
+    db_session.flush()
+    attach_transcript(db_session, source, fork)
+    db_session.commit()
+    db_session.refresh(fork)
+    return fork
+
+
+def _add_message(db_session, conversation, text, turn, reply_to_id=None):
+    msg = ConversationMessage(
+        conversation_id=conversation.id, persona_id=None, persona_name="Test User",
+        message_text=text, turn_number=turn, moderation_status="user",
+        reply_to_id=reply_to_id,
+    )
+    db_session.add(msg)
+    db_session.commit()
+    return msg
+
+
+class TestCopyOnWriteFork:
+
+    def test_fork_shares_rows_instead_of_copying(self, db_session, source_conversation, test_user):
+        fork = _fork(db_session, source_conversation, test_user)
+
+        assert _messages(db_session, fork.id) == []
+        assert fork.parent_id == source_conversation.id
+        assert fork.fork_depth == 1
+        assert fork.fork_point_turn == 2
+        assert [m.message_text for m in fork.get_transcript()] == ["Opening", "Rebuttal", "Injected"]
+
+    def test_fork_does_not_see_parent_messages_after_fork_point(self, db_session, source_conversation, test_user):
+        fork = _fork(db_session, source_conversation, test_user)
+        _add_message(db_session, source_conversation, "Parent later", 3)
+        _add_message(db_session, fork, "Fork later", 3)
+
+        assert [m.message_text for m in fork.get_transcript()] == ["Opening", "Rebuttal", "Injected", "Fork later"]
+        assert [m.message_text for m in source_conversation.get_transcript()][-1] == "Parent later"
+
+    def test_fork_of_fork_resolves_chain(self, db_session, source_conversation, test_user):
+        child = _fork(db_session, source_conversation, test_user)
+        _add_message(db_session, child, "Child turn", 3)
+        grandchild = _fork(db_session, child, test_user)
+        _add_message(db_session, child, "Child after fork", 4)
+
+        assert grandchild.fork_depth == 2
+        assert [m.message_text for m in grandchild.get_transcript()] == [
+            "Opening", "Rebuttal", "Injected", "Child turn",
+        ]
+
+    def test_fork_of_unmodified_fork_shares_original(self, db_session, source_conversation, test_user):
+        child = _fork(db_session, source_conversation, test_user)
+        grandchild = _fork(db_session, child, test_user)
+        assert grandchild.fork_point_message_id == child.fork_point_message_id
+        assert len(grandchild.get_transcript()) == 3
+
+    def test_depth_limit_materializes(self, db_session, source_conversation, test_user):
+        with patch("app.services.fork_service.settings") as mock_settings:
+            mock_settings.FORK_MAX_DEPTH = 1
+            child = _fork(db_session, source_conversation, test_user)
+            grandchild = _fork(db_session, child, test_user)
+
+        assert child.parent_id == source_conversation.id
+        assert grandchild.parent_id is None
+        assert grandchild.fork_depth == 0
+        copied = _messages(db_session, grandchild.id)
+        assert [m.message_text for m in copied] == ["Opening", "Rebuttal", "Injected"]
+        assert copied[1].reply_to_id == copied[0].id
+
+    def test_empty_source_is_not_shared(self, db_session, empty_target, test_user):
+        fork = _fork(db_session, empty_target, test_user)
+        assert fork.parent_id is None
+        assert fork.get_transcript() == []
+
+
+class TestDetachForks:
+
+    def test_delete_parent_hands_rows_to_children(self, db_session, source_conversation, test_user):
+        child = _fork(db_session, source_conversation, test_user)
+        inherited = source_conversation.get_transcript()
+        reply = _add_message(db_session, child, "Reply to opening", 3, reply_to_id=inherited[0].id)
+        grandchild = _fork(db_session, child, test_user)
+        grandchild_id = grandchild.id
+        before = [m.id for m in grandchild.get_transcript()]
+
+        detach_forks(db_session, source_conversation)
+        db_session.delete(source_conversation)
+        db_session.commit()
+        db_session.expire_all()
+
+        child_texts = [m.message_text for m in child.get_transcript()]
+        assert child_texts == ["Opening", "Rebuttal", "Injected", "Reply to opening"]
+        assert (child.parent_id, child.fork_depth) == (None, 0)
+        # Nothing is copied: ids (and so since_id polling and reply links) are unchanged
+        assert [m.id for m in child.get_transcript()] == [m.id for m in inherited] + [reply.id]
+        assert db_session.get(ConversationMessage, reply.id).reply_to_id == inherited[0].id
+
+        grandchild = db_session.get(Conversation, grandchild_id)
+        assert (grandchild.parent_id, grandchild.fork_depth) == (child.id, 1)
+        assert [m.id for m in grandchild.get_transcript()] == before
+
+    def test_siblings_repoint_to_the_fork_sharing_most(self, db_session, source_conversation, test_user):
+        early = _fork(db_session, source_conversation, test_user)
+        _add_message(db_session, source_conversation, "Parent later", 3)
+        late = _fork(db_session, source_conversation, test_user)
+        _add_message(db_session, early, "Early turn", 3)
+        _add_message(db_session, late, "Late turn", 4)
+        early_ids = [m.id for m in early.get_transcript()]
+        late_ids = [m.id for m in late.get_transcript()]
+
+        db_session.delete(source_conversation)
+        db_session.commit()
+        db_session.expire_all()
+
+        assert late.parent_id is None
+        assert early.parent_id == late.id
+        assert [m.id for m in early.get_transcript()] == early_ids
+        assert [m.id for m in late.get_transcript()] == late_ids
+        assert early_ids == sorted(early_ids) and late_ids == sorted(late_ids)
+
+    def test_deleting_a_middle_fork_keeps_the_chain(self, db_session, source_conversation, test_user):
+        child = _fork(db_session, source_conversation, test_user)
+        _add_message(db_session, child, "Child turn", 3)
+        grandchild = _fork(db_session, child, test_user)
+        _add_message(db_session, grandchild, "Grandchild turn", 4)
+        before = [m.id for m in grandchild.get_transcript()]
+
+        db_session.delete(child)
+        db_session.commit()
+        db_session.expire_all()
+
+        assert (grandchild.parent_id, grandchild.fork_depth) == (source_conversation.id, 1)
+        assert [m.message_text for m in grandchild.get_transcript()] == [
+            "Opening", "Rebuttal", "Injected", "Child turn", "Grandchild turn",
+        ]
+        assert [m.id for m in grandchild.get_transcript()] == before
+
+    def test_session_delete_hands_rows_to_children(self, db_session, source_conversation, test_user):
+        # Any session delete (admin scripts, future endpoints), not just the routers
+        child = _fork(db_session, source_conversation, test_user)
+        _add_message(db_session, child, "Fork turn", 3)
+        assert len(source_conversation.messages) == 3  # Loaded, so the delete cascades to them
+
+        db_session.delete(source_conversation)
+        db_session.commit()
+        db_session.expire_all()
+
+        assert child.parent_id is None
+        assert [m.message_text for m in child.get_transcript()] == ["Opening", "Rebuttal", "Injected", "Fork turn"]
+
+    def test_delete_bypassing_session_is_refused(self, db_session, source_conversation, test_user):
+        child = _fork(db_session, source_conversation, test_user)
+
+        with pytest.raises(IntegrityError):
+            db_session.execute(delete(Conversation).where(Conversation.id == source_conversation.id))
+        db_session.rollback()
+
+        assert len(child.get_transcript()) == 3
+
+    def test_no_forks_is_noop(self, db_session, source_conversation):
+        detach_forks(db_session, source_conversation)
+        db_session.commit()
+        assert len(_messages(db_session, source_conversation.id)) == 3
+
+
+class TestParticipants:
+
+    def test_copy_participants(self, db_session, source_conversation, empty_target):
+        copy_participants(db_session, source_conversation.id, empty_target.id)
+        db_session.commit()
+
+        rows = db_session.query(ConversationParticipant).filter_by(conversation_id=empty_target.id).all()
+        assert len(rows) == 2
+        assert all(r.persuaded_score == 0.0 for r in rows)
+
+    def test_add_participants(self, db_session, empty_target, test_personas):
+        add_participants(db_session, empty_target.id, [p.id for p in test_personas])
+        db_session.commit()
+
+        rows = db_session.query(ConversationParticipant).filter_by(conversation_id=empty_target.id).all()
+        assert {r.persona_id for r in rows} == {p.id for p in test_personas}
@@ -0,0 +1,209 @@
+"""
+Idempotency Tests
+
+SingleFlight coalescing, and Idempotency-Key replay / conflict handling on
+POST /conversations/{unique_id}/continue.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from app.idempotency import SingleFlight
+from app.models.conversation import Conversation, ConversationMessage, ConversationParticipant
+from app.models.idempotency import IdempotencyRecord
+from app.services.conversation_orchestrator import TurnConflictError
+
+
+class TestSingleFlight:
+
+    def _wait_for_waiters(self, flight, n):
+        deadline = time.monotonic() + 5
+        while flight.stats()["coalesced"] < n:
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return {"turn": 1}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("conv", work))) for _ in range(4)]
+        threads[0].start()
+        while not calls:
+            time.sleep(0.001)
+        for t in threads[1:]:
+            t.start()
+        self._wait_for_waiters(flight, 3)
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        assert len(calls) == 1
+        assert results == [{"turn": 1}] * 4
+        assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 3}
+
+    def test_error_is_shared_and_key_freed(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("boom")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("conv", fail)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=call)
+        follower.start()
+        self._wait_for_waiters(flight, 1)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        assert errors == ["boom", "boom"]
+        assert flight.do("conv", lambda: "fresh") == "fresh"
+
+    def test_different_keys_run_independently(self):
+        flight = SingleFlight()
+        assert flight.do("a", lambda: 1) == 1
+        assert flight.do("b", lambda: 2) == 2
+        assert flight.stats()["executed"] == 2
+
+
+# ============================================================================
+# POST /conversations/{unique_id}/continue
+# ============================================================================
+
+def _conversation(db_session, user, personas, topic):
+    conv = Conversation(topic=topic, created_by=user.id)
+    db_session.add(conv)
+    db_session.commit()
+    for persona in personas[:2]:
+        db_session.add(ConversationParticipant(conversation_id=conv.id, persona_id=persona.id))
+    db_session.commit()
+    return conv
+
+
+@pytest.fixture
+def conversation(db_session, test_user, test_personas):
+    return _conversation(db_session, test_user, test_personas, "Should we colonize Mars?")
+
+
+@pytest.fixture
+def orchestrator():
+    """Patched ConversationOrchestrator whose turns write real messages."""
+    def generate_turn(conversation, personas, history, db, history_ids=None):
+        msgs = [
+            ConversationMessage(
+                conversation_id=conversation.id, persona_id=p.id, persona_name=p.name,
+                message_text=f"Turn {conversation.turn_count + 1} from {p.name}",
+                turn_number=conversation.turn_count + 1,
+            )
+            for p in personas
+        ]
+        db.add_all(msgs)
+        conversation.turn_count += 1
+        db.commit()
+        return msgs
+
+    with patch("app.routers.conversations.ConversationOrchestrator") as cls:
+        cls.return_value.generate_turn.side_effect = generate_turn
+        yield cls.return_value
+
+
+class TestIdempotencyKey:
+
+    def test_retry_replays_without_generating(self, client, auth_headers, conversation, orchestrator):
+        headers = {**auth_headers, "Idempotency-Key": "click-1"}
+        url = f"/conversations/{conversation.unique_id}/continue"
+
+        first = client.post(url, headers=headers)
+        retry = client.post(url, headers=headers)
+
+        assert first.status_code == retry.status_code == 200
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert orchestrator.generate_turn.call_count == 1
+
+    def test_new_key_generates_next_turn(self, client, auth_headers, conversation, orchestrator):
+        url = f"/conversations/{conversation.unique_id}/continue"
+        first = client.post(url, headers={**auth_headers, "Idempotency-Key": "a"})
+        second = client.post(url, headers={**auth_headers, "Idempotency-Key": "b"})
+
+        assert (first.json()["turn_number"], second.json()["turn_number"]) == (1, 2)
+
+    def test_without_key_every_request_generates(self, client, auth_headers, conversation, orchestrator):
+        url = f"/conversations/{conversation.unique_id}/continue"
+        client.post(url, headers=auth_headers)
+        client.post(url, headers=auth_headers)
+        assert orchestrator.generate_turn.call_count == 2
+
+    def test_key_reused_for_other_conversation(
+        self, client, auth_headers, conversation, orchestrator, db_session, test_user, test_personas,
+    ):
+        other = _conversation(db_session, test_user, test_personas, "Cats or dogs?")
+        headers = {**auth_headers, "Idempotency-Key": "same"}
+        client.post(f"/conversations/{conversation.unique_id}/continue", headers=headers)
+        response = client.post(f"/conversations/{other.unique_id}/continue", headers=headers)
+
+        assert response.status_code == 422
+        assert orchestrator.generate_turn.call_count == 1
+
+    def test_expired_key_generates_again(self, client, auth_headers, conversation, orchestrator, db_session):
+        headers = {**auth_headers, "Idempotency-Key": "old"}
+        url = f"/conversations/{conversation.unique_id}/continue"
+        client.post(url, headers=headers)
+        db_session.query(IdempotencyRecord).update(
+            {IdempotencyRecord.created_at: datetime.now(timezone.utc) - timedelta(days=2)}
+        )
+        db_session.commit()
+
+        response = client.post(url, headers=headers)
+        assert response.json()["turn_number"] == 2
+        assert db_session.query(IdempotencyRecord).count() == 1
+
+    def test_failed_request_is_not_stored(self, client, auth_headers, conversation, orchestrator, db_session):
+        orchestrator.generate_turn.side_effect = TurnConflictError("Turn 1 was already generated")
+        response = client.post(
+            f"/conversations/{conversation.unique_id}/continue",
+            headers={**auth_headers, "Idempotency-Key": "k"},
+        )
+        assert response.status_code == 409
+        assert db_session.query(IdempotencyRecord).count() == 0
+
+    def test_overlong_key_rejected(self, client, auth_headers, conversation, orchestrator):
+        response = client.post(
+            f"/conversations/{conversation.unique_id}/continue",
+            headers={**auth_headers, "Idempotency-Key": "x" * 256},
+        )
+        assert response.status_code == 422
+        orchestrator.generate_turn.assert_not_called()
+
+    def test_replay_skips_admission(self, client, auth_headers, conversation, orchestrator):
+        headers = {**auth_headers, "Idempotency-Key": "k"}
+        url = f"/conversations/{conversation.unique_id}/continue"
+        with patch.multiple("app.admission.settings", GENERATION_BURST=1, GENERATION_RATE_PER_MINUTE=1.0):
+            client.post(url, headers=headers)
+            assert client.post(url, headers=headers).status_code == 200
+            assert client.post(url, headers=auth_headers).status_code == 429
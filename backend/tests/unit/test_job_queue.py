@@ -0,0 +1,544 @@
+"""
+Background Job Queue Tests
+
+Enqueue/dedupe, claiming and leases, retries with backoff, permanent
+failures, cancellation, the built-in handlers (including auto-run), and the
+job endpoints.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import create_access_token
+from app.models.conversation import Conversation, ConversationMessage, ConversationParticipant
+from app.models.job import Job
+from app.models.user import User
+from app.services import job_queue
+from app.services.job_handlers import AUTO_RUN, BUILD_CHALLENGE, GENERATE_TURN
+from app.services.job_queue import (
+    JobWorker,
+    PermanentJobError,
+    cancel_job,
+    claim_job,
+    enqueue,
+    extend_lease,
+    job_handler,
+)
+
+
+@pytest.fixture
+def session_factory(test_db_engine):
+    return sessionmaker(bind=test_db_engine)
+
+
+@pytest.fixture
+def worker(session_factory):
+    return JobWorker(session_factory=session_factory, worker_id="w1", poll_interval=0, visibility_timeout=60)
+
+
+@pytest.fixture
+def handler():
+    """Registers a 'test' job kind whose behaviour each test sets via calls/effect."""
+    state = {"calls": [], "effect": None, "failed": []}
+
+    def run(db, job):
+        state["calls"].append(job.id)
+        if state["effect"] is not None:
+            raise state["effect"]
+        return {"ok": job.payload.get("n")}
+
+    job_handler("test", on_failure=lambda db, job: state["failed"].append(job.id))(run)
+    yield state
+    job_queue._handlers.pop("test", None)
+
+
+def _job(db_session, job_id):
+    db_session.expire_all()
+    return db_session.get(Job, job_id)
+
+
+class TestEnqueue:
+
+    def test_enqueue_and_run(self, db_session, worker, handler):
+        job = enqueue(db_session, "test", {"n": 7})
+        db_session.commit()
+
+        assert worker.run_once() is True
+        job = _job(db_session, job.id)
+        assert (job.status, job.result, job.attempts) == ("succeeded", {"ok": 7}, 1)
+        assert job.locked_by is None and job.finished_at is not None
+        assert worker.run_once() is False
+
+    def test_dedupe_key_returns_active_job(self, db_session, worker, handler):
+        first = enqueue(db_session, "test", dedupe_key="k")
+        second = enqueue(db_session, "test", dedupe_key="k")
+        db_session.commit()
+        assert first.id == second.id
+
+        worker.run_once()
+        third = enqueue(db_session, "test", dedupe_key="k")
+        db_session.commit()
+        assert third.id != first.id
+
+    def test_jobs_run_in_order(self, db_session, worker, handler):
+        ids = [enqueue(db_session, "test").id for _ in range(3)]
+        db_session.commit()
+        while worker.run_once():
+            pass
+        assert handler["calls"] == ids
+
+
+class TestFailures:
+
+    def test_retry_with_backoff(self, db_session, worker, handler):
+        handler["effect"] = RuntimeError("API down")
+        job = enqueue(db_session, "test", max_attempts=2)
+        db_session.commit()
+
+        with patch("app.services.job_queue.settings.JOB_RETRY_BACKOFF_SECONDS", 30):
+            worker.run_once()
+        job = _job(db_session, job.id)
+        assert (job.status, job.attempts) == ("queued", 1)
+        assert "API down" in job.error
+        assert worker.run_once() is False  # Backing off
+
+        job.run_after = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db_session.commit()
+        worker.run_once()
+        job = _job(db_session, job.id)
+        assert (job.status, job.attempts) == ("failed", 2)
+        assert handler["failed"] == [job.id]
+
+    def test_permanent_error_is_not_retried(self, db_session, worker, handler):
+        handler["effect"] = PermanentJobError("complete")
+        job = enqueue(db_session, "test")
+        db_session.commit()
+
+        worker.run_once()
+        job = _job(db_session, job.id)
+        assert (job.status, job.attempts) == ("failed", 1)
+        assert handler["failed"] == [job.id]
+
+    def test_unknown_kind_fails(self, db_session, worker):
+        job = enqueue(db_session, "no_such_kind")
+        db_session.commit()
+        worker.run_once()
+        assert _job(db_session, job.id).status == "failed"
+
+
+class TestLeases:
+
+    def test_expired_lease_is_reclaimed(self, db_session, session_factory, handler):
+        job = enqueue(db_session, "test")
+        db_session.commit()
+        with session_factory() as db:
+            assert claim_job(db, "dead-worker", visibility_timeout=-1).id == job.id
+
+        JobWorker(session_factory=session_factory, worker_id="w2", visibility_timeout=60).run_once()
+        job = _job(db_session, job.id)
+        assert (job.status, job.attempts) == ("succeeded", 2)
+
+    def test_user_at_running_cap_is_skipped(self, db_session, session_factory, handler, test_user):
+        first, second = (enqueue(db_session, "test", user_id=test_user.id) for _ in range(2))
+        anonymous = enqueue(db_session, "test")
+        db_session.commit()
+
+        with patch("app.services.job_queue.settings.JOB_MAX_RUNNING_PER_USER", 1), session_factory() as db:
+            assert claim_job(db, "w1", visibility_timeout=60).id == first.id
+            # The user's second job waits; other work still runs
+            assert claim_job(db, "w2", visibility_timeout=60).id == anonymous.id
+            assert claim_job(db, "w3", visibility_timeout=60) is None
+
+            db.get(Job, first.id).locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+            db.commit()
+            # An expired lease no longer counts against the user
+            assert claim_job(db, "w3", visibility_timeout=60).id in (first.id, second.id)
+
+    def test_live_lease_is_not_reclaimed(self, db_session, session_factory, handler):
+        enqueue(db_session, "test")
+        db_session.commit()
+        with session_factory() as db:
+            claim_job(db, "w1", visibility_timeout=60)
+            assert claim_job(db, "w2", visibility_timeout=60) is None
+
+    def test_expired_lease_on_last_attempt_fails(self, db_session, session_factory, handler):
+        job = enqueue(db_session, "test", max_attempts=1)
+        db_session.commit()
+        with session_factory() as db:
+            claim_job(db, "dead-worker", visibility_timeout=-1)
+            assert claim_job(db, "w2", visibility_timeout=60) is None
+
+        assert _job(db_session, job.id).status == "failed"
+        assert handler["failed"] == [job.id]
+
+    def test_outcome_discarded_after_lease_lost(self, db_session, session_factory, handler):
+        job = enqueue(db_session, "test")
+        db_session.commit()
+
+        def stolen(db, claimed):
+            claimed_elsewhere = db.get(Job, claimed.id)
+            claimed_elsewhere.locked_by = "w2"
+            db.commit()
+            return {"ok": "late"}
+
+        job_queue._handlers["test"] = (stolen, None)
+        JobWorker(session_factory=session_factory, worker_id="w1").run_once()
+        job = _job(db_session, job.id)
+        assert (job.status, job.locked_by, job.result) == ("running", "w2", None)
+
+    def test_extend_lease_only_for_owner(self, db_session, session_factory, handler):
+        job = enqueue(db_session, "test")
+        db_session.commit()
+        with session_factory() as db:
+            claim_job(db, "w1", visibility_timeout=1)
+            assert extend_lease(db, job.id, "w1", 600) is True
+            assert extend_lease(db, job.id, "w2", 600) is False
+
+
+# ============================================================================
+# Handlers
+# ============================================================================
+
+@pytest.fixture
+def challenge(db_session, test_user):
+    conv = Conversation(
+        topic="Challenge: Four-day week", proposal="Four-day week", challenge_type="Public Debate",
+        is_challenge=True, status="pending", created_by=test_user.id,
+    )
+    db_session.add(conv)
+    db_session.flush()
+    job = enqueue(
+        db_session, BUILD_CHALLENGE, {"proposal": "Four-day week", "challenge_type": "Public Debate", "n_personas": 2},
+        user_id=test_user.id, conversation_id=conv.id,
+    )
+    db_session.commit()
+    return conv, job
+
+
+class TestHandlers:
+
+    def test_build_challenge(self, db_session, worker, challenge, test_personas):
+        conv, job = challenge
+        with patch("app.services.challenge_service.ChallengeService") as svc_cls:
+            svc_cls.return_value.generate_challenge_personas.return_value = test_personas[:2]
+            worker.run_once()
+
+        db_session.expire_all()
+        assert conv.status == "active"
+        assert [p.persuaded_score for p in conv.participants] == [0.1, 0.1]
+        assert _job(db_session, job.id).result == {"participants": 2}
+
+    def test_build_challenge_marks_failed_when_out_of_attempts(self, db_session, worker, challenge):
+        conv, job = challenge
+        job.max_attempts = 1
+        db_session.commit()
+        with patch("app.services.challenge_service.ChallengeService") as svc_cls:
+            svc_cls.return_value.generate_challenge_personas.side_effect = RuntimeError("API down")
+            worker.run_once()
+
+        db_session.expire_all()
+        assert conv.status == "failed"
+        assert _job(db_session, job.id).status == "failed"
+
+    def test_generate_turn(self, db_session, worker, test_user, test_personas):
+        conv = Conversation(topic="Mars", created_by=test_user.id)
+        db_session.add(conv)
+        db_session.flush()
+        for persona in test_personas[:2]:
+            db_session.add(ConversationParticipant(conversation_id=conv.id, persona_id=persona.id))
+        job = enqueue(db_session, GENERATE_TURN, user_id=test_user.id, conversation_id=conv.id)
+        db_session.commit()
+
+        def generate_turn(conversation, personas, history, db, history_ids=None):
+            msg = ConversationMessage(
+                conversation_id=conversation.id, persona_id=personas[0].id, persona_name=personas[0].name,
+                message_text="Hello", turn_number=1,
+            )
+            db.add(msg)
+            conversation.turn_count = 1
+            db.commit()
+            return [msg]
+
+        with patch("app.services.job_handlers.ConversationOrchestrator") as orch_cls:
+            orch_cls.return_value.generate_turn.side_effect = generate_turn
+            worker.run_once()
+
+        result = _job(db_session, job.id).result
+        assert result["turn_number"] == 1
+        assert [m["message_text"] for m in result["new_messages"]] == ["Hello"]
+
+    def test_generate_turn_retry_after_commit_returns_that_turn(self, db_session, worker, test_user, test_personas):
+        # The worker died after the turn was committed but before the job completed
+        conv = Conversation(topic="Mars", created_by=test_user.id, turn_count=1)
+        db_session.add(conv)
+        db_session.flush()
+        db_session.add(ConversationParticipant(conversation_id=conv.id, persona_id=test_personas[0].id))
+        db_session.add(ConversationMessage(
+            conversation_id=conv.id, persona_id=test_personas[0].id, persona_name=test_personas[0].name,
+            message_text="Already generated", turn_number=1,
+        ))
+        job = enqueue(db_session, GENERATE_TURN, {"turn_count": 0}, user_id=test_user.id, conversation_id=conv.id)
+        db_session.commit()
+
+        with patch("app.services.job_handlers.ConversationOrchestrator") as orch_cls:
+            worker.run_once()
+        orch_cls.return_value.generate_turn.assert_not_called()
+
+        job = _job(db_session, job.id)
+        assert job.status == "succeeded"
+        assert job.result["turn_number"] == 1
+        assert [m["message_text"] for m in job.result["new_messages"]] == ["Already generated"]
+
+    def test_generate_turn_on_complete_conversation_fails_permanently(self, db_session, worker, test_user):
+        conv = Conversation(topic="Done", created_by=test_user.id, max_turns=1, turn_count=1)
+        db_session.add(conv)
+        db_session.flush()
+        job = enqueue(db_session, GENERATE_TURN, user_id=test_user.id, conversation_id=conv.id)
+        db_session.commit()
+
+        with patch("app.services.job_handlers.ConversationOrchestrator") as orch_cls:
+            orch_cls.return_value.generate_turn.side_effect = ValueError("Conversation has reached its maximum")
+            worker.run_once()
+        job = _job(db_session, job.id)
+        assert (job.status, job.attempts) == ("failed", 1)
+
+
+# ============================================================================
+# Endpoints
+# ============================================================================
+
+@pytest.fixture
+def conversation(db_session, test_user, test_personas):
+    conv = Conversation(topic="Should we colonize Mars?", created_by=test_user.id)
+    db_session.add(conv)
+    db_session.flush()
+    for persona in test_personas[:2]:
+        db_session.add(ConversationParticipant(conversation_id=conv.id, persona_id=persona.id))
+    db_session.commit()
+    return conv
+
+
+class TestJobEndpoints:
+
+    def test_create_challenge_enqueues_build(self, client, auth_headers, db_session):
+        response = client.post(
+            "/conversations/challenge", json={"proposal": "Four-day week", "n_personas": 2}, headers=auth_headers,
+        )
+        assert response.status_code == 201
+        job = db_session.get(Job, response.json()["job_id"])
+        assert (job.kind, job.status, job.payload["n_personas"]) == (BUILD_CHALLENGE, "queued", 2)
+
+    def test_background_continue_returns_job(self, client, auth_headers, conversation, db_session):
+        url = f"/conversations/{conversation.unique_id}/continue?background=true"
+        first = client.post(url, headers=auth_headers)
+        second = client.post(url, headers=auth_headers)
+
+        assert first.status_code == second.status_code == 202
+        assert first.json()["status"] == "queued"
+        assert second.json()["id"] == first.json()["id"]
+        assert db_session.get(Job, first.json()["id"]).payload == {"turn_count": conversation.turn_count}
+
+    def test_background_continue_on_complete_conversation(self, client, auth_headers, conversation, db_session):
+        conversation.turn_count = conversation.max_turns
+        db_session.commit()
+        response = client.post(
+            f"/conversations/{conversation.unique_id}/continue?background=true", headers=auth_headers,
+        )
+        assert response.status_code == 400
+
+    def test_get_job(self, client, auth_headers, conversation):
+        created = client.post(
+            f"/conversations/{conversation.unique_id}/continue?background=true", headers=auth_headers,
+        ).json()
+        response = client.get(f"/jobs/{created['id']}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["kind"] == GENERATE_TURN
+
+    def test_get_job_of_other_user_is_404(self, client, auth_headers, conversation, db_session):
+        created = client.post(
+            f"/conversations/{conversation.unique_id}/continue?background=true", headers=auth_headers,
+        ).json()
+        other = User(email="other@example.com", google_id="google_other", name="Other")
+        db_session.add(other)
+        db_session.commit()
+        response = client.get(
+            f"/jobs/{created['id']}", headers={"Authorization": f"Bearer {create_access_token(user_id=other.id)}"},
+        )
+        assert response.status_code == 404
+
+    def test_admin_queue_stats(self, client, auth_headers, conversation, db_session, test_user):
+        client.post(f"/conversations/{conversation.unique_id}/continue?background=true", headers=auth_headers)
+        test_user.is_admin = True
+        db_session.commit()
+        response = client.get("/admin/jobs", headers=auth_headers)
+        assert response.json() == {GENERATE_TURN: {"queued": 1}}
+
+
+# ============================================================================
+# Auto-run and cancellation
+# ============================================================================
+
+def _fake_turns(on_turn=None):
+    """A generate_turn side effect that writes one message per persona."""
+    def generate_turn(conversation, personas, history, db, history_ids=None):
+        turn = conversation.turn_count + 1
+        msgs = [
+            ConversationMessage(
+                conversation_id=conversation.id, persona_id=p.id, persona_name=p.name,
+                message_text=f"Turn {turn} from {p.name}", turn_number=turn,
+            )
+            for p in personas
+        ]
+        db.add_all(msgs)
+        conversation.turn_count = turn
+        db.commit()
+        if on_turn:
+            on_turn(turn)
+        return msgs
+    return generate_turn
+
+
+class TestAutoRun:
+
+    def _enqueue(self, db_session, conversation, turns):
+        job = enqueue(
+            db_session, AUTO_RUN,
+            {"start_turn": conversation.turn_count, "until_turn": conversation.turn_count + turns},
+            user_id=conversation.created_by, conversation_id=conversation.id,
+        )
+        db_session.commit()
+        return job
+
+    def test_generates_requested_turns_with_one_orchestrator(self, db_session, worker, conversation):
+        job = self._enqueue(db_session, conversation, 3)
+        seen = []
+
+        def record(conversation, personas, history, db, history_ids=None):
+            seen.append((len(history), len(history_ids)))
+            return generate(conversation, personas, history, db, history_ids)
+
+        generate = _fake_turns()
+        with patch("app.services.job_handlers.ConversationOrchestrator") as orch_cls:
+            orch_cls.return_value.generate_turn.side_effect = record
+            worker.run_once()
+
+        job = _job(db_session, job.id)
+        assert job.status == "succeeded"
+        assert job.result["turns_completed"] == 3
+        assert job.result["turn_number"] == 3
+        assert orch_cls.call_count == 1
+        # History grows in memory between turns instead of being re-queried
+        assert seen == [(0, 0), (2, 2), (4, 4)]
+        assert db_session.get(Conversation, conversation.id).turn_count == 3
+
+    def test_stops_at_max_turns(self, db_session, worker, conversation):
+        conversation.max_turns = 2
+        db_session.commit()
+        job = self._enqueue(db_session, conversation, 5)
+        with patch("app.services.job_handlers.ConversationOrchestrator") as orch_cls:
+            orch_cls.return_value.generate_turn.side_effect = _fake_turns()
+            worker.run_once()
+
+        job = _job(db_session, job.id)
+        assert (job.result["turns_completed"], job.result["is_complete"]) == (2, True)
+
+    def test_cancel_stops_after_current_turn(self, db_session, session_factory, worker, conversation):
+        job = self._enqueue(db_session, conversation, 5)
+
+        def cancel_after_second(turn):
+            if turn == 2:
+                with session_factory() as other:
+                    cancel_job(other, other.get(Job, job.id))
+                    other.commit()
+
+        with patch("app.services.job_handlers.ConversationOrchestrator") as orch_cls:
+            orch_cls.return_value.generate_turn.side_effect = _fake_turns(cancel_after_second)
+            worker.run_once()
+
+        job = _job(db_session, job.id)
+        assert job.status == "cancelled"
+        assert (job.result["turns_completed"], job.result["stopped"]) == (2, "cancelled")
+
+    def test_retry_resumes_from_last_committed_turn(self, db_session, worker, conversation):
+        job = self._enqueue(db_session, conversation, 3)
+
+        def fail_on_second(turn):
+            if turn == 2:
+                raise RuntimeError("LLM timeout")
+
+        with patch("app.services.job_handlers.ConversationOrchestrator") as orch_cls:
+            orch_cls.return_value.generate_turn.side_effect = _fake_turns(fail_on_second)
+            worker.run_once()
+        assert _job(db_session, job.id).status == "queued"
+
+        db_session.query(Job).update({Job.run_after: datetime.now(timezone.utc)})
+        db_session.commit()
+        with patch("app.services.job_handlers.ConversationOrchestrator") as orch_cls:
+            orch_cls.return_value.generate_turn.side_effect = _fake_turns()
+            worker.run_once()
+
+        job = _job(db_session, job.id)
+        assert job.status == "succeeded"
+        assert orch_cls.return_value.generate_turn.call_count == 1
+        assert job.result["turns_completed"] == 3
+
+    def test_stops_when_budget_exhausted(self, db_session, worker, conversation):
+        job = self._enqueue(db_session, conversation, 3)
+        with patch("app.admission.daily_usage", return_value=(100, 0)), \
+                patch("app.admission.settings.USER_DAILY_TOKEN_BUDGET", 100), \
+                patch("app.services.job_handlers.ConversationOrchestrator") as orch_cls:
+            worker.run_once()
+
+        job = _job(db_session, job.id)
+        orch_cls.return_value.generate_turn.assert_not_called()
+        assert (job.status, job.result["stopped"]) == ("succeeded", "budget")
+
+    def test_cancel_queued_job(self, db_session, worker, conversation):
+        job = self._enqueue(db_session, conversation, 3)
+        cancel_job(db_session, job)
+        db_session.commit()
+
+        assert worker.run_once() is False
+        assert _job(db_session, job.id).status == "cancelled"
+
+
+class TestAutoRunEndpoints:
+
+    def test_auto_run_queues_job(self, client, auth_headers, conversation, db_session):
+        url = f"/conversations/{conversation.unique_id}/auto-run"
+        first = client.post(url, json={"turns": 4}, headers=auth_headers)
+        second = client.post(url, headers=auth_headers)
+
+        assert first.status_code == second.status_code == 202
+        assert second.json()["id"] == first.json()["id"]
+        job = db_session.get(Job, first.json()["id"])
+        assert (job.kind, job.payload) == (AUTO_RUN, {"start_turn": 0, "until_turn": 4})
+
+    def test_turns_default_to_remaining(self, client, auth_headers, conversation, db_session):
+        conversation.turn_count = 7
+        db_session.commit()
+        response = client.post(f"/conversations/{conversation.unique_id}/auto-run", headers=auth_headers)
+        assert db_session.get(Job, response.json()["id"]).payload["until_turn"] == conversation.max_turns
+
+    def test_conflicts_with_queued_single_turn(self, client, auth_headers, conversation):
+        client.post(f"/conversations/{conversation.unique_id}/continue?background=true", headers=auth_headers)
+        response = client.post(f"/conversations/{conversation.unique_id}/auto-run", headers=auth_headers)
+        assert response.status_code == 409
+
+    def test_complete_conversation_rejected(self, client, auth_headers, conversation, db_session):
+        conversation.turn_count = conversation.max_turns
+        db_session.commit()
+        response = client.post(f"/conversations/{conversation.unique_id}/auto-run", headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_cancel_endpoint(self, client, auth_headers, conversation):
+        created = client.post(f"/conversations/{conversation.unique_id}/auto-run", headers=auth_headers).json()
+        response = client.post(f"/jobs/{created['id']}/cancel", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["status"] == "cancelled"
+        # A new auto-run can start once the old one is cancelled
+        again = client.post(f"/conversations/{conversation.unique_id}/auto-run", headers=auth_headers)
+        assert again.json()["id"] != created["id"]
@@ -0,0 +1,208 @@
+"""
+OCEAN Inference Cache Tests
+
+LRU + DB-backed cache in app/services/ocean_cache.py, its use by
+OceanInferenceService, and the admin warm/stats endpoints.
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import create_access_token
+from app.models.ocean_cache import OceanInferenceCacheEntry
+from app.models.persona import Persona
+from app.models.user import User
+from app.services.ocean_cache import OceanCache, cache_key, normalize_description
+from app.services.ocean_inference import DEFAULT_MODEL, OceanInferenceService
+
+SCORES = {
+    "openness": 0.7,
+    "conscientiousness": 0.8,
+    "extraversion": 0.4,
+    "agreeableness": 0.6,
+    "neuroticism": 0.3,
+}
+
+
+def _mock_client(scores=SCORES):
+    client = MagicMock()
+    message = MagicMock()
+    message.content = [MagicMock(text=json.dumps(scores))]
+    client.messages.create.return_value = message
+    return client
+
+
+@pytest.fixture
+def session_factory(test_db_engine):
+    return sessionmaker(bind=test_db_engine)
+
+
+@pytest.fixture
+def cache(session_factory):
+    return OceanCache(session_factory=session_factory, max_entries=2)
+
+
+class TestCacheKey:
+
+    def test_normalisation_ignores_case_and_whitespace(self):
+        assert normalize_description("  A Person\n named   Bob ") == "a person named bob"
+        assert cache_key("m", "A person named Bob") == cache_key("m", "a person  named bob")
+
+    def test_model_and_prompt_version_change_key(self):
+        assert cache_key("m1", "x") != cache_key("m2", "x")
+        assert cache_key("m1", "x", prompt_version=1) != cache_key("m1", "x", prompt_version=2)
+
+    def test_empty_description(self):
+        assert cache_key("m", None) == cache_key("m", "   ")
+
+
+class TestOceanCache:
+
+    def test_miss_then_hit(self, cache):
+        assert cache.get("m", "curious explorer") is None
+        cache.put("m", "curious explorer", SCORES)
+        assert cache.get("m", "Curious  explorer") == SCORES
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    def test_db_level_survives_new_process(self, cache, session_factory):
+        cache.put("m", "curious explorer", SCORES)
+        fresh = OceanCache(session_factory=session_factory)
+        assert fresh.get("m", "curious explorer") == SCORES
+        assert fresh.stats()["db_hits"] == 1
+        # Now in the LRU
+        assert fresh.get("m", "curious explorer") == SCORES
+        assert fresh.stats()["hits"] == 1
+
+    def test_lru_evicts_oldest(self, cache):
+        for description in ("a", "b", "c"):
+            cache.put("m", description, SCORES)
+        assert cache.stats()["entries"] == 2
+        cache.clear()
+        assert cache.get("m", "a") == SCORES  # from the table
+
+    def test_duplicate_put_is_ignored(self, cache, session_factory):
+        cache.put("m", "x", SCORES)
+        cache.clear()
+        cache.put("m", "x", SCORES)
+        with session_factory() as db:
+            assert db.query(OceanInferenceCacheEntry).count() == 1
+
+    def test_db_failure_is_a_miss(self):
+        def broken():
+            raise RuntimeError("database down")
+
+        cache = OceanCache(session_factory=broken)
+        assert cache.get("m", "x") is None
+        cache.put("m", "x", SCORES)  # must not raise
+        assert cache.get("m", "x") == SCORES
+
+
+class TestServiceWithCache:
+
+    def test_identical_descriptions_call_claude_once(self, cache):
+        client = _mock_client()
+        service = OceanInferenceService(client=client, cache=cache)
+
+        first = service.infer_ocean_traits("A person named Bob")
+        second = service.infer_ocean_traits("a person named  bob")
+
+        assert first == second == SCORES
+        client.messages.create.assert_called_once()
+
+    def test_different_model_misses(self, cache):
+        client = _mock_client()
+        OceanInferenceService(client=client, model="model-a", cache=cache).infer_ocean_traits("x")
+        OceanInferenceService(client=client, model="model-b", cache=cache).infer_ocean_traits("x")
+        assert client.messages.create.call_count == 2
+
+    def test_parse_failure_not_cached(self, cache):
+        client = MagicMock()
+        client.messages.create.return_value.content = [MagicMock(text="not json")]
+        service = OceanInferenceService(client=client, cache=cache)
+        with pytest.raises(ValueError):
+            service.infer_ocean_traits("x")
+        assert cache.get(DEFAULT_MODEL, "x") is None
+
+    def test_no_cache_by_default(self):
+        client = _mock_client()
+        service = OceanInferenceService(client=client)
+        service.infer_ocean_traits("x")
+        service.infer_ocean_traits("x")
+        assert client.messages.create.call_count == 2
+
+
+# ============================================================================
+# Warming + admin endpoints
+# ============================================================================
+
+@pytest.fixture
+def superuser_headers(db_session):
+    user = User(email="root@example.com", google_id="google_root", name="Root", is_admin=True, is_superuser=True)
+    db_session.add(user)
+    db_session.commit()
+    return {"Authorization": f"Bearer {create_access_token(user_id=user.id)}"}
+
+
+@pytest.fixture
+def personas(db_session, test_user):
+    rows = [
+        Persona(user_id=test_user.id, name="Bob", description=None, **{f"ocean_{k}": v for k, v in SCORES.items()}),
+        Persona(user_id=test_user.id, name="Ann", description="A stoic", **{f"ocean_{k}": 0.4 for k in SCORES}),
+        Persona(user_id=test_user.id, name="Cy", description="a  STOIC", **{f"ocean_{k}": 0.6 for k in SCORES}),
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+class TestWarmFromPersonas:
+
+    def test_warm_then_hit(self, cache, db_session, personas):
+        assert cache.warm_from_personas(db_session) == 2  # "A stoic" and "a  STOIC" share a key
+        assert cache.warm_from_personas(db_session) == 0
+        assert cache.get(DEFAULT_MODEL, "A person named Bob") == SCORES
+
+    def test_pages_newest_first(self, cache, db_session, personas):
+        assert cache.warm_from_personas(db_session, batch_size=1) == 2
+        assert cache.get(DEFAULT_MODEL, "A STOIC")["openness"] == 0.6
+
+    def test_skips_scores_not_from_inference(self, cache, db_session, test_user):
+        from app.models.conversation import Conversation, ConversationParticipant
+
+        def persona(name, description, value):
+            return Persona(user_id=test_user.id, name=name, description=description,
+                           **{f"ocean_{k}": value for k in SCORES})
+
+        fallback = persona("Neutral", "Inference failed for me", 0.5)
+        challenger = persona("Critic", "A skeptical landlord", 0.2)
+        db_session.add_all([fallback, challenger])
+        challenge = Conversation(topic="Rent caps", created_by=test_user.id, is_challenge=True)
+        db_session.add(challenge)
+        db_session.flush()
+        db_session.add(ConversationParticipant(conversation_id=challenge.id, persona_id=challenger.id))
+        db_session.commit()
+
+        assert cache.warm_from_personas(db_session) == 0
+        assert cache.get(DEFAULT_MODEL, "A skeptical landlord") is None
+
+    def test_warm_endpoint(self, client, superuser_headers, personas, db_session):
+        response = client.post("/admin/ocean-cache/warm", headers=superuser_headers)
+        assert response.status_code == 200
+        assert response.json() == {"added": 2}
+        assert db_session.query(OceanInferenceCacheEntry).count() == 2
+
+    def test_warm_requires_superuser(self, client, auth_headers):
+        response = client.post("/admin/ocean-cache/warm", headers=auth_headers)
+        assert response.status_code == 403
+
+    def test_stats_endpoint(self, client, superuser_headers):
+        stub = MagicMock()
+        stub.stats.return_value = {"hits": 3}
+        with patch("app.routers.admin.ocean_cache", stub):
+            response = client.get("/admin/ocean-cache", headers=superuser_headers)
+        assert response.status_code == 200
+        assert response.json() == {"hits": 3}
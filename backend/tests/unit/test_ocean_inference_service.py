@@ -293,3 +293,153 @@ class TestOceanScoreNormalization:
 
         assert result["openness"] == pytest.approx(0.0)
         assert result["conscientiousness"] == pytest.approx(1.0)
+
+
+def _scores_json(value):
+    return (
+        f'{{"openness": {value}, "conscientiousness": {value}, "extraversion": {value}, '
+        f'"agreeableness": {value}, "neuroticism": {value}}}'
+    )
+
+
+def _message(text):
+    message = MagicMock()
+    message.content = [MagicMock(text=text)]
+    return message
+
+
+class TestOceanBatchInference:
+    """Test infer_ocean_traits_batch: one call for many descriptions, per-item fallback."""
+
+    def test_single_call_for_all_descriptions(self):
+        """Three descriptions are scored with one API call, in input order."""
+        from app.services.ocean_inference import OceanInferenceService
+
+        mock_client = MagicMock()
+        mock_client.messages.create.return_value = _message(
+            f"[{_scores_json(0.1)}, {_scores_json(0.2)}, {_scores_json(0.3)}]"
+        )
+
+        service = OceanInferenceService(client=mock_client)
+        results = service.infer_ocean_traits_batch(["Alpha", "Beta", "Gamma"])
+
+        mock_client.messages.create.assert_called_once()
+        assert [r["openness"] for r in results] == [0.1, 0.2, 0.3]
+        prompt = mock_client.messages.create.call_args.kwargs["messages"][0]["content"]
+        assert '1. "Alpha"' in prompt and '3. "Gamma"' in prompt
+
+    def test_invalid_item_falls_back_to_single_call(self):
+        """Only the malformed item is re-inferred individually."""
+        from app.services.ocean_inference import OceanInferenceService
+
+        mock_client = MagicMock()
+        mock_client.messages.create.side_effect = [
+            _message(f'[{_scores_json(0.1)}, {{"openness": 0.9}}]'),
+            _message(_scores_json(0.7)),
+        ]
+
+        service = OceanInferenceService(client=mock_client)
+        results = service.infer_ocean_traits_batch(["Alpha", "Beta"])
+
+        assert mock_client.messages.create.call_count == 2
+        assert results[0]["openness"] == 0.1
+        assert results[1]["openness"] == 0.7
+        assert "Beta" in str(mock_client.messages.create.call_args)
+
+    def test_wrong_length_falls_back_for_all(self):
+        """An array that can't be aligned with the input (even after repair) is discarded."""
+        from app.services.ocean_inference import OceanInferenceService
+
+        mock_client = MagicMock()
+        mock_client.messages.create.side_effect = [
+            _message(f"[{_scores_json(0.1)}]"),
+            _message(f"[{_scores_json(0.1)}]"),  # repair attempt
+            _message(_scores_json(0.4)),
+            _message(_scores_json(0.6)),
+        ]
+
+        service = OceanInferenceService(client=mock_client)
+        results = service.infer_ocean_traits_batch(["Alpha", "Beta"])
+
+        assert mock_client.messages.create.call_count == 4
+        assert [r["openness"] for r in results] == [0.4, 0.6]
+
+    def test_wrong_length_repaired_in_one_call(self):
+        """The repair request fixes the array, so no per-item fallback is needed."""
+        from app.services.ocean_inference import OceanInferenceService
+
+        mock_client = MagicMock()
+        mock_client.messages.create.side_effect = [
+            _message(f"[{_scores_json(0.1)}]"),
+            _message(f"[{_scores_json(0.2)}, {_scores_json(0.3)}]"),
+        ]
+
+        service = OceanInferenceService(client=mock_client)
+        results = service.infer_ocean_traits_batch(["Alpha", "Beta"])
+
+        assert mock_client.messages.create.call_count == 2
+        assert [r["openness"] for r in results] == [0.2, 0.3]
+        repair_messages = mock_client.messages.create.call_args.kwargs["messages"]
+        assert "Expected an array of 2" in repair_messages[-1]["content"]
+
+    def test_failed_fallback_yields_none(self):
+        """An item that fails both ways is None; the rest are still returned."""
+        from app.services.ocean_inference import OceanInferenceService
+
+        mock_client = MagicMock()
+        mock_client.messages.create.side_effect = [
+            _message(f'[{_scores_json(0.1)}, "garbage"]'),
+            Exception("API down"),
+        ]
+
+        service = OceanInferenceService(client=mock_client)
+        results = service.infer_ocean_traits_batch(["Alpha", "Beta"])
+
+        assert results[0]["openness"] == 0.1
+        assert results[1] is None
+
+    def test_duplicates_and_single_item_use_plain_call(self):
+        """Duplicate descriptions are inferred once; one unique item skips the batch prompt."""
+        from app.services.ocean_inference import OceanInferenceService, INFERENCE_SYSTEM_PROMPT
+
+        mock_client = MagicMock()
+        mock_client.messages.create.return_value = _message(_scores_json(0.5))
+
+        service = OceanInferenceService(client=mock_client)
+        results = service.infer_ocean_traits_batch(["Same", "Same"])
+
+        mock_client.messages.create.assert_called_once()
+        assert mock_client.messages.create.call_args.kwargs["system"] == INFERENCE_SYSTEM_PROMPT
+        assert results[0] == results[1] and results[0] is not results[1]
+
+    def test_cached_items_are_not_sent(self):
+        """Cache hits are answered locally; only misses go in the batch."""
+        from app.services.ocean_inference import OceanInferenceService
+
+        cache = MagicMock()
+        cache.get.side_effect = lambda model, description: (
+            {"openness": 0.9, "conscientiousness": 0.9, "extraversion": 0.9, "agreeableness": 0.9, "neuroticism": 0.9}
+            if description == "Known" else None
+        )
+        mock_client = MagicMock()
+        mock_client.messages.create.return_value = _message(f"[{_scores_json(0.1)}, {_scores_json(0.2)}]")
+
+        service = OceanInferenceService(client=mock_client, cache=cache)
+        results = service.infer_ocean_traits_batch(["Alpha", "Known", "Beta"])
+
+        assert [r["openness"] for r in results] == [0.1, 0.9, 0.2]
+        prompt = mock_client.messages.create.call_args.kwargs["messages"][0]["content"]
+        assert "Known" not in prompt
+        assert cache.put.call_count == 2
+
+    def test_batch_response_in_code_block(self):
+        """Markdown-wrapped arrays are parsed like single responses."""
+        from app.services.ocean_inference import OceanInferenceService
+
+        service = OceanInferenceService(client=MagicMock())
+        results = service.parse_ocean_batch_response(
+            f"```json\n[{_scores_json(1.5)}, {_scores_json(0)}]\n```", expected=2
+        )
+
+        assert results[0]["openness"] == 1.0
+        assert results[1]["neuroticism"] == 0.0
@@ -289,6 +289,53 @@ class TestGetPersona:
         response = client.get(f"/personas/{test_persona.unique_id}")
         assert response.status_code == 401
 
+    def test_get_persona_returns_weak_etag(self, client, auth_headers, test_persona):
+        """Response carries a weak ETag for conditional polling."""
+        response = client.get(
+            f"/personas/{test_persona.unique_id}",
+            headers=auth_headers,
+        )
+        assert response.headers["ETag"].startswith('W/"')
+
+    def test_get_persona_if_none_match_returns_304(self, client, auth_headers, test_persona):
+        """An unchanged persona answers a matching If-None-Match with 304."""
+        first = client.get(f"/personas/{test_persona.unique_id}", headers=auth_headers)
+        response = client.get(
+            f"/personas/{test_persona.unique_id}",
+            headers={**auth_headers, "If-None-Match": first.headers["ETag"]},
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_etag_rolls_over_before_presigned_urls_expire(self, client, auth_headers, test_persona):
+        """With S3 avatars a cached body is revalidated while its URLs still work."""
+        from app.http_cache import settings as cache_settings
+        from app.services.image_generation_service import PRESIGNED_URL_EXPIRY_SECONDS
+
+        url = f"/personas/{test_persona.unique_id}"
+        with patch.object(cache_settings, "S3_AVATAR_BUCKET", "avatars-bucket"), \
+                patch.object(cache_settings, "LOCAL_AVATAR_DIR", ""), \
+                patch("app.http_cache.time.time") as now:
+            now.return_value = 0
+            etag = client.get(url, headers=auth_headers).headers["ETag"]
+            now.return_value = PRESIGNED_URL_EXPIRY_SECONDS // 2 - 1
+            assert client.get(url, headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+            now.return_value = PRESIGNED_URL_EXPIRY_SECONDS // 2
+            response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_etag_changes_with_avatar_key(self, client, auth_headers, test_persona, db_session):
+        """A new stored avatar invalidates the cached body."""
+        url = f"/personas/{test_persona.unique_id}"
+        etag = client.get(url, headers=auth_headers).headers["ETag"]
+        test_persona.avatar_url = "https://api.dicebear.com/7.x/personas/svg?seed=new"
+        db_session.commit()
+
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+
 
 # ============================================================================
 # DELETE /personas/{unique_id} - Delete Persona
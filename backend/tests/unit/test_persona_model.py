@@ -515,3 +515,50 @@ class TestPersonaOceanVector:
 
         for code, value in vector.items():
             assert 0.0 <= value <= 1.0, f"{code} = {value} is out of range"
+
+
+class TestPersonaPromptBlock:
+    """prompt_block is rendered on save and backfilled for older rows."""
+
+    def _persona(self, db_session, **fields):
+        from app.models.persona import Persona
+
+        user = User(email="block@example.com", google_id="google_block")
+        db_session.add(user)
+        db_session.flush()
+        persona = Persona(
+            user_id=user.id, name="Mia", attitude="Cynical", description="A landlord.",
+            ocean_openness=0.2, ocean_conscientiousness=0.8, ocean_extraversion=0.5,
+            ocean_agreeableness=0.2, ocean_neuroticism=0.6, **fields,
+        )
+        db_session.add(persona)
+        db_session.commit()
+        return persona
+
+    def test_rendered_on_insert_and_update(self, db_session):
+        from app.services.prompt_templates import PERSONA_BLOCK_VERSION
+
+        persona = self._persona(db_session)
+        assert persona.prompt_block_version == PERSONA_BLOCK_VERSION
+        assert persona.prompt_block.startswith("You are Mia.\nYour background: A landlord.\n")
+
+        persona.attitude = "Blunt"
+        db_session.commit()
+        assert "Your communication style: Blunt" in persona.prompt_block
+
+    def test_stale_block_is_rerendered_and_backfilled(self, db_session):
+        from sqlalchemy import update
+
+        from app.models.persona import Persona, backfill_prompt_blocks
+
+        persona = self._persona(db_session)
+        expected = persona.prompt_block
+        db_session.execute(update(Persona).values(prompt_block="old", prompt_block_version=None))
+        db_session.commit()
+        db_session.refresh(persona)
+
+        assert persona.current_prompt_block() == expected
+        assert backfill_prompt_blocks(db_session, batch_size=1) == 1
+        db_session.refresh(persona)
+        assert persona.prompt_block == expected
+        assert backfill_prompt_blocks(db_session) == 0
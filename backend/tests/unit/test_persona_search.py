@@ -0,0 +1,160 @@
+"""
+Persona Search Tests
+
+SearchIndex (the pure-Python fallback used on SQLite), cursor encoding, and
+GET /personas/public?q= ranking and keyset pagination.
+"""
+
+import pytest
+
+from app.models.persona import Persona
+from app.models.user import User
+from app.services.persona_search import (
+    SearchIndex,
+    decode_cursor,
+    encode_cursor,
+    tokenize,
+    trigrams,
+)
+
+OCEAN_DEFAULTS = dict(
+    ocean_openness=0.5,
+    ocean_conscientiousness=0.5,
+    ocean_extraversion=0.5,
+    ocean_agreeableness=0.5,
+    ocean_neuroticism=0.5,
+)
+
+
+@pytest.fixture
+def author(db_session):
+    user = User(email="author@example.com", google_id="google_author", name="Author")
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def make_persona(db_session, author):
+    def make(name, description=None, motto=None, user_id=None, is_public=True):
+        persona = Persona(
+            user_id=user_id or author.id, name=name, description=description,
+            motto=motto, is_public=is_public, **OCEAN_DEFAULTS,
+        )
+        db_session.add(persona)
+        db_session.commit()
+        db_session.refresh(persona)
+        return persona
+    return make
+
+
+class TestTextHelpers:
+
+    def test_tokenize(self):
+        assert tokenize("Hello, World! It's 2024") == ["hello", "world", "it", "s", "2024"]
+        assert tokenize(None) == []
+
+    def test_trigrams_match_pg_trgm_padding(self):
+        assert trigrams("cat") == {"  c", " ca", "cat", "at "}
+
+    def test_cursor_round_trip(self):
+        assert decode_cursor(encode_cursor(1.2345678901234567, 42)) == (1.2345678901234567, 42)
+
+    @pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24=", encode_cursor(1.0, 1)[:-4]])
+    def test_malformed_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestSearchIndex:
+
+    @pytest.fixture
+    def index(self):
+        index = SearchIndex()
+        index.add(1, 10, "Stoic Philosopher", motto="Endure and renounce", description="Calm under pressure")
+        index.add(2, 10, "Anxious Poet", motto=None, description="Writes about stoic calm")
+        index.add(3, 20, "Marcus Aurelius", motto="The obstacle is the way", description="Roman emperor, stoic")
+        index.add(4, 20, "Pirate Captain", description="Loud and reckless")
+        return index
+
+    def test_name_match_outranks_description(self, index):
+        ranked = [pid for _, pid in index.search("stoic")]
+        assert ranked[0] == 1
+        assert set(ranked) == {1, 2, 3}
+
+    def test_all_terms_required(self, index):
+        assert [pid for _, pid in index.search("stoic emperor")] == [3]
+
+    def test_last_term_is_prefix(self, index):
+        assert [pid for _, pid in index.search("pira")] == [4]
+        assert index.search("stoic emp")[0][1] == 3
+
+    def test_fuzzy_name_match(self, index):
+        assert [pid for _, pid in index.search("Marcos Aurelius")] == [3]
+
+    def test_excludes_user(self, index):
+        assert {pid for _, pid in index.search("stoic", exclude_user_id=10)} == {3}
+
+    def test_no_match(self, index):
+        assert index.search("zzznomatch") == []
+        assert index.search("!!!") == []
+
+
+class TestPublicPersonaSearchEndpoint:
+
+    def _search(self, client, auth_headers, query, **params):
+        response = client.get("/personas/public", params={"q": query, **params}, headers=auth_headers)
+        assert response.status_code == 200
+        return response
+
+    def test_searches_description_and_motto(self, client, auth_headers, make_persona):
+        by_description = make_persona("Alice", description="A retired lighthouse keeper")
+        by_motto = make_persona("Bob", motto="Keep the lighthouse burning")
+        make_persona("Carol", description="Baker")
+
+        data = self._search(client, auth_headers, "lighthouse").json()
+        assert {p["unique_id"] for p in data} == {by_description.unique_id, by_motto.unique_id}
+        # Motto (B) weighs more than description (C)
+        assert data[0]["unique_id"] == by_motto.unique_id
+
+    def test_excludes_own_and_private(self, client, auth_headers, test_user, make_persona):
+        make_persona("Lighthouse Mine", user_id=test_user.id)
+        make_persona("Lighthouse Hidden", is_public=False)
+        visible = make_persona("Lighthouse Public")
+
+        data = self._search(client, auth_headers, "lighthouse").json()
+        assert [p["unique_id"] for p in data] == [visible.unique_id]
+
+    def test_keyset_pagination(self, client, auth_headers, make_persona):
+        for i in range(5):
+            make_persona(f"Sailor {i}", description="sails the sea" if i % 2 else None)
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = self._search(client, auth_headers, "sailor", **params)
+            page = [p["unique_id"] for p in response.json()]
+            assert len(page) <= 2
+            seen.extend(page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert len(seen) == len(set(seen)) == 5
+
+    def test_index_sees_new_and_edited_personas(self, client, auth_headers, make_persona, db_session):
+        persona = make_persona("Gardener")
+        assert self._search(client, auth_headers, "gardener").json()[0]["unique_id"] == persona.unique_id
+
+        later = make_persona("Head Gardener")
+        assert len(self._search(client, auth_headers, "gardener").json()) == 2
+
+        later.name = "Beekeeper"
+        db_session.commit()
+        data = self._search(client, auth_headers, "beekeeper").json()
+        assert [p["unique_id"] for p in data] == [later.unique_id]
+
+    def test_invalid_cursor_returns_400(self, client, auth_headers):
+        response = client.get("/personas/public?q=x&cursor=garbage!", headers=auth_headers)
+        assert response.status_code == 400
@@ -0,0 +1,222 @@
+"""
+Prompt Engine Tests
+
+Compiled templates, incremental history rendering, the token-budget
+history window, byte-for-byte parity of the compiled conversation prompt
+with the previous f-string version, and a micro-benchmark of
+consecutive-turn rendering.
+"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services.prompt_engine import (
+    CompiledTemplate,
+    HistoryRenderer,
+    estimate_tokens,
+    history_token_budget,
+    truncate_to_tokens,
+)
+from app.services.prompt_templates import (
+    BANNED_PHRASES,
+    NATURAL_STARTERS,
+    ChallengeConversationTemplate,
+    ConversationPromptTemplate,
+    _indexed_history,
+    render_persona_block,
+)
+
+OCEAN = {"openness": 0.8, "conscientiousness": 0.2, "extraversion": 0.5, "agreeableness": 0.4, "neuroticism": 0.6}
+
+
+def _history(n, speakers=("Ana", "Ben", "Cy")):
+    return [{"speaker": speakers[i % len(speakers)], "message": f"Point number {i} about the topic."} for i in range(n)]
+
+
+def _reference_render(persona_name, ocean_scores, attitude, topic, history, description=""):
+    """ConversationPromptTemplate.render as it was before compilation."""
+    banned = ", ".join(f'"{p}"' for p in BANNED_PHRASES)
+    stagnation_warning = ""
+    if len(history) >= 4 and len(set(m["speaker"] for m in history[-4:])) <= 2:
+        stagnation_warning = (
+            "\nWARNING: The conversation is going in circles. "
+            "You MUST introduce a new angle, contradict something, or say something provocative. "
+            "Do NOT continue the current thread.\n"
+        )
+    if history:
+        lines = [f"[{i+1}] {msg['speaker']}: {msg['message']}" for i, msg in enumerate(history)]
+        history_section = "Conversation so far (use [index] to reply):\n" + "\n".join(lines) + "\n\n"
+    else:
+        history_section = "You are opening the discussion.\n\n"
+    starters = ", ".join(f'"{s}"' for s in NATURAL_STARTERS)
+    return (
+        f"{render_persona_block(persona_name, ocean_scores, attitude, description)}\n"
+        f"Topic: {topic}\n\n"
+        f"{history_section}"
+        f"{stagnation_warning}"
+        f"RULES — read carefully:\n"
+        f"1. State YOUR OWN position first. Do not open by asking what others think.\n"
+        f"2. You are NOT required to be nice. Low agreeableness means you push back hard.\n"
+        f"3. NEVER open with any of these: {banned}\n"
+        f"4. Aim for a direct, authentic opening. Examples: {starters}\n"
+        f"5. Do not repeat points already made. If you agree, say so in one clause then move on.\n"
+        f"6. If someone said something wrong or naive, call it out directly.\n"
+        f"7. Keep it to 2-3 sentences. Be dense, not verbose.\n"
+        f"8. Sound like a real human, not a panel discussion moderator. No filler phrases.\n"
+        f"9. Be aware of the developing tone of the conversation and respond accordingly.\n"
+        f"10. Track who you have spoken to. Use direct quotes when appropriate.\n"
+        f"11. If you are responding to a specific message, start your response with 'REPLY_TO: [index]'. Example: 'REPLY_TO: [1] I disagree because...'\n\n"
+        f"Respond now as {persona_name}:"
+    )
+
+
+class TestCompiledTemplate:
+
+    def test_static_fields_are_folded_in(self):
+        template = CompiledTemplate("Hi {name}, rules: {rules}. Bye {name}", rules="be nice")
+        assert template.fields == ("name", "name")
+        assert template.render(name="Ana") == "Hi Ana, rules: be nice. Bye Ana"
+
+    def test_values_are_not_reparsed(self):
+        assert CompiledTemplate("[{x}]").render(x="{y}") == "[{y}]"
+        assert CompiledTemplate("{x}").render(x=None) == "None"
+
+    def test_format_specs_rejected(self):
+        with pytest.raises(ValueError, match="score"):
+            CompiledTemplate("{score:.2f}")
+
+
+class TestHistoryRenderer:
+
+    def test_extends_cached_prefix(self):
+        renderer = HistoryRenderer(lambda i, m: f"[{i + 1}] {m['speaker']}")
+        history = _history(3)
+        assert renderer.render(history) == "[1] Ana\n[2] Ben\n[3] Cy"
+
+        # The orchestrator copies the list and appends as the turn goes on
+        longer = list(history) + [{"speaker": "Dee", "message": "x"}]
+        assert renderer.render(longer) == "[1] Ana\n[2] Ben\n[3] Cy\n[4] Dee"
+        assert renderer.lines_rendered == 4
+
+    def test_different_messages_render_from_scratch(self):
+        renderer = HistoryRenderer(lambda i, m: m["message"])
+        history = _history(3)
+        renderer.render(history)
+
+        edited = [history[0], {"speaker": "Ben", "message": "changed"}, history[2]]
+        assert renderer.render(edited).split("\n")[1] == "changed"
+        assert renderer.render(history[:2]) == "Point number 0 about the topic.\nPoint number 1 about the topic."
+
+    def test_empty_and_lru(self):
+        renderer = HistoryRenderer(lambda i, m: m["message"], max_entries=1)
+        assert renderer.render([]) == ""
+        a, b = _history(2), _history(2)
+        renderer.render(a)
+        renderer.render(b)
+        renderer.render(a)
+        assert renderer.lines_rendered == 6
+
+
+class TestHistoryWindow:
+
+    def test_estimate_and_truncate(self):
+        assert (estimate_tokens(""), estimate_tokens("abcd"), estimate_tokens("abcde")) == (0, 1, 2)
+        assert truncate_to_tokens("x" * 40, 10) == "x" * 40
+        assert truncate_to_tokens("x" * 41, 10) == "x" * 40 + " […]"
+        assert truncate_to_tokens("x" * 41, 0) == "x" * 41
+
+    def test_drops_oldest_and_keeps_labels(self):
+        renderer = HistoryRenderer(lambda i, m: f"[{i + 1}] {m['message']}")
+        history = [{"speaker": "A", "message": "x" * 36} for _ in range(5)]  # 10 tokens per line
+
+        assert renderer.render_window(history, None) == (renderer.render(history), 0)
+        assert renderer.render_window(history, 50)[1] == 0
+        text, omitted = renderer.render_window(history, 25)
+        assert omitted == 3
+        assert text == f"[4] {'x' * 36}\n[5] {'x' * 36}"
+        # The latest message is always kept
+        assert renderer.render_window(history, 1) == (f"[5] {'x' * 36}", 4)
+
+    def test_budget_per_model(self):
+        with patch("app.services.prompt_engine.settings.PROMPT_HISTORY_TOKEN_BUDGETS", "big-model=20000, off=0"):
+            assert history_token_budget("big-model") == 20000
+            assert history_token_budget("off") is None
+            assert history_token_budget("other") == 6000
+
+    def test_pasted_messages_stay_bounded(self):
+        history = _history(3) + [{"speaker": "Me", "message": "spam " * 400} for _ in range(30)]
+        template = ConversationPromptTemplate()
+        prompt = template.render("Dee", OCEAN, "Blunt", "Robots", history, token_budget=1000)
+
+        assert estimate_tokens(prompt) < 1000 + estimate_tokens(template.render("Dee", OCEAN, "Blunt", "Robots", []))
+        # Each pasted message is cut to ~250 tokens, so the last three fit
+        assert "(30 earlier messages omitted)\n[31] Me: spam" in prompt
+        assert "[33] Me: spam" in prompt and "[1] Ana" not in prompt
+        assert prompt.count(" […]") == 3
+
+    def test_challenge_window(self):
+        history = _history(10)
+        prompt = ChallengeConversationTemplate().render(
+            "Dee", OCEAN, "Blunt", "p", "Debate", history, token_budget=estimate_tokens("Cy: Point number 9 about the topic."),
+        )
+        assert "Conversation so far:\n(9 earlier messages omitted)\nAna: Point number 9" in prompt
+
+
+class TestConversationPromptParity:
+
+    @pytest.mark.parametrize("n", [0, 1, 4, 12])
+    def test_matches_reference(self, n):
+        history = _history(n, speakers=("Ana", "Ben") if n == 4 else ("Ana", "Ben", "Cy"))
+        args = ("Dee", OCEAN, "Sarcastic", "Should we tax robots?", history, "A welder.")
+        assert ConversationPromptTemplate().render(*args) == _reference_render(*args)
+
+
+def _growing_histories(base=300, turns=50):
+    """Each turn sees the previous history plus one appended message, as the orchestrator builds it."""
+    history, growing = _history(base), []
+    for message in _history(turns, speakers=("New",)):
+        history = history + [message]
+        growing.append(history)
+    return growing
+
+
+class TestConsecutiveTurns:
+
+    def test_each_turn_renders_only_the_new_line(self):
+        template = ConversationPromptTemplate()
+        before = _indexed_history.lines_rendered
+
+        for history in _growing_histories():
+            template.render("Dee", OCEAN, "Blunt", "Robots", history)
+
+        assert _indexed_history.lines_rendered - before == 300 + 50
+
+
+@pytest.mark.slow
+class TestRenderBenchmark:
+    """Consecutive-turn rendering: compiled + incremental vs the previous implementation."""
+
+    def test_consecutive_turns_against_reference(self, record_property):
+        # Both paths get the same inputs and render the persona block themselves
+        growing = _growing_histories()
+        template = ConversationPromptTemplate()
+
+        def best_of(fn, rounds=5):
+            timings = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                for history in growing:
+                    fn(history)
+                timings.append(time.perf_counter() - started)
+            return min(timings)
+
+        compiled = best_of(lambda h: template.render("Dee", OCEAN, "Blunt", "Robots", h))
+        reference = best_of(lambda h: _reference_render("Dee", OCEAN, "Blunt", "Robots", h))
+        # Reported in the JUnit XML; wall-clock comparisons are too noisy to assert
+        record_property("compiled_ms", round(compiled * 1000, 2))
+        record_property("reference_ms", round(reference * 1000, 2))
+        assert template.render("Dee", OCEAN, "Blunt", "Robots", growing[-1]) == _reference_render(
+            "Dee", OCEAN, "Blunt", "Robots", growing[-1],
+        )
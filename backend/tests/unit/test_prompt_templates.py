@@ -1,13 +1,19 @@
 """
 Prompt Templates Tests - Phase 4 (RED phase)
 
-Tests for MottoPromptTemplate and ConversationPromptTemplate.
+Tests for MottoPromptTemplate, ConversationPromptTemplate and the
+pre-rendered persona block.
 
 TDD: These tests are written FIRST. They define expected behavior.
 """
 
 import pytest
-from app.services.prompt_templates import MottoPromptTemplate, ConversationPromptTemplate
+from app.services.prompt_templates import (
+    ChallengeConversationTemplate,
+    ConversationPromptTemplate,
+    MottoPromptTemplate,
+    render_persona_block,
+)
 
 
 SAMPLE_OCEAN = {
@@ -201,3 +207,34 @@ class TestConversationPromptTemplate:
             history=[],
         )
         assert isinstance(prompt, str)
+
+
+# ============================================================================
+# Persona Block Tests
+# ============================================================================
+
+class TestPersonaBlock:
+    """The stored persona block splices in exactly what the templates would render."""
+
+    def test_block_contents(self):
+        block = render_persona_block("Alice", SAMPLE_OCEAN, "Blunt", "A retired nurse.")
+        assert block.startswith("You are Alice.\nYour background: A retired nurse.\nYour personality:\n- ")
+        assert block.endswith("Your communication style: Blunt — zero filter, says the uncomfortable thing out loud, no apologies\n")
+
+    def test_conversation_prompt_is_unchanged_by_splicing(self):
+        kwargs = dict(
+            persona_name="Alice", ocean_scores=SAMPLE_OCEAN, attitude="Comical", topic="Mars",
+            history=[{"speaker": "Bob", "message": "No."}], description="A pilot.",
+        )
+        block = render_persona_block("Alice", SAMPLE_OCEAN, "Comical", "A pilot.")
+        template = ConversationPromptTemplate()
+        assert template.render(**kwargs, persona_block=block) == template.render(**kwargs)
+        assert template.render(**kwargs).startswith(block + "\nTopic: Mars")
+
+    def test_challenge_prompt_splices_block(self):
+        template = ChallengeConversationTemplate()
+        prompt = template.render(
+            persona_name="Alice", ocean_scores={}, attitude="Neutral", proposal="p", challenge_type="Debate",
+            history=[], persona_block="STORED BLOCK\n",
+        )
+        assert prompt.startswith("STORED BLOCK\n\nContext:")
@@ -0,0 +1,72 @@
+"""
+Provider Rate Limit Tests
+
+Per-provider token buckets: disabled at 0, queueing callers in order,
+independent providers, and rate changes.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.services.provider_limits import ProviderRateLimiter
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def limiter(clock):
+    return ProviderRateLimiter(clock=clock, sleep=clock.sleep)
+
+
+class TestProviderRateLimiter:
+
+    def test_disabled_by_default(self, limiter, clock):
+        for _ in range(100):
+            assert limiter.acquire("anthropic") == 0
+        assert clock.slept == []
+        assert limiter.stats()["anthropic"]["requests"] == 0
+
+    @patch("app.services.provider_limits.settings.ANTHROPIC_REQUESTS_PER_MINUTE", 60)
+    def test_callers_queue_behind_reservations(self, limiter, clock):
+        assert limiter.acquire("anthropic") == 0
+        # No time passes: each caller waits one more second than the last
+        assert limiter.acquire("anthropic") == pytest.approx(1.0)
+        assert limiter.acquire("anthropic") == pytest.approx(2.0)
+
+        clock.now += 10
+        assert limiter.acquire("anthropic") == 0
+        stats = limiter.stats()["anthropic"]
+        assert (stats["requests"], stats["throttled"]) == (4, 2)
+        assert stats["wait_seconds"] == pytest.approx(3.0)
+
+    @patch("app.services.provider_limits.settings.ANTHROPIC_REQUESTS_PER_MINUTE", 60)
+    @patch("app.services.provider_limits.settings.OPENAI_REQUESTS_PER_MINUTE", 60)
+    def test_providers_are_independent(self, limiter, clock):
+        limiter.acquire("anthropic")
+        assert limiter.acquire("openai") == 0
+        assert limiter.acquire("gemini") == 0
+        assert clock.slept == []
+
+    def test_rate_change_rebuilds_bucket(self, limiter, clock):
+        with patch("app.services.provider_limits.settings.OPENAI_REQUESTS_PER_MINUTE", 6):
+            limiter.acquire("openai")
+            assert limiter.acquire("openai") == pytest.approx(10.0)
+        with patch("app.services.provider_limits.settings.OPENAI_REQUESTS_PER_MINUTE", 600):
+            assert limiter.acquire("openai") == 0
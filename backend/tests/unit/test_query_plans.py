@@ -0,0 +1,171 @@
+"""
+Query Plan Tests
+
+EXPLAIN harness for the router query shapes: each hot query must be able to
+use the index declared for it in the model __table_args__ (and created for
+existing databases by docker-entrypoint.sh). Catches regressions where a
+query or an index changes shape and the two stop matching.
+
+Runs against SQLite (EXPLAIN QUERY PLAN) always, and against PostgreSQL
+(EXPLAIN with enable_seqscan off, so tiny test tables still show whether an
+index is usable) when TEST_POSTGRES_URL points at a scratch database.
+"""
+
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from app.database import Base
+from app.models.conversation import Conversation, ConversationMessage, transcript_clause
+from app.models.persona import Persona
+from app.models.social import PageView
+from app.services.persona_search import postgres_search_statement
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+# SQLite names the index backing a table-level UNIQUE constraint itself
+UQ_PAGEVIEW_DAILY = ("uq_pageview_daily", "sqlite_autoindex_page_views_1")
+
+
+# (name, statement, expected index name(s)) — statements mirror the router queries
+QUERY_CATALOGUE = [
+    (
+        "list_personas",
+        select(Persona).where(Persona.user_id == 1).order_by(Persona.created_at.desc()),
+        "ix_personas_user_created",
+    ),
+    (
+        "list_public_personas",
+        select(Persona)
+        .where(Persona.is_public == True, Persona.user_id != 1)
+        .order_by(Persona.upvote_count.desc(), Persona.created_at.desc())
+        .limit(100),
+        "ix_personas_public_upvotes",
+    ),
+    (
+        "discover_personas_new",
+        select(Persona).where(Persona.is_public == True).order_by(Persona.created_at.desc()).limit(20),
+        "ix_personas_public_created",
+    ),
+    (
+        "discover_personas_top",
+        select(Persona)
+        .where(Persona.is_public == True)
+        .order_by(Persona.upvote_count.desc(), Persona.view_count.desc())
+        .limit(20),
+        "ix_personas_public_upvotes",
+    ),
+    (
+        "list_conversations",
+        select(Conversation).where(Conversation.created_by == 1).order_by(Conversation.created_at.desc()),
+        "ix_conversations_creator_created",
+    ),
+    (
+        "discover_conversations_new",
+        select(Conversation).where(Conversation.is_public == True).order_by(Conversation.created_at.desc()).limit(20),
+        "ix_conversations_public_created",
+    ),
+    (
+        "discover_conversations_top",
+        select(Conversation)
+        .where(Conversation.is_public == True)
+        .order_by(Conversation.upvote_count.desc(), Conversation.view_count.desc())
+        .limit(20),
+        "ix_conversations_public_upvotes",
+    ),
+    (
+        "transcript",
+        select(ConversationMessage)
+        .where(transcript_clause([(1, None)]))
+        .order_by(ConversationMessage.turn_number, ConversationMessage.id),
+        "ix_conversation_messages_transcript",
+    ),
+    (
+        "record_view_dedup_user",
+        select(PageView).where(
+            PageView.target_type == "persona",
+            PageView.target_id == "abc123",
+            PageView.user_id == 1,
+            PageView.ip_hash.is_(None),
+            PageView.viewed_date == date(2024, 1, 1),
+        ),
+        UQ_PAGEVIEW_DAILY,
+    ),
+    (
+        "record_view_dedup_ip",
+        select(PageView).where(
+            PageView.target_type == "persona",
+            PageView.target_id == "abc123",
+            PageView.user_id.is_(None),
+            PageView.ip_hash == "f" * 32,
+            PageView.viewed_date == date(2024, 1, 1),
+        ),
+        UQ_PAGEVIEW_DAILY,
+    ),
+]
+
+CATALOGUE_IDS = [name for name, _, _ in QUERY_CATALOGUE]
+
+
+def _uses_index(plan: str, index) -> bool:
+    names = index if isinstance(index, tuple) else (index,)
+    return any(name in plan for name in names)
+
+
+def _literal_sql(statement, dialect) -> str:
+    return str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+@pytest.fixture(scope="module")
+def sqlite_engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def postgres_engine():
+    engine = create_engine(TEST_POSTGRES_URL)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+class TestSqliteQueryPlans:
+
+    @pytest.mark.parametrize("name,statement,index", QUERY_CATALOGUE, ids=CATALOGUE_IDS)
+    def test_query_uses_index(self, sqlite_engine, name, statement, index):
+        with sqlite_engine.connect() as conn:
+            sql = _literal_sql(statement, conn.dialect)
+            plan = " | ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+        assert _uses_index(plan, index), f"{name} does not use {index}: {plan}"
+
+
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+class TestPostgresQueryPlans:
+
+    @pytest.mark.parametrize("name,statement,index", QUERY_CATALOGUE, ids=CATALOGUE_IDS)
+    def test_query_uses_index(self, postgres_engine, name, statement, index):
+        with postgres_engine.connect() as conn:
+            conn.execute(text("SET enable_seqscan = off"))
+            sql = _literal_sql(statement, conn.dialect)
+            plan = "\n".join(row[0] for row in conn.exec_driver_sql(f"EXPLAIN {sql}"))
+        assert _uses_index(plan, index), f"{name} does not use {index}:\n{plan}"
+
+    @pytest.mark.parametrize("query,index", [
+        ("lighthouse keeper", "ix_personas_search"),
+        ("Marcos Aurelius", "ix_personas_name_trgm"),
+    ])
+    def test_persona_search_uses_gin_indexes(self, postgres_engine, query, index):
+        statement = postgres_search_statement(query, exclude_user_id=1)
+        with postgres_engine.connect() as conn:
+            conn.execute(text("SET enable_seqscan = off"))
+            sql = _literal_sql(statement, conn.dialect)
+            plan = "\n".join(row[0] for row in conn.exec_driver_sql(f"EXPLAIN {sql}"))
+        assert index in plan, f"search for {query!r} does not use {index}:\n{plan}"
@@ -0,0 +1,198 @@
+"""
+Structured Output Tests
+
+call_with_tool (forced tool use, validation, one repair request), its
+metrics, the challenge validators, and GET /admin/structured-output.
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.auth import create_access_token
+from app.models.user import User
+from app.services.challenge_service import ChallengeService, validate_personas, validate_persuasion
+from app.services.structured_output import (
+    StructuredOutputError,
+    StructuredOutputMetrics,
+    call_with_tool,
+    extract_json,
+    structured_output_metrics,
+)
+
+TOOL = {
+    "name": "record_thing",
+    "description": "Record a thing.",
+    "input_schema": {"type": "object", "properties": {"value": {"type": "number"}}, "required": ["value"]},
+}
+
+
+def _tool_response(data, tool_name="record_thing", input_tokens=100, output_tokens=20):
+    block = MagicMock(type="tool_use", input=data, id="toolu_1")
+    block.name = tool_name
+    return MagicMock(content=[block], usage=MagicMock(input_tokens=input_tokens, output_tokens=output_tokens))
+
+
+def _text_response(text):
+    return MagicMock(content=[MagicMock(type="text", text=text)], usage=MagicMock(input_tokens=50, output_tokens=5))
+
+
+def _validate(data):
+    return float(data["value"])
+
+
+@pytest.fixture
+def metrics():
+    return StructuredOutputMetrics()
+
+
+def _call(client, metrics):
+    return call_with_tool(
+        client, "thing", TOOL, _validate, metrics=metrics,
+        model="m", max_tokens=10, messages=[{"role": "user", "content": "go"}],
+    )
+
+
+class TestExtractJson:
+
+    @pytest.mark.parametrize("text", [
+        '{"a": 1}',
+        'Sure! {"a": 1} Hope that helps.',
+        '```json\n{"a": 1}\n```',
+    ])
+    def test_object(self, text):
+        assert extract_json(text) == {"a": 1}
+
+    def test_array(self):
+        assert extract_json('Here: [1, 2]') == [1, 2]
+
+    def test_no_json(self):
+        with pytest.raises(ValueError):
+            extract_json("no json here")
+
+
+class TestCallWithTool:
+
+    def test_forces_tool_and_returns_validated_input(self, metrics):
+        client = MagicMock()
+        client.messages.create.return_value = _tool_response({"value": 3})
+
+        assert _call(client, metrics) == 3.0
+        kwargs = client.messages.create.call_args.kwargs
+        assert kwargs["tools"] == [TOOL]
+        assert kwargs["tool_choice"] == {"type": "tool", "name": "record_thing"}
+        assert kwargs["model"] == "m"
+        assert metrics.stats()["thing"]["first_try"] == 1
+
+    def test_repairs_invalid_tool_input_once(self, metrics):
+        client = MagicMock()
+        client.messages.create.side_effect = [_tool_response({"wrong": 1}), _tool_response({"value": 2})]
+
+        assert _call(client, metrics) == 2.0
+        repair = client.messages.create.call_args.kwargs["messages"]
+        assert [m["role"] for m in repair] == ["user", "assistant", "user"]
+        result = repair[-1]["content"][0]
+        assert result["type"] == "tool_result"
+        assert result["tool_use_id"] == "toolu_1"
+        assert result["is_error"] is True
+        assert "value" in result["content"]
+
+        stats = metrics.stats()["thing"]
+        assert (stats["calls"], stats["repaired"], stats["failed"]) == (1, 1, 0)
+        assert (stats["wasted_input_tokens"], stats["wasted_output_tokens"]) == (100, 20)
+        assert stats["parse_failure_rate"] == 1.0
+
+    def test_gives_up_after_one_repair(self, metrics):
+        client = MagicMock()
+        client.messages.create.return_value = _tool_response({"value": "NaN?"})
+
+        with pytest.raises(StructuredOutputError):
+            _call(client, metrics)
+        assert client.messages.create.call_count == 2
+        assert metrics.stats()["thing"]["failed"] == 1
+
+    def test_text_answer_is_parsed(self, metrics):
+        client = MagicMock()
+        client.messages.create.return_value = _text_response('{"value": 7}')
+
+        assert _call(client, metrics) == 7.0
+        assert metrics.stats()["thing"]["text_fallback"] == 1
+
+    def test_unparseable_text_gets_plain_repair_message(self, metrics):
+        client = MagicMock()
+        client.messages.create.side_effect = [_text_response("I'd rather not."), _tool_response({"value": 1})]
+
+        assert _call(client, metrics) == 1.0
+        assert isinstance(client.messages.create.call_args.kwargs["messages"][-1]["content"], str)
+
+    def test_api_errors_propagate_without_retry(self, metrics):
+        client = MagicMock()
+        client.messages.create.side_effect = RuntimeError("overloaded")
+
+        with pytest.raises(RuntimeError):
+            _call(client, metrics)
+        assert client.messages.create.call_count == 1
+
+    def test_caller_messages_not_mutated(self, metrics):
+        client = MagicMock()
+        client.messages.create.side_effect = [_tool_response({}), _tool_response({"value": 1})]
+        messages = [{"role": "user", "content": "go"}]
+
+        call_with_tool(client, "thing", TOOL, _validate, metrics=metrics, model="m", max_tokens=10, messages=messages)
+        assert len(messages) == 1
+
+
+class TestChallengeValidators:
+
+    def test_personas_accepts_tool_input_or_array(self):
+        assert validate_personas({"personas": [{"name": "A"}]}) == [{"name": "A"}]
+        assert validate_personas([{"name": "A"}]) == [{"name": "A"}]
+
+    @pytest.mark.parametrize("data", [{"personas": []}, {"other": 1}, [{"age": 3}], ["x"]])
+    def test_personas_rejects(self, data):
+        with pytest.raises(ValueError):
+            validate_personas(data)
+
+    def test_persuasion_clamps(self):
+        assert validate_persuasion({"new_score": 1.4, "reasoning": "Wow"}) == {"new_score": 1.0, "reasoning": "Wow"}
+
+    @pytest.mark.parametrize("data", [{"new_score": "high"}, {"reasoning": "x"}, [0.5]])
+    def test_persuasion_rejects(self, data):
+        with pytest.raises((KeyError, ValueError)):
+            validate_persuasion(data)
+
+    def test_evaluate_persuasion_repairs(self):
+        mock_llm = MagicMock()
+        mock_llm.client.messages.create.side_effect = [
+            _tool_response({"reasoning": "forgot the score"}, tool_name="record_persuasion"),
+            _tool_response({"new_score": 0.4, "reasoning": "Better."}, tool_name="record_persuasion"),
+        ]
+
+        res = ChallengeService(llm_service=mock_llm).evaluate_persuasion(
+            persona_name="P", persona_description="D", proposal="X",
+            current_score=0.3, message_speaker="User", message_text="Hi",
+        )
+        assert res == {"new_score": 0.4, "reasoning": "Better."}
+        assert mock_llm.client.messages.create.call_count == 2
+
+
+class TestStructuredOutputEndpoint:
+
+    @pytest.fixture
+    def admin_headers(self, db_session):
+        user = User(email="ops@example.com", google_id="google_ops", name="Ops", is_admin=True)
+        db_session.add(user)
+        db_session.commit()
+        return {"Authorization": f"Bearer {create_access_token(user_id=user.id)}"}
+
+    def test_reports_global_metrics(self, client, admin_headers):
+        structured_output_metrics.reset()
+        structured_output_metrics.record("ocean_inference", calls=2, first_try=1, repaired=1)
+
+        response = client.get("/admin/structured-output", headers=admin_headers)
+        assert response.status_code == 200
+        assert response.json()["ocean_inference"]["parse_failure_rate"] == 0.5
+        structured_output_metrics.reset()
+
+    def test_requires_admin(self, client, auth_headers):
+        assert client.get("/admin/structured-output", headers=auth_headers).status_code == 403
@@ -0,0 +1,324 @@
+"""
+Usage Accounting Tests
+
+Cost estimation, UsageRecorder buffering/flushing, attribution through
+usage_context, service call sites, and the admin usage rollups.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import create_access_token
+from app.models.conversation import Conversation
+from app.models.usage import UsageEvent
+from app.models.user import User
+from app.services.usage import (
+    UsageRecorder,
+    current_attribution,
+    estimate_cost,
+    in_context,
+    usage_context,
+)
+
+
+@pytest.fixture
+def session_factory(test_db_engine):
+    return sessionmaker(bind=test_db_engine)
+
+
+@pytest.fixture
+def recorder(session_factory):
+    return UsageRecorder(session_factory=session_factory, batch_size=100, flush_interval=3600)
+
+
+def _eventually(condition, timeout=5.0):
+    """Poll for something the background flusher does."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _anthropic_response(input_tokens=1000, output_tokens=200, text="ok"):
+    return MagicMock(content=[MagicMock(text=text)], usage=MagicMock(input_tokens=input_tokens, output_tokens=output_tokens))
+
+
+class TestEstimateCost:
+
+    def test_token_pricing_by_model_prefix(self):
+        assert estimate_cost("claude-haiku-4-5-20251001", 1_000_000, 1_000_000) == pytest.approx(6.0)
+
+    def test_image_pricing(self):
+        assert estimate_cost("dall-e-3", images=2) == pytest.approx(0.16)
+
+    def test_unknown_model_is_free(self):
+        assert estimate_cost("mystery-model", 10_000, 10_000, images=1) == 0.0
+
+
+class TestUsageRecorder:
+
+    def test_aggregates_in_memory(self, recorder):
+        recorder.record("llm", "motto", "claude-haiku-4-5", input_tokens=100, output_tokens=10, latency_ms=40)
+        recorder.record("llm", "motto", "claude-haiku-4-5", input_tokens=300, output_tokens=30, latency_ms=60)
+        recorder.record("ocean_inference", "ocean_inference", "claude-haiku-4-5", cache_hit=True)
+
+        stats = recorder.stats()
+        llm = stats["totals"]["llm/claude-haiku-4-5"]
+        assert (llm["calls"], llm["input_tokens"], llm["output_tokens"]) == (2, 400, 40)
+        assert llm["avg_latency_ms"] == 50.0
+        assert stats["totals"]["ocean_inference/claude-haiku-4-5"]["cache_hits"] == 1
+        assert stats["buffered"] == 3
+
+    def test_flush_writes_one_batch(self, recorder, session_factory):
+        with usage_context(user_id=None, endpoint="POST /x"):
+            recorder.record("llm", "motto", "claude-haiku-4-5", input_tokens=5)
+            recorder.record("image", "avatar", "dall-e-3", images=1)
+
+        assert recorder.flush() == 2
+        assert recorder.flush() == 0
+        with session_factory() as db:
+            rows = db.query(UsageEvent).order_by(UsageEvent.id).all()
+        assert [(r.service, r.endpoint) for r in rows] == [("llm", "POST /x"), ("image", "POST /x")]
+        assert rows[1].cost_usd == pytest.approx(0.08)
+
+    def test_flushes_when_batch_is_full(self, session_factory):
+        recorder = UsageRecorder(session_factory=session_factory, batch_size=2, flush_interval=3600)
+        recorder.record("llm", "motto", "m")
+        assert recorder.stats()["flushed"] == 0
+        recorder.record("llm", "motto", "m")
+        assert _eventually(lambda: recorder.stats()["flushed"] == 2)
+        assert recorder.stats()["buffered"] == 0
+
+    def test_flushes_after_interval_without_more_events(self, session_factory):
+        # A quiet period: nothing else is recorded, the flusher still writes the batch
+        recorder = UsageRecorder(session_factory=session_factory, batch_size=100, flush_interval=0.05)
+        recorder.record("llm", "motto", "m")
+        assert _eventually(lambda: recorder.stats()["flushed"] == 1)
+
+    def test_record_does_not_write(self, session_factory):
+        writers = []
+        recorder = UsageRecorder(session_factory=session_factory, batch_size=1, flush_interval=3600)
+        original = recorder._write
+        recorder._write = lambda events: (writers.append(threading.current_thread().name), original(events))[1]
+
+        recorder.record("llm", "motto", "m")
+        assert _eventually(lambda: recorder.stats()["flushed"] == 1)
+        assert writers == ["usage-flusher"]
+
+    def test_close_writes_the_buffer(self, recorder):
+        recorder.record("llm", "motto", "m")
+        recorder.close()
+        assert recorder.stats()["flushed"] == 1
+
+    def test_deleted_conversation_keeps_the_batch(self, recorder, session_factory, test_user):
+        with session_factory() as db:
+            conversation = Conversation(topic="Gone soon", created_by=test_user.id)
+            db.add(conversation)
+            db.commit()
+            conversation_id = conversation.id
+
+        with usage_context(user_id=test_user.id, conversation_id=conversation_id):
+            recorder.record("llm", "conversation_turn", "m", input_tokens=10)
+        with usage_context(user_id=test_user.id):
+            recorder.record("llm", "motto", "m", input_tokens=5)
+
+        with session_factory() as db:
+            db.query(Conversation).filter(Conversation.id == conversation_id).delete()
+            db.commit()
+
+        assert recorder.flush() == 2
+        assert recorder.stats()["dropped"] == 0
+        with session_factory() as db:
+            rows = db.query(UsageEvent).order_by(UsageEvent.id).all()
+        assert [(r.user_id, r.conversation_id, r.input_tokens) for r in rows] == [
+            (test_user.id, None, 10), (test_user.id, None, 5),
+        ]
+
+    def test_write_failure_drops_batch_without_raising(self):
+        def broken():
+            raise RuntimeError("database down")
+
+        recorder = UsageRecorder(session_factory=broken, batch_size=1)
+        recorder.record("llm", "motto", "m")
+        assert _eventually(lambda: recorder.stats()["dropped"] == 1)
+
+    def test_disabled(self, recorder):
+        with patch("app.services.usage.settings.USAGE_ACCOUNTING_ENABLED", False):
+            recorder.record("llm", "motto", "m")
+        assert recorder.stats()["buffered"] == 0
+
+    def test_record_response_reads_usage(self, recorder):
+        recorder.record_response("llm", "motto", "claude-haiku-4-5", _anthropic_response(), started=0.0)
+        totals = recorder.stats()["totals"]["llm/claude-haiku-4-5"]
+        assert (totals["input_tokens"], totals["output_tokens"]) == (1000, 200)
+
+
+class TestAttribution:
+
+    def test_nested_contexts_merge(self):
+        with usage_context(user_id=1, endpoint="GET /a"):
+            with usage_context(conversation_id=7, user_id=None):
+                assert current_attribution() == {"user_id": 1, "conversation_id": 7, "endpoint": "GET /a"}
+        assert current_attribution() == {"user_id": None, "conversation_id": None, "endpoint": None}
+
+    def test_endpoint_uses_route_template(self):
+        scope = {"method": "POST", "path": "/conversations/abc123/continue",
+                 "route": SimpleNamespace(path="/conversations/{unique_id}/continue")}
+        with usage_context(scope=scope):
+            assert current_attribution()["endpoint"] == "POST /conversations/{unique_id}/continue"
+
+    def test_in_context_carries_attribution_into_threads(self):
+        with usage_context(user_id=3):
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                plain = pool.submit(current_attribution).result()
+                wrapped = pool.submit(in_context(current_attribution)).result()
+        assert plain["user_id"] is None
+        assert wrapped["user_id"] == 3
+
+
+class TestCallSites:
+
+    @pytest.fixture
+    def recorded(self):
+        calls = []
+        stub = MagicMock()
+        stub.record.side_effect = lambda *a, **kw: calls.append((a, {**kw, **current_attribution()}))
+        stub.record_response.side_effect = lambda service, operation, model, response, started: calls.append(
+            ((service, operation, model), current_attribution())
+        )
+        return stub, calls
+
+    def test_llm_service_motto(self, recorded):
+        from app.services.llm_service import LLMService
+
+        stub, calls = recorded
+        client = MagicMock()
+        client.messages.create.return_value = _anthropic_response(text="Grind.")
+        with patch("app.services.llm_service.usage_recorder", stub):
+            LLMService(client=client, model="claude-haiku-4-5").generate_motto({
+                "name": "A",
+                "ocean_scores": dict.fromkeys(
+                    ("openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism"), 0.5,
+                ),
+                "archetype_affinities": {"The Analyst": 0.9},
+            })
+        assert calls[0][0] == ("llm", "motto", "claude-haiku-4-5")
+
+    def test_ocean_cache_hit_recorded(self, recorded):
+        from app.services.ocean_inference import OceanInferenceService
+
+        stub, calls = recorded
+        cache = MagicMock()
+        cache.get.return_value = {"openness": 0.5}
+        with patch("app.services.ocean_inference.usage_recorder", stub):
+            OceanInferenceService(client=MagicMock(), cache=cache).infer_ocean_traits("x")
+        assert calls[0][1]["cache_hit"] is True
+
+    def test_moderation_recorded(self, recorded):
+        from app.services.content_moderation_service import ContentModerationService
+
+        stub, calls = recorded
+        http = MagicMock()
+        http.post.return_value.json.return_value = {"results": [{"category_scores": {"hate": 0.1}}]}
+        with patch("app.services.content_moderation_service.usage_recorder", stub):
+            ContentModerationService(http_client=http, threshold=0.7).analyze_toxicity("hi")
+        assert calls[0][0][0] == "moderation"
+
+    def test_orchestrator_attributes_conversation(self, recorded, db_session, test_user, test_personas):
+        from app.services.conversation_orchestrator import ConversationOrchestrator
+        from app.services.llm_service import LLMService
+
+        stub, calls = recorded
+        conv = Conversation(topic="Cats", created_by=test_user.id)
+        db_session.add(conv)
+        db_session.commit()
+
+        client = MagicMock()
+        client.messages.create.return_value = _anthropic_response(text="Cats rule.")
+        moderator = MagicMock()
+        moderator.analyze_toxicity.return_value = 0.0
+        moderator.is_safe.return_value = True
+        with patch("app.services.llm_service.usage_recorder", stub):
+            ConversationOrchestrator(
+                llm_service=LLMService(client=client), moderation_service=moderator,
+            ).generate_turn(conversation=conv, personas=test_personas[:2], history=[], db=db_session)
+
+        assert [c[1]["conversation_id"] for c in calls] == [conv.id, conv.id]
+
+
+# ============================================================================
+# Admin rollups
+# ============================================================================
+
+@pytest.fixture
+def superuser_headers(db_session):
+    user = User(email="root@example.com", google_id="google_root", name="Root", is_admin=True, is_superuser=True)
+    db_session.add(user)
+    db_session.commit()
+    return {"Authorization": f"Bearer {create_access_token(user_id=user.id)}"}
+
+
+@pytest.fixture
+def usage_rows(db_session, test_user):
+    conv = Conversation(topic="Budget", created_by=test_user.id)
+    db_session.add(conv)
+    db_session.flush()
+    now = datetime.now(timezone.utc)
+    db_session.add_all([
+        UsageEvent(service="llm", operation="conversation_turn", model="m", user_id=test_user.id,
+                   conversation_id=conv.id, input_tokens=100, output_tokens=10, latency_ms=100, cost_usd=0.5,
+                   created_at=now),
+        UsageEvent(service="llm", operation="conversation_turn", model="m", user_id=test_user.id,
+                   conversation_id=conv.id, input_tokens=300, output_tokens=30, latency_ms=300, cost_usd=1.5,
+                   created_at=now),
+        UsageEvent(service="ocean_inference", operation="ocean_inference", model="m", user_id=test_user.id,
+                   cache_hit=True, created_at=now - timedelta(days=2)),
+    ])
+    db_session.commit()
+    return conv
+
+
+class TestUsageRollups:
+
+    @pytest.fixture(autouse=True)
+    def no_flush(self):
+        with patch("app.routers.admin.usage_recorder") as stub:
+            yield stub
+
+    def test_per_user(self, client, superuser_headers, usage_rows, test_user):
+        response = client.get("/admin/usage/users", headers=superuser_headers)
+        assert response.status_code == 200
+        [item] = response.json()["items"]
+        assert item["email"] == test_user.email
+        assert (item["calls"], item["cache_hits"], item["input_tokens"]) == (3, 1, 400)
+        assert item["cost_usd"] == 2.0
+
+    def test_per_conversation_since(self, client, superuser_headers, usage_rows):
+        since = (datetime.now(timezone.utc) - timedelta(days=1)).replace(tzinfo=None).isoformat()
+        response = client.get("/admin/usage/conversations", params={"since": since}, headers=superuser_headers)
+        [item] = response.json()["items"]
+        assert item["conversation_id"] == usage_rows.unique_id
+        assert (item["calls"], item["output_tokens"], item["avg_latency_ms"]) == (2, 40, 200.0)
+
+    def test_rollups_flush_buffer_first(self, client, superuser_headers, no_flush):
+        client.get("/admin/usage/users", headers=superuser_headers)
+        no_flush.flush.assert_called_once()
+
+    def test_rollups_require_superuser(self, client, auth_headers):
+        assert client.get("/admin/usage/users", headers=auth_headers).status_code == 403
+        assert client.get("/admin/usage/conversations", headers=auth_headers).status_code == 403
+
+    def test_totals_endpoint(self, client, superuser_headers, no_flush):
+        no_flush.stats.return_value = {"totals": {}, "buffered": 0, "flushed": 0, "dropped": 0}
+        response = client.get("/admin/usage", headers=superuser_headers)
+        assert response.status_code == 200
+        assert response.json()["buffered"] == 0
@@ -0,0 +1,75 @@
+"""
+Job Worker Entry Point Tests
+
+Tests for python -m app.worker: the threaded run until stopped and --drain.
+"""
+
+import threading
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import worker
+from app.models.job import Job
+from app.services import job_queue
+from app.services.job_queue import enqueue, job_handler
+
+
+@pytest.fixture
+def session_factory(test_db_engine):
+    return sessionmaker(bind=test_db_engine)
+
+
+@pytest.fixture
+def handler():
+    calls = []
+
+    def run(db, job):
+        calls.append(job.id)
+        return {"ok": job.payload.get("n")}
+
+    job_handler("test")(run)
+    yield calls
+    job_queue._handlers.pop("test", None)
+
+
+def _status(db_session, job_id):
+    db_session.expire_all()
+    return db_session.get(Job, job_id).status
+
+
+class TestWorkerMain:
+
+    def test_claims_and_completes_queued_job_until_stopped(self, db_session, session_factory, handler):
+        job = enqueue(db_session, "test", {"n": 3})
+        db_session.commit()
+
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=worker.main,
+            args=(["--concurrency", "1"], stop),
+            kwargs={"session_factory": session_factory, "poll_interval": 0.01},
+        )
+        thread.start()
+        try:
+            deadline = time.monotonic() + 5
+            while _status(db_session, job.id) != "succeeded" and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            stop.set()
+            thread.join(timeout=5)
+
+        assert not thread.is_alive()
+        assert handler == [job.id]
+        db_session.expire_all()
+        assert db_session.get(Job, job.id).result == {"ok": 3}
+
+    def test_drain_runs_every_job_then_returns(self, db_session, session_factory, handler):
+        jobs = [enqueue(db_session, "test", {"n": n}) for n in range(3)]
+        db_session.commit()
+
+        worker.main(["--drain"], session_factory=session_factory, poll_interval=0)
+
+        assert handler == [job.id for job in jobs]
+        assert {_status(db_session, job.id) for job in jobs} == {"succeeded"}
@@ -46,7 +46,7 @@ function ConversationContent() {
       if (data?.is_challenge && data?.status === "pending") {
         pollRef.current = setInterval(async () => {
           const updated = await fetchConversation();
-          if (updated?.status === "active") stopPolling();
+          if (updated?.status !== "pending") stopPolling();
         }, POLL_INTERVAL_MS);
       }
     });
@@ -132,6 +132,15 @@ function ConversationContent() {
               </p>
             </div>
           </div>
+        ) : conversation?.is_challenge && conversation?.status === "failed" ? (
+          <div className="flex flex-col items-center justify-center py-24 gap-2 text-center">
+            <h2 className="text-xl font-bold text-gray-800 dark:text-gray-100">
+              We couldn&apos;t build this challenge
+            </h2>
+            <p className="text-gray-500 dark:text-gray-400 max-w-sm">
+              Generating the personas failed. Please try creating the challenge again.
+            </p>
+          </div>
         ) : conversation ? (
           <ConversationView
             conversation={conversation}